@@ -1,7 +1,44 @@
+from typing import Callable
+
 from flask import Blueprint
 
 api_v1_bp = Blueprint("api_v1", __name__)
 
+# CONNECT_AI_ASYNC 有効時に差し替える async ビュー（エンドポイント名 -> ビュー関数）
+async_views: dict[str, Callable] = {}
+
+
+def async_variant(endpoint: str):
+    """ビュー関数を、同期ビュー endpoint の async 版として登録するデコレーター。"""
+    def decorator(fn: Callable) -> Callable:
+        async_views[endpoint] = fn
+        return fn
+    return decorator
+
+
+def enable_async_views(app) -> None:
+    """
+    登録済みの async ビューで同期ビューを置き換える（ログイン必須は同期ビューと同じ）。
+
+    Flask は WSGI アプリのため、async ビューもリクエストごとにワーカースレッドで
+    イベントループを回して実行する。同時に処理できるリクエスト数は変わらず、
+    上流呼び出しの接続の再利用とリクエスト内の並行実行が主な効果になる。
+
+    Raises:
+        RuntimeError: httpx または asgiref（Flask[async]）がインストールされていない場合
+    """
+    from flask_login import login_required
+    from backend.connectai.async_http_pool import httpx
+    if httpx is None:
+        raise RuntimeError("CONNECT_AI_ASYNC=true but httpx is not installed")
+    try:
+        import asgiref  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("CONNECT_AI_ASYNC=true but Flask[async] (asgiref) is not installed") from e
+    for endpoint, fn in async_views.items():
+        app.view_functions[f"{api_v1_bp.name}.{endpoint}"] = login_required(fn)
+
+
 from . import auth        # noqa: E402, F401
 from . import connections  # noqa: E402, F401
 from . import metadata     # noqa: E402, F401
@@ -10,3 +47,4 @@ from . import data         # noqa: E402, F401
 from . import api_log      # noqa: E402, F401
 from . import settings     # noqa: E402, F401
 from . import ai_assistant  # noqa: E402, F401
+from . import health       # noqa: E402, F401
@@ -1,9 +1,11 @@
-import json
+import uuid
 from flask import render_template, request, Response, stream_with_context, jsonify, current_app
 from flask_login import login_required, current_user
 from backend.api.v1 import api_v1_bp
+from backend import json_provider
 from backend.services import crypto_service
 from backend.services import claude_service
+from backend.services import tool_result_shaping
 from backend.connectai.jwt import generate_connect_ai_jwt
 
 
@@ -24,6 +26,8 @@ def ai_assistant_chat():
     message = data.get("message", "").strip()
     catalog_name = (data.get("catalog_name") or "").strip() or None
     client_messages: list[dict] = data.get("messages") or []
+    # トークン使用量のログを会話ごとに集計するための識別子（画面側で会話ごとに生成する）
+    conversation_id = str(data.get("conversation_id") or "")[:64] or uuid.uuid4().hex
 
     if not message:
         return jsonify({"error": {"code": "VALIDATION_ERROR", "message": "メッセージを入力してください"}}), 400
@@ -54,12 +58,27 @@ def ai_assistant_chat():
     messages = list(client_messages) + [{"role": "user", "content": message}]
 
     def generate():
-        for event_type, event_data in claude_service.stream_chat(api_key, jwt_token, messages, catalog_name):
-            yield f"event: {event_type}\ndata: {json.dumps(event_data, ensure_ascii=False)}\n\n"
+        for event_type, event_data in claude_service.stream_chat(
+            api_key, jwt_token, messages, catalog_name, account_id=account_id,
+            conversation_id=conversation_id,
+        ):
+            yield f"event: {event_type}\ndata: {json_provider.dumps(event_data)}\n\n"
 
     return Response(stream_with_context(generate()), mimetype="text/event-stream")
 
 
+@api_v1_bp.route("/api/v1/ai-assistant/results/<handle>", methods=["GET"])
+@login_required
+def ai_assistant_result(handle: str):
+    """AI アシスタントが省略したツール結果の全件を返す。"""
+    text = tool_result_shaping.get_full_result(current_user.connect_ai_account_id, handle)
+    if text is None:
+        return jsonify({
+            "error": {"code": "NOT_FOUND", "message": "結果が見つかりません（期限切れの可能性があります）"}
+        }), 404
+    return Response(text, mimetype="text/csv; charset=utf-8")
+
+
 @api_v1_bp.route("/api/v1/ai-assistant/reset", methods=["POST"])
 @login_required
 def ai_assistant_reset():
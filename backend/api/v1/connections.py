@@ -26,6 +26,7 @@ def connections_new_page():
 @api_v1_bp.route("/callback")
 @login_required
 def callback_page():
+    connection_service.complete_connection()
     return render_template("callback.html")
 
 
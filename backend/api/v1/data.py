@@ -1,8 +1,10 @@
-from flask import jsonify, request, render_template
+from flask import Response, jsonify, request, render_template
 from flask_login import login_required
-from backend.api.v1 import api_v1_bp
-from backend.services.data_service import DataService
+from backend.api.v1 import api_v1_bp, async_variant
+from backend.services import result_format
+from backend.services.data_service import AsyncDataService, DataService
 from backend.schemas.data_schema import (
+    RecordCountSchema,
     RecordListSchema,
     RecordWriteSchema,
     RecordUpdateSchema,
@@ -12,6 +14,7 @@ from backend.connectai.exceptions import ConnectAIError
 from pydantic import ValidationError
 
 data_service = DataService()
+async_data_service = AsyncDataService()
 
 
 # --- ページルーティング ---
@@ -32,7 +35,41 @@ def get_records():
     except ValidationError as e:
         return jsonify({"error": {"code": "VALIDATION_ERROR", "message": e.errors()}}), 400
     try:
+        fmt = result_format.negotiate_format(request.accept_mimetypes, request.args.get("format"))
+        if fmt != result_format.FORMAT_JSON:
+            body, page_info = data_service.list_records_columnar(req, fmt)
+            return Response(
+                body, mimetype=result_format.MIMETYPES[fmt], headers=_page_headers(page_info)
+            ), 200
         result = data_service.list_records(req)
+    except ValueError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": str(e)}}), 400
+    except result_format.ColumnarUnavailableError as e:
+        return jsonify({"error": {"code": "NOT_ACCEPTABLE", "message": str(e)}}), 406
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return jsonify(result), 200
+
+
+def _page_headers(page_info: dict) -> dict:
+    """列指向フォーマットで返す場合のページ情報（JSON 本体の代わりにヘッダーで渡す）。"""
+    headers = {"X-Total-Count": str(page_info["total"])}
+    if page_info.get("total_pending"):
+        headers["X-Total-Pending"] = "true"
+    if page_info.get("next_cursor"):
+        headers["X-Next-Cursor"] = page_info["next_cursor"]
+    return headers
+
+
+@api_v1_bp.route("/api/v1/data/records/count", methods=["GET"])
+@login_required
+def get_record_count():
+    try:
+        req = RecordCountSchema(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": e.errors()}}), 400
+    try:
+        result = data_service.get_record_count(req)
     except ConnectAIError as e:
         return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
     return jsonify(result), 200
@@ -82,3 +119,85 @@ def delete_record():
     except ConnectAIError as e:
         return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
     return jsonify(result), 200
+
+
+# --- async 版（CONNECT_AI_ASYNC 有効時に上のビューと差し替える） ---
+
+@async_variant("get_records")
+async def get_records_async():
+    """get_records の async 版。"""
+    try:
+        req = RecordListSchema(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": e.errors()}}), 400
+    try:
+        fmt = result_format.negotiate_format(request.accept_mimetypes, request.args.get("format"))
+        if fmt != result_format.FORMAT_JSON:
+            body, page_info = await async_data_service.list_records_columnar(req, fmt)
+            return Response(
+                body, mimetype=result_format.MIMETYPES[fmt], headers=_page_headers(page_info)
+            ), 200
+        result = await async_data_service.list_records(req)
+    except ValueError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": str(e)}}), 400
+    except result_format.ColumnarUnavailableError as e:
+        return jsonify({"error": {"code": "NOT_ACCEPTABLE", "message": str(e)}}), 406
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return jsonify(result), 200
+
+
+@async_variant("get_record_count")
+async def get_record_count_async():
+    try:
+        req = RecordCountSchema(**request.args.to_dict())
+    except ValidationError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": e.errors()}}), 400
+    try:
+        result = await async_data_service.get_record_count(req)
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return jsonify(result), 200
+
+
+@async_variant("create_record")
+async def create_record_async():
+    try:
+        req = RecordWriteSchema(**request.get_json())
+    except ValidationError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": e.errors()}}), 400
+    try:
+        result = await async_data_service.create_record(req)
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return jsonify(result), 201
+
+
+@async_variant("update_record")
+async def update_record_async():
+    try:
+        req = RecordUpdateSchema(**request.get_json())
+    except ValidationError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": e.errors()}}), 400
+    try:
+        result = await async_data_service.update_record(req)
+    except ValueError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": str(e)}}), 400
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return jsonify(result), 200
+
+
+@async_variant("delete_record")
+async def delete_record_async():
+    try:
+        req = RecordDeleteSchema(**request.get_json())
+    except ValidationError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": e.errors()}}), 400
+    try:
+        result = await async_data_service.delete_record(req)
+    except ValueError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": str(e)}}), 400
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return jsonify(result), 200
@@ -0,0 +1,13 @@
+from flask import current_app, jsonify
+from backend.api.v1 import api_v1_bp
+from backend.services.health_service import HealthService
+
+health_service = HealthService()
+
+
+# --- API ---
+
+@api_v1_bp.route("/api/v1/health", methods=["GET"])
+def health():
+    # ロードバランサーのヘルスチェックにも使えるよう認証不要・常に 200 を返す
+    return jsonify(health_service.get_status(current_app._get_current_object())), 200
@@ -1,10 +1,11 @@
 from flask import jsonify, request, render_template
 from flask_login import login_required
-from backend.api.v1 import api_v1_bp
-from backend.services.metadata_service import MetadataService
+from backend.api.v1 import api_v1_bp, async_variant
+from backend.services.metadata_service import AsyncMetadataService, MetadataService
 from backend.connectai.exceptions import ConnectAIError
 
 metadata_service = MetadataService()
+async_metadata_service = AsyncMetadataService()
 
 
 # --- ページルーティング ---
@@ -67,3 +68,53 @@ def get_columns():
     except ConnectAIError as e:
         return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
     return jsonify({"columns": columns}), 200
+
+
+# --- async 版（CONNECT_AI_ASYNC 有効時に上のビューと差し替える） ---
+
+@async_variant("get_catalogs")
+async def get_catalogs_async():
+    try:
+        catalogs = await async_metadata_service.get_catalogs()
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return jsonify({"catalogs": catalogs}), 200
+
+
+@async_variant("get_schemas")
+async def get_schemas_async():
+    catalog_name = request.args.get("catalog_name")
+    if not catalog_name:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": "catalog_name は必須です"}}), 400
+    try:
+        schemas = await async_metadata_service.get_schemas(catalog_name)
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return jsonify({"schemas": schemas}), 200
+
+
+@async_variant("get_tables")
+async def get_tables_async():
+    catalog_name = request.args.get("catalog_name")
+    schema_name = request.args.get("schema_name")
+    if not catalog_name or not schema_name:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": "catalog_name / schema_name は必須です"}}), 400
+    try:
+        tables = await async_metadata_service.get_tables(catalog_name, schema_name)
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return jsonify({"tables": tables}), 200
+
+
+@async_variant("get_columns")
+async def get_columns_async():
+    catalog_name = request.args.get("catalog_name")
+    schema_name = request.args.get("schema_name")
+    table_name = request.args.get("table_name")
+    if not catalog_name or not schema_name or not table_name:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": "catalog_name / schema_name / table_name は必須です"}}), 400
+    try:
+        columns = await async_metadata_service.get_columns(catalog_name, schema_name, table_name)
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return jsonify({"columns": columns}), 200
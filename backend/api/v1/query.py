@@ -1,12 +1,16 @@
-from flask import jsonify, request, render_template
+from urllib.parse import quote
+
+from flask import Response, jsonify, request, render_template, stream_with_context
 from flask_login import login_required
-from backend.api.v1 import api_v1_bp
-from backend.services.query_service import QueryService
-from backend.schemas.query_schema import QueryRequestSchema
+from backend.api.v1 import api_v1_bp, async_variant
+from backend.services import result_format
+from backend.services.query_service import EXPORT_FORMATS, AsyncQueryService, QueryService
+from backend.schemas.query_schema import QueryExportSchema, QueryRequestSchema
 from backend.connectai.exceptions import ConnectAIError
 from pydantic import ValidationError
 
 query_service = QueryService()
+async_query_service = AsyncQueryService()
 
 
 # --- ページルーティング ---
@@ -27,7 +31,63 @@ def execute_query():
     except ValidationError as e:
         return jsonify({"error": {"code": "VALIDATION_ERROR", "message": e.errors()}}), 400
     try:
+        fmt = result_format.negotiate_format(request.accept_mimetypes, request.args.get("format"))
+        if fmt != result_format.FORMAT_JSON:
+            body = query_service.execute_query_columnar(req, fmt)
+            return Response(body, mimetype=result_format.MIMETYPES[fmt]), 200
         result = query_service.execute_query(req)
+    except ValueError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": str(e)}}), 400
+    except result_format.ColumnarUnavailableError as e:
+        return jsonify({"error": {"code": "NOT_ACCEPTABLE", "message": str(e)}}), 406
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return jsonify(result), 200
+
+
+@async_variant("execute_query")
+async def execute_query_async():
+    """execute_query の async 版（CONNECT_AI_ASYNC 有効時に差し替える）。"""
+    try:
+        req = QueryRequestSchema(**request.get_json())
+    except ValidationError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": e.errors()}}), 400
+    try:
+        fmt = result_format.negotiate_format(request.accept_mimetypes, request.args.get("format"))
+        if fmt != result_format.FORMAT_JSON:
+            body = await async_query_service.execute_query_columnar(req, fmt)
+            return Response(body, mimetype=result_format.MIMETYPES[fmt]), 200
+        result = await async_query_service.execute_query(req)
+    except ValueError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": str(e)}}), 400
+    except result_format.ColumnarUnavailableError as e:
+        return jsonify({"error": {"code": "NOT_ACCEPTABLE", "message": str(e)}}), 406
     except ConnectAIError as e:
         return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
     return jsonify(result), 200
+
+
+@api_v1_bp.route("/api/v1/query/export", methods=["POST"])
+@login_required
+def export_query():
+    try:
+        req = QueryExportSchema(**request.get_json())
+    except ValidationError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": e.errors()}}), 400
+    try:
+        chunks = query_service.export_query(req)
+    except ValueError as e:
+        return jsonify({"error": {"code": "VALIDATION_ERROR", "message": str(e)}}), 400
+    except ConnectAIError as e:
+        return jsonify({"error": {"code": "CONNECT_AI_ERROR", "message": str(e)}}), 502
+    return Response(
+        stream_with_context(chunks),
+        content_type=EXPORT_FORMATS[req.format],
+        headers={
+            "Content-Disposition": (
+                f"attachment; filename*=UTF-8''{quote(f'{req.table_name}.{req.format}')}"
+            ),
+            # リバースプロキシにバッファリングさせず、ページごとに送信する
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -18,6 +18,10 @@ def create_app(test_config: dict | None = None):
     if test_config:
         app.config.update(test_config)
 
+    from backend import json_provider
+    json_provider.configure(app.config["JSON_BACKEND"])
+    app.json = json_provider.FastJSONProvider(app)
+
     db.init_app(app)
     Migrate(app, db)
 
@@ -36,8 +40,10 @@ def create_app(test_config: dict | None = None):
             return jsonify({"error": {"code": "UNAUTHORIZED"}}), 401
         return redirect(url_for("api_v1.login_page"))
 
-    from backend.api.v1 import api_v1_bp
+    from backend.api.v1 import api_v1_bp, enable_async_views
     app.register_blueprint(api_v1_bp)
+    if app.config["CONNECT_AI_ASYNC"]:
+        enable_async_views(app)
 
     from backend.middleware.error_handler import register_error_handlers
     register_error_handlers(app)
@@ -0,0 +1,83 @@
+"""
+JSON エンコード / デコードのベンチマーク（標準ライブラリ vs orjson）。
+
+Connect AI のクエリ結果に近い 1,000 行のペイロードで、レスポンス解析（loads）・
+API レスポンス生成（dumps）・NDJSON 1 行ずつの生成を計測する。
+
+    python -m backend.benchmarks.bench_json [--iterations 200] [--rows 1000]
+"""
+import argparse
+import time
+
+from backend import json_provider
+
+
+def _timeit(label: str, fn, iterations: int) -> None:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call_us = (time.perf_counter() - start) / iterations * 1_000_000
+    print(f"{label:<28} {per_call_us:>10.1f} us/call")
+
+
+def _payload(rows: int) -> dict:
+    """/query のレスポンスに近い {"results": [{"schema": [...], "rows": [...]}]} を作る。"""
+    schema = [
+        {"columnName": "Id", "dataTypeName": "VARCHAR"},
+        {"columnName": "Name", "dataTypeName": "VARCHAR"},
+        {"columnName": "Amount", "dataTypeName": "DOUBLE"},
+        {"columnName": "Quantity", "dataTypeName": "INTEGER"},
+        {"columnName": "IsActive", "dataTypeName": "BOOLEAN"},
+        {"columnName": "CreatedDate", "dataTypeName": "TIMESTAMP"},
+        {"columnName": "Description", "dataTypeName": "VARCHAR"},
+    ]
+    data = [
+        [
+            f"0015g00000{i:06d}",
+            f"取引先 {i}",
+            i * 12.5,
+            i % 100,
+            i % 2 == 0,
+            f"2024-01-{i % 28 + 1:02d}T03:04:05.000Z",
+            "Lorem ipsum dolor sit amet, consectetur adipiscing elit." if i % 3 else None,
+        ]
+        for i in range(rows)
+    ]
+    return {"results": [{"schema": schema, "rows": data}]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    payload = _payload(args.rows)
+    columns = [c["columnName"] for c in payload["results"][0]["schema"]]
+    rows = payload["results"][0]["rows"]
+
+    backends = [json_provider.BACKEND_STDLIB]
+    if json_provider.orjson is not None:
+        backends.append(json_provider.BACKEND_ORJSON)
+    else:
+        print("orjson is not installed: measuring stdlib only")
+
+    previous = json_provider.get_backend()
+    try:
+        for backend in backends:
+            json_provider.configure(backend)
+            body = json_provider.dumps(payload).encode()
+            print(f"[{backend}] payload {len(body) / 1024:.0f} KiB, {args.rows} rows")
+            _timeit("loads (Connect AI response)", lambda: json_provider.loads(body),
+                    args.iterations)
+            _timeit("dumps (API response)", lambda: json_provider.dumps(payload),
+                    args.iterations)
+            _timeit("dumps (NDJSON per row)",
+                    lambda: [json_provider.dumps(dict(zip(columns, r)), default=str) for r in rows],
+                    args.iterations)
+    finally:
+        json_provider.configure(previous)
+
+
+if __name__ == "__main__":
+    main()
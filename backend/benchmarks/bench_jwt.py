@@ -0,0 +1,53 @@
+"""
+JWT 生成コストのベンチマーク。
+
+鍵の読み込み（PEM パース）・RS256 署名・キャッシュ経由の取得を個別に計測する。
+
+    python -m backend.benchmarks.bench_jwt [--iterations 200]
+"""
+import argparse
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from flask import Flask
+
+from backend.connectai.jwt import clear_jwt_cache, generate_connect_ai_jwt, sign_connect_ai_jwt
+
+
+def _timeit(label: str, fn, iterations: int) -> None:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call_us = (time.perf_counter() - start) / iterations * 1_000_000
+    print(f"{label:<28} {per_call_us:>10.1f} us/call")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    )
+
+    app = Flask(__name__)
+    app.config["CONNECT_AI_PRIVATE_KEY"] = pem.decode()
+
+    _timeit("load_pem_private_key", lambda: serialization.load_pem_private_key(pem, password=None),
+            args.iterations)
+    _timeit("sign_connect_ai_jwt", lambda: sign_connect_ai_jwt(key, "parent", "child"),
+            args.iterations)
+    with app.app_context():
+        clear_jwt_cache()
+        _timeit("generate_connect_ai_jwt", lambda: generate_connect_ai_jwt("parent", "child"),
+                args.iterations)
+        clear_jwt_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import threading
+
+from .loader import CacheLoader
+from .memory import CacheEntry, MemoryCache
+from .sqlite import SQLiteCache
+
+_init_lock = threading.Lock()
+
+
+def create_cache_backend(config):
+    """
+    CACHE_BACKEND の設定に応じたキャッシュバックエンドを生成する。
+
+    - "memory": プロセス内 LRU（ワーカーごとに独立）
+    - "sqlite": CACHE_SQLITE_PATH の SQLite ファイルを同一ホストの全ワーカーで共有
+    """
+    backend = config.get("CACHE_BACKEND", "memory")
+    max_bytes = int(config.get("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    if backend == "memory":
+        return MemoryCache(max_bytes=max_bytes)
+    if backend == "sqlite":
+        return SQLiteCache(config["CACHE_SQLITE_PATH"], max_bytes=max_bytes)
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+
+def get_cache(app) -> CacheLoader:
+    """
+    アプリに紐づく CacheLoader を返す（初回呼び出し時に生成）。
+
+    Args:
+        app: Flask アプリ（current_app._get_current_object() の値）
+    """
+    loader = app.extensions.get("cache")
+    if loader is not None:
+        return loader
+    with _init_lock:
+        loader = app.extensions.get("cache")
+        if loader is None:
+            loader = CacheLoader(create_cache_backend(app.config))
+            app.extensions["cache"] = loader
+    return loader
+
+
+__all__ = [
+    "CacheEntry",
+    "CacheLoader",
+    "MemoryCache",
+    "SQLiteCache",
+    "create_cache_backend",
+    "get_cache",
+]
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+
+class CacheLoader:
+    """
+    キャッシュ越しに値を取得するヘルパー（stale-while-revalidate 対応）。
+
+    - TTL 内: キャッシュの値を返す
+    - TTL 切れだが stale_ttl 内: 古い値をすぐ返し、裏で 1 回だけ再取得する
+    - それ以外: loader() を呼んで取得・保存する
+
+    invalidate_prefix() 以前に開始した取得の結果は保存しない（削除直後に古い値が戻るのを防ぐ）。
+
+    Args:
+        cache: get / set / delete_prefix / stats を持つキャッシュバックエンド
+        max_workers: バックグラウンド再取得のスレッド数
+    """
+
+    def __init__(self, cache, max_workers: int = 4) -> None:
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="cache-refresh")
+        self._lock = threading.Lock()
+        self._refreshing: set[str] = set()
+        self._epoch = 0
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._refresh_errors = 0
+
+    def get_or_load(self, key: str, loader: Callable[[], object], ttl: float,
+                    stale_ttl: float = 0):
+        """
+        キャッシュから値を返す。なければ loader() で取得して保存する。
+
+        loader() の例外はそのまま呼び出し元に伝播する（キャッシュには保存しない）。
+        """
+        found, value = self._lookup(key, loader, ttl, stale_ttl)
+        if found:
+            return value
+        epoch = self._miss()
+        value = loader()
+        self._store(key, value, ttl, stale_ttl, epoch)
+        return value
+
+    async def aget_or_load(self, key: str, loader: Callable[[], Awaitable], ttl: float,
+                           stale_ttl: float = 0):
+        """
+        get_or_load() のコルーチン版（loader は await で値を返す関数）。
+
+        TTL 切れ後の裏での再取得は、再取得用スレッドで asyncio.run(loader()) として行う。
+        """
+        found, value = self._lookup(key, lambda: asyncio.run(loader()), ttl, stale_ttl)
+        if found:
+            return value
+        epoch = self._miss()
+        value = await loader()
+        self._store(key, value, ttl, stale_ttl, epoch)
+        return value
+
+    def _lookup(self, key: str, refresh: Callable[[], object], ttl: float,
+                stale_ttl: float) -> tuple[bool, object]:
+        """キャッシュにあれば (True, 値) を返す（stale なら裏で refresh() を呼ぶ）。"""
+        entry = self.cache.get(key)
+        if entry is not None:
+            now = time.time()
+            if now < entry.fresh_until:
+                with self._lock:
+                    self._hits += 1
+                return True, entry.value
+            if now < entry.stale_until:
+                with self._lock:
+                    self._stale_hits += 1
+                self._refresh_async(key, refresh, ttl, stale_ttl)
+                return True, entry.value
+        return False, None
+
+    def _miss(self) -> int:
+        """ミスを記録し、取得開始時点の世代を返す。"""
+        with self._lock:
+            self._misses += 1
+            return self._epoch
+
+    def _store(self, key: str, value, ttl: float, stale_ttl: float, epoch: int) -> None:
+        with self._lock:
+            if epoch != self._epoch:
+                return
+        if ttl > 0:
+            self.cache.set(key, value, ttl, stale_ttl)
+
+    def _refresh_async(self, key: str, loader: Callable[[], object], ttl: float,
+                       stale_ttl: float) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            epoch = self._epoch
+
+        def _refresh() -> None:
+            try:
+                value = loader()
+                self._store(key, value, ttl, stale_ttl, epoch)
+                with self._lock:
+                    self._refreshes += 1
+            except Exception:
+                with self._lock:
+                    self._refresh_errors += 1  # 古い値を返し続け、次回アクセスで再試行する
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(_refresh)
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """prefix で始まるキーを削除し、実行中の取得結果も保存させない。"""
+        with self._lock:
+            self._epoch += 1
+        return self.cache.delete_prefix(prefix)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._stale_hits + self._misses
+            stats = {
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits + self._stale_hits) / lookups if lookups else 0.0,
+                "refreshes": self._refreshes,
+                "refresh_errors": self._refresh_errors,
+            }
+        stats.update(self.cache.stats())
+        return stats
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    fresh_until: float   # この時刻（UNIX 秒）までは新鮮
+    stale_until: float   # この時刻までは古い値として返せる（裏で再取得する）
+
+
+def estimate_size(value) -> int:
+    """値のおおよそのメモリ使用量（JSON 化したバイト数）を返す。"""
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode())
+
+
+class MemoryCache:
+    """
+    プロセス内の LRU キャッシュ。
+
+    エントリごとに TTL（fresh_until / stale_until）を持ち、合計サイズが
+    max_bytes を超えたら最も長く使われていないエントリから追い出す。
+
+    Args:
+        max_bytes: キャッシュ全体の上限サイズ（JSON 化したバイト数の合計）
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (CacheEntry, size)
+        self._data: OrderedDict[str, tuple[CacheEntry, int]] = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> CacheEntry | None:
+        """エントリを返す。stale_until を過ぎたものは削除して None を返す。"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            entry, size = item
+            if entry.stale_until <= time.time():
+                del self._data[key]
+                self._bytes -= size
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value, ttl: float, stale_ttl: float = 0) -> None:
+        """
+        値を保存する。
+
+        Args:
+            ttl: 新鮮とみなす秒数
+            stale_ttl: TTL 切れ後も古い値として返してよい秒数
+        """
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        entry = CacheEntry(value, now + ttl, now + ttl + stale_ttl)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (entry, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._data:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None:
+                self._bytes -= item[1]
+
+    def delete_prefix(self, prefix: str) -> int:
+        """prefix で始まるキーをすべて削除し、削除件数を返す。"""
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                self._bytes -= self._data.pop(k)[1]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .memory import CacheEntry
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key         TEXT PRIMARY KEY,
+    value       TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    fresh_until REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cache_entries_last_access ON cache_entries (last_access);
+CREATE INDEX IF NOT EXISTS ix_cache_entries_stale_until ON cache_entries (stale_until);
+
+-- 合計サイズ（書き込みのたびに SUM(size) を数え直さないよう、トリガーで増減させる）
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id    INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats (id, bytes)
+    SELECT 0, COALESCE(SUM(size), 0) FROM cache_entries;
+CREATE TRIGGER IF NOT EXISTS tr_cache_entries_insert AFTER INSERT ON cache_entries
+BEGIN
+    UPDATE cache_stats SET bytes = bytes + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS tr_cache_entries_update AFTER UPDATE OF size ON cache_entries
+BEGIN
+    UPDATE cache_stats SET bytes = bytes - OLD.size + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS tr_cache_entries_delete AFTER DELETE ON cache_entries
+BEGIN
+    UPDATE cache_stats SET bytes = bytes - OLD.size WHERE id = 0;
+END;
+"""
+
+# last_access の更新間隔（秒）。読み取りのたびに書き込みが発生しないよう粗く記録する
+_TOUCH_INTERVAL = 5.0
+# 期限切れの行をまとめて削除する間隔（秒）。上限を超えた場合はこれを待たずに削除する
+_PURGE_INTERVAL = 60.0
+# 上限超過時に 1 回の SELECT で追い出し候補として読む行数
+_EVICT_BATCH = 64
+
+
+class SQLiteCache:
+    """
+    同一ホストの全ワーカーで共有する SQLite（WAL モード）キャッシュ。
+
+    MemoryCache と同じ get / set / delete / delete_prefix / clear / stats を持ち、
+    CacheLoader のバックエンドとして差し替えられる。値は JSON で保存する。
+    書き込みはトランザクション単位で原子的に行い、合計サイズが max_bytes を
+    超えたら期限切れ → last_access の古い順に追い出す。合計サイズはトリガーで
+    更新する cache_stats から読むため、書き込みのコストはエントリ数によらない。
+
+    Args:
+        path: SQLite ファイルのパス（ワーカー間で同じパスを指定する）
+        max_bytes: キャッシュ全体の上限サイズ（保存した JSON のバイト数の合計）
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._evictions = 0
+        self._last_purge = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        # 既存ファイルの cache_stats の初期化とトリガーの作成の間に他のワーカーが書き込まないようにする
+        conn.executescript(f"BEGIN IMMEDIATE;{_SCHEMA}COMMIT;")
+
+    def _conn(self) -> sqlite3.Connection:
+        """スレッドごとの接続を返す（sqlite3 の接続はスレッド間で共有しない）。"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> CacheEntry | None:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, fresh_until, stale_until, last_access FROM cache_entries WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        value, fresh_until, stale_until, last_access = row
+        if stale_until <= now:
+            conn.execute("DELETE FROM cache_entries WHERE key = ? AND stale_until <= ?", (key, now))
+            return None
+        if now - last_access > _TOUCH_INTERVAL:
+            conn.execute("UPDATE cache_entries SET last_access = ? WHERE key = ?", (now, key))
+        return CacheEntry(json.loads(value), fresh_until, stale_until)
+
+    def set(self, key: str, value, ttl: float, stale_ttl: float = 0) -> None:
+        data = json.dumps(value, ensure_ascii=False, default=str)
+        size = len(data.encode())
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # INSERT OR REPLACE は置き換えで削除トリガーが動かないため UPSERT にする
+            conn.execute(
+                "INSERT INTO cache_entries"
+                " (key, value, size, fresh_until, stale_until, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size,"
+                " fresh_until = excluded.fresh_until, stale_until = excluded.stale_until,"
+                " last_access = excluded.last_access",
+                (key, data, size, now + ttl, now + ttl + stale_ttl, now),
+            )
+            evicted = self._evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if evicted:
+            with self._lock:
+                self._evictions += evicted
+
+    def _total(self, conn: sqlite3.Connection) -> int:
+        (total,) = conn.execute("SELECT bytes FROM cache_stats WHERE id = 0").fetchone()
+        return total
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> int:
+        """
+        合計サイズが上限以下になるまで、期限切れ → last_access の古い順に削除する。
+
+        期限切れの行は _PURGE_INTERVAL 秒ごと、または上限を超えたときだけまとめて削除する。
+        """
+        total = self._total(conn)
+        if total > self.max_bytes or now - self._last_purge > _PURGE_INTERVAL:
+            self._last_purge = now
+            conn.execute("DELETE FROM cache_entries WHERE stale_until <= ?", (now,))
+            total = self._total(conn)
+        evicted = 0
+        while total > self.max_bytes:
+            batch = conn.execute(
+                "SELECT key, size FROM cache_entries ORDER BY last_access ASC LIMIT ?",
+                (_EVICT_BATCH,),
+            ).fetchall()
+            if not batch:
+                break
+            for key, size in batch:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+        return evicted
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str) -> int:
+        cursor = self._conn().execute(
+            "DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+        )
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM cache_entries")
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        (entries,) = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        total = self._total(conn)
+        with self._lock:
+            evictions = self._evictions
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "evictions": evictions,
+        }
@@ -25,6 +25,120 @@ class Config:
     CONNECT_AI_PRIVATE_KEY_PATH: str = _resolve_path(
         os.environ.get("CONNECT_AI_PRIVATE_KEY_PATH", "backend/keys/private.key")
     )
+    # JWT キャッシュ: 有効期限の何秒前に再発行するか
+    CONNECT_AI_JWT_REFRESH_MARGIN: int = int(os.environ.get("CONNECT_AI_JWT_REFRESH_MARGIN", "300"))
+
+    # 同時に発生した同一の GET / SELECT を 1 回の Connect AI 呼び出しにまとめる
+    CONNECT_AI_COALESCE: bool = os.environ.get("CONNECT_AI_COALESCE", "true").lower() == "true"
+
+    # GET / SELECT の再試行（接続エラー・429/5xx、指数バックオフ + full jitter）
+    CONNECT_AI_RETRY_MAX_ATTEMPTS: int = int(os.environ.get("CONNECT_AI_RETRY_MAX_ATTEMPTS", "3"))
+    CONNECT_AI_RETRY_BASE_DELAY: float = float(os.environ.get("CONNECT_AI_RETRY_BASE_DELAY", "0.2"))
+    # 1 回の待ち時間の上限（秒）。Retry-After がこれを超える場合は再試行しない
+    CONNECT_AI_RETRY_MAX_DELAY: float = float(os.environ.get("CONNECT_AI_RETRY_MAX_DELAY", "5.0"))
+    # テナントごとの再試行バジェット: リクエスト 1 回につき RATIO 回分が貯まる（上限 BURST 回）
+    CONNECT_AI_RETRY_BUDGET_RATIO: float = float(os.environ.get("CONNECT_AI_RETRY_BUDGET_RATIO", "0.1"))
+    CONNECT_AI_RETRY_BUDGET_BURST: float = float(os.environ.get("CONNECT_AI_RETRY_BUDGET_BURST", "10"))
+
+    # サーキットブレーカー（Connect AI / MCP の上流ごと）
+    CIRCUIT_BREAKER_ENABLED: bool = os.environ.get("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    # 直近 WINDOW 秒で MIN_REQUESTS 件以上のうち失敗率が FAILURE_RATE 以上なら open にする
+    CIRCUIT_BREAKER_FAILURE_RATE: float = float(os.environ.get("CIRCUIT_BREAKER_FAILURE_RATE", "0.5"))
+    CIRCUIT_BREAKER_MIN_REQUESTS: int = int(os.environ.get("CIRCUIT_BREAKER_MIN_REQUESTS", "10"))
+    CIRCUIT_BREAKER_WINDOW: float = float(os.environ.get("CIRCUIT_BREAKER_WINDOW", "30"))
+    # open を維持する秒数（経過後は HALF_OPEN_CALLS 件だけ試行を通す）
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = float(os.environ.get("CIRCUIT_BREAKER_OPEN_SECONDS", "15"))
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS: int = int(os.environ.get("CIRCUIT_BREAKER_HALF_OPEN_CALLS", "1"))
+    # true ならテナント（ChildAccountId）ごとに別のブレーカーを使う
+    CIRCUIT_BREAKER_PER_TENANT: bool = os.environ.get("CIRCUIT_BREAKER_PER_TENANT", "false").lower() == "true"
+
+    # AI アシスタント: システムプロンプト・ツール定義・直前までの会話をプロンプトキャッシュの対象にする
+    CLAUDE_PROMPT_CACHE: bool = os.environ.get("CLAUDE_PROMPT_CACHE", "true").lower() == "true"
+    # AI アシスタント: 1 回の呼び出しの入力トークン数の上限（超える場合は古いツール結果・ターンを圧縮する、0 で無効）
+    CLAUDE_CONTEXT_TOKEN_BUDGET: int = int(os.environ.get("CLAUDE_CONTEXT_TOKEN_BUDGET", "150000"))
+
+    # MCP Streamable HTTP セッション（initialize + Mcp-Session-Id をテナント単位で再利用する秒数）
+    MCP_SESSION_ENABLED: bool = os.environ.get("MCP_SESSION_ENABLED", "true").lower() == "true"
+    MCP_SESSION_TTL: float = float(os.environ.get("MCP_SESSION_TTL", "600"))
+
+    # MCP レスポンスの最大サイズ（バイト、0 で無制限）。超えたら受信を打ち切ってエラーにする
+    MCP_MAX_RESPONSE_BYTES: int = int(os.environ.get("MCP_MAX_RESPONSE_BYTES", str(32 * 1024 * 1024)))
+
+    # MCP ツール定義のキャッシュ（テナント単位、秒）。TTL 切れ後も STALE_TTL 秒は古い値を返して裏で再取得する
+    MCP_TOOLS_CACHE_TTL: float = float(os.environ.get("MCP_TOOLS_CACHE_TTL", "300"))
+    MCP_TOOLS_CACHE_STALE_TTL: float = float(os.environ.get("MCP_TOOLS_CACHE_STALE_TTL", "3600"))
+
+    # AI アシスタント: MCP ツール実行結果のキャッシュ（テナント単位、秒、0 で無効）
+    # メタデータ取得ツール（getCatalogs / getSchemas / getTables / getColumns など）と queryData
+    MCP_TOOL_RESULT_CACHE_TTL: float = float(os.environ.get("MCP_TOOL_RESULT_CACHE_TTL", "300"))
+    MCP_QUERY_RESULT_CACHE_TTL: float = float(os.environ.get("MCP_QUERY_RESULT_CACHE_TTL", "0"))
+
+    # AI アシスタント: Claude に渡すツール結果の上限（バイト数・行数、0 で無制限）
+    # 超える結果はヘッダー・サンプル行・カラムの統計に置き換え、全件は HANDLE_TTL 秒だけハンドルで取得できる
+    # 全件は共有キャッシュ（CACHE_BACKEND）に保存し、FULL_MAX_BYTES を超える結果は保存しない（0 で無制限）
+    MCP_TOOL_RESULT_MAX_BYTES: int = int(os.environ.get("MCP_TOOL_RESULT_MAX_BYTES", str(32 * 1024)))
+    MCP_TOOL_RESULT_MAX_ROWS: int = int(os.environ.get("MCP_TOOL_RESULT_MAX_ROWS", "200"))
+    MCP_TOOL_RESULT_SAMPLE_ROWS: int = int(os.environ.get("MCP_TOOL_RESULT_SAMPLE_ROWS", "20"))
+    MCP_TOOL_RESULT_HANDLE_TTL: float = float(os.environ.get("MCP_TOOL_RESULT_HANDLE_TTL", "1800"))
+    MCP_TOOL_RESULT_FULL_MAX_BYTES: int = int(os.environ.get("MCP_TOOL_RESULT_FULL_MAX_BYTES", str(8 * 1024 * 1024)))
+
+    # AI アシスタント: 1 ターン内の複数ツール呼び出しの並行実行
+    # 1 ターンあたりの同時実行数（1 で逐次実行）と、プロセス共有スレッドプールの大きさ
+    MCP_TOOL_CONCURRENCY: int = int(os.environ.get("MCP_TOOL_CONCURRENCY", "4"))
+    MCP_TOOL_POOL_SIZE: int = int(os.environ.get("MCP_TOOL_POOL_SIZE", "16"))
+
+    # HTTP コネクションプール（プロセス内の全 ConnectAIClient / MCPClient で共有）
+    CONNECT_AI_POOL_SIZE: int = int(os.environ.get("CONNECT_AI_POOL_SIZE", "10"))
+    CONNECT_AI_POOL_MAX_KEEPALIVE: int = int(os.environ.get("CONNECT_AI_POOL_MAX_KEEPALIVE", "300"))
+    CONNECT_AI_POOL_IDLE_TIMEOUT: int = int(os.environ.get("CONNECT_AI_POOL_IDLE_TIMEOUT", "60"))
+
+    # 非同期クライアント（httpx・asgiref が必要）: metadata / query / data の API を async
+    # ビューに切り替え、AI アシスタントのツール呼び出しを共有イベントループで実行する
+    CONNECT_AI_ASYNC: bool = os.environ.get("CONNECT_AI_ASYNC", "false").lower() == "true"
+    # 非同期コネクションプール（1 本のイベントループで全ホスト合計の最大接続数・アイドル接続数）
+    CONNECT_AI_ASYNC_MAX_CONNECTIONS: int = int(os.environ.get("CONNECT_AI_ASYNC_MAX_CONNECTIONS", "100"))
+    CONNECT_AI_ASYNC_MAX_KEEPALIVE: int = int(os.environ.get("CONNECT_AI_ASYNC_MAX_KEEPALIVE", "20"))
+
+    # API ログ書き込みキュー（1 本のライタースレッドがまとめて INSERT する）
+    API_LOG_QUEUE_SIZE: int = int(os.environ.get("API_LOG_QUEUE_SIZE", "10000"))
+    API_LOG_BATCH_SIZE: int = int(os.environ.get("API_LOG_BATCH_SIZE", "100"))
+    API_LOG_FLUSH_INTERVAL: float = float(os.environ.get("API_LOG_FLUSH_INTERVAL", "1.0"))
+    # キュー満杯時の動作: "drop_oldest"（古いログを捨てる）/ "block"（空きを待つ）
+    API_LOG_OVERFLOW_POLICY: str = os.environ.get("API_LOG_OVERFLOW_POLICY", "drop_oldest")
+
+    # データブラウザ: ページ取得後に COUNT(*) の完了を待つ秒数（超えたら total=-1 で先に返す）
+    DATA_COUNT_TIMEOUT: float = float(os.environ.get("DATA_COUNT_TIMEOUT", "2.0"))
+    # /api/v1/data/records/count で COUNT(*) の完了を待つ最大秒数
+    DATA_COUNT_WAIT_TIMEOUT: float = float(os.environ.get("DATA_COUNT_WAIT_TIMEOUT", "30.0"))
+    # テーブルごとの総件数をキャッシュする秒数（0 で無効）
+    DATA_COUNT_CACHE_TTL: float = float(os.environ.get("DATA_COUNT_CACHE_TTL", "60"))
+
+    # クエリ結果のエクスポート（/api/v1/query/export）: 1 回に取得する件数と全体の上限（0 で無制限）
+    EXPORT_PAGE_SIZE: int = int(os.environ.get("EXPORT_PAGE_SIZE", "1000"))
+    EXPORT_MAX_ROWS: int = int(os.environ.get("EXPORT_MAX_ROWS", "0"))
+
+    # メタデータキャッシュ（テナント × カタログ/スキーマ/テーブル単位、秒）
+    METADATA_CACHE_TTL_CATALOGS: float = float(os.environ.get("METADATA_CACHE_TTL_CATALOGS", "300"))
+    METADATA_CACHE_TTL_SCHEMAS: float = float(os.environ.get("METADATA_CACHE_TTL_SCHEMAS", "600"))
+    METADATA_CACHE_TTL_TABLES: float = float(os.environ.get("METADATA_CACHE_TTL_TABLES", "600"))
+    METADATA_CACHE_TTL_COLUMNS: float = float(os.environ.get("METADATA_CACHE_TTL_COLUMNS", "1800"))
+    # TTL 切れ後も古い値を返しつつバックグラウンドで再取得する秒数
+    METADATA_CACHE_STALE_TTL: float = float(os.environ.get("METADATA_CACHE_STALE_TTL", "3600"))
+    # キャッシュ全体の上限（バイト、超えたら LRU で追い出す）
+    CACHE_MAX_BYTES: int = int(os.environ.get("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    # キャッシュバックエンド: "memory"（ワーカーごと）/ "sqlite"（同一ホストの全ワーカーで共有）
+    CACHE_BACKEND: str = os.environ.get("CACHE_BACKEND", "memory")
+    CACHE_SQLITE_PATH: str = _resolve_path(
+        os.environ.get("CACHE_SQLITE_PATH", "instance/connectai_cache.sqlite3")
+    )
+    # データソース一覧（全テナント共通）のキャッシュ秒数
+    DATASOURCES_CACHE_TTL: float = float(os.environ.get("DATASOURCES_CACHE_TTL", "3600"))
+    # クエリ結果のキャッシュ秒数（0 で無効。データ操作時はテナント単位で破棄する）
+    QUERY_CACHE_TTL: float = float(os.environ.get("QUERY_CACHE_TTL", "0"))
+
+    # JSON エンコーダー: "auto"（orjson があれば使う）/ "orjson" / "stdlib"
+    JSON_BACKEND: str = os.environ.get("JSON_BACKEND", "auto")
+
     APP_BASE_URL: str = os.environ.get("APP_BASE_URL", "http://localhost:5001")
 
     # Claude API Key 暗号化キー（Fernet 対称暗号）
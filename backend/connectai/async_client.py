@@ -0,0 +1,245 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlencode
+
+from flask import current_app
+from backend import json_provider
+from .async_http_pool import get_async_http_pool, httpx
+from .circuit_breaker import CircuitOpenError
+from .client import BaseConnectAIClient, _is_read_only_sql
+from .decoding import decode_columns, decode_rows
+from .exceptions import ConnectAIError
+from .retry import RETRYABLE_STATUS, parse_retry_after
+from .singleflight import AsyncSingleFlight
+
+# 同一テナント・同一内容の読み取りリクエストを 1 回の上流呼び出しにまとめる（プロセス共有）
+_inflight = AsyncSingleFlight()
+
+
+class AsyncConnectAIClient(BaseConnectAIClient):
+    """
+    Connect AI HTTP API の非同期クライアント（ConnectAIClient のコルーチン版）。
+
+    HTTP 接続はプロセス共有の AsyncHTTPConnectionPool（httpx.AsyncClient）を経由し、
+    上流の待ち時間はプールのイベントループで待つため、1 つのリクエスト内の複数の呼び出しを
+    スレッドを増やさずに並行させられる。
+    相乗り・再試行・サーキットブレーカー・API ログの扱いは ConnectAIClient と同じ。
+
+    Raises:
+        AsyncUnavailableError: httpx が未インストールの場合
+    """
+
+    def __init__(self, child_account_id: str | None):
+        super().__init__(child_account_id)
+        self._http = get_async_http_pool(current_app.config)
+
+    async def _coalesce(self, key: tuple, fn):
+        """CONNECT_AI_COALESCE が有効なら、実行中の同一リクエストの結果を共有する。"""
+        coalesce_key = self._coalesce_key(key)
+        if coalesce_key is None:
+            return await fn()
+        return await _inflight.do(coalesce_key, fn)
+
+    async def _send(self, method: str, path: str, *, params: dict | None = None,
+                    payload: dict | None = None, idempotent: bool = False,
+                    parse_json: bool = True):
+        """
+        リクエストを送信し、成功時はレスポンスの JSON（parse_json=False なら None）を返す。
+
+        再試行の条件・バックオフ・ApiLog の記録は ConnectAIClient._send と同じ。
+
+        Raises:
+            httpx.HTTPError: 最後の試行が失敗した場合
+        """
+        url = f"{self.base_url}{path}"
+        log_path = f"{path}?{urlencode(params)}" if params else path
+        budget = self._retry_budget()
+        budget.deposit()
+        attempt = 1
+        while True:
+            start = time.monotonic()
+            retry_after = None
+            try:
+                resp = await self._request_once(
+                    method, url, headers=self._headers(), params=params, json=payload
+                )
+                resp.raise_for_status()
+                data = json_provider.loads(resp.content) if parse_json else None
+                self._log(log_path, method, payload, data, resp.status_code, start, attempt)
+                return data
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                self._log(log_path, method, payload, {"error": e.response.text}, status, start, attempt)
+                if status not in RETRYABLE_STATUS:
+                    raise
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                error = e
+            except json.JSONDecodeError as e:
+                raise ConnectAIError(
+                    f"Invalid JSON (HTTP {resp.status_code}): {resp.text[:500]!r}"
+                ) from e
+            except httpx.TransportError as e:
+                self._log(log_path, method, payload, {"error": str(e)}, 0, start, attempt)
+                error = e
+
+            delay = self._retry.backoff(attempt, retry_after) if idempotent else None
+            if delay is None or attempt >= self._retry.max_attempts or not budget.try_withdraw():
+                raise error
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _request_once(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        """
+        HTTP リクエストを 1 回送信し、結果をサーキットブレーカーに記録する。
+
+        Raises:
+            ConnectAIError: サーキットが open の場合
+        """
+        breaker = self._breaker
+        if breaker is not None:
+            try:
+                breaker.before_call()
+            except CircuitOpenError as e:
+                raise ConnectAIError(str(e)) from e
+        try:
+            resp = await self._http.request(method, url, timeout=30, **kwargs)
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        if breaker is not None:
+            breaker.record_status(resp.status_code)
+        return resp
+
+    async def _get(self, path: str, params: dict | None = None) -> dict:
+        key = ("GET", path, tuple(sorted((params or {}).items())))
+        return await self._coalesce(key, lambda: self._get_uncoalesced(path, params))
+
+    async def _get_uncoalesced(self, path: str, params: dict | None = None) -> dict:
+        try:
+            return await self._send("GET", path, params=params, idempotent=True)
+        except httpx.HTTPStatusError as e:
+            raise ConnectAIError(f"HTTP {e.response.status_code}: {e.response.text}") from e
+        except httpx.HTTPError as e:
+            raise ConnectAIError(f"Request failed: {e}") from e
+
+    async def _delete(self, path: str) -> None:
+        try:
+            await self._send("DELETE", path, parse_json=False)
+        except httpx.HTTPStatusError as e:
+            raise ConnectAIError(f"HTTP {e.response.status_code}: {e.response.text}") from e
+        except httpx.HTTPError as e:
+            raise ConnectAIError(f"Request failed: {e}") from e
+
+    async def _post(self, path: str, payload: dict, idempotent: bool = False) -> dict:
+        try:
+            return await self._send("POST", path, payload=payload, idempotent=idempotent)
+        except httpx.HTTPStatusError as e:
+            raise ConnectAIError(
+                f"HTTP {e.response.status_code}: {e.response.text} "
+                f"| Request: POST {path} | Payload: {json.dumps(payload, ensure_ascii=False)}"
+            ) from e
+        except httpx.HTTPError as e:
+            raise ConnectAIError(f"Request failed: {e}") from e
+
+    async def create_account(self, external_id: str) -> str:
+        """子アカウントを作成し、ChildAccountId を返す。"""
+        data = await self._post("/poweredby/account/create", {"externalId": external_id})
+        return data["accountId"]
+
+    async def get_datasources(self) -> list[dict]:
+        """利用可能なデータソース一覧を返す。"""
+        data = await self._get("/poweredby/sources/list")
+        return data.get("dataSources", data) if isinstance(data, dict) else data
+
+    async def get_connections(self) -> list[dict]:
+        """ChildAccountId に紐づくコネクション一覧を返す。"""
+        data = await self._get("/poweredby/connection/list")
+        return data.get("connections", data) if isinstance(data, dict) else data
+
+    async def create_connection(self, name: str, data_source: str, redirect_url: str) -> str:
+        """コネクションを作成し、Connect AI の認証画面 URL を返す。"""
+        data = await self._post("/poweredby/connection/create", {
+            "name": name,
+            "dataSource": data_source,
+            "redirectURL": redirect_url,
+        })
+        return data["redirectURL"]
+
+    async def delete_connection(self, connection_id: str) -> None:
+        """コネクションを削除する。"""
+        await self._delete(f"/poweredby/connection/delete/{connection_id}")
+
+    async def query_data(
+        self,
+        sql: str,
+        params: dict | None = None,
+        param_types: dict | None = None,
+        typed: bool = False,
+    ) -> tuple[list[str], list[list]]:
+        """SQL を実行し、(column_names, rows) を返す（ConnectAIClient.query_data と同じ）。"""
+        schema, rows = await self.query_with_schema(sql, params, param_types)
+        if typed:
+            rows = decode_rows(schema, rows)
+        return [col["columnName"] for col in schema], rows
+
+    async def query_columns(
+        self,
+        sql: str,
+        params: dict | None = None,
+        param_types: dict | None = None,
+        use_numpy: bool = False,
+    ) -> dict:
+        """SQL を実行し、カラム単位に型変換した {columnName: 値の一覧} を返す。"""
+        schema, rows = await self.query_with_schema(sql, params, param_types)
+        return decode_columns(schema, rows, use_numpy=use_numpy)
+
+    async def query_with_schema(
+        self,
+        sql: str,
+        params: dict | None = None,
+        param_types: dict | None = None,
+    ) -> tuple[list[dict], list[list]]:
+        """SQL を実行し、Connect AI の schema と rows をそのまま返す。"""
+        payload = self._query_payload(sql, params, param_types)
+        sql_context = self._sql_context(sql, params)
+        try:
+            if _is_read_only_sql(sql):
+                key = ("QUERY", json.dumps(payload, sort_keys=True, ensure_ascii=False))
+                data = await self._coalesce(
+                    key, lambda: self._post("/query", payload, idempotent=True)
+                )
+            else:
+                data = await self._post("/query", payload)
+        except ConnectAIError as e:
+            raise ConnectAIError(f"{e}{sql_context}") from e
+        return self._query_result(data, sql_context)
+
+    async def get_catalogs(self) -> list[dict]:
+        """カタログ一覧を返す。"""
+        data = await self._get("/catalogs")
+        return self._rows_to_dicts(data["results"][0])
+
+    async def get_schemas(self, catalog_name: str) -> list[dict]:
+        """スキーマ一覧を返す。"""
+        data = await self._get("/schemas", params={"catalogName": catalog_name})
+        return self._rows_to_dicts(data["results"][0])
+
+    async def get_tables(self, catalog_name: str, schema_name: str) -> list[dict]:
+        """テーブル一覧を返す。"""
+        data = await self._get("/tables", params={
+            "catalogName": catalog_name,
+            "schemaName": schema_name,
+        })
+        return self._rows_to_dicts(data["results"][0])
+
+    async def get_columns(self, catalog_name: str, schema_name: str,
+                          table_name: str) -> list[dict]:
+        """カラム一覧を返す。"""
+        data = await self._get("/columns", params={
+            "catalogName": catalog_name,
+            "schemaName": schema_name,
+            "tableName": table_name,
+        })
+        return self._rows_to_dicts(data["results"][0])
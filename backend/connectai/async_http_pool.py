@@ -0,0 +1,199 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Awaitable, Callable, TypeVar
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - httpx 未インストール環境
+    httpx = None
+
+T = TypeVar("T")
+
+
+class AsyncUnavailableError(RuntimeError):
+    """httpx が未インストールのため非同期クライアントを使えないことを表す。"""
+
+
+class AsyncHTTPConnectionPool:
+    """
+    プロセス全体で共有する非同期 HTTP コネクションプール（httpx.AsyncClient）。
+
+    httpx の接続は作成したイベントループに紐づくため、専用スレッドで 1 本の
+    イベントループを動かし、そこで 1 つの AsyncClient を保持する。呼び出し元の
+    イベントループ（Flask の async ビューはリクエストごとに別のループで動く）からの
+    リクエストはこのループに投入して結果を待つため、すべての呼び出しで接続を再利用する。
+    1 つのリクエスト内の複数の上流呼び出し（AI アシスタントのツール並行実行など）は
+    スレッドを増やさずに並行させられる。ただし Flask は WSGI アプリのため、async ビューでも
+    リクエストごとにワーカースレッドを 1 つ使い、同時に処理できるリクエスト数は
+    WSGI サーバーのワーカー・スレッド数のままである。
+
+    Args:
+        max_connections: 同時に開く最大接続数（全ホスト合計）
+        max_keepalive: 保持するアイドル接続の最大数
+        idle_timeout: この秒数以上使われなかった接続を閉じる
+        transport: httpx のトランスポート（テスト用。省略時はネットワークに接続する）
+    """
+
+    def __init__(self, max_connections: int = 100, max_keepalive: int = 20,
+                 idle_timeout: float = 60.0, transport=None) -> None:
+        if httpx is None:
+            raise AsyncUnavailableError("httpx is not installed")
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.idle_timeout = idle_timeout
+        self._transport = transport
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._client = None
+        self._requests = 0
+        self._in_flight = 0
+        self._max_in_flight = 0
+
+    def _start_locked(self) -> asyncio.AbstractEventLoop:
+        """イベントループのスレッドと AsyncClient を作る（ロック取得済みで呼ぶこと）。"""
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run() -> None:
+            asyncio.set_event_loop(loop)
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.idle_timeout,
+                ),
+                transport=self._transport,
+            )
+            ready.set()
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=_run, name="async-http", daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+        return loop
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                return self._start_locked()
+            return self._loop
+
+    async def run(self, fn: Callable[["httpx.AsyncClient"], Awaitable[T]]) -> T:
+        """
+        プールのイベントループで await fn(client) を実行し、結果を返す。
+
+        ストリーミングレスポンス（SSE など）はボディの読み込みまで fn の中で行うこと
+        （レスポンスは作成したループの外では読めない）。
+        """
+        loop = self._ensure_loop()
+
+        async def _call() -> T:
+            self._requests += 1
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+            try:
+                return await fn(self._client)
+            finally:
+                self._in_flight -= 1
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return await _call()
+        # 呼び出し元がキャンセルされた場合はプール側の実行もキャンセルされる
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_call(), loop))
+
+    def submit(self, coro: Awaitable[T]) -> concurrent.futures.Future:
+        """
+        コルーチンをプールのイベントループで実行し、結果の Future を返す。
+
+        同期コード（ワーカースレッド）から多数の呼び出しをスレッドを増やさずに並行実行する場合に使う。
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    async def request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        """プールのイベントループで HTTP リクエストを送信し、ボディを読み込んだレスポンスを返す。"""
+        return await self.run(lambda client: client.request(method, url, **kwargs))
+
+    def stats(self) -> dict:
+        """
+        リクエスト数と同時実行数を返す。
+
+        Returns:
+            {"requests": N, "in_flight": N, "max_in_flight": N, "max_connections": N, ...}
+        """
+        return {
+            "requests": self._requests,
+            "in_flight": self._in_flight,
+            "max_in_flight": self._max_in_flight,
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "idle_timeout": self.idle_timeout,
+        }
+
+    def close(self) -> None:
+        """接続をすべて閉じ、イベントループのスレッドを止める。"""
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            self._loop = self._thread = self._client = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=10)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+        loop.close()
+
+
+# ---------------------------------------------------------------------------
+# モジュールレベル: プロセス共有プール
+# ---------------------------------------------------------------------------
+
+_pool: AsyncHTTPConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_async_http_pool(config: dict | None = None) -> AsyncHTTPConnectionPool:
+    """
+    プロセス共有の AsyncHTTPConnectionPool を返す（初回呼び出し時に生成）。
+
+    Args:
+        config: Flask の app.config など。初回生成時のみ CONNECT_AI_ASYNC_* を参照する
+    Raises:
+        AsyncUnavailableError: httpx が未インストールの場合
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = config or {}
+                _pool = AsyncHTTPConnectionPool(
+                    max_connections=int(config.get("CONNECT_AI_ASYNC_MAX_CONNECTIONS", 100)),
+                    max_keepalive=int(config.get("CONNECT_AI_ASYNC_MAX_KEEPALIVE", 20)),
+                    idle_timeout=float(config.get("CONNECT_AI_POOL_IDLE_TIMEOUT", 60)),
+                )
+    return _pool
+
+
+def async_http_pool_stats() -> dict | None:
+    """共有プールの統計を返す（未生成なら None。統計のためにプールを生成しない）。"""
+    pool = _pool
+    return pool.stats() if pool is not None else None
+
+
+def set_async_http_pool(pool: AsyncHTTPConnectionPool | None) -> None:
+    """共有プールを差し替える（テストでトランスポートを指定する場合など）。"""
+    global _pool
+    with _pool_lock:
+        previous, _pool = _pool, pool
+    if previous is not None and previous is not pool:
+        previous.close()
+
+
+def reset_async_http_pool() -> None:
+    """共有プールを破棄する（テスト・設定再読み込み用）。"""
+    set_async_http_pool(None)
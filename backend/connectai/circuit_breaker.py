@@ -0,0 +1,258 @@
+import collections
+import threading
+import time
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """サーキットが open のため、上流を呼び出さずに即座に失敗したことを表す。"""
+
+    def __init__(self, name: str, retry_in: float) -> None:
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(
+            f"Circuit open for {name}: upstream is unavailable (retry in {retry_in:.1f}s)"
+        )
+
+
+class CircuitBreaker:
+    """
+    上流サービスごとのサーキットブレーカー（closed / open / half-open）。
+
+    直近 window 秒の呼び出し結果を記録し、min_requests 件以上のうち失敗率が
+    failure_rate 以上になったら open にする。open 中の呼び出しは上流に送らずに
+    CircuitOpenError で即座に失敗させる。open_seconds 経過後は half-open となり、
+    half_open_calls 件の試行が成功すれば closed に戻し、失敗すれば再び open にする。
+    429（レート制限）は上流の健全性を示さないため、成功にも失敗にも数えない。
+
+    Args:
+        name: 上流の名前（ヘルスチェック・エラーメッセージに表示する）
+        failure_rate: open にする失敗率（0〜1）
+        min_requests: 失敗率を判定する最小件数
+        window: 失敗率を計算する期間（秒）
+        open_seconds: open を維持する秒数
+        half_open_calls: half-open 中に同時に通す試行の数
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_requests: int = 10,
+                 window: float = 30.0, open_seconds: float = 15.0,
+                 half_open_calls: int = 1) -> None:
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        # (monotonic 時刻, 成功なら True)
+        self._outcomes: collections.deque[tuple[float, bool]] = collections.deque()
+        self._rejected = 0
+        self._opened = 0
+        # 最後に呼び出し・結果の記録があった monotonic 時刻（アイドル判定に使う）
+        self._last_used = time.monotonic()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        """open_seconds を過ぎた open を half-open に遷移させてから状態を返す（ロック内で呼ぶ）。"""
+        if self._state == STATE_OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = STATE_HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def before_call(self) -> None:
+        """
+        呼び出し前に通してよいか判定する。
+
+        Raises:
+            CircuitOpenError: open 中、または half-open の試行枠が埋まっている場合
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._last_used = now
+            state = self._current_state(now)
+            if state == STATE_CLOSED:
+                return
+            if state == STATE_HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return
+            self._rejected += 1
+            retry_in = max(0.0, self.open_seconds - (now - self._opened_at))
+        raise CircuitOpenError(self.name, retry_in)
+
+    def record_status(self, status: int) -> None:
+        """HTTP ステータスを記録する（5xx は失敗、429 は中立、それ以外は成功）。"""
+        if status >= 500:
+            self.record_failure()
+        elif status == 429:
+            self.record_neutral()
+        else:
+            self.record_success()
+
+    def record_neutral(self) -> None:
+        """成功にも失敗にも数えない結果を記録する（half-open の試行枠は返却する）。"""
+        now = time.monotonic()
+        with self._lock:
+            self._last_used = now
+            if self._current_state(now) == STATE_HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._last_used = now
+            if self._current_state(now) == STATE_HALF_OPEN:
+                self._state = STATE_CLOSED
+                self._outcomes.clear()
+                return
+            self._add(now, True)
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._last_used = now
+            state = self._current_state(now)
+            if state == STATE_HALF_OPEN:
+                self._open(now)
+                return
+            self._add(now, False)
+            if state == STATE_CLOSED and len(self._outcomes) >= self.min_requests:
+                failures = sum(1 for _, ok in self._outcomes if not ok)
+                if failures / len(self._outcomes) >= self.failure_rate:
+                    self._open(now)
+
+    def _add(self, now: float, ok: bool) -> None:
+        self._outcomes.append((now, ok))
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def _open(self, now: float) -> None:
+        self._state = STATE_OPEN
+        self._opened_at = now
+        self._opened += 1
+        self._outcomes.clear()
+
+    def is_idle(self, now: float) -> bool:
+        """closed のまま window・open_seconds より長く使われていなければ True を返す。"""
+        with self._lock:
+            return (
+                self._current_state(now) == STATE_CLOSED
+                and now - self._last_used > max(self.window, self.open_seconds)
+            )
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            state = self._current_state(now)
+            failures = sum(1 for t, ok in self._outcomes if not ok and now - t <= self.window)
+            requests = sum(1 for t, _ in self._outcomes if now - t <= self.window)
+            return {
+                "name": self.name,
+                "state": state,
+                "window_requests": requests,
+                "window_failures": failures,
+                "rejected": self._rejected,
+                "opened": self._opened,
+            }
+
+
+# ---------------------------------------------------------------------------
+# モジュールレベル: 上流（とテナント）ごとのブレーカー
+# ---------------------------------------------------------------------------
+
+_breakers: dict[tuple[str, str | None], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+# テナント別のブレーカーがこの件数に達したら、次の生成時にアイドルなものを破棄する
+_PRUNE_MIN = 256
+_prune_at = _PRUNE_MIN
+
+
+def _prune_idle_breakers(now: float) -> None:
+    """
+    アイドルな closed のテナント別ブレーカーを破棄する（_breakers_lock 保持中に呼ぶ）。
+
+    掃除後の件数の 2 倍を次のしきい値にするため、掃除のコストは生成 1 回あたり定数に収まる。
+    破棄したブレーカーを参照中のクライアントがあっても、結果が新しいブレーカーに
+    記録されないだけで、状態は closed のまま変わらない。
+    """
+    global _prune_at
+    for key, breaker in list(_breakers.items()):
+        if key[1] is not None and breaker.is_idle(now):
+            del _breakers[key]
+    _prune_at = max(_PRUNE_MIN, 2 * len(_breakers))
+
+
+def get_circuit_breaker(upstream: str, tenant: str | None = None,
+                        config=None) -> CircuitBreaker | None:
+    """
+    上流に対応するブレーカーを返す（初回呼び出し時に生成）。
+
+    CIRCUIT_BREAKER_PER_TENANT が有効なら tenant ごとに別のブレーカーを使う
+    （アイドルな closed のブレーカーは生成時にまとめて破棄する）。
+    CIRCUIT_BREAKER_ENABLED が無効なら None を返す。
+
+    Args:
+        upstream: 上流の名前（"connect-ai" / "mcp"）
+        tenant: テナント（ChildAccountId）
+        config: Flask の config（None ならデフォルト値を使う）
+    """
+    config = config or {}
+    if not config.get("CIRCUIT_BREAKER_ENABLED", True):
+        return None
+    key = (upstream, tenant if config.get("CIRCUIT_BREAKER_PER_TENANT", False) else None)
+    breaker = _breakers.get(key)
+    if breaker is not None:
+        return breaker
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            if key[1] is not None and len(_breakers) >= _prune_at:
+                _prune_idle_breakers(time.monotonic())
+            breaker = CircuitBreaker(
+                name=upstream,
+                failure_rate=float(config.get("CIRCUIT_BREAKER_FAILURE_RATE", 0.5)),
+                min_requests=int(config.get("CIRCUIT_BREAKER_MIN_REQUESTS", 10)),
+                window=float(config.get("CIRCUIT_BREAKER_WINDOW", 30.0)),
+                open_seconds=float(config.get("CIRCUIT_BREAKER_OPEN_SECONDS", 15.0)),
+                half_open_calls=int(config.get("CIRCUIT_BREAKER_HALF_OPEN_CALLS", 1)),
+            )
+            _breakers[key] = breaker
+    return breaker
+
+
+def circuit_breaker_stats() -> dict:
+    """
+    上流ごとのブレーカーの状態を返す（ヘルスチェック用）。
+
+    テナント別のブレーカーはテナント ID を出さず、状態ごとの件数に集約する。
+    """
+    with _breakers_lock:
+        items = list(_breakers.items())
+    result: dict = {}
+    for (upstream, tenant), breaker in items:
+        stats = breaker.stats()
+        if tenant is None:
+            result[upstream] = stats
+        else:
+            summary = result.setdefault(upstream, {"name": upstream, "tenants": {}})
+            tenants = summary.setdefault("tenants", {})
+            tenants[stats["state"]] = tenants.get(stats["state"], 0) + 1
+    return result
+
+
+def reset_circuit_breakers() -> None:
+    """すべてのブレーカーを破棄する（テスト用）。"""
+    global _prune_at
+    with _breakers_lock:
+        _breakers.clear()
+        _prune_at = _PRUNE_MIN
@@ -1,48 +1,50 @@
 import json
-import threading
 import time
 
 import requests
-from flask import current_app
+from flask import current_app, has_request_context
 from flask_login import current_user
+from backend import json_provider
 from .jwt import generate_connect_ai_jwt
+from .decoding import decode_columns, decode_rows
+from .circuit_breaker import CircuitOpenError, get_circuit_breaker
 from .exceptions import ConnectAIError
+from .http_pool import get_http_pool
+from .log_writer import get_log_writer
+from .retry import RETRYABLE_STATUS, RetryPolicy, get_retry_budget, parse_retry_after
+from .singleflight import SingleFlight
 
+# 同一テナント・同一内容の読み取りリクエストを 1 回の上流呼び出しにまとめる（プロセス共有）
+_inflight = SingleFlight()
 
-def _save_log_async(app, user_id: int, method: str, endpoint: str,
-                    request_body, response_body, status_code: int, elapsed_ms: int) -> None:
-    """API ログを DB にバックグラウンドで保存する（メイン処理をブロックしない）"""
-    def _save():
-        with app.app_context():
-            try:
-                from backend.models.api_log import ApiLog
-                from backend.models import db
-                log = ApiLog(
-                    user_id=user_id,
-                    method=method,
-                    endpoint=endpoint,
-                    request_body=(
-                        json.dumps(request_body, ensure_ascii=False)
-                        if request_body is not None else None
-                    ),
-                    response_body=(
-                        json.dumps(response_body, ensure_ascii=False)
-                        if response_body is not None else None
-                    ),
-                    status_code=status_code,
-                    elapsed_ms=elapsed_ms,
-                )
-                db.session.add(log)
-                db.session.commit()
-            except Exception:
-                pass  # ログ失敗はサイレントに無視
-    threading.Thread(target=_save, daemon=True).start()
 
+def _is_read_only_sql(sql: str) -> bool:
+    """SELECT 文かどうかを判定する（書き込み系は相乗りさせない）。"""
+    return sql.lstrip().upper().startswith("SELECT")
 
-class ConnectAIClient:
+
+def _save_log_async(app, user_id: int, method: str, endpoint: str,
+                    request_body, response_body, status_code: int, elapsed_ms: int,
+                    attempt: int = 1) -> None:
+    """API ログをライターキューに積む（DB 書き込みはバックグラウンドでまとめて行う）"""
+    get_log_writer(app).submit({
+        "user_id": user_id,
+        "method": method,
+        "endpoint": endpoint,
+        "request_body": request_body,
+        "response_body": response_body,
+        "status_code": status_code,
+        "elapsed_ms": elapsed_ms,
+        "attempt": attempt,
+    })
+
+
+class BaseConnectAIClient:
     """
-    Connect AI HTTP API クライアント。
-    各メソッド呼び出し時に JWT を生成してリクエストに付与する。
+    ConnectAIClient / AsyncConnectAIClient に共通の部分。
+
+    設定・JWT ヘッダーの生成・API ログの記録・SQL リクエストの組み立てとレスポンスの
+    解析を持ち、HTTP の送信はサブクラスが行う。
     """
 
     def __init__(self, child_account_id: str | None):
@@ -50,88 +52,251 @@ class ConnectAIClient:
         self.parent_account_id = current_app.config["CONNECT_AI_PARENT_ACCOUNT_ID"]
         # 子アカウント未作成の場合は空文字列を使う（Account API 呼び出し時）
         self.subject_id = child_account_id if child_account_id is not None else ""
+        self._retry = RetryPolicy.from_config(current_app.config)
+        self._breaker = get_circuit_breaker("connect-ai", self.subject_id, current_app.config)
+        # 別スレッドから呼び出してもログを記録できるよう、生成時点のアプリとユーザーを保持する
+        self._app = current_app._get_current_object()
+        self._user_id = (
+            current_user.id
+            if has_request_context() and current_user.is_authenticated else None
+        )
+
+    def app_context(self):
+        """生成元アプリの app_context を返す（ワーカースレッドで API を呼び出す際に使う）。"""
+        return self._app.app_context()
 
     def _headers(self) -> dict:
         token = generate_connect_ai_jwt(self.parent_account_id, self.subject_id)
         return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
     def _log(self, path: str, method: str, request_body, response_body,
-             status_code: int, start: float) -> None:
-        """API 呼び出し結果をバックグラウンドスレッドで DB に記録する。未認証時はスキップ。"""
+             status_code: int, start: float, attempt: int = 1) -> None:
+        """API 呼び出し結果をバックグラウンドのログライター経由で DB に記録する。未認証時はスキップ。"""
         try:
-            if not current_user.is_authenticated:
+            if self._user_id is None:
                 return
-            user_id = current_user.id
-            app = current_app._get_current_object()
             elapsed_ms = int((time.monotonic() - start) * 1000)
             _save_log_async(
-                app=app,
-                user_id=user_id,
+                app=self._app,
+                user_id=self._user_id,
                 method=method,
                 endpoint=path,
                 request_body=request_body,
                 response_body=response_body,
                 status_code=status_code,
                 elapsed_ms=elapsed_ms,
+                attempt=attempt,
             )
         except Exception:
             pass  # ログ処理のエラーは本体に伝播させない
 
-    def _get(self, path: str, params: dict | None = None) -> dict:
+    def _coalesce_key(self, key: tuple) -> tuple | None:
+        """相乗りに使うキーを返す。CONNECT_AI_COALESCE が無効なら None。"""
+        if not self._app.config.get("CONNECT_AI_COALESCE", True):
+            return None
+        return (self.base_url, self.parent_account_id, self.subject_id, *key)
+
+    def _retry_budget(self):
+        return get_retry_budget(
+            (self.base_url, self.parent_account_id, self.subject_id), self._app.config
+        )
+
+    @staticmethod
+    def _rows_to_dicts(result: dict) -> list[dict]:
+        """SQL形式のレスポンス（schema + rows）を dict の一覧に変換する。"""
+        columns = [col["columnName"] for col in result["schema"]]
+        return [dict(zip(columns, row)) for row in result["rows"]]
+
+    # Connect AI dataType 定数（SQL TYPE_NAME → dataType 番号）
+    _TYPE_NAME_TO_DATA_TYPE: dict[str, int] = {
+        "BINARY": 1,
+        "VARCHAR": 5,
+        "TINYINT": 6,
+        "SMALLINT": 7,
+        "INTEGER": 8,
+        "INT": 8,
+        "BIGINT": 9,
+        "FLOAT": 10,
+        "DOUBLE": 11,
+        "DECIMAL": 12,
+        "NUMERIC": 13,
+        "BOOLEAN": 14,
+        "DATE": 15,
+        "TIME": 16,
+        "TIMESTAMP": 17,
+        "UUID": 18,
+    }
+
+    def _query_payload(self, sql: str, params: dict | None,
+                       param_types: dict | None) -> dict:
+        """
+        /query のリクエストボディを作る（params の各値は {"dataType": N, "value": "..."} 形式）。
+
+        None は文字列 "None" にせず、value を null にして送る。
+        """
+        payload: dict = {"query": sql}
+        if params:
+            formatted: dict = {}
+            for key, value in params.items():
+                type_name = (param_types or {}).get(key, "VARCHAR").upper()
+                data_type = self._TYPE_NAME_TO_DATA_TYPE.get(type_name, 5)
+                formatted[key] = {
+                    "dataType": data_type,
+                    "value": None if value is None else str(value),
+                }
+            payload["parameters"] = formatted
+        return payload
+
+    @staticmethod
+    def _sql_context(sql: str, params: dict | None) -> str:
+        return f" | [Sent] SQL: {sql} | Parameters: {json.dumps(params, ensure_ascii=False)}"
+
+    @staticmethod
+    def _query_result(data, sql_context: str) -> tuple[list[dict], list[list]]:
+        """/query のレスポンスから (schema, rows) を取り出す。"""
+        try:
+            result = data["results"][0]
+            # DML (INSERT/UPDATE/DELETE) returns {"affectedRows": N} without schema/rows
+            if "schema" not in result:
+                return [], []
+            schema = result["schema"]
+            missing = [col for col in schema if "columnName" not in col]
+            if missing:
+                raise KeyError("columnName")
+            rows = result["rows"]
+        except (KeyError, TypeError, IndexError) as e:
+            raise ConnectAIError(
+                f"Unexpected response ({type(e).__name__}: {e}): "
+                f"{json.dumps(data, ensure_ascii=False)}{sql_context}"
+            ) from e
+        return schema, rows
+
+
+class ConnectAIClient(BaseConnectAIClient):
+    """
+    Connect AI HTTP API クライアント。
+    各メソッド呼び出し時に JWT を生成してリクエストに付与する。
+    HTTP 接続はプロセス共有のコネクションプールを経由して再利用する。
+    同時に発生した同一の GET / SELECT は 1 回の上流呼び出しにまとめる（書き込みはまとめない）。
+    GET / SELECT は一時的な失敗（接続エラー・429/5xx）をバックオフ付きで再試行する。
+    上流の障害が続く間はサーキットブレーカーで即座に失敗させる。
+    """
+
+    def __init__(self, child_account_id: str | None):
+        super().__init__(child_account_id)
+        self._http = get_http_pool(current_app.config)
+
+    def _coalesce(self, key: tuple, fn):
+        """CONNECT_AI_COALESCE が有効なら、実行中の同一リクエストの結果を共有する。"""
+        coalesce_key = self._coalesce_key(key)
+        if coalesce_key is None:
+            return fn()
+        return _inflight.do(coalesce_key, fn)
+
+    def _send(self, method: str, path: str, *, params: dict | None = None,
+              payload: dict | None = None, idempotent: bool = False,
+              parse_json: bool = True):
+        """
+        リクエストを送信し、成功時はレスポンスの JSON（parse_json=False なら None）を返す。
+
+        idempotent=True の呼び出しは、接続エラー・タイムアウト・429/5xx を
+        RetryPolicy に従って再試行する（Retry-After を尊重し、テナントごとの
+        RetryBudget を超えては再試行しない）。試行ごとに ApiLog を 1 行記録する。
+
+        Raises:
+            requests.RequestException: 最後の試行が失敗した場合
+        """
         from urllib.parse import urlencode
         url = f"{self.base_url}{path}"
         log_path = f"{path}?{urlencode(params)}" if params else path
-        start = time.monotonic()
+        budget = self._retry_budget()
+        budget.deposit()
+        attempt = 1
+        while True:
+            start = time.monotonic()
+            retry_after = None
+            try:
+                resp = self._request_once(
+                    method, url, headers=self._headers(), params=params, json=payload
+                )
+                resp.raise_for_status()
+                data = json_provider.response_json(resp) if parse_json else None
+                self._log(log_path, method, payload, data, resp.status_code, start, attempt)
+                return data
+            except requests.HTTPError as e:
+                status = e.response.status_code
+                self._log(log_path, method, payload, {"error": e.response.text}, status, start, attempt)
+                if status not in RETRYABLE_STATUS:
+                    raise
+                retry_after = parse_retry_after(e.response.headers.get("Retry-After"))
+                error = e
+            except json.JSONDecodeError as e:
+                raise ConnectAIError(
+                    f"Invalid JSON (HTTP {resp.status_code}): {resp.text[:500]!r}"
+                ) from e
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._log(log_path, method, payload, {"error": str(e)}, 0, start, attempt)
+                error = e
+
+            delay = self._retry.backoff(attempt, retry_after) if idempotent else None
+            if delay is None or attempt >= self._retry.max_attempts or not budget.try_withdraw():
+                raise error
+            time.sleep(delay)
+            attempt += 1
+
+    def _request_once(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        HTTP リクエストを 1 回送信し、結果をサーキットブレーカーに記録する。
+
+        接続エラー・タイムアウト・5xx を失敗とみなす。open 中は送信せずに即座に失敗する。
+
+        Raises:
+            ConnectAIError: サーキットが open の場合
+        """
+        breaker = self._breaker
+        if breaker is not None:
+            try:
+                breaker.before_call()
+            except CircuitOpenError as e:
+                raise ConnectAIError(str(e)) from e
+        try:
+            resp = self._http.request(method, url, timeout=30, **kwargs)
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        if breaker is not None:
+            breaker.record_status(resp.status_code)
+        return resp
+
+    def _get(self, path: str, params: dict | None = None) -> dict:
+        key = ("GET", path, tuple(sorted((params or {}).items())))
+        return self._coalesce(key, lambda: self._get_uncoalesced(path, params))
+
+    def _get_uncoalesced(self, path: str, params: dict | None = None) -> dict:
         try:
-            resp = requests.get(url, headers=self._headers(), params=params, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()
-            self._log(log_path, "GET", None, data, resp.status_code, start)
-            return data
+            return self._send("GET", path, params=params, idempotent=True)
         except requests.HTTPError as e:
-            self._log(log_path, "GET", None, {"error": e.response.text}, e.response.status_code, start)
             raise ConnectAIError(f"HTTP {e.response.status_code}: {e.response.text}") from e
-        except requests.exceptions.JSONDecodeError as e:
-            raise ConnectAIError(f"Invalid JSON (HTTP {resp.status_code}): {resp.text[:500]!r}") from e
         except requests.RequestException as e:
             raise ConnectAIError(f"Request failed: {e}") from e
 
-    @staticmethod
-    def _rows_to_dicts(result: dict) -> list[dict]:
-        """SQL形式のレスポンス（schema + rows）を dict の一覧に変換する。"""
-        columns = [col["columnName"] for col in result["schema"]]
-        return [dict(zip(columns, row)) for row in result["rows"]]
-
     def _delete(self, path: str) -> None:
-        url = f"{self.base_url}{path}"
-        start = time.monotonic()
         try:
-            resp = requests.delete(url, headers=self._headers(), timeout=30)
-            resp.raise_for_status()
-            self._log(path, "DELETE", None, None, resp.status_code, start)
+            self._send("DELETE", path, parse_json=False)
         except requests.HTTPError as e:
-            self._log(path, "DELETE", None, {"error": e.response.text}, e.response.status_code, start)
             raise ConnectAIError(f"HTTP {e.response.status_code}: {e.response.text}") from e
         except requests.RequestException as e:
             raise ConnectAIError(f"Request failed: {e}") from e
 
-    def _post(self, path: str, payload: dict) -> dict:
-        url = f"{self.base_url}{path}"
-        start = time.monotonic()
+    def _post(self, path: str, payload: dict, idempotent: bool = False) -> dict:
         try:
-            resp = requests.post(url, json=payload, headers=self._headers(), timeout=30)
-            resp.raise_for_status()
-            data = resp.json()
-            self._log(path, "POST", payload, data, resp.status_code, start)
-            return data
+            return self._send("POST", path, payload=payload, idempotent=idempotent)
         except requests.HTTPError as e:
-            self._log(path, "POST", payload, {"error": e.response.text}, e.response.status_code, start)
             raise ConnectAIError(
                 f"HTTP {e.response.status_code}: {e.response.text} "
                 f"| Request: POST {path} | Payload: {json.dumps(payload, ensure_ascii=False)}"
             ) from e
-        except requests.exceptions.JSONDecodeError as e:
-            raise ConnectAIError(f"Invalid JSON (HTTP {resp.status_code}): {resp.text[:500]!r}") from e
         except requests.RequestException as e:
             raise ConnectAIError(f"Request failed: {e}") from e
 
@@ -194,66 +359,69 @@ class ConnectAIClient:
         """
         self._delete(f"/poweredby/connection/delete/{connection_id}")
 
-    # Connect AI dataType 定数（SQL TYPE_NAME → dataType 番号）
-    _TYPE_NAME_TO_DATA_TYPE: dict[str, int] = {
-        "BINARY": 1,
-        "VARCHAR": 5,
-        "TINYINT": 6,
-        "SMALLINT": 7,
-        "INTEGER": 8,
-        "INT": 8,
-        "BIGINT": 9,
-        "FLOAT": 10,
-        "DOUBLE": 11,
-        "DECIMAL": 12,
-        "NUMERIC": 13,
-        "BOOLEAN": 14,
-        "DATE": 15,
-        "TIME": 16,
-        "TIMESTAMP": 17,
-        "UUID": 18,
-    }
-
     def query_data(
         self,
         sql: str,
         params: dict | None = None,
         param_types: dict | None = None,
+        typed: bool = False,
     ) -> tuple[list[str], list[list]]:
         """
         SQL を実行し、(column_names, rows) を返す。
 
         params の各値は {"dataType": N, "value": "..."} 形式に変換して送信する。
 
+        Args:
+            typed: True の場合、レスポンスの schema の型に従って値を変換する
+                   （整数・小数 → int / float / Decimal、日時 → datetime など）
         Returns:
             (["Id", "Name", ...], [["001", "John"], ...])
         """
-        payload: dict = {"query": sql}
-        if params:
-            formatted: dict = {}
-            for key, value in params.items():
-                type_name = (param_types or {}).get(key, "VARCHAR").upper()
-                data_type = self._TYPE_NAME_TO_DATA_TYPE.get(type_name, 5)
-                formatted[key] = {"dataType": data_type, "value": str(value)}
-            payload["parameters"] = formatted
-        sql_context = f" | [Sent] SQL: {sql} | Parameters: {json.dumps(params, ensure_ascii=False)}"
+        schema, rows = self.query_with_schema(sql, params, param_types)
+        if typed:
+            rows = decode_rows(schema, rows)
+        return [col["columnName"] for col in schema], rows
+
+    def query_columns(
+        self,
+        sql: str,
+        params: dict | None = None,
+        param_types: dict | None = None,
+        use_numpy: bool = False,
+    ) -> dict:
+        """
+        SQL を実行し、カラム単位に型変換した {columnName: 値の一覧} を返す（集計向け）。
+
+        Args:
+            use_numpy: True かつ numpy が使える場合、数値カラムを ndarray で返す
+        """
+        schema, rows = self.query_with_schema(sql, params, param_types)
+        return decode_columns(schema, rows, use_numpy=use_numpy)
+
+    def query_with_schema(
+        self,
+        sql: str,
+        params: dict | None = None,
+        param_types: dict | None = None,
+    ) -> tuple[list[dict], list[list]]:
+        """
+        SQL を実行し、Connect AI の schema（カラム名・型）と rows をそのまま返す。
+
+        Returns:
+            ([{"columnName": "Id", "dataType": 5, "dataTypeName": "VARCHAR", ...}, ...],
+             [["001", "John"], ...])
+        """
+        payload = self._query_payload(sql, params, param_types)
+        sql_context = self._sql_context(sql, params)
         try:
-            data = self._post("/query", payload)
+            if _is_read_only_sql(sql):
+                key = ("QUERY", json.dumps(payload, sort_keys=True, ensure_ascii=False))
+                data = self._coalesce(key, lambda: self._post("/query", payload, idempotent=True))
+            else:
+                data = self._post("/query", payload)
         except ConnectAIError as e:
             raise ConnectAIError(f"{e}{sql_context}") from e
-        try:
-            result = data["results"][0]
-            # DML (INSERT/UPDATE/DELETE) returns {"affectedRows": N} without schema/rows
-            if "schema" not in result:
-                return [], []
-            columns = [col["columnName"] for col in result["schema"]]
-            rows = result["rows"]
-        except (KeyError, TypeError, IndexError) as e:
-            raise ConnectAIError(
-                f"Unexpected response ({type(e).__name__}: {e}): "
-                f"{json.dumps(data, ensure_ascii=False)}{sql_context}"
-            ) from e
-        return columns, rows
+        return self._query_result(data, sql_context)
 
     def get_catalogs(self) -> list[dict]:
         """
@@ -0,0 +1,172 @@
+"""
+Connect AI のクエリ結果（schema + rows）を型付きの値に変換する。
+
+schema の型からカラムごとの変換関数を 1 度だけ決め、カラム単位でまとめて適用する
+（セルごとに型を判定しない）。numpy がインストールされていれば数値カラムを
+ndarray として返すこともできる。
+"""
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+from typing import Callable
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy 未インストール環境
+    np = None
+
+# dataTypeName が無い場合に使う dataType 番号 -> 型名（REST API 基本仕様のデータ型一覧）
+DATA_TYPE_NAMES: dict[int, str] = {
+    1: "BINARY",
+    2: "BIT",
+    3: "INTEGER",
+    4: "BIGINT",
+    5: "VARCHAR",
+    6: "DECIMAL",
+    7: "DOUBLE",
+    8: "FLOAT",
+    9: "BOOLEAN",
+    10: "DATE",
+    11: "TIME",
+    12: "TIMESTAMP",
+    13: "LONGVARCHAR",
+    14: "LONGVARBINARY",
+    15: "NULL",
+    16: "NUMERIC",
+    17: "CHAR",
+    18: "REAL",
+}
+
+INTEGER_TYPES = frozenset({"TINYINT", "SMALLINT", "INTEGER", "INT", "BIGINT"})
+FLOAT_TYPES = frozenset({"REAL", "FLOAT", "DOUBLE"})
+DECIMAL_TYPES = frozenset({"DECIMAL", "NUMERIC"})
+BOOLEAN_TYPES = frozenset({"BIT", "BOOLEAN"})
+BINARY_TYPES = frozenset({"BINARY", "VARBINARY", "LONGVARBINARY"})
+
+
+def type_name(column: dict) -> str:
+    """schema の 1 カラムから型名（大文字）を返す。dataTypeName を優先する。"""
+    name = column.get("dataTypeName")
+    if name:
+        return str(name).upper()
+    return DATA_TYPE_NAMES.get(column.get("dataType"), "VARCHAR")
+
+
+def to_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("true", "1", "yes")
+
+
+def to_decimal(value) -> Decimal:
+    return Decimal(str(value))
+
+
+def to_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def to_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def to_time(value) -> time:
+    if isinstance(value, time):
+        return value
+    return time.fromisoformat(str(value))
+
+
+def converter_for(name: str) -> Callable | None:
+    """
+    型名に対応する変換関数を返す。変換不要な型（文字列など）は None。
+
+    バイナリは Connect AI の JSON 表現のまま（文字列）返す。
+    """
+    if name in INTEGER_TYPES:
+        return int
+    if name in FLOAT_TYPES:
+        return float
+    if name in DECIMAL_TYPES:
+        return to_decimal
+    if name in BOOLEAN_TYPES:
+        return to_bool
+    if name == "DATE":
+        return to_date
+    if name == "TIME":
+        return to_time
+    if name in ("TIMESTAMP", "DATETIME"):
+        return to_datetime
+    return None
+
+
+def build_converters(schema: list[dict]) -> list[Callable | None]:
+    """schema からカラムごとの変換関数を前計算する。"""
+    return [converter_for(type_name(column)) for column in schema]
+
+
+def _convert_column(values: list, convert: Callable | None) -> list:
+    """
+    1 カラム分の値をまとめて変換する（None はそのまま）。
+
+    変換できない値が含まれていた場合は、その値だけ元のまま残す。
+    """
+    if convert is None:
+        return list(values)
+    try:
+        return [None if v is None else convert(v) for v in values]
+    except (ValueError, TypeError, ArithmeticError, InvalidOperation):
+        result = []
+        for v in values:
+            try:
+                result.append(None if v is None else convert(v))
+            except (ValueError, TypeError, ArithmeticError, InvalidOperation):
+                result.append(v)
+        return result
+
+
+def _decode(schema: list[dict], rows: list[list], use_numpy: bool) -> list:
+    """rows を転置し、カラムごとに前計算した変換関数をまとめて適用する。"""
+    converters = build_converters(schema)
+    columns = list(zip(*rows)) if rows else [() for _ in schema]
+    decoded = []
+    for column, values, convert in zip(schema, columns, converters):
+        kind = type_name(column)
+        values = _convert_column(values, convert)
+        if use_numpy and np is not None and (kind in INTEGER_TYPES or kind in FLOAT_TYPES):
+            decoded.append(_to_ndarray(values, kind))
+        else:
+            decoded.append(values)
+    return decoded
+
+
+def _to_ndarray(values: list, kind: str):
+    try:
+        if kind in INTEGER_TYPES and not any(v is None for v in values):
+            return np.asarray(values, dtype=np.int64)
+        return np.asarray([np.nan if v is None else v for v in values], dtype=np.float64)
+    except (ValueError, TypeError, OverflowError):
+        return np.asarray(values, dtype=object)
+
+
+def decode_columns(schema: list[dict], rows: list[list], use_numpy: bool = False) -> dict:
+    """
+    rows をカラム単位に型変換し、{columnName: 値の一覧} を返す。
+
+    Args:
+        use_numpy: True かつ numpy が使える場合、整数・浮動小数点カラムを ndarray にする
+                   （NULL を含む整数カラムは float64 + NaN になる）
+    """
+    decoded = _decode(schema, rows, use_numpy)
+    return {column["columnName"]: values for column, values in zip(schema, decoded)}
+
+
+def decode_rows(schema: list[dict], rows: list[list]) -> list[list]:
+    """rows をカラム単位に型変換し、行形式（list of list）に戻して返す。"""
+    if not rows:
+        return []
+    return [list(row) for row in zip(*_decode(schema, rows, use_numpy=False))]
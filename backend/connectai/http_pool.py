@@ -0,0 +1,222 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HTTPConnectionPool:
+    """
+    プロセス全体で共有する keep-alive 対応の HTTP セッションプール。
+
+    requests.Session + HTTPAdapter（urllib3 のコネクションプール）で
+    TCP/TLS 接続を再利用し、リクエストごとのハンドシェイクを省く。
+
+    Args:
+        pool_size: ホストごとに保持する最大接続数
+        max_keepalive: セッションを作り直すまでの最大寿命（秒）
+        idle_timeout: この秒数以上使われなかったセッションは破棄して作り直す
+
+    寿命・アイドル超過で入れ替えたセッションは以後払い出さないだけで、その場では閉じない。
+    request() 経由で使用中のセッションは最後の利用が終わった時点で閉じ、
+    session() で直接受け取った呼び出し元がまだ参照しうるセッションは GC に閉じさせる。
+    """
+
+    def __init__(self, pool_size: int = 10, max_keepalive: float = 300.0,
+                 idle_timeout: float = 60.0) -> None:
+        self.pool_size = pool_size
+        self.max_keepalive = max_keepalive
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._session: requests.Session | None = None
+        self._created_at = 0.0
+        self._last_used = 0.0
+        # id(session) -> request() で使用中の件数
+        self._in_use: dict[int, int] = {}
+        # 入れ替え済みで、使用中の request() が終わるのを待っているセッション
+        self._draining: dict[int, requests.Session] = {}
+        # 破棄済みセッションの累計（stats を通算で返すため）
+        self._retired_requests = 0
+        self._retired_connections = 0
+        self._evictions = 0
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @staticmethod
+    def _counters(session: requests.Session) -> tuple[int, int]:
+        """セッション配下の urllib3 プールから (リクエスト数, 新規接続数) を集計する。"""
+        num_requests = 0
+        num_connections = 0
+        # http:// と https:// に同一アダプタをマウントしているため重複を除く
+        adapters = {id(a): a for a in session.adapters.values()}.values()
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                num_requests += pool.num_requests
+                num_connections += pool.num_connections
+        return num_requests, num_connections
+
+    def _account_locked(self, session: requests.Session) -> None:
+        """破棄するセッションの件数を通算に加える（ロック取得済みで呼ぶこと）。"""
+        num_requests, num_connections = self._counters(session)
+        self._retired_requests += num_requests
+        self._retired_connections += num_connections
+
+    def _retire_locked(self, close: bool) -> None:
+        """
+        現在のセッションを払い出し対象から外す（ロック取得済みで呼ぶこと）。
+
+        request() で使用中なら、最後の利用が終わった時点で _release が閉じる。
+        そうでなければ close=True のときだけここで閉じ、それ以外は GC に任せる。
+        """
+        session = self._session
+        if session is None:
+            return
+        self._session = None
+        if id(session) in self._in_use:
+            self._draining[id(session)] = session
+            return
+        self._account_locked(session)
+        if close:
+            session.close()
+
+    def _acquire(self, lease: bool) -> requests.Session:
+        now = time.monotonic()
+        with self._lock:
+            if self._session is not None and (
+                now - self._last_used > self.idle_timeout
+                or now - self._created_at > self.max_keepalive
+            ):
+                self._retire_locked(close=False)
+                self._evictions += 1
+            if self._session is None:
+                self._session = self._new_session()
+                self._created_at = now
+            self._last_used = now
+            session = self._session
+            if lease:
+                self._in_use[id(session)] = self._in_use.get(id(session), 0) + 1
+            return session
+
+    def _release(self, session: requests.Session) -> None:
+        """lease() の利用を 1 件終える。入れ替え済みで最後の利用なら閉じる。"""
+        with self._lock:
+            count = self._in_use.pop(id(session)) - 1
+            if count:
+                self._in_use[id(session)] = count
+                return
+            if self._draining.pop(id(session), None) is None:
+                return
+            self._account_locked(session)
+        session.close()
+
+    def session(self) -> requests.Session:
+        """
+        利用可能なセッションを返す。
+        アイドル時間・寿命を超えたセッションはここで入れ替える（閉じずに GC に任せる）。
+        """
+        return self._acquire(lease=False)
+
+    @contextmanager
+    def lease(self):
+        """
+        利用中として記録したセッションを貸し出す。
+
+        with ブロックの間に入れ替えが起きても、ブロックを抜けるまでセッションは閉じない。
+        """
+        session = self._acquire(lease=True)
+        try:
+            yield session
+        finally:
+            self._release(session)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """プール済みセッションで HTTP リクエストを送信する。"""
+        with self.lease() as session:
+            return session.request(method, url, **kwargs)
+
+    def stats(self) -> dict:
+        """
+        接続の再利用状況を返す。
+
+        Returns:
+            {"requests": N, "hits": N, "misses": N, "hit_rate": float, "evictions": N, ...}
+            hits = 既存接続を再利用したリクエスト数、misses = 新規接続を張った回数
+        """
+        with self._lock:
+            num_requests = self._retired_requests
+            num_connections = self._retired_connections
+            live = list(self._draining.values())
+            if self._session is not None:
+                live.append(self._session)
+            for session in live:
+                cur_requests, cur_connections = self._counters(session)
+                num_requests += cur_requests
+                num_connections += cur_connections
+            evictions = self._evictions
+        hits = max(num_requests - num_connections, 0)
+        return {
+            "requests": num_requests,
+            "hits": hits,
+            "misses": num_connections,
+            "hit_rate": hits / num_requests if num_requests else 0.0,
+            "evictions": evictions,
+            "pool_size": self.pool_size,
+            "max_keepalive": self.max_keepalive,
+            "idle_timeout": self.idle_timeout,
+        }
+
+    def close(self) -> None:
+        """
+        保持している接続をすべて閉じる。
+
+        request() で使用中のセッションは、その利用が終わった時点で閉じる。
+        """
+        with self._lock:
+            self._retire_locked(close=True)
+
+
+# ---------------------------------------------------------------------------
+# モジュールレベル: プロセス共有プール
+# ---------------------------------------------------------------------------
+
+_pool: HTTPConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_http_pool(config: dict | None = None) -> HTTPConnectionPool:
+    """
+    プロセス共有の HTTPConnectionPool を返す（初回呼び出し時に生成）。
+
+    Args:
+        config: Flask の app.config など。初回生成時のみ CONNECT_AI_POOL_* を参照する
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = config or {}
+                _pool = HTTPConnectionPool(
+                    pool_size=int(config.get("CONNECT_AI_POOL_SIZE", 10)),
+                    max_keepalive=float(config.get("CONNECT_AI_POOL_MAX_KEEPALIVE", 300)),
+                    idle_timeout=float(config.get("CONNECT_AI_POOL_IDLE_TIMEOUT", 60)),
+                )
+    return _pool
+
+
+def reset_http_pool() -> None:
+    """共有プールを破棄する（テスト・設定再読み込み用）。"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
@@ -1,13 +1,134 @@
+import os
+import threading
 import time
 import jwt
 from cryptography.hazmat.primitives import serialization
 from flask import current_app
 
+# トークンの有効期間（秒）
+_TOKEN_TTL = 3600
+
+
+class PrivateKeyProvider:
+    """
+    RSA 秘密鍵をプロセス内で 1 度だけ読み込んで保持する。
+
+    CONNECT_AI_PRIVATE_KEY の値、または CONNECT_AI_PRIVATE_KEY_PATH のファイル
+    (パス + mtime) が変わったときだけ再読み込みするため、鍵ローテーションにも追従する。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (source, private_key, version) を 1 つのタプルで保持し、ロックなしで読めるようにする
+        # version は鍵を読み込み直すたびに増える世代番号（トークンキャッシュの無効化に使う）
+        self._state: tuple = (None, None, 0)
+
+    @staticmethod
+    def _current_source(config) -> tuple:
+        private_key_content = config.get("CONNECT_AI_PRIVATE_KEY", "")
+        if private_key_content:
+            return ("value", private_key_content)
+        private_key_path = config["CONNECT_AI_PRIVATE_KEY_PATH"]
+        return ("file", private_key_path, os.stat(private_key_path).st_mtime_ns)
+
+    @staticmethod
+    def _load(source: tuple):
+        if source[0] == "value":
+            return serialization.load_pem_private_key(
+                source[1].replace("\\n", "\n").encode(), password=None
+            )
+        with open(source[1], "rb") as f:
+            return serialization.load_pem_private_key(f.read(), password=None)
+
+    def get(self, config) -> tuple[object, int]:
+        """
+        秘密鍵と世代番号を返す。設定・ファイルが変わっていれば読み込み直す。
+
+        Returns:
+            (private_key, version)
+        """
+        source = self._current_source(config)
+        cached_source, private_key, version = self._state
+        if source == cached_source:
+            return private_key, version
+        with self._lock:
+            cached_source, private_key, version = self._state
+            if source != cached_source:
+                private_key = self._load(source)
+                version += 1
+                self._state = (source, private_key, version)
+            return private_key, version
+
+    def reset(self) -> None:
+        """保持している鍵を破棄する（テスト用）。"""
+        with self._lock:
+            self._state = (None, None, self._state[2])
+
+
+_key_provider = PrivateKeyProvider()
+
+# (parent_account_id, subject_account_id) -> (token, exp, key_version)
+_token_cache: dict[tuple[str, str], tuple[str, int, int]] = {}
+# テナントごとの発行ロック（同一テナントの同時署名を 1 回にまとめる）
+_mint_locks: dict[tuple[str, str], threading.Lock] = {}
+_mint_locks_guard = threading.Lock()
+# キャッシュがこの件数に達したら、次の発行時に期限切れ・旧鍵のエントリを掃除する
+_PRUNE_MIN = 256
+_prune_at = _PRUNE_MIN
+
+
+def sign_connect_ai_jwt(private_key, parent_account_id: str, subject_account_id: str,
+                        now: int | None = None) -> tuple[str, int]:
+    """
+    読み込み済みの秘密鍵で JWT に署名し、(token, exp) を返す。
+    鍵の読み込みを含まないため、署名コスト単体のベンチマークにも使える。
+    """
+    now = int(time.time()) if now is None else now
+    exp = now + _TOKEN_TTL
+    payload = {
+        "tokenType": "powered-by",
+        "iss": parent_account_id,
+        "sub": subject_account_id,
+        "iat": now,
+        "exp": exp,
+    }
+    return jwt.encode(payload, private_key, algorithm="RS256"), exp
+
+
+def _get_cached(key: tuple[str, str], margin: int, key_version: int) -> str | None:
+    """現在の鍵で署名され、有効期限まで margin 秒以上残っているトークンを返す。"""
+    cached = _token_cache.get(key)
+    if cached and cached[2] == key_version and cached[1] - margin > time.time():
+        return cached[0]
+    return None
+
+
+def _prune(now: float, key_version: int) -> None:
+    """
+    期限切れ・旧鍵のトークンと、使われていない発行ロックを破棄する（_mint_locks_guard 保持中に呼ぶ）。
+
+    掃除後の件数の 2 倍を次のしきい値にするため、掃除のコストは発行 1 回あたり定数に収まり、
+    キャッシュの件数は直近 _TOKEN_TTL 秒に発行したテナント数で頭打ちになる。
+    """
+    global _prune_at
+    for key, (_, exp, version) in list(_token_cache.items()):
+        if exp <= now or version != key_version:
+            _token_cache.pop(key, None)
+    for key, lock in list(_mint_locks.items()):
+        # 保持中のロックは残す。取得直前のロックを消しても、同時に 2 回署名するだけで結果は正しい
+        if key not in _token_cache and not lock.locked():
+            del _mint_locks[key]
+    _prune_at = max(_PRUNE_MIN, 2 * len(_token_cache))
+
 
 def generate_connect_ai_jwt(parent_account_id: str, subject_account_id: str) -> str:
     """
     Connect AI API 用 RS256 JWT を生成する。
 
+    (parent_account_id, subject_account_id) ごとにトークンをキャッシュし、
+    有効期限の CONNECT_AI_JWT_REFRESH_MARGIN 秒前、または秘密鍵が
+    差し替えられたときに再発行する。期限切れのエントリは発行時にまとめて掃除する。
+
     Args:
         parent_account_id: ParentAccountId（iss クレーム）
         subject_account_id: 呼び出し対象アカウントID（sub クレーム）
@@ -16,22 +137,33 @@ def generate_connect_ai_jwt(parent_account_id: str, subject_account_id: str) ->
     Returns:
         署名済み JWT 文字列
     """
-    private_key_content = current_app.config.get("CONNECT_AI_PRIVATE_KEY", "")
-    if private_key_content:
-        private_key = serialization.load_pem_private_key(
-            private_key_content.replace("\\n", "\n").encode(), password=None
-        )
-    else:
-        private_key_path = current_app.config["CONNECT_AI_PRIVATE_KEY_PATH"]
-        with open(private_key_path, "rb") as f:
-            private_key = serialization.load_pem_private_key(f.read(), password=None)
-
-    now = int(time.time())
-    payload = {
-        "tokenType": "powered-by",
-        "iss": parent_account_id,
-        "sub": subject_account_id,
-        "iat": now,
-        "exp": now + 3600,
-    }
-    return jwt.encode(payload, private_key, algorithm="RS256")
+    margin = int(current_app.config.get("CONNECT_AI_JWT_REFRESH_MARGIN", 300))
+    key = (parent_account_id, subject_account_id)
+    private_key, key_version = _key_provider.get(current_app.config)
+
+    token = _get_cached(key, margin, key_version)
+    if token is not None:
+        return token
+
+    with _mint_locks_guard:
+        if len(_token_cache) >= _prune_at:
+            _prune(time.time(), key_version)
+        lock = _mint_locks.setdefault(key, threading.Lock())
+    with lock:
+        # ロック待ちの間に他スレッドが発行済みならそれを使う
+        token = _get_cached(key, margin, key_version)
+        if token is not None:
+            return token
+        token, exp = sign_connect_ai_jwt(private_key, parent_account_id, subject_account_id)
+        _token_cache[key] = (token, exp, key_version)
+        return token
+
+
+def clear_jwt_cache() -> None:
+    """JWT キャッシュと読み込み済みの秘密鍵を破棄する（テスト用）。"""
+    global _prune_at
+    with _mint_locks_guard:
+        _token_cache.clear()
+        _mint_locks.clear()
+        _prune_at = _PRUNE_MIN
+    _key_provider.reset()
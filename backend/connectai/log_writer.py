@@ -0,0 +1,223 @@
+import atexit
+import collections
+import threading
+import time
+from datetime import datetime, timezone
+
+from backend import json_provider
+
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_BLOCK = "block"
+
+
+class ApiLogWriter:
+    """
+    API ログを 1 本のバックグラウンドスレッドでまとめて DB に書き込むライター。
+
+    submit() はキューに積むだけで即座に戻り、ライタースレッドが
+    batch_size 件たまるか flush_interval 秒経過するごとに複数行 INSERT で保存する。
+
+    Args:
+        app: Flask アプリ（書き込み時に app_context を開くため）
+        max_queue: キューの上限件数
+        batch_size: 1 回の INSERT で書き込む最大件数
+        flush_interval: 件数に満たなくても書き込むまでの秒数
+        overflow_policy: キューが満杯のときの動作
+            - "drop_oldest": 最も古いログを捨てて新しいログを積む
+            - "block": 空きができるまで最大 block_timeout 秒待ち、それでも満杯なら捨てる
+        block_timeout: overflow_policy="block" のときの最大待ち時間（秒）
+    """
+
+    def __init__(self, app, max_queue: int = 10000, batch_size: int = 100,
+                 flush_interval: float = 1.0, overflow_policy: str = OVERFLOW_DROP_OLDEST,
+                 block_timeout: float = 1.0) -> None:
+        if overflow_policy not in (OVERFLOW_DROP_OLDEST, OVERFLOW_BLOCK):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.app = app
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._queue: collections.deque[dict] = collections.deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._stopping = False
+        self._dropped = 0
+        self._written = 0
+        self._failed = 0
+        self._batches = 0
+
+        self._thread = threading.Thread(target=self._run, name="api-log-writer", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # 呼び出し側
+    # ------------------------------------------------------------------
+
+    def submit(self, entry: dict) -> bool:
+        """
+        ログ 1 件をキューに積む。
+
+        Args:
+            entry: ApiLog のカラム名をキーとする dict
+                   （request_body / response_body は JSON 化前のオブジェクトのまま渡す）
+        Returns:
+            キューに積めた場合 True、停止中・満杯で捨てた場合 False
+        """
+        entry.setdefault("timestamp", datetime.now(timezone.utc).replace(tzinfo=None))
+        with self._cond:
+            if self._stopping:
+                self._dropped += 1
+                return False
+            if len(self._queue) >= self.max_queue:
+                if self.overflow_policy == OVERFLOW_DROP_OLDEST:
+                    self._queue.popleft()
+                    self._dropped += 1
+                else:
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.max_queue and not self._stopping:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._dropped += 1
+                            return False
+                        self._cond.wait(remaining)
+                    if self._stopping:
+                        self._dropped += 1
+                        return False
+            self._queue.append(entry)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        キューが空になり、書き込み中のバッチがなくなるまで待つ。
+
+        Returns:
+            時間内に書き込みが完了した場合 True
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """新規の受け付けを止め、残りのログを書き込んでからスレッドを終了する。"""
+        with self._cond:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        """キュー深さ・破棄件数などの統計を返す。"""
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "dropped": self._dropped,
+                "written": self._written,
+                "failed": self._failed,
+                "batches": self._batches,
+                "overflow_policy": self.overflow_policy,
+            }
+
+    # ------------------------------------------------------------------
+    # ライタースレッド
+    # ------------------------------------------------------------------
+
+    def _next_batch(self) -> list[dict] | None:
+        """次に書き込むバッチを取り出す。停止済みでキューが空なら None。"""
+        with self._cond:
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._queue) < self.batch_size and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if not self._queue:
+                return None if self._stopping else []
+            count = min(len(self._queue), self.batch_size)
+            batch = [self._queue.popleft() for _ in range(count)]
+            self._in_flight = len(batch)
+            # block ポリシーで待っている submit() を起こす
+            self._cond.notify_all()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if not batch:
+                continue
+            ok = self._write(batch)
+            with self._cond:
+                self._in_flight = 0
+                self._batches += 1
+                if ok:
+                    self._written += len(batch)
+                else:
+                    self._failed += len(batch)
+                self._cond.notify_all()
+
+    @staticmethod
+    def _to_row(entry: dict) -> dict:
+        row = dict(entry)
+        for key in ("request_body", "response_body"):
+            value = row.get(key)
+            row[key] = json_provider.dumps(value) if value is not None else None
+        return row
+
+    def _write(self, batch: list[dict]) -> bool:
+        """バッチを 1 回の複数行 INSERT で保存する。失敗してもスレッドは止めない。"""
+        try:
+            with self.app.app_context():
+                from backend.models.api_log import ApiLog
+                from backend.models import db
+                db.session.execute(db.insert(ApiLog), [self._to_row(e) for e in batch])
+                db.session.commit()
+            return True
+        except Exception:
+            return False  # ログ失敗はサイレントに無視（件数は failed に計上）
+
+
+# ---------------------------------------------------------------------------
+# モジュールレベル: アプリごとのライター
+# ---------------------------------------------------------------------------
+
+_writer_lock = threading.Lock()
+
+
+def get_log_writer(app) -> ApiLogWriter:
+    """
+    アプリに紐づく ApiLogWriter を返す（初回呼び出し時に生成し、終了時に drain する）。
+
+    Args:
+        app: Flask アプリ（current_app._get_current_object() の値）
+    """
+    writer = app.extensions.get("api_log_writer")
+    if writer is not None:
+        return writer
+    with _writer_lock:
+        writer = app.extensions.get("api_log_writer")
+        if writer is None:
+            config = app.config
+            writer = ApiLogWriter(
+                app,
+                max_queue=int(config.get("API_LOG_QUEUE_SIZE", 10000)),
+                batch_size=int(config.get("API_LOG_BATCH_SIZE", 100)),
+                flush_interval=float(config.get("API_LOG_FLUSH_INTERVAL", 1.0)),
+                overflow_policy=config.get("API_LOG_OVERFLOW_POLICY", OVERFLOW_DROP_OLDEST),
+            )
+            app.extensions["api_log_writer"] = writer
+            atexit.register(writer.shutdown)
+    return writer
@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+
+# 再試行の対象とする HTTP ステータス（スロットリング・一時的なサーバーエラー）
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: str | None, now: float | None = None) -> float | None:
+    """
+    Retry-After ヘッダーを待ち秒数に変換する。
+
+    秒数（"120"）と HTTP 日付（"Wed, 21 Oct 2015 07:28:00 GMT"）の両形式に対応する。
+    解釈できない場合は None を返す。
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    now = time.time() if now is None else now
+    return max(0.0, retry_at.timestamp() - now)
+
+
+class RetryPolicy:
+    """
+    上限付き指数バックオフ（full jitter）による再試行ポリシー。
+
+    Args:
+        max_attempts: 初回を含む最大試行回数（1 で再試行しない）
+        base_delay: 1 回目の再試行前の待ち時間の上限（秒）。以降は 2 倍ずつ増える
+        max_delay: 1 回の待ち時間の上限（秒）。Retry-After がこれを超える場合は再試行しない
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2,
+                 max_delay: float = 5.0) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_config(cls, config) -> "RetryPolicy":
+        return cls(
+            max_attempts=int(config.get("CONNECT_AI_RETRY_MAX_ATTEMPTS", 3)),
+            base_delay=float(config.get("CONNECT_AI_RETRY_BASE_DELAY", 0.2)),
+            max_delay=float(config.get("CONNECT_AI_RETRY_MAX_DELAY", 5.0)),
+        )
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float | None:
+        """
+        attempt 回目の試行が失敗した後、次の試行までに待つ秒数を返す。
+
+        Retry-After が指定されていればそれに従い、max_delay を超える場合は
+        再試行しない（None を返す）。
+        """
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+
+class RetryBudget:
+    """
+    テナント単位の再試行バジェット（トークンバケット）。
+
+    リクエストごとに ratio 枚のトークンが貯まり（上限 burst 枚）、再試行 1 回ごとに
+    1 枚消費する。障害時でも再試行は通常リクエストの ratio 倍程度に抑えられ、
+    再試行による負荷の増幅を防ぐ。
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 10.0) -> None:
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+        self._retries = 0
+        self._exhausted = 0
+
+    def deposit(self) -> None:
+        """リクエスト 1 回分のトークンを貯める。"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        """再試行 1 回分のトークンを消費する。残りがなければ False。"""
+        with self._lock:
+            if self._tokens < 1:
+                self._exhausted += 1
+                return False
+            self._tokens -= 1
+            self._retries += 1
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tokens": round(self._tokens, 2),
+                "retries": self._retries,
+                "exhausted": self._exhausted,
+            }
+
+
+# ---------------------------------------------------------------------------
+# モジュールレベル: テナントごとのバジェット
+# ---------------------------------------------------------------------------
+
+_budgets: dict[tuple, RetryBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def get_retry_budget(key: tuple, config) -> RetryBudget:
+    """
+    テナント（(base_url, parent_account_id, subject_id) など）に対応するバジェットを返す。
+
+    CONNECT_AI_RETRY_BUDGET_RATIO / CONNECT_AI_RETRY_BUDGET_BURST で初回生成する。
+    """
+    budget = _budgets.get(key)
+    if budget is not None:
+        return budget
+    with _budgets_lock:
+        budget = _budgets.get(key)
+        if budget is None:
+            budget = RetryBudget(
+                ratio=float(config.get("CONNECT_AI_RETRY_BUDGET_RATIO", 0.1)),
+                burst=float(config.get("CONNECT_AI_RETRY_BUDGET_BURST", 10)),
+            )
+            _budgets[key] = budget
+    return budget
+
+
+def reset_retry_budgets() -> None:
+    """すべてのテナントのバジェットを破棄する（テスト用）。"""
+    with _budgets_lock:
+        _budgets.clear()
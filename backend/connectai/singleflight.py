@@ -0,0 +1,128 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Awaitable, Callable, Hashable
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    同じキーの同時呼び出しを 1 回の実行にまとめる（single-flight）。
+
+    最初の呼び出し（リーダー）だけが fn() を実行し、実行中に同じキーで呼ばれた
+    スレッドはその結果（または例外）を共有する。完了後の呼び出しは新たに実行される。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._executed = 0
+        self._shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], object]):
+        """
+        key ごとに fn() を 1 回だけ実行し、その結果を返す。
+
+        Note:
+            共有された結果は同じオブジェクトなので、呼び出し側で変更しないこと。
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self) -> dict:
+        """実行回数と、相乗りで省略できた呼び出し回数を返す。"""
+        with self._lock:
+            return {
+                "executed": self._executed,
+                "shared": self._shared,
+                "in_flight": len(self._calls),
+            }
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight のコルーチン版。
+
+    リーダーの結果は concurrent.futures.Future で共有するため、別のイベントループ
+    （別スレッドの Flask の async ビューなど）からの同じキーの呼び出しもまとめられる。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, concurrent.futures.Future] = {}
+        self._executed = 0
+        self._shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """
+        key ごとに await fn() を 1 回だけ実行し、その結果を返す。
+
+        Note:
+            共有された結果は同じオブジェクトなので、呼び出し側で変更しないこと。
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._shared += 1
+                leader = False
+            else:
+                future = concurrent.futures.Future()
+                self._calls[key] = future
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            # 待っている側がキャンセルされてもリーダーの実行は止めない
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self) -> dict:
+        """実行回数と、相乗りで省略できた呼び出し回数を返す。"""
+        with self._lock:
+            return {
+                "executed": self._executed,
+                "shared": self._shared,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,112 @@
+"""
+JSON のエンコード / デコード。
+
+orjson がインストールされていればそれを使い、無ければ標準ライブラリの json を使う。
+Flask アプリ（jsonify / request.get_json）、Connect AI・MCP のレスポンス解析、
+API ログの保存、SSE イベントの送信で共通に使う。
+
+    JSON_BACKEND=auto     # orjson があれば orjson（デフォルト）
+    JSON_BACKEND=orjson   # orjson を必須にする
+    JSON_BACKEND=stdlib   # 常に標準ライブラリ
+"""
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 未インストール環境
+    orjson = None
+
+BACKEND_AUTO = "auto"
+BACKEND_ORJSON = "orjson"
+BACKEND_STDLIB = "stdlib"
+
+_backend = BACKEND_ORJSON if orjson is not None else BACKEND_STDLIB
+
+
+def configure(name: str) -> str:
+    """
+    使用するバックエンドを切り替え、実際に選ばれたバックエンド名を返す。
+
+    Raises:
+        ValueError: 未対応の名前が指定された場合
+        RuntimeError: orjson が指定されたがインストールされていない場合
+    """
+    global _backend
+    name = (name or BACKEND_AUTO).lower()
+    if name not in (BACKEND_AUTO, BACKEND_ORJSON, BACKEND_STDLIB):
+        raise ValueError(f"Unsupported JSON_BACKEND: {name}")
+    if name == BACKEND_ORJSON and orjson is None:
+        raise RuntimeError("JSON_BACKEND=orjson but orjson is not installed")
+    if name == BACKEND_AUTO:
+        name = BACKEND_ORJSON if orjson is not None else BACKEND_STDLIB
+    _backend = name
+    return _backend
+
+
+def get_backend() -> str:
+    return _backend
+
+
+def _orjson_option(sort_keys: bool) -> int:
+    # 日時は default（Flask の HTTP 日付形式など）に任せ、標準ライブラリと同じ出力にする
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return option
+
+
+def dumps(obj, *, default=None, sort_keys: bool = False) -> str:
+    """
+    obj を JSON 文字列にする（非 ASCII 文字はエスケープしない）。
+
+    orjson で扱えない値（64 bit を超える整数など）は標準ライブラリで処理する。
+    """
+    if _backend == BACKEND_ORJSON:
+        try:
+            return orjson.dumps(obj, default=default, option=_orjson_option(sort_keys)).decode()
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, default=default, sort_keys=sort_keys)
+
+
+def loads(data: str | bytes):
+    """
+    JSON 文字列（またはバイト列）を解析する。
+
+    Raises:
+        json.JSONDecodeError: JSON として解析できない場合（orjson の例外もこのサブクラス）
+    """
+    if _backend == BACKEND_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def response_json(resp):
+    """requests.Response のボディを解析する（resp.json() の代わり）。"""
+    return loads(resp.content)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask 用の JSON プロバイダー。
+
+    DefaultJSONProvider と同じ設定（sort_keys・日時の HTTP 日付形式など）で、
+    エンコード / デコードを dumps() / loads() に任せる。インデント付きの出力
+    （デバッグ時の整形表示）は標準ライブラリで行う。
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        if _backend == BACKEND_ORJSON and kwargs.get("indent") is None:
+            return dumps(
+                obj,
+                default=kwargs.get("default", self.default),
+                sort_keys=kwargs.get("sort_keys", self.sort_keys),
+            )
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s: str | bytes, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
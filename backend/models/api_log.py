@@ -13,5 +13,6 @@ class ApiLog(db.Model):
     response_body = db.Column(db.Text, nullable=True)           # JSON 文字列
     status_code   = db.Column(db.Integer, nullable=False)
     elapsed_ms    = db.Column(db.Integer, nullable=False)
+    attempt       = db.Column(db.Integer, nullable=False, server_default="1")  # 再試行を含む試行番号（1 始まり）
 
     user = db.relationship("User", backref=db.backref("api_logs", lazy=True))
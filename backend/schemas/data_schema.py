@@ -1,6 +1,15 @@
+from typing import Literal
+
 from pydantic import BaseModel
 
 
+class RecordCountSchema(BaseModel):
+    connection_id: str
+    catalog: str
+    schema_name: str
+    table: str
+
+
 class RecordListSchema(BaseModel):
     connection_id: str
     catalog: str
@@ -8,6 +17,12 @@ class RecordListSchema(BaseModel):
     table: str
     limit: int = 20
     offset: int = 0
+    # "offset": LIMIT/OFFSET でページング / "keyset": ソートキーの続きから取得
+    paging: Literal["offset", "keyset"] = "offset"
+    # keyset モードの継続トークン（前ページの next_cursor。指定時は keyset モードになる）
+    cursor: str | None = None
+    # keyset モードのソートキー（省略時はカラムメタデータの主キー。主キー以外なら主キーを併用する）
+    sort_key: str | None = None
 
 
 class RecordWriteSchema(BaseModel):
@@ -16,3 +16,7 @@ class QueryRequestSchema(BaseModel):
     table_name: str
     columns: list[str] = []
     conditions: list[ConditionSchema] = []
+
+
+class QueryExportSchema(QueryRequestSchema):
+    format: str = "csv"   # "csv" / "ndjson"
@@ -26,6 +26,7 @@ class ApiLogService:
             "endpoint": log.endpoint,
             "status_code": log.status_code,
             "elapsed_ms": log.elapsed_ms,
+            "attempt": log.attempt,
             "request_body": log.request_body,
             "response_body": log.response_body,
         }
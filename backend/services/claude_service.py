@@ -1,8 +1,13 @@
 import json
-from typing import Generator
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Generator, Iterator
 
 from anthropic import Anthropic
-from backend.services.mcp_client import MCPClient, MCPError, get_mcp_tools
+from flask import current_app, has_app_context
+from backend.services import tool_result_shaping
+from backend.services.mcp_client import AsyncMCPClient, MCPClient, MCPError, get_mcp_tools
 
 
 _SYSTEM_PROMPT = (
@@ -13,6 +18,12 @@ _SYSTEM_PROMPT = (
 
 _MAX_ITERATIONS = 10
 
+# ツール実行用のプロセス共有スレッドプール（初回使用時に MCP_TOOL_POOL_SIZE で生成）
+_tool_executor: ThreadPoolExecutor | None = None
+_tool_executor_lock = threading.Lock()
+# ツール実行中に進捗通知を確認する間隔（秒）
+_PROGRESS_POLL_SECONDS = 0.1
+
 
 def _block_to_dict(block) -> dict:
     """Anthropic SDK のコンテンツブロックを JSON シリアライズ可能な dict に変換する。"""
@@ -28,11 +39,471 @@ def _block_to_dict(block) -> dict:
     return d
 
 
+def _config(key: str, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+
+# ---------------------------------------------------------------------------
+# プロンプトキャッシュ
+# ---------------------------------------------------------------------------
+
+_CACHE_CONTROL = {"type": "ephemeral"}
+
+# レスポンスの usage から集計するトークン数
+_USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+
+def _system_prompt(catalog_name: str | None, cache: bool) -> str | list[dict]:
+    """システムプロンプトを返す。cache が True ならキャッシュ対象のテキストブロックにする。"""
+    system = _SYSTEM_PROMPT
+    if catalog_name:
+        system += f"\n優先して使用するカタログ名は '{catalog_name}' です。"
+    if not cache:
+        return system
+    return [{"type": "text", "text": system, "cache_control": _CACHE_CONTROL}]
+
+
+def _cacheable_tools(tools: list[dict], cache: bool) -> list[dict]:
+    """末尾のツール定義にキャッシュのブレークポイントを付ける（ツール一覧全体が対象になる）。"""
+    if not cache or not tools:
+        return tools
+    return tools[:-1] + [{**tools[-1], "cache_control": _CACHE_CONTROL}]
+
+
+def _with_cache_breakpoint(messages: list[dict]) -> list[dict]:
+    """
+    最後のメッセージの末尾ブロックにキャッシュのブレークポイントを付けたコピーを返す。
+
+    Agentic loop の次の呼び出しでは、ここまでの会話がそのままプレフィックスになるため
+    キャッシュから読み込まれる。元の messages は変更しない。
+    """
+    if not messages:
+        return messages
+    last = messages[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = list(content)
+    if not blocks:
+        return messages
+    blocks[-1] = {**blocks[-1], "cache_control": _CACHE_CONTROL}
+    return messages[:-1] + [{**last, "content": blocks}]
+
+
+def _add_usage(totals: dict, usage, estimated: int = 0, compacted: int = 0) -> int | None:
+    """
+    レスポンスの usage（キャッシュの書き込み / 読み込みトークン数を含む）を合計に加え、
+    呼び出しごとの入力トークン数を iterations に記録する。
+
+    Returns:
+        この呼び出しの入力トークン数（キャッシュ分を含む）。usage が無ければ None
+    """
+    totals["requests"] += 1
+    input_tokens = None
+    if usage is not None:
+        for field in _USAGE_FIELDS:
+            totals[field] += getattr(usage, field, None) or 0
+        input_tokens = sum(
+            getattr(usage, field, None) or 0
+            for field in ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+        )
+    totals["iterations"].append({
+        "input_tokens": input_tokens,
+        "estimated_input_tokens": estimated,
+        "compacted": compacted,
+    })
+    return input_tokens
+
+
+def _new_usage() -> dict:
+    return {"requests": 0, **{field: 0 for field in _USAGE_FIELDS}, "iterations": []}
+
+
+def _log_usage(totals: dict, account_id: str | None, conversation_id: str | None,
+               status: str) -> None:
+    """
+    会話 1 ターン分のトークン使用量（キャッシュの書き込み / 読み込みを含む）をログに記録する。
+
+    画面を閉じた後も会話ごとのキャッシュの効果を集計できるよう、extra の
+    claude_usage に同じ値を構造化して渡す。
+    """
+    if not has_app_context() or not totals.get("requests"):
+        return
+    record = {
+        "account_id": account_id,
+        "conversation_id": conversation_id,
+        "status": status,
+        "requests": totals["requests"],
+        **{field: totals[field] for field in _USAGE_FIELDS},
+    }
+    current_app.logger.info(
+        "claude usage account=%s conversation=%s status=%s requests=%d input=%d output=%d "
+        "cache_creation=%d cache_read=%d",
+        account_id, conversation_id, status, totals["requests"], totals["input_tokens"],
+        totals["output_tokens"], totals["cache_creation_input_tokens"],
+        totals["cache_read_input_tokens"],
+        extra={"claude_usage": record},
+    )
+
+
+# ---------------------------------------------------------------------------
+# 会話コンテキストの圧縮（トークン予算）
+# ---------------------------------------------------------------------------
+
+# 1 トークンあたりのおおよその UTF-8 バイト数（実際の入力トークン数が分かるまでの初期値）
+_BYTES_PER_TOKEN = 3.5
+# 古いツール結果を圧縮するときに残す先頭の文字数
+_COMPACTED_TOOL_RESULT_CHARS = 300
+# 省略した古い会話について残すユーザーの発言数と、1 発言あたりの文字数
+_SUMMARY_MAX_QUESTIONS = 10
+_SUMMARY_CHARS = 80
+# ツール結果を切り詰めたときに付ける注記のおおよそのバイト数
+_NOTICE_BYTES = 100
+
+
+def _json_size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode())
+
+
+def _is_turn_start(message: dict) -> bool:
+    """ユーザーの発言（tool_result ではない user メッセージ）かどうか。"""
+    if message["role"] != "user":
+        return False
+    content = message["content"]
+    if isinstance(content, str):
+        return True
+    return not any(isinstance(b, dict) and b.get("type") == "tool_result" for b in content)
+
+
+def _message_text(message: dict) -> str:
+    content = message["content"]
+    if isinstance(content, str):
+        return content
+    return " ".join(b.get("text", "") for b in content if isinstance(b, dict))
+
+
+class _ContextBudget:
+    """
+    会話コンテキスト（システムプロンプト・ツール定義・messages）の入力トークン数を見積もり、
+    予算を超える場合は messages を圧縮する。
+
+    トークン数は JSON 化したバイト数からの概算で、Claude から実際の入力トークン数が
+    返るたびにバイト数との比率を補正する。圧縮は次の順に予算内に収まるまで行う。
+
+    1. 古いツール結果（最新のターン以外）を先頭部分だけ残して省略する
+    2. 古いターンを削除し、以前のユーザーの発言を要約として最初の発言の前に付ける
+    3. 残ったツール結果（最新のものを含む）を予算に収まる長さに切り詰める
+
+    圧縮した messages は以降の呼び出しでもそのまま使うため、プロンプトキャッシュは
+    圧縮した呼び出しの次から再び効く。
+
+    メッセージごとの JSON のバイト数は覚えておき（圧縮はメッセージを差し替えるため、
+    同じ dict なら内容も同じ）、圧縮中は合計を増減させて見積もる。会話が長くなっても
+    見積もりのたびに全体を JSON 化し直さない。
+
+    Args:
+        budget: 入力トークン数の上限（0 以下なら圧縮しない）
+    """
+
+    def __init__(self, budget: int, system, tools: list[dict]) -> None:
+        self.budget = budget
+        self._fixed_bytes = _json_size(system) + _json_size(tools)
+        self._tokens_per_byte = 1 / _BYTES_PER_TOKEN
+        self._summary: list[str] = []
+        # 要約を付けた先頭メッセージと、その元の内容
+        self._head: dict | None = None
+        self._head_content = None
+        # id(message) -> (message, JSON のバイト数)
+        self._sizes: dict[int, tuple[dict, int]] = {}
+
+    def _size(self, message: dict) -> int:
+        """メッセージの JSON のバイト数（区切りの ", " を含む）。"""
+        entry = self._sizes.get(id(message))
+        if entry is None or entry[0] is not message:
+            entry = (message, _json_size(message) + 2)
+            self._sizes[id(message)] = entry
+        return entry[1]
+
+    def _total(self, messages: list[dict]) -> int:
+        """system・tools と messages を送った場合の JSON のおおよそのバイト数を返す。"""
+        total = self._fixed_bytes + sum(self._size(m) for m in messages)
+        # 会話から外れたメッセージの分は忘れる
+        self._sizes = {id(m): self._sizes[id(m)] for m in messages}
+        return total
+
+    def _tokens(self, total: int) -> int:
+        return int(total * self._tokens_per_byte)
+
+    def _replace(self, messages: list[dict], i: int, message: dict, total: int) -> int:
+        """messages[i] を message に差し替え、増減を反映した合計バイト数を返す。"""
+        total += self._size(message) - self._size(messages[i])
+        messages[i] = message
+        return total
+
+    def estimate(self, messages: list[dict]) -> int:
+        """messages を送った場合の入力トークン数の見積もりを返す。"""
+        return self._tokens(self._total(messages))
+
+    def observe(self, messages: list[dict], input_tokens: int | None) -> None:
+        """実際の入力トークン数でバイト数 -> トークン数の比率を補正する。"""
+        size = self._total(messages)
+        if input_tokens and size:
+            self._tokens_per_byte = input_tokens / size
+
+    def fit(self, messages: list[dict]) -> int:
+        """
+        messages をその場で圧縮して予算内に収め、圧縮・削除したメッセージ数を返す。
+
+        予算内に収まらない場合（最新の発言だけで予算を超える場合など）もそのまま返す。
+        """
+        if self.budget <= 0:
+            return 0
+        total = self._total(messages)
+        if self._tokens(total) <= self.budget:
+            return 0
+        compacted, total = self._compact_old_tool_results(messages, total)
+        if self._tokens(total) > self.budget:
+            dropped, total = self._drop_oldest_turns(messages, total)
+            compacted += dropped
+        if self._tokens(total) > self.budget:
+            truncated, total = self._truncate_tool_results(messages, total)
+            compacted += truncated
+        return compacted
+
+    def _over_bytes(self, total: int) -> int:
+        return int((self._tokens(total) - self.budget) / self._tokens_per_byte)
+
+    def _compact_old_tool_results(self, messages: list[dict], total: int) -> tuple[int, int]:
+        compacted = 0
+        for i, message in enumerate(messages[:-1]):
+            if self._tokens(total) <= self.budget:
+                break
+            content = message["content"]
+            if message["role"] != "user" or isinstance(content, str):
+                continue
+            blocks = [_shorten_tool_result(b, _COMPACTED_TOOL_RESULT_CHARS,
+                                           "以前のツール結果のため省略") for b in content]
+            if blocks != content:
+                total = self._replace(messages, i, {**message, "content": blocks}, total)
+                compacted += 1
+        return compacted, total
+
+    def _drop_oldest_turns(self, messages: list[dict], total: int) -> tuple[int, int]:
+        """
+        予算に収まるまで古いターンから削除して要約に加え、(削除したメッセージ数, 合計バイト数)
+        を返す（最新のターンは残す）。
+        """
+        starts = [i for i, m in enumerate(messages) if _is_turn_start(m)]
+        dropped = 0
+        while len(starts) >= 2 and self._tokens(total) > self.budget:
+            cut = starts[1]
+            for message in messages[:cut]:
+                total -= self._size(message)
+                if message is self._head:
+                    text = _message_text({"content": self._head_content})
+                elif _is_turn_start(message):
+                    text = _message_text(message)
+                else:
+                    continue
+                self._summary.append(text[:_SUMMARY_CHARS])
+            self._summary = self._summary[-_SUMMARY_MAX_QUESTIONS:]
+            del messages[:cut]
+            starts = [i - cut for i in starts[1:]]
+            dropped += cut
+
+            head = messages[0]
+            self._head_content = head["content"]
+            note = (
+                "（以前の会話はコンテキストの上限のため省略しました。"
+                "以前のユーザーの質問: " + " / ".join(f"「{q}」" for q in self._summary) + "）"
+            )
+            if isinstance(head["content"], str):
+                content = f"{note}\n\n{head['content']}"
+            else:
+                content = [{"type": "text", "text": note}] + list(head["content"])
+            self._head = {**head, "content": content}
+            total = self._replace(messages, 0, self._head, total)
+        return dropped, total
+
+    def _truncate_tool_results(self, messages: list[dict], total: int) -> tuple[int, int]:
+        truncated = 0
+        for i, message in enumerate(messages):
+            over = self._over_bytes(total)
+            if over <= 0:
+                break
+            content = message["content"]
+            if message["role"] != "user" or isinstance(content, str):
+                continue
+            blocks = []
+            for block in content:
+                text = block.get("content") if isinstance(block, dict) else None
+                if over > 0 and isinstance(text, str) and len(text) > _COMPACTED_TOOL_RESULT_CHARS:
+                    # 省略の注記の分も差し引く
+                    keep = max(_COMPACTED_TOOL_RESULT_CHARS, len(text) - over - _NOTICE_BYTES)
+                    over -= len(text) - keep - _NOTICE_BYTES
+                    block = _shorten_tool_result(block, keep, "コンテキストの上限のため省略")
+                blocks.append(block)
+            if blocks != content:
+                total = self._replace(messages, i, {**message, "content": blocks}, total)
+                truncated += 1
+        return truncated, total
+
+
+def _shorten_tool_result(block, keep: int, reason: str):
+    """tool_result ブロックの文字列結果を先頭 keep 文字に切り詰めたコピーを返す。"""
+    if not isinstance(block, dict) or block.get("type") != "tool_result":
+        return block
+    text = block.get("content")
+    if not isinstance(text, str) or len(text) <= keep:
+        return block
+    return {**block, "content": f"{text[:keep]}\n…（{reason}: 全 {len(text)} 文字）"}
+
+
+def _context_budget(system, tools: list[dict]) -> _ContextBudget:
+    return _ContextBudget(int(_config("CLAUDE_CONTEXT_TOKEN_BUDGET", 150000)), system, tools)
+
+
+def _get_tool_executor() -> ThreadPoolExecutor:
+    global _tool_executor
+    with _tool_executor_lock:
+        if _tool_executor is None:
+            _tool_executor = ThreadPoolExecutor(
+                max_workers=max(1, int(_config("MCP_TOOL_POOL_SIZE", 16))),
+                thread_name_prefix="mcp-tool",
+            )
+        return _tool_executor
+
+
+def _call_tool(mcp: MCPClient, block, on_progress=None) -> str:
+    """
+    ツールを 1 件実行し、結果テキストを返す（MCP エラーは結果として Claude に返す）。
+
+    上限を超える結果はサンプルと統計に整形する（全件は readToolResult で取得できる）。
+    """
+    if block.name == tool_result_shaping.READ_RESULT_TOOL_NAME:
+        return tool_result_shaping.read_result(mcp.account_id, dict(block.input))
+    try:
+        if on_progress is None:
+            result = mcp.call_tool(block.name, block.input)
+        else:
+            result = mcp.call_tool(block.name, block.input, on_progress=on_progress)
+    except MCPError as e:
+        return f"エラー: {e}"
+    return tool_result_shaping.shape(result, mcp.account_id)
+
+
+async def _acall_tool(mcp: AsyncMCPClient, block, app, on_progress=None) -> str:
+    """
+    _call_tool() のコルーチン版（共有イベントループで実行する）。
+
+    結果の整形などアプリの設定を参照する処理は、生成元アプリのコンテキストで行う。
+    """
+    result = None
+    if block.name != tool_result_shaping.READ_RESULT_TOOL_NAME:
+        try:
+            result = await mcp.call_tool(block.name, block.input, on_progress=on_progress)
+        except MCPError as e:
+            return f"エラー: {e}"
+    if app is None:
+        return _finish_async_tool(mcp, block, result)
+    with app.app_context():
+        return _finish_async_tool(mcp, block, result)
+
+
+def _finish_async_tool(mcp: AsyncMCPClient, block, result: str | None) -> str:
+    if block.name == tool_result_shaping.READ_RESULT_TOOL_NAME:
+        return tool_result_shaping.read_result(mcp.account_id, dict(block.input))
+    return tool_result_shaping.shape(result, mcp.account_id)
+
+
+def _mcp_client(jwt_token: str, account_id: str | None) -> MCPClient | AsyncMCPClient:
+    """CONNECT_AI_ASYNC 有効時は、ツールを共有イベントループで実行する AsyncMCPClient を返す。"""
+    if _config("CONNECT_AI_ASYNC", False):
+        return AsyncMCPClient(jwt_token, account_id=account_id)
+    return MCPClient(jwt_token, account_id=account_id)
+
+
+def _assistant_tools(jwt_token: str, account_id: str | None) -> list[dict]:
+    """MCP のツール定義に、結果の整形が有効なら readToolResult を加えて返す。"""
+    tools = get_mcp_tools(jwt_token, account_id)
+    if tool_result_shaping.is_enabled():
+        tools = tools + [tool_result_shaping.READ_RESULT_TOOL]
+    return tools
+
+
+def _run_tools(mcp: MCPClient, blocks: list,
+               progress: bool = False) -> Iterator[tuple[str, int, object]]:
+    """
+    1 ターン分の tool_use ブロックを実行し、開始・進捗・完了を順次 yield する。
+
+    2 件以上ある場合は共有スレッドプールで並行実行する（同時実行数は 1 ターンあたり
+    MCP_TOOL_CONCURRENCY 件まで）。AsyncMCPClient の場合はスレッドを使わず、
+    共有イベントループで並行実行する。完了は終わった順に通知されるため、呼び出し側は
+    インデックスで元の順序に並べ直すこと。
+
+    Args:
+        progress: True の場合、MCP サーバーからの進捗通知も yield する
+    Yields:
+        ("tool_start", index, None)
+        ("tool_progress", index, {"progress": ..., "total": ..., "message": ...})
+        ("tool_result", index, result)
+    """
+    limit = min(len(blocks), max(1, int(_config("MCP_TOOL_CONCURRENCY", 4))))
+    use_loop = isinstance(mcp, AsyncMCPClient)
+    if limit <= 1 and not progress and not use_loop:
+        for i, block in enumerate(blocks):
+            yield "tool_start", i, None
+            yield "tool_result", i, _call_tool(mcp, block)
+        return
+
+    # ワーカースレッドでも同じアプリの設定（サーキットブレーカーなど）を使う
+    app = current_app._get_current_object() if has_app_context() else None
+    # ワーカースレッドから届く進捗通知（呼び出し元のスレッドで yield する）
+    updates: queue.SimpleQueue = queue.SimpleQueue()
+
+    def run(i: int, block) -> str:
+        on_progress = (lambda params: updates.put((i, params))) if progress else None
+        if app is None:
+            return _call_tool(mcp, block, on_progress)
+        with app.app_context():
+            return _call_tool(mcp, block, on_progress)
+
+    def submit(i: int, block):
+        if use_loop:
+            on_progress = (lambda params: updates.put((i, params))) if progress else None
+            return mcp.submit(_acall_tool(mcp, block, app, on_progress))
+        return _get_tool_executor().submit(run, i, block)
+
+    pending: dict = {}
+    next_index = 0
+    while next_index < len(blocks) or pending:
+        while next_index < len(blocks) and len(pending) < limit:
+            pending[submit(next_index, blocks[next_index])] = next_index
+            yield "tool_start", next_index, None
+            next_index += 1
+        done, _ = wait(pending, timeout=_PROGRESS_POLL_SECONDS if progress else None,
+                       return_when=FIRST_COMPLETED)
+        while not updates.empty():
+            i, params = updates.get()
+            yield "tool_progress", i, params
+        for future in sorted(done, key=pending.get):
+            yield "tool_result", pending.pop(future), future.result()
+
+
 def chat(
     api_key: str,
     jwt_token: str,
     messages: list[dict],
     catalog_name: str | None = None,
+    usage: dict | None = None,
+    account_id: str | None = None,
+    conversation_id: str | None = None,
 ) -> tuple[str, list[dict]]:
     """
     Agentic ループを実行し、最終的なテキスト回答とツール呼び出しログを返す。
@@ -42,6 +513,10 @@ def chat(
         jwt_token: Connect AI MCP 認証用 JWT（sub クレーム = accountId）
         messages: 会話履歴（{"role": "user"/"assistant", "content": str} のリスト）
         catalog_name: 優先カタログ名（省略時は Claude が自律的に探索する）
+        usage: 指定した場合、会話全体のトークン使用量（キャッシュ分を含む）と、
+               呼び出しごとの入力トークン数（iterations）を書き込む
+        account_id: テナント（ツール定義キャッシュ・サーキットブレーカーの分離に使う）
+        conversation_id: 会話の識別子（トークン使用量のログに記録する）
 
     Returns:
         (answer, tool_calls) tuple
@@ -49,12 +524,12 @@ def chat(
         - tool_calls: [{"name": str, "input": dict, "result": str}, ...]
     """
     client = Anthropic(api_key=api_key)
-    mcp = MCPClient(jwt_token)
-    tools = get_mcp_tools(jwt_token)
-
-    system = _SYSTEM_PROMPT
-    if catalog_name:
-        system += f"\n優先して使用するカタログ名は '{catalog_name}' です。"
+    mcp = _mcp_client(jwt_token, account_id)
+    cache = bool(_config("CLAUDE_PROMPT_CACHE", True))
+    tools = _cacheable_tools(_assistant_tools(jwt_token, account_id), cache)
+    system = _system_prompt(catalog_name, cache)
+    totals = usage if usage is not None else {}
+    totals.update(_new_usage())
 
     # messages はセッション保存用の plain dict（テキストのみ）から開始する
     current_messages: list[dict] = [
@@ -62,16 +537,23 @@ def chat(
     ]
     tool_calls_log: list[dict] = []
 
+    budget = _context_budget(system, tools)
+
     for _ in range(_MAX_ITERATIONS):
+        compacted = budget.fit(current_messages)
+        estimated = budget.estimate(current_messages)
         response = client.messages.create(
             model="claude-opus-4-6",
             max_tokens=4096,
             system=system,
-            messages=current_messages,
+            messages=_with_cache_breakpoint(current_messages) if cache else current_messages,
             tools=tools,
         )
+        input_tokens = _add_usage(totals, getattr(response, "usage", None), estimated, compacted)
+        budget.observe(current_messages, input_tokens)
 
         if response.stop_reason == "end_turn":
+            _log_usage(totals, account_id, conversation_id, "complete")
             text_parts = [b.text for b in response.content if b.type == "text"]
             return "\n".join(text_parts), tool_calls_log
 
@@ -82,16 +564,15 @@ def chat(
                 "content": [_block_to_dict(b) for b in response.content],
             })
 
-            # 各ツールを MCP 経由で実行
-            tool_results = []
-            for block in response.content:
-                if block.type != "tool_use":
-                    continue
-                try:
-                    result = mcp.call_tool(block.name, block.input)
-                except MCPError as e:
-                    result = f"エラー: {e}"
+            # 各ツールを MCP 経由で実行（複数あれば並行実行し、結果は元の順序に揃える）
+            blocks = [b for b in response.content if b.type == "tool_use"]
+            results: list = [None] * len(blocks)
+            for event, i, result in _run_tools(mcp, blocks):
+                if event == "tool_result":
+                    results[i] = result
 
+            tool_results = []
+            for block, result in zip(blocks, results):
                 tool_calls_log.append({
                     "name": block.name,
                     "input": dict(block.input),
@@ -109,6 +590,7 @@ def chat(
         # 予期しない stop_reason（max_tokens など）
         break
 
+    _log_usage(totals, account_id, conversation_id, "incomplete")
     return "", tool_calls_log
 
 
@@ -117,37 +599,49 @@ def stream_chat(
     jwt_token: str,
     messages: list[dict],
     catalog_name: str | None = None,
+    account_id: str | None = None,
+    conversation_id: str | None = None,
 ) -> Generator[tuple[str, dict], None, None]:
     """
     Agentic ループをストリーミングで実行し、SSE イベントを (event_type, data) として yield する。
 
+    引数は chat() と同じ。
+
     Yields:
         ("text_delta",  {"text": "..."})
-        ("tool_start",  {"tool_name": "...", "tool_input": {...}})
-        ("tool_result", {"tool_name": "...", "result": "..."})
-        ("done",        {"message": "complete", "answer": "..."})
+        ("tool_start",  {"tool_use_id": "...", "tool_name": "...", "tool_input": {...}})
+        ("tool_progress", {"tool_use_id": "...", "tool_name": "...", "progress": N, "total": N, "message": "..."})
+        ("tool_result", {"tool_use_id": "...", "tool_name": "...", "result": "..."})
+        ※ 複数のツールは並行実行するため、tool_result は完了した順に届く
+        ("done",        {"message": "complete", "answer": "...", "usage": {...}})
+        ※ usage は会話全体のトークン使用量（cache_read_input_tokens がキャッシュから読んだ分）。
+          iterations に呼び出しごとの入力トークン数・見積もり・圧縮したメッセージ数を含む
         ("error",       {"error": "..."})  ← 例外発生時
+        ※ 終了時（エラーを含む）にトークン使用量を conversation_id とともにログに記録する
     """
     client = Anthropic(api_key=api_key)
-    mcp = MCPClient(jwt_token)
-    tools = get_mcp_tools(jwt_token)
-
-    system = _SYSTEM_PROMPT
-    if catalog_name:
-        system += f"\n優先して使用するカタログ名は '{catalog_name}' です。"
+    mcp = _mcp_client(jwt_token, account_id)
+    cache = bool(_config("CLAUDE_PROMPT_CACHE", True))
+    tools = _cacheable_tools(_assistant_tools(jwt_token, account_id), cache)
+    system = _system_prompt(catalog_name, cache)
+    totals = _new_usage()
 
     current_messages: list[dict] = [
         {"role": m["role"], "content": m["content"]} for m in messages
     ]
     full_answer_parts: list[str] = []
 
+    budget = _context_budget(system, tools)
+
     try:
         for _ in range(_MAX_ITERATIONS):
+            compacted = budget.fit(current_messages)
+            estimated = budget.estimate(current_messages)
             with client.messages.stream(
                 model="claude-opus-4-6",
                 max_tokens=4096,
                 system=system,
-                messages=current_messages,
+                messages=_with_cache_breakpoint(current_messages) if cache else current_messages,
                 tools=tools,
             ) as stream:
                 for text in stream.text_stream:
@@ -155,6 +649,9 @@ def stream_chat(
                     full_answer_parts.append(text)
 
                 final_message = stream.get_final_message()
+            input_tokens = _add_usage(totals, getattr(final_message, "usage", None),
+                                      estimated, compacted)
+            budget.observe(current_messages, input_tokens)
 
             if final_message.stop_reason == "end_turn":
                 break
@@ -165,25 +662,37 @@ def stream_chat(
                     "content": [_block_to_dict(b) for b in final_message.content],
                 })
 
-                tool_results = []
-                for block in final_message.content:
-                    if block.type != "tool_use":
-                        continue
-                    yield "tool_start", {
-                        "tool_name": block.name,
-                        "tool_input": dict(block.input),
-                    }
-                    try:
-                        result = mcp.call_tool(block.name, block.input)
-                    except MCPError as e:
-                        result = f"エラー: {e}"
-
-                    yield "tool_result", {"tool_name": block.name, "result": result}
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": block.id,
-                        "content": result,
-                    })
+                # 複数のツールは並行実行し、開始・完了のたびにイベントを送る
+                blocks = [b for b in final_message.content if b.type == "tool_use"]
+                results: list = [None] * len(blocks)
+                for event, i, result in _run_tools(mcp, blocks, progress=True):
+                    block = blocks[i]
+                    if event == "tool_start":
+                        yield "tool_start", {
+                            "tool_use_id": block.id,
+                            "tool_name": block.name,
+                            "tool_input": dict(block.input),
+                        }
+                    elif event == "tool_progress":
+                        yield "tool_progress", {
+                            "tool_use_id": block.id,
+                            "tool_name": block.name,
+                            "progress": result.get("progress"),
+                            "total": result.get("total"),
+                            "message": result.get("message"),
+                        }
+                    else:
+                        results[i] = result
+                        yield "tool_result", {
+                            "tool_use_id": block.id,
+                            "tool_name": block.name,
+                            "result": result,
+                        }
+
+                tool_results = [
+                    {"type": "tool_result", "tool_use_id": block.id, "content": result}
+                    for block, result in zip(blocks, results)
+                ]
 
                 current_messages.append({"role": "user", "content": tool_results})
                 continue
@@ -191,7 +700,9 @@ def stream_chat(
             break
 
     except Exception as e:
+        _log_usage(totals, account_id, conversation_id, "error")
         yield "error", {"error": str(e)}
         return
 
-    yield "done", {"message": "complete", "answer": "".join(full_answer_parts)}
+    _log_usage(totals, account_id, conversation_id, "complete")
+    yield "done", {"message": "complete", "answer": "".join(full_answer_parts), "usage": totals}
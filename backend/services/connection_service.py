@@ -1,7 +1,9 @@
 from flask import current_app
 from flask_login import current_user
+from backend.cache import get_cache
 from backend.connectai.client import ConnectAIClient
 from backend.connectai.exceptions import ConnectAIError
+from backend.services.metadata_service import invalidate_metadata_cache
 
 
 class ConnectionService:
@@ -12,9 +14,15 @@ class ConnectionService:
 
     def get_datasources(self) -> list[dict]:
         """データソース一覧を Connect AI から取得する。
-        データソース一覧はユーザー固有ではないため、sub="" の親アカウントレベルで取得する。
+        データソース一覧はユーザー固有ではないため、sub="" の親アカウントレベルで取得し、
+        全テナント共通で DATASOURCES_CACHE_TTL 秒キャッシュする。
         """
-        return ConnectAIClient(child_account_id=None).get_datasources()
+        client = ConnectAIClient(child_account_id=None)
+        return get_cache(current_app._get_current_object()).get_or_load(
+            "datasources:",
+            client.get_datasources,
+            ttl=current_app.config["DATASOURCES_CACHE_TTL"],
+        )
 
     def get_connections(self) -> list[dict]:
         """コネクション一覧を Connect AI から取得する。"""
@@ -32,7 +40,20 @@ class ConnectionService:
             raise ValueError("Connect AI アカウントが未設定です。管理者にお問い合わせください。")
 
         redirect_url = f"{current_app.config['APP_BASE_URL']}/callback"
-        return self._client().create_connection(name, data_source, redirect_url)
+        auth_url = self._client().create_connection(name, data_source, redirect_url)
+        # 参照できるカタログが変わるためメタデータキャッシュを破棄する
+        invalidate_metadata_cache(current_user.connect_ai_account_id)
+        return auth_url
+
+    def complete_connection(self) -> None:
+        """
+        OAuth 完了（/callback）時にメタデータキャッシュを破棄する。
+
+        作成時点では認証前で新しいカタログがまだ見えないため、その間に読み込まれた
+        キャッシュが残らないよう、コネクションが確立した後にも破棄し直す。
+        """
+        if current_user.connect_ai_account_id:
+            invalidate_metadata_cache(current_user.connect_ai_account_id)
 
     def delete_connection(self, connection_id: str) -> None:
         """
@@ -42,3 +63,4 @@ class ConnectionService:
             ConnectAIError: Connect AI API 呼び出し失敗
         """
         self._client().delete_connection(connection_id)
+        invalidate_metadata_cache(current_user.connect_ai_account_id)
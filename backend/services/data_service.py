@@ -1,7 +1,24 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app
 from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeSerializer
+from backend.connectai.async_client import AsyncConnectAIClient
 from backend.connectai.client import ConnectAIClient
 from backend.connectai.exceptions import ConnectAIError
+from backend.services import result_format
+from backend.services.metadata_service import (
+    AsyncMetadataService,
+    MetadataService,
+    is_key_column,
+    is_non_nullable_column,
+)
+from backend.services.query_service import invalidate_query_cache
 from backend.schemas.data_schema import (
+    RecordCountSchema,
     RecordListSchema,
     RecordWriteSchema,
     RecordUpdateSchema,
@@ -20,6 +37,40 @@ def build_select_sql(
     return f"SELECT * FROM [{catalog}].[{schema}].[{table}] LIMIT {limit} OFFSET {offset}"
 
 
+def build_keyset_select_sql(
+    catalog: str,
+    schema: str,
+    table: str,
+    key_columns: list[str],
+    limit: int,
+    after: bool,
+) -> str:
+    """
+    ソートキー順に limit + 1 件を取得する SQL を返す（1 件多く取って次ページの有無を判定する）。
+
+    key_columns は一意な並び順になるカラムの組（ソートキー + 主キー）。
+    after=True の場合は (@after0, @after1, ...) より後ろの行だけを対象にする。
+    """
+    limit = max(1, min(limit, 100))
+    where = ""
+    if after:
+        # (k0, k1, ...) > (@after0, @after1, ...) を行値比較を使わずに展開する
+        clauses = []
+        for i, column in enumerate(key_columns):
+            terms = [f"[{c}] = @after{j}" for j, c in enumerate(key_columns[:i])]
+            terms.append(f"[{column}] > @after{i}")
+            clauses.append(" AND ".join(terms))
+        if len(clauses) == 1:
+            where = f" WHERE {clauses[0]}"
+        else:
+            where = " WHERE " + " OR ".join(f"({c})" for c in clauses)
+    order = ", ".join(f"[{c}] ASC" for c in key_columns)
+    return (
+        f"SELECT * FROM [{catalog}].[{schema}].[{table}]{where}"
+        f" ORDER BY {order} LIMIT {limit + 1}"
+    )
+
+
 def build_count_sql(catalog: str, schema: str, table: str) -> str:
     return f"SELECT COUNT(*) AS [cnt] FROM [{catalog}].[{schema}].[{table}]"
 
@@ -94,41 +145,406 @@ def build_delete_sql(
     return sql, params, param_types
 
 
+# ---------------------------------------------------------------------------
+# keyset ページング
+# ---------------------------------------------------------------------------
+
+_CURSOR_SALT = "data-records-cursor"
+
+
+def _cursor_serializer() -> URLSafeSerializer:
+    """継続トークンの署名に使うシリアライザー（改ざんされたトークンは受け付けない）。"""
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt=_CURSOR_SALT)
+
+
+# ---------------------------------------------------------------------------
+# COUNT(*) の並行実行
+# ---------------------------------------------------------------------------
+
+# COUNT(*) をページ取得と並行して実行するワーカー（プロセス共有）
+_count_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="data-count")
+
+# (account_id, catalog, schema, table) -> (Future, 投入時刻)
+# タイムアウトした COUNT の結果を後から /records/count で受け取るために保持する
+_pending_counts: dict[tuple, tuple[Future, float]] = {}
+_pending_lock = threading.Lock()
+
+# 完了済みの COUNT 結果を保持する秒数
+_PENDING_TTL = 300
+
+
+class _CountCache:
+    """
+    テナント × テーブルごとの総件数キャッシュ（TTL 付き）。
+
+    invalidate / adjust のたびに世代番号を進め、それ以前に開始した COUNT の結果は
+    書き込まないようにする（削除直後に古い件数が入り込むのを防ぐ）。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # key -> (total, expires_at)
+        self._entries: dict[tuple, tuple[int, float]] = {}
+        self._generations: dict[tuple, int] = {}
+
+    def get(self, key: tuple) -> int | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[0]
+
+    def generation(self, key: tuple) -> int:
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def put(self, key: tuple, total: int, ttl: float, generation: int) -> None:
+        """generation が現在の世代と一致する場合だけ件数を保存する。"""
+        if ttl <= 0:
+            return
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                return
+            self._entries[key] = (total, time.monotonic() + ttl)
+
+    def adjust(self, key: tuple, delta: int) -> None:
+        """キャッシュ済みの件数を delta だけ増減する（未キャッシュなら何もしない）。"""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (max(entry[0] + delta, 0), entry[1])
+
+    def invalidate(self, key: tuple) -> None:
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+_count_cache = _CountCache()
+
+
+def _run_count(client: ConnectAIClient, sql: str) -> int:
+    """ワーカースレッドで COUNT(*) を実行して件数を返す（取得できなければ -1）。"""
+    with client.app_context():
+        _, count_rows = client.query_data(sql)
+    if count_rows and count_rows[0]:
+        return int(count_rows[0][0])
+    return -1
+
+
+def _pick_key_columns(req: RecordListSchema, columns: list[dict]) -> list[tuple[str, str]]:
+    """
+    カラムメタデータから keyset ページングの並び順に使うカラムと型名の組を選ぶ。
+
+    並び順は一意でなければページ境界で行が重複・欠落するため、主キーを必ず含める。
+    sort_key が主キー以外なら (sort_key, 主キー...) の複合キーにする。
+    NULL は比較で続きを特定できず、並ぶ位置もデータソースごとに異なるため、
+    主キー以外の sort_key は IS_NULLABLE が偽と明示されたカラムに限る。
+
+    Raises:
+        ValueError: sort_key がテーブルに存在しない・NULL を取りうる、または主キーが特定できない場合
+    """
+    def _pair(column: dict) -> tuple[str, str]:
+        return column["COLUMN_NAME"], str(column.get("TYPE_NAME") or "VARCHAR")
+
+    keys = [_pair(c) for c in columns if is_key_column(c)]
+    if not keys:
+        raise ValueError("Keyset paging requires a primary key column.")
+    if not req.sort_key:
+        return keys
+    candidates = [c for c in columns if c.get("COLUMN_NAME") == req.sort_key]
+    if not candidates:
+        raise ValueError(f"Unknown sort key: {req.sort_key}")
+    sort = _pair(candidates[0])
+    if keys == [sort]:
+        return keys
+    if not is_key_column(candidates[0]) and not is_non_nullable_column(candidates[0]):
+        raise ValueError(f"Keyset paging cannot sort by nullable column: {req.sort_key}")
+    return [sort] + [k for k in keys if k[0] != sort[0]]
+
+
+def _keyset_query(req: RecordListSchema,
+                  keys: list[tuple[str, str]]) -> tuple[str, dict | None, dict | None, int]:
+    """
+    継続トークンを検証し、keyset ページの (sql, params, param_types, limit) を返す。
+
+    Raises:
+        ValueError: 継続トークンが不正、または別テーブル・別ソートキーのものである場合
+    """
+    key_columns = [name for name, _ in keys]
+    after = None
+    if req.cursor is not None:
+        try:
+            token = _cursor_serializer().loads(req.cursor)
+        except BadSignature as e:
+            raise ValueError("Invalid cursor.") from e
+        if (token.get("t") != [req.catalog, req.schema_name, req.table]
+                or token.get("k") != key_columns
+                or not isinstance(token.get("v"), list)
+                or len(token["v"]) != len(keys)):
+            raise ValueError("Cursor does not match this table or sort key.")
+        after = token["v"]
+
+    limit = max(1, min(req.limit, 100))
+    sql = build_keyset_select_sql(
+        req.catalog, req.schema_name, req.table, key_columns, limit, after is not None
+    )
+    if after is None:
+        return sql, None, None, limit
+    params = {f"@after{i}": value for i, value in enumerate(after)}
+    param_types = {f"@after{i}": type_name for i, (_, type_name) in enumerate(keys)}
+    return sql, params, param_types, limit
+
+
+def _keyset_page(req: RecordListSchema, keys: list[tuple[str, str]], limit: int,
+                 columns: list[str], rows: list[list]) -> tuple[list[str], list[list], str | None]:
+    """
+    limit + 1 行取得した結果から 1 ページ分と次ページの継続トークンを返す。
+
+    Raises:
+        ConnectAIError: 結果に並び順のカラムが含まれない、またはページ末尾の並び順の値が
+                        NULL の場合（継続トークンを作れない）
+    """
+    key_columns = [name for name, _ in keys]
+    missing = [c for c in key_columns if c not in columns]
+    if missing:
+        raise ConnectAIError(f"Keyset sort columns missing from result: {', '.join(missing)}")
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = [rows[-1][columns.index(c)] for c in key_columns]
+        if any(value is None for value in last):
+            raise ConnectAIError("Keyset sort columns returned NULL at the page boundary.")
+        next_cursor = _cursor_serializer().dumps(
+            {"t": [req.catalog, req.schema_name, req.table], "k": key_columns, "v": last}
+        )
+    return columns, rows, next_cursor
+
+
+def _list_result(req: RecordListSchema, columns: list[str], rows: list[list], total: int,
+                 pending: bool, keyset: bool, next_cursor: str | None) -> dict:
+    """list_records() の結果を組み立てる。"""
+    result = {
+        "columns": columns,
+        "rows": rows,
+        "total": total,
+        "limit": req.limit,
+        "offset": req.offset,
+    }
+    if keyset:
+        result["paging"] = "keyset"
+        result["next_cursor"] = next_cursor
+    if pending:
+        result["total_pending"] = True
+    return result
+
+
 class DataService:
 
     def _client(self) -> ConnectAIClient:
         return ConnectAIClient(child_account_id=current_user.connect_ai_account_id)
 
+    @staticmethod
+    def _count_key(catalog: str, schema: str, table: str) -> tuple:
+        return (current_user.connect_ai_account_id, catalog, schema, table)
+
+    def _submit_count(self, client: ConnectAIClient, catalog: str, schema: str,
+                      table: str) -> Future:
+        """COUNT(*) をワーカーに投入する。同じテーブルの COUNT が実行中ならそれを再利用する。"""
+        key = self._count_key(catalog, schema, table)
+        now = time.monotonic()
+        # 投入前の世代を控え、完了までに書き込みがあれば結果をキャッシュしない
+        ttl = current_app.config["DATA_COUNT_CACHE_TTL"]
+        generation = _count_cache.generation(key)
+
+        def _store(f: Future) -> None:
+            if f.cancelled() or f.exception() is not None:
+                return
+            if f.result() >= 0:
+                _count_cache.put(key, f.result(), ttl, generation)
+
+        with _pending_lock:
+            for k, (f, submitted_at) in list(_pending_counts.items()):
+                if f.done() and now - submitted_at > _PENDING_TTL:
+                    del _pending_counts[k]
+            entry = _pending_counts.get(key)
+            if entry and not entry[0].done():
+                return entry[0]
+            future = _count_executor.submit(
+                _run_count, client, build_count_sql(catalog, schema, table)
+            )
+            _pending_counts[key] = (future, now)
+        future.add_done_callback(_store)
+        return future
+
+    def _invalidate_count(self, catalog: str, schema: str, table: str,
+                          delta: int | None = None) -> None:
+        """
+        書き込み後にクエリ結果キャッシュを破棄し、件数キャッシュを更新する。
+
+        Args:
+            delta: 件数の増減が確定している場合はその値（キャッシュを補正する）。
+                   None の場合はキャッシュを破棄する
+        """
+        key = self._count_key(catalog, schema, table)
+        invalidate_query_cache(current_user.connect_ai_account_id)
+        with _pending_lock:
+            _pending_counts.pop(key, None)
+        if delta is None:
+            _count_cache.invalidate(key)
+        else:
+            _count_cache.adjust(key, delta)
+
     def list_records(self, req: RecordListSchema) -> dict:
+        """
+        レコード一覧を返す。
+
+        総件数は DATA_COUNT_CACHE_TTL 秒キャッシュする。キャッシュがなければ
+        COUNT(*) をページ取得と並行して実行し、ページ取得後 DATA_COUNT_TIMEOUT 秒
+        待っても終わらなければ total=-1 / total_pending=True を返す。
+        その場合の件数は get_record_count() で後から取得できる。
+        """
+        result, _ = self._list_records(req, with_schema=False)
+        return result
+
+    def list_records_columnar(self, req: RecordListSchema, fmt: str) -> tuple[bytes, dict]:
+        """
+        list_records() の結果を Arrow IPC / Parquet で返す。
+
+        各カラムの型はページ取得のレスポンスの schema（dataTypeName）から決める。
+        total / next_cursor などのページ情報は Arrow スキーマのメタデータにも含める。
+
+        Returns:
+            (body, page_info)。page_info は rows / columns を除いた list_records() の結果
+        Raises:
+            ColumnarUnavailableError: pyarrow が未インストールの場合
+        """
+        result, schema = self._list_records(req, with_schema=True)
+        page_info = {k: v for k, v in result.items() if k not in ("columns", "rows")}
+        return result_format.encode(fmt, schema, result["rows"], page_info), page_info
+
+    @staticmethod
+    def _query_page(client: ConnectAIClient, sql: str, params: dict | None = None,
+                    param_types: dict | None = None,
+                    with_schema: bool = False) -> tuple[list[dict] | None, list[str], list[list]]:
+        """
+        1 ページ分の SELECT を実行し、(schema, columns, rows) を返す。
+
+        with_schema=False の場合は schema を取得せず None を返す。
+        """
+        if not with_schema:
+            columns, rows = client.query_data(sql, params, param_types)
+            return None, columns, rows
+        schema, rows = client.query_with_schema(sql, params, param_types)
+        return schema, [c["columnName"] for c in schema], rows
+
+    def _list_records(self, req: RecordListSchema,
+                      with_schema: bool) -> tuple[dict, list[dict] | None]:
+        """list_records() の結果と、with_schema=True ならページ取得のレスポンスの schema を返す。"""
         client = self._client()
 
-        # 総件数取得（失敗時は -1）
-        total = -1
-        try:
-            count_sql = build_count_sql(req.catalog, req.schema_name, req.table)
-            _, count_rows = client.query_data(count_sql)
-            if count_rows and count_rows[0]:
-                total = int(count_rows[0][0])
-        except (ConnectAIError, ValueError, IndexError):
-            pass
+        # 総件数: キャッシュがなければバックグラウンドで COUNT(*) を開始
+        cached_total = _count_cache.get(self._count_key(req.catalog, req.schema_name, req.table))
+        count_future = None
+        if cached_total is None:
+            count_future = self._submit_count(client, req.catalog, req.schema_name, req.table)
 
         # レコード取得
-        sql = build_select_sql(req.catalog, req.schema_name, req.table, req.limit, req.offset)
-        columns, rows = client.query_data(sql)
+        keyset = req.paging == "keyset" or req.cursor is not None
+        next_cursor = None
+        if keyset:
+            schema, columns, rows, next_cursor = self._fetch_keyset_page(client, req, with_schema)
+        else:
+            sql = build_select_sql(req.catalog, req.schema_name, req.table, req.limit, req.offset)
+            schema, columns, rows = self._query_page(client, sql, with_schema=with_schema)
+
+        # 総件数（失敗時は -1）
+        total = -1 if cached_total is None else cached_total
+        pending = False
+        if count_future is not None:
+            try:
+                total = count_future.result(timeout=current_app.config["DATA_COUNT_TIMEOUT"])
+            except FutureTimeoutError:
+                pending = True
+            except (ConnectAIError, ValueError, IndexError, TypeError):
+                pass
+
+        return _list_result(req, columns, rows, total, pending, keyset, next_cursor), schema
+
+    def _resolve_key_columns(self, req: RecordListSchema) -> list[tuple[str, str]]:
+        """
+        keyset ページングの並び順に使う (カラム名, 型名) の組を返す。
+
+        sort_key の指定がなければカラムメタデータの主キーを使う。
 
-        return {
-            "columns": columns,
-            "rows": rows,
-            "total": total,
-            "limit": req.limit,
-            "offset": req.offset,
-        }
+        Raises:
+            ValueError: ソートキーがテーブルに存在しない、または主キーが特定できない場合
+        """
+        columns = MetadataService().get_columns(req.catalog, req.schema_name, req.table)
+        return _pick_key_columns(req, columns)
+
+    def _fetch_keyset_page(self, client: ConnectAIClient, req: RecordListSchema,
+                           with_schema: bool = False,
+                           ) -> tuple[list[dict] | None, list[str], list[list], str | None]:
+        """
+        ソートキーの続きから 1 ページ分を取得する。OFFSET を使わないため深いページでも
+        先頭ページと同じコストで取得できる。
+
+        Returns:
+            (schema, columns, rows, next_cursor)（最終ページなら next_cursor は None。
+            schema は with_schema=True の場合のみ）
+        Raises:
+            ValueError: 継続トークンが不正、または別テーブル・別ソートキーのものである場合
+            ConnectAIError: 結果に並び順のカラムが含まれない場合
+        """
+        keys = self._resolve_key_columns(req)
+        sql, params, param_types, limit = _keyset_query(req, keys)
+        schema, columns, rows = self._query_page(client, sql, params, param_types, with_schema)
+        columns, page, next_cursor = _keyset_page(req, keys, limit, columns, rows)
+        return schema, columns, page, next_cursor
+
+    def get_record_count(self, req: RecordCountSchema) -> dict:
+        """
+        テーブルの総件数を返す。list_records でタイムアウトした COUNT があればその結果を待つ。
+
+        Returns:
+            {"total": N}（DATA_COUNT_WAIT_TIMEOUT 秒以内に終わらなければ total=-1, total_pending=True）
+        Raises:
+            ConnectAIError: COUNT の実行に失敗した場合
+        """
+        key = self._count_key(req.catalog, req.schema_name, req.table)
+        cached_total = _count_cache.get(key)
+        if cached_total is not None:
+            return {"total": cached_total}
+        with _pending_lock:
+            entry = _pending_counts.get(key)
+        if entry:
+            future = entry[0]
+        else:
+            future = self._submit_count(self._client(), req.catalog, req.schema_name, req.table)
+        try:
+            total = future.result(timeout=current_app.config["DATA_COUNT_WAIT_TIMEOUT"])
+        except FutureTimeoutError:
+            return {"total": -1, "total_pending": True}
+        except (ValueError, IndexError, TypeError):
+            total = -1
+        return {"total": total}
 
     def create_record(self, req: RecordWriteSchema) -> dict:
         sql, params, param_types = build_insert_sql(
             req.catalog, req.schema_name, req.table, req.data
         )
         self._client().query_data(sql, params, param_types)
+        self._invalidate_count(req.catalog, req.schema_name, req.table, delta=1)
         return {"message": "Record created successfully."}
 
     def update_record(self, req: RecordUpdateSchema) -> dict:
@@ -138,6 +554,8 @@ class DataService:
             req.catalog, req.schema_name, req.table, req.data, req.where
         )
         self._client().query_data(sql, params, param_types)
+        # UPDATE は件数を変えないため件数キャッシュはそのまま使う
+        invalidate_query_cache(current_user.connect_ai_account_id)
         return {"message": "Record updated successfully."}
 
     def delete_record(self, req: RecordDeleteSchema) -> dict:
@@ -147,4 +565,142 @@ class DataService:
             req.catalog, req.schema_name, req.table, req.where
         )
         self._client().query_data(sql, params, param_types)
+        # WHERE に一致した件数は分からないためキャッシュを破棄する
+        self._invalidate_count(req.catalog, req.schema_name, req.table)
+        return {"message": "Record deleted successfully."}
+
+
+class AsyncDataService:
+    """
+    DataService の非同期版（CONNECT_AI_ASYNC 有効時の async ビューから使う）。
+
+    レコードの取得・書き込みは AsyncConnectAIClient で行う。COUNT(*) は DataService と
+    同じワーカーで実行し（/records/count と結果を共有する）、完了をスレッドを占有せずに待つ。
+    """
+
+    def __init__(self) -> None:
+        self._sync = DataService()
+
+    def _client(self) -> AsyncConnectAIClient:
+        return AsyncConnectAIClient(child_account_id=current_user.connect_ai_account_id)
+
+    @staticmethod
+    async def _wait_count(future: Future, timeout: float) -> int:
+        """COUNT の Future を timeout 秒まで待つ（タイムアウトしても COUNT は続行する）。"""
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+
+    async def list_records(self, req: RecordListSchema) -> dict:
+        """レコード一覧を返す（結果は DataService.list_records() と同じ）。"""
+        result, _ = await self._list_records(req, with_schema=False)
+        return result
+
+    async def list_records_columnar(self, req: RecordListSchema, fmt: str) -> tuple[bytes, dict]:
+        """
+        レコード一覧を Arrow IPC / Parquet で返す（結果は DataService.list_records_columnar() と同じ）。
+
+        Raises:
+            ColumnarUnavailableError: pyarrow が未インストールの場合
+        """
+        result, schema = await self._list_records(req, with_schema=True)
+        page_info = {k: v for k, v in result.items() if k not in ("columns", "rows")}
+        return result_format.encode(fmt, schema, result["rows"], page_info), page_info
+
+    @staticmethod
+    async def _query_page(client: AsyncConnectAIClient, sql: str, params: dict | None = None,
+                          param_types: dict | None = None,
+                          with_schema: bool = False) -> tuple[list[dict] | None, list[str], list[list]]:
+        """DataService._query_page() のコルーチン版。"""
+        if not with_schema:
+            columns, rows = await client.query_data(sql, params, param_types)
+            return None, columns, rows
+        schema, rows = await client.query_with_schema(sql, params, param_types)
+        return schema, [c["columnName"] for c in schema], rows
+
+    async def _list_records(self, req: RecordListSchema,
+                            with_schema: bool) -> tuple[dict, list[dict] | None]:
+        client = self._client()
+
+        cached_total = _count_cache.get(self._sync._count_key(req.catalog, req.schema_name, req.table))
+        count_future = None
+        if cached_total is None:
+            count_future = self._sync._submit_count(
+                self._sync._client(), req.catalog, req.schema_name, req.table
+            )
+
+        keyset = req.paging == "keyset" or req.cursor is not None
+        next_cursor = None
+        if keyset:
+            columns_meta = await AsyncMetadataService().get_columns(
+                req.catalog, req.schema_name, req.table
+            )
+            keys = _pick_key_columns(req, columns_meta)
+            sql, params, param_types, limit = _keyset_query(req, keys)
+            schema, columns, rows = await self._query_page(
+                client, sql, params, param_types, with_schema
+            )
+            columns, rows, next_cursor = _keyset_page(req, keys, limit, columns, rows)
+        else:
+            sql = build_select_sql(req.catalog, req.schema_name, req.table, req.limit, req.offset)
+            schema, columns, rows = await self._query_page(client, sql, with_schema=with_schema)
+
+        total = -1 if cached_total is None else cached_total
+        pending = False
+        if count_future is not None:
+            try:
+                total = await self._wait_count(count_future, current_app.config["DATA_COUNT_TIMEOUT"])
+            except asyncio.TimeoutError:
+                pending = True
+            except (ConnectAIError, ValueError, IndexError, TypeError):
+                pass
+
+        return _list_result(req, columns, rows, total, pending, keyset, next_cursor), schema
+
+    async def get_record_count(self, req: RecordCountSchema) -> dict:
+        """テーブルの総件数を返す（結果は DataService.get_record_count() と同じ）。"""
+        key = self._sync._count_key(req.catalog, req.schema_name, req.table)
+        cached_total = _count_cache.get(key)
+        if cached_total is not None:
+            return {"total": cached_total}
+        with _pending_lock:
+            entry = _pending_counts.get(key)
+        if entry:
+            future = entry[0]
+        else:
+            future = self._sync._submit_count(
+                self._sync._client(), req.catalog, req.schema_name, req.table
+            )
+        try:
+            total = await self._wait_count(future, current_app.config["DATA_COUNT_WAIT_TIMEOUT"])
+        except asyncio.TimeoutError:
+            return {"total": -1, "total_pending": True}
+        except (ValueError, IndexError, TypeError):
+            total = -1
+        return {"total": total}
+
+    async def create_record(self, req: RecordWriteSchema) -> dict:
+        sql, params, param_types = build_insert_sql(
+            req.catalog, req.schema_name, req.table, req.data
+        )
+        await self._client().query_data(sql, params, param_types)
+        self._sync._invalidate_count(req.catalog, req.schema_name, req.table, delta=1)
+        return {"message": "Record created successfully."}
+
+    async def update_record(self, req: RecordUpdateSchema) -> dict:
+        if not req.where:
+            raise ValueError("WHERE condition is required for UPDATE.")
+        sql, params, param_types = build_update_sql(
+            req.catalog, req.schema_name, req.table, req.data, req.where
+        )
+        await self._client().query_data(sql, params, param_types)
+        invalidate_query_cache(current_user.connect_ai_account_id)
+        return {"message": "Record updated successfully."}
+
+    async def delete_record(self, req: RecordDeleteSchema) -> dict:
+        if not req.where:
+            raise ValueError("WHERE condition is required for DELETE.")
+        sql, params, param_types = build_delete_sql(
+            req.catalog, req.schema_name, req.table, req.where
+        )
+        await self._client().query_data(sql, params, param_types)
+        self._sync._invalidate_count(req.catalog, req.schema_name, req.table)
         return {"message": "Record deleted successfully."}
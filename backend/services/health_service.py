@@ -0,0 +1,41 @@
+from backend.connectai.async_http_pool import async_http_pool_stats
+from backend.connectai.circuit_breaker import STATE_OPEN, circuit_breaker_stats
+from backend.connectai.http_pool import get_http_pool
+from backend.services.mcp_client import tool_result_cache_stats
+
+
+class HealthService:
+
+    def get_status(self, app) -> dict:
+        """
+        上流（Connect AI / MCP）のサーキットブレーカー状態と、プロセス内の
+        コネクションプール・ログライター・キャッシュの統計を返す。
+
+        いずれかのブレーカーが open なら status を "degraded" にする。
+        テナント ID などの利用者情報は含めない。
+
+        Args:
+            app: Flask アプリ（current_app._get_current_object() の値）
+        """
+        breakers = circuit_breaker_stats()
+        degraded = any(
+            b.get("state") == STATE_OPEN or b.get("tenants", {}).get(STATE_OPEN)
+            for b in breakers.values()
+        )
+        status = {
+            "status": "degraded" if degraded else "ok",
+            "circuit_breakers": breakers,
+            "http_pool": get_http_pool(app.config).stats(),
+            "mcp_tool_result_cache": tool_result_cache_stats(),
+        }
+        # 非同期プール・ログライター・キャッシュは生成済みの場合のみ報告する（ヘルスチェックで生成しない）
+        async_pool = async_http_pool_stats()
+        if async_pool is not None:
+            status["async_http_pool"] = async_pool
+        writer = app.extensions.get("api_log_writer")
+        if writer is not None:
+            status["api_log_writer"] = writer.stats()
+        cache = app.extensions.get("cache")
+        if cache is not None:
+            status["cache"] = cache.stats()
+        return status
@@ -1,108 +1,451 @@
+import concurrent.futures
+import hashlib
 import json
+import re
+import threading
+import time
 import uuid
+from typing import Callable, Iterable, Iterator
+
+import jwt
 import requests
 
+from backend import json_provider
+from backend.cache import CacheLoader, MemoryCache
+from backend.connectai.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from backend.connectai.async_http_pool import get_async_http_pool, httpx
+from backend.connectai.http_pool import get_http_pool
+from backend.connectai.singleflight import AsyncSingleFlight, SingleFlight
+
 MCP_BASE_URL = "https://mcp.cloud.cdata.com/mcp"
+# initialize で要求するプロトコルバージョン（Streamable HTTP 対応版）
+MCP_PROTOCOL_VERSION = "2025-03-26"
+SESSION_ID_HEADER = "Mcp-Session-Id"
+PROTOCOL_VERSION_HEADER = "MCP-Protocol-Version"
 
-_cached_tools: list[dict] | None = None
+_TOOLS_CACHE_PREFIX = "mcp-tools:"
 
 
 class MCPError(Exception):
     """MCP サーバーとの通信エラー"""
 
 
-def _parse_response(resp: requests.Response) -> dict:
+class _SessionExpired(Exception):
+    """サーバーがセッション ID を認識しなかった（HTTP 404）ことを表す。"""
+
+
+class _SSEDecoder:
+    """
+    受信したチャンクを SSE のイベント (event, data) に分割する（同期 / 非同期で共通）。
+
+    複数行の data: は改行で連結する。行末は LF / CRLF に対応する。
+
+    Args:
+        max_bytes: 受信量の上限（0 で無制限）
+    """
+
+    def __init__(self, max_bytes: int = 0) -> None:
+        self._max_bytes = max_bytes
+        # 改行が届いていない行の途中（長い 1 行を受信中でも追記だけで済むよう bytearray にする）
+        self._buffer = bytearray()
+        # _buffer のうち改行を探し終えた位置（受信済みの部分を毎回探し直さない）
+        self._scanned = 0
+        self._received = 0
+        self._event = "message"
+        self._data_lines: list[str] = []
+
+    def feed(self, chunk: bytes) -> list[tuple[str, str]]:
+        """
+        チャンクを追加し、完結したイベントを返す。
+
+        改行は新しく受信した部分だけから探すため、長いイベントでも受信量に比例した時間で済む。
+
+        Raises:
+            MCPError: 受信量が max_bytes を超えた場合
+        """
+        self._received += len(chunk)
+        if self._max_bytes and self._received > self._max_bytes:
+            raise MCPError(f"Response too large: exceeds {self._max_bytes} bytes")
+        self._buffer += chunk
+        events: list[tuple[str, str]] = []
+        start = 0
+        while True:
+            end = self._buffer.find(b"\n", max(start, self._scanned))
+            if end < 0:
+                break
+            self._line(bytes(self._buffer[start:end]), events)
+            start = end + 1
+        if start:
+            del self._buffer[:start]
+        self._scanned = len(self._buffer)
+        return events
+
+    def _line(self, raw: bytes, events: list[tuple[str, str]]) -> None:
+        line = raw.rstrip(b"\r").decode("utf-8")
+        if not line:
+            if self._data_lines:
+                events.append((self._event, "\n".join(self._data_lines)))
+            self._event, self._data_lines = "message", []
+            return
+        if line.startswith(":"):
+            return  # コメント（keep-alive）
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            self._data_lines.append(value)
+        elif field == "event":
+            self._event = value
+
+    def close(self) -> list[tuple[str, str]]:
+        """ストリーム終端で、空行で閉じられていない最後のイベントを返す。"""
+        line = bytes(self._buffer).rstrip(b"\r").decode("utf-8")
+        if line.startswith("data:"):
+            self._data_lines.append(line[len("data:"):].lstrip(" "))
+        events = [(self._event, "\n".join(self._data_lines))] if self._data_lines else []
+        self._buffer, self._scanned, self._data_lines = bytearray(), 0, []
+        return events
+
+
+def _iter_sse_events(resp: requests.Response, max_bytes: int) -> Iterator[tuple[str, str]]:
+    """
+    SSE ストリームを受信しながら 1 イベントずつ (event, data) を返す。
+
+    Raises:
+        MCPError: 受信量が max_bytes を超えた場合（0 で無制限）
+    """
+    decoder = _SSEDecoder(max_bytes)
+    for chunk in resp.iter_content(chunk_size=8192):
+        yield from decoder.feed(chunk)
+    yield from decoder.close()
+
+
+def _sse_message(data: str, request_id: str | None,
+                 on_progress: Callable[[dict], None] | None) -> dict | None:
+    """
+    SSE の data を解析し、request_id に対応する JSON-RPC レスポンスなら返す。
+
+    サーバーからの通知・リクエストは None（進捗通知は on_progress に渡す）。
+    """
+    if not data.strip():
+        return None
+    message = json_provider.loads(data)
+    if "method" in message:
+        # サーバーからの通知・リクエスト（進捗以外は読み飛ばす）
+        if message["method"] == "notifications/progress" and on_progress is not None:
+            on_progress(message.get("params", {}))
+        return None
+    if request_id is None or message.get("id") in (request_id, None):
+        return message
+    return None
+
+
+def _rpc_result(body: dict) -> dict:
+    """
+    JSON-RPC レスポンスの result を返す。
+
+    Raises:
+        MCPError: JSON-RPC エラーの場合
+    """
+    if "error" in body:
+        err = body["error"]
+        raise MCPError(
+            f"JSON-RPC error {err.get('code')}: {err.get('message')}"
+        )
+    return body.get("result", {})
+
+
+def _parse_response(resp: requests.Response, request_id: str | None = None,
+                    on_progress: Callable[[dict], None] | None = None,
+                    max_bytes: int = 0) -> dict:
     """
     MCP サーバーのレスポンスを解析して JSON-RPC ボディを返す。
 
     MCP Streamable HTTP は Content-Type に応じて2種類のフォーマットで返す:
     - application/json: 通常の JSON レスポンス
     - text/event-stream: SSE フォーマット (event: message\\ndata: {...}\\n\\n)
+
+    SSE はイベントを受信した順に解析し、request_id と一致する JSON-RPC レスポンスが
+    届いた時点で読み込みを終える。それまでの進捗通知（notifications/progress）は
+    on_progress に渡す。
+
+    Raises:
+        MCPError: レスポンスが max_bytes を超えた・SSE にレスポンスが含まれない場合
     """
     content_type = resp.headers.get("Content-Type", "")
 
     if "text/event-stream" in content_type:
-        # SSE フォーマット: "data: <json>" 行を探して JSON をパース
-        for line in resp.text.splitlines():
-            if line.startswith("data:"):
-                data_str = line[len("data:"):].strip()
-                if data_str:
-                    return json.loads(data_str)
-        raise MCPError(f"SSE response contains no data line: {resp.text[:500]!r}")
+        try:
+            for _, data in _iter_sse_events(resp, max_bytes):
+                message = _sse_message(data, request_id, on_progress)
+                if message is not None:
+                    return message
+        finally:
+            resp.close()
+        raise MCPError("SSE response contains no JSON-RPC response")
 
-    return resp.json()
+    length = resp.headers.get("Content-Length")
+    if max_bytes and length and str(length).isdigit() and int(length) > max_bytes:
+        resp.close()
+        raise MCPError(f"Response too large: exceeds {max_bytes} bytes")
+    if max_bytes and len(resp.content) > max_bytes:
+        raise MCPError(f"Response too large: exceeds {max_bytes} bytes")
+    return json_provider.response_json(resp)
 
 
-class MCPClient:
-    """
-    CData Connect AI MCP クライアント。
-    Streamable HTTP (JSON-RPC 2.0) で MCP サーバーと通信する。
-    jwt_token の sub クレームがテナント分離に使われる。
-    """
+class _BaseMCPClient:
+    """MCPClient / AsyncMCPClient に共通の設定・ヘッダー・ペイロードの組み立て。"""
 
-    def __init__(self, jwt_token: str) -> None:
+    def __init__(self, jwt_token: str, account_id: str | None = None) -> None:
+        from flask import current_app, has_app_context
         self.jwt_token = jwt_token
+        self.account_id = account_id
+        self._config = current_app.config if has_app_context() else {}
 
-    def _headers(self) -> dict:
-        return {
+    def _headers(self, session: "_MCPSession | None" = None) -> dict:
+        headers = {
             "Authorization": f"Bearer {self.jwt_token}",
             "Content-Type": "application/json",
             "Accept": "application/json, text/event-stream",
         }
+        if session is not None:
+            if session.session_id:
+                headers[SESSION_ID_HEADER] = session.session_id
+            if session.protocol_version:
+                headers[PROTOCOL_VERSION_HEADER] = session.protocol_version
+        return headers
 
-    def _call_jsonrpc(self, method: str, params: dict) -> dict:
-        """
-        JSON-RPC 2.0 リクエストを MCP サーバーに送信し、result を返す。
+    def _max_response_bytes(self) -> int:
+        return int(self._config.get("MCP_MAX_RESPONSE_BYTES", 32 * 1024 * 1024))
 
-        Raises:
-            MCPError: HTTP エラー・JSON-RPC エラー・接続エラー時
-        """
-        payload = {
+    def _session_enabled(self) -> bool:
+        return bool(self._config.get("MCP_SESSION_ENABLED", _SESSION_ENABLED_DEFAULT))
+
+    def _session_ttl(self) -> float:
+        return float(self._config.get("MCP_SESSION_TTL", 600))
+
+    @staticmethod
+    def _initialize_payload() -> dict:
+        return {
+            "jsonrpc": "2.0",
+            "method": "initialize",
+            "params": {
+                "protocolVersion": MCP_PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": "connect-ai-oem-sample", "version": "1.0"},
+            },
+            "id": str(uuid.uuid4()),
+        }
+
+    @staticmethod
+    def _request_payload(method: str, params: dict) -> dict:
+        return {
             "jsonrpc": "2.0",
             "method": method,
             "params": params,
             "id": str(uuid.uuid4()),
         }
+
+    @staticmethod
+    def _tool_call_params(tool_name: str, tool_input: dict,
+                          on_progress: Callable[[dict], None] | None):
+        """tools/call の params と、進捗通知をこの呼び出し分だけに絞るハンドラーを返す。"""
+        params: dict = {"name": tool_name, "arguments": tool_input}
+        handler = None
+        if on_progress is not None:
+            token = str(uuid.uuid4())
+            params["_meta"] = {"progressToken": token}
+
+            def handler(progress: dict) -> None:
+                if progress.get("progressToken") == token:
+                    on_progress(progress)
+
+        return params, handler
+
+    @staticmethod
+    def _tool_text(result: dict) -> str:
+        """tools/call の result からテキストブロックを連結して返す。"""
+        content = result.get("content", [])
+        texts = [
+            block["text"]
+            for block in content
+            if isinstance(block, dict) and block.get("type") == "text"
+        ]
+        return "\n".join(texts)
+
+    @staticmethod
+    def _to_anthropic_format(mcp_tool: dict) -> dict:
+        """MCP ツール定義を Anthropic SDK の tools 形式に変換する。"""
+        return {
+            "name": mcp_tool["name"],
+            "description": mcp_tool.get("description", ""),
+            "input_schema": mcp_tool["inputSchema"],
+        }
+
+    def _tool_result_key(self, tool_name: str, tool_input: dict) -> str:
+        return _tool_result_key(_tenant_key(self.jwt_token, self.account_id),
+                                tool_name, tool_input)
+
+
+class MCPClient(_BaseMCPClient):
+    """
+    CData Connect AI MCP クライアント。
+    Streamable HTTP (JSON-RPC 2.0) で MCP サーバーと通信する。
+    jwt_token の sub クレームがテナント分離に使われる。
+    MCP サーバーの障害が続く間はサーキットブレーカーで即座に失敗させる。
+
+    Args:
+        jwt_token: MCP サーバー認証用 JWT
+        account_id: テナント（CIRCUIT_BREAKER_PER_TENANT 有効時のブレーカー分離に使う）
+    """
+
+    def __init__(self, jwt_token: str, account_id: str | None = None) -> None:
+        super().__init__(jwt_token, account_id)
+        self._http = get_http_pool(self._config)
+
+    def _breaker(self):
+        from flask import current_app, has_app_context
+        config = current_app.config if has_app_context() else None
+        return get_circuit_breaker("mcp", self.account_id, config)
+
+    def _post(self, payload: dict, headers: dict) -> requests.Response:
+        """
+        プール済みの keep-alive セッションで MCP サーバーに POST する。
+
+        レスポンスは stream=True で受け取り、ボディは _parse_response で読み進める。
+
+        Raises:
+            MCPError: 接続エラー・サーキットが open の場合
+        """
+        breaker = self._breaker()
+        if breaker is not None:
+            try:
+                breaker.before_call()
+            except CircuitOpenError as e:
+                raise MCPError(str(e)) from e
         try:
-            resp = requests.post(
+            resp = self._http.session().post(
                 MCP_BASE_URL,
                 json=payload,
-                headers=self._headers(),
+                headers=headers,
                 timeout=60,
+                stream=True,
             )
+        except requests.RequestException as e:
+            if breaker is not None:
+                breaker.record_failure()
+            raise MCPError(f"Request failed: {e}") from e
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        if breaker is not None:
+            breaker.record_status(resp.status_code)
+        return resp
+
+    @staticmethod
+    def _raise_for_status(resp: requests.Response) -> None:
+        try:
             resp.raise_for_status()
         except requests.HTTPError as e:
             raise MCPError(
                 f"HTTP {e.response.status_code}: {e.response.text[:500]}"
             ) from e
-        except requests.RequestException as e:
-            raise MCPError(f"Request failed: {e}") from e
 
+    def _parse_result(self, resp: requests.Response, request_id: str | None = None,
+                      on_progress: Callable[[dict], None] | None = None) -> dict:
         try:
-            body = _parse_response(resp)
+            body = _parse_response(resp, request_id, on_progress, self._max_response_bytes())
         except MCPError:
             raise
         except Exception as e:
-            raise MCPError(
-                f"Invalid response: {resp.text[:500]!r}"
-            ) from e
+            raise MCPError(f"Invalid response: {e}") from e
+        return _rpc_result(body)
 
-        if "error" in body:
-            err = body["error"]
-            raise MCPError(
-                f"JSON-RPC error {err.get('code')}: {err.get('message')}"
-            )
+    # ------------------------------------------------------------------
+    # MCP セッション（Streamable HTTP）
+    # ------------------------------------------------------------------
 
-        return body.get("result", {})
+    def _session(self) -> "_MCPSession | None":
+        """
+        テナントの MCP セッションを返す。無ければ initialize して作る。
 
-    @staticmethod
-    def _to_anthropic_format(mcp_tool: dict) -> dict:
-        """MCP ツール定義を Anthropic SDK の tools 形式に変換する。"""
-        return {
-            "name": mcp_tool["name"],
-            "description": mcp_tool.get("description", ""),
-            "input_schema": mcp_tool["inputSchema"],
-        }
+        MCP_SESSION_ENABLED が無効なら None（セッションなしで呼び出す）。
+        同じテナントの同時の初期化は 1 回にまとめる。
+        """
+        if not self._session_enabled():
+            return None
+        tenant = _tenant_key(self.jwt_token, self.account_id)
+        session = _sessions.get(tenant)
+        if session is not None:
+            return session
+        return _session_flight.do(tenant, lambda: _sessions.get(tenant) or self._initialize(tenant))
+
+    def _initialize(self, tenant: str) -> "_MCPSession":
+        """
+        initialize → notifications/initialized を送り、セッションを登録する。
+
+        サーバーが Mcp-Session-Id を返さない（ステートレス）場合や initialize を
+        受け付けない（4xx・JSON-RPC エラー）場合は、セッション ID なしで登録して
+        以降の初期化を省く。
+
+        Raises:
+            MCPError: 接続エラー・5xx の場合（セッションは登録しない）
+        """
+        ttl = self._session_ttl()
+        payload = self._initialize_payload()
+        resp = self._post(payload, self._headers())
+        if resp.status_code >= 500:
+            self._raise_for_status(resp)
+        try:
+            self._raise_for_status(resp)
+            result = self._parse_result(resp, payload["id"])
+        except MCPError:
+            return _sessions.put(tenant, _MCPSession(None, None), ttl)
+
+        session = _MCPSession(
+            resp.headers.get(SESSION_ID_HEADER),
+            result.get("protocolVersion") or MCP_PROTOCOL_VERSION,
+        )
+        try:
+            # 202 の空ボディを読み切って接続をプールに戻す
+            self._post(
+                {"jsonrpc": "2.0", "method": "notifications/initialized"},
+                self._headers(session),
+            ).content
+        except MCPError:
+            pass
+        return _sessions.put(tenant, session, ttl)
+
+    def _call_jsonrpc(self, method: str, params: dict,
+                      on_progress: Callable[[dict], None] | None = None) -> dict:
+        """
+        JSON-RPC 2.0 リクエストを MCP サーバーに送信し、result を返す。
+
+        セッションが期限切れ（HTTP 404）の場合は 1 回だけ初期化し直して再送する。
+
+        Args:
+            on_progress: SSE で届いた進捗通知の params を受け取るコールバック
+
+        Raises:
+            MCPError: HTTP エラー・JSON-RPC エラー・接続エラー時
+        """
+        session = self._session()
+        try:
+            return self._send(method, params, session, on_progress)
+        except _SessionExpired:
+            _sessions.drop(_tenant_key(self.jwt_token, self.account_id), session)
+            return self._send(method, params, self._session(), on_progress)
+
+    def _send(self, method: str, params: dict, session: "_MCPSession | None",
+              on_progress: Callable[[dict], None] | None = None) -> dict:
+        payload = self._request_payload(method, params)
+        resp = self._post(payload, self._headers(session))
+        if resp.status_code == 404 and session is not None and session.session_id:
+            resp.close()
+            raise _SessionExpired()
+        self._raise_for_status(resp)
+        return self._parse_result(resp, payload["id"], on_progress)
 
     def list_tools(self) -> list[dict]:
         """
@@ -115,52 +458,632 @@ class MCPClient:
         mcp_tools = result.get("tools", [])
         return [self._to_anthropic_format(t) for t in mcp_tools]
 
-    def call_tool(self, tool_name: str, tool_input: dict) -> str:
+    def call_tool(self, tool_name: str, tool_input: dict,
+                  on_progress: Callable[[dict], None] | None = None) -> str:
         """
         指定したツールを呼び出し、テキスト結果を返す。
 
+        読み取り専用のメタデータ取得ツール（getCatalogs など）と、SELECT 1 文だけの
+        queryData の結果はテナント単位でキャッシュする（MCP_TOOL_RESULT_CACHE_TTL /
+        MCP_QUERY_RESULT_CACHE_TTL が 0 なら毎回呼び出す）。queryData で SELECT 以外を
+        実行した後は、テナントのクエリ結果キャッシュを破棄する。
+
+        Args:
+            on_progress: 指定した場合は progressToken を付けて呼び出し、サーバーからの
+                         進捗通知の params（progress / total / message）を渡す
+                         （キャッシュヒット時は呼ばれない）
         Returns:
             ツール実行結果のテキスト
         Raises:
-            MCPError: 呼び出し失敗時
+            MCPError: 呼び出し失敗時（失敗した結果はキャッシュしない）
         """
-        result = self._call_jsonrpc(
-            "tools/call",
-            {"name": tool_name, "arguments": tool_input},
+        if _is_write_query(tool_name, tool_input):
+            try:
+                return self._call_tool(tool_name, tool_input, on_progress)
+            finally:
+                _invalidate_after_write(_tenant_key(self.jwt_token, self.account_id))
+        ttl = _tool_result_ttl(self._config, tool_name)
+        if ttl <= 0:
+            return self._call_tool(tool_name, tool_input, on_progress)
+
+        key = self._tool_result_key(tool_name, tool_input)
+        entry = _tool_results.get(key)
+        if entry is not None:
+            _tool_result_stats.record(tool_name, hit=True)
+            return entry.value
+
+        def _load() -> str:
+            # 同時に来た同じ呼び出しは 1 回にまとめ、後続はその結果を使う
+            entry = _tool_results.get(key)
+            if entry is not None:
+                return entry.value
+            tenant = _tenant_key(self.jwt_token, self.account_id)
+            epoch = _tool_result_epochs.current(tenant)
+            text = self._call_tool(tool_name, tool_input, on_progress)
+            # 呼び出し中にこのテナントのキャッシュが破棄された場合は古いかもしれない結果を保存しない
+            _tool_result_epochs.set_if_current(tenant, epoch, key, text, ttl)
+            return text
+
+        _tool_result_stats.record(tool_name, hit=False)
+        return _tool_result_flight.do(key, _load)
+
+    def _call_tool(self, tool_name: str, tool_input: dict,
+                   on_progress: Callable[[dict], None] | None = None) -> str:
+        """tools/call を送信してテキスト結果を返す（キャッシュを通さない）。"""
+        params, handler = self._tool_call_params(tool_name, tool_input, on_progress)
+        return self._tool_text(self._call_jsonrpc("tools/call", params, handler))
+
+
+async def _aparse_response(resp, request_id: str | None = None,
+                           on_progress: Callable[[dict], None] | None = None,
+                           max_bytes: int = 0) -> dict:
+    """
+    _parse_response() の非同期版（httpx のストリーミングレスポンスを読み進める）。
+
+    SSE は request_id と一致する JSON-RPC レスポンスが届いた時点で読み込みを終える。
+
+    Raises:
+        MCPError: レスポンスが max_bytes を超えた・SSE にレスポンスが含まれない場合
+    """
+    content_type = resp.headers.get("Content-Type", "")
+
+    if "text/event-stream" in content_type:
+        decoder = _SSEDecoder(max_bytes)
+        async for chunk in resp.aiter_bytes():
+            for _, data in decoder.feed(chunk):
+                message = _sse_message(data, request_id, on_progress)
+                if message is not None:
+                    return message
+        for _, data in decoder.close():
+            message = _sse_message(data, request_id, on_progress)
+            if message is not None:
+                return message
+        raise MCPError("SSE response contains no JSON-RPC response")
+
+    length = resp.headers.get("Content-Length")
+    if max_bytes and length and str(length).isdigit() and int(length) > max_bytes:
+        raise MCPError(f"Response too large: exceeds {max_bytes} bytes")
+    body = b""
+    async for chunk in resp.aiter_bytes():
+        body += chunk
+        if max_bytes and len(body) > max_bytes:
+            raise MCPError(f"Response too large: exceeds {max_bytes} bytes")
+    return json_provider.loads(body)
+
+
+def _parse_buffered(resp, request_id: str | None = None) -> dict:
+    """読み込み済みのレスポンス（JSON / SSE）から JSON-RPC ボディを取り出す。"""
+    if "text/event-stream" in resp.headers.get("Content-Type", ""):
+        decoder = _SSEDecoder()
+        for _, data in decoder.feed(resp.content) + decoder.close():
+            message = _sse_message(data, request_id, None)
+            if message is not None:
+                return message
+        raise MCPError("SSE response contains no JSON-RPC response")
+    return json_provider.loads(resp.content)
+
+
+class AsyncMCPClient(_BaseMCPClient):
+    """
+    MCPClient の非同期版（list_tools / call_tool をコルーチンとして提供する）。
+
+    HTTP 接続はプロセス共有の AsyncHTTPConnectionPool を使い、SSE のボディもプールの
+    イベントループで読み進める。セッション・ツール結果キャッシュ・サーキットブレーカーは
+    MCPClient と共有する。設定は生成時のアプリのものを使うため、生成後はアプリ
+    コンテキスト外（プールのイベントループなど）からも呼び出せる。
+
+    Note:
+        on_progress はプールのイベントループのスレッドから呼ばれる。
+
+    Raises:
+        AsyncUnavailableError: httpx が未インストールの場合
+    """
+
+    def __init__(self, jwt_token: str, account_id: str | None = None) -> None:
+        super().__init__(jwt_token, account_id)
+        self._http = get_async_http_pool(self._config)
+
+    def _breaker(self):
+        return get_circuit_breaker("mcp", self.account_id, self._config or None)
+
+    async def _exchange(self, payload: dict, headers: dict, request_id: str | None = None,
+                        on_progress: Callable[[dict], None] | None = None,
+                        parse: bool = True) -> tuple["httpx.Response", dict | None]:
+        """
+        MCP サーバーに POST し、(レスポンス, JSON-RPC ボディ) を返す。
+
+        エラー応答（4xx / 5xx）と parse=False の場合はボディを読み込んだうえで None を返す。
+
+        Raises:
+            MCPError: 接続エラー・サーキットが open・レスポンスを解析できない場合
+        """
+        breaker = self._breaker()
+        if breaker is not None:
+            try:
+                breaker.before_call()
+            except CircuitOpenError as e:
+                raise MCPError(str(e)) from e
+        max_bytes = self._max_response_bytes()
+        recorded = False
+
+        async def _fn(client):
+            nonlocal recorded
+            async with client.stream("POST", MCP_BASE_URL, json=payload, headers=headers,
+                                     timeout=60) as resp:
+                if breaker is not None:
+                    breaker.record_status(resp.status_code)
+                recorded = True
+                if resp.status_code >= 400 or not parse:
+                    await resp.aread()
+                    return resp, None
+                try:
+                    return resp, await _aparse_response(resp, request_id, on_progress, max_bytes)
+                except MCPError:
+                    raise
+                except Exception as e:
+                    raise MCPError(f"Invalid response: {e}") from e
+
+        try:
+            return await self._http.run(_fn)
+        except httpx.HTTPError as e:
+            if breaker is not None and not recorded:
+                breaker.record_failure()
+            raise MCPError(f"Request failed: {e}") from e
+
+    @staticmethod
+    def _raise_for_status(resp) -> None:
+        if resp.status_code >= 400:
+            raise MCPError(f"HTTP {resp.status_code}: {resp.text[:500]}")
+
+    async def _session(self) -> "_MCPSession | None":
+        """MCPClient._session() の非同期版（同じテナントの同時の初期化は 1 回にまとめる）。"""
+        if not self._session_enabled():
+            return None
+        tenant = _tenant_key(self.jwt_token, self.account_id)
+        session = _sessions.get(tenant)
+        if session is not None:
+            return session
+
+        async def _init() -> _MCPSession:
+            return _sessions.get(tenant) or await self._initialize(tenant)
+
+        return await _async_session_flight.do(tenant, _init)
+
+    async def _initialize(self, tenant: str) -> "_MCPSession":
+        """
+        initialize → notifications/initialized を送り、セッションを登録する。
+
+        扱いは MCPClient._initialize() と同じ（4xx・JSON-RPC エラーならセッション ID なし）。
+
+        Raises:
+            MCPError: 接続エラー・5xx の場合（セッションは登録しない）
+        """
+        ttl = self._session_ttl()
+        payload = self._initialize_payload()
+        resp, _ = await self._exchange(payload, self._headers(), parse=False)
+        if resp.status_code >= 500:
+            self._raise_for_status(resp)
+        try:
+            self._raise_for_status(resp)
+            result = _rpc_result(_parse_buffered(resp, payload["id"]))
+        except (MCPError, ValueError):
+            return _sessions.put(tenant, _MCPSession(None, None), ttl)
+
+        session = _MCPSession(
+            resp.headers.get(SESSION_ID_HEADER),
+            result.get("protocolVersion") or MCP_PROTOCOL_VERSION,
         )
-        content = result.get("content", [])
-        texts = [
-            block["text"]
-            for block in content
-            if isinstance(block, dict) and block.get("type") == "text"
-        ]
-        return "\n".join(texts)
+        try:
+            await self._exchange(
+                {"jsonrpc": "2.0", "method": "notifications/initialized"},
+                self._headers(session),
+                parse=False,
+            )
+        except MCPError:
+            pass
+        return _sessions.put(tenant, session, ttl)
+
+    async def _call_jsonrpc(self, method: str, params: dict,
+                            on_progress: Callable[[dict], None] | None = None) -> dict:
+        """MCPClient._call_jsonrpc() の非同期版（期限切れのセッションは 1 回だけ作り直す）。"""
+        session = await self._session()
+        try:
+            return await self._send(method, params, session, on_progress)
+        except _SessionExpired:
+            _sessions.drop(_tenant_key(self.jwt_token, self.account_id), session)
+            return await self._send(method, params, await self._session(), on_progress)
+
+    async def _send(self, method: str, params: dict, session: "_MCPSession | None",
+                    on_progress: Callable[[dict], None] | None = None) -> dict:
+        payload = self._request_payload(method, params)
+        resp, body = await self._exchange(payload, self._headers(session), payload["id"],
+                                          on_progress)
+        if resp.status_code == 404 and session is not None and session.session_id:
+            raise _SessionExpired()
+        self._raise_for_status(resp)
+        return _rpc_result(body)
+
+    def submit(self, coro) -> "concurrent.futures.Future":
+        """コルーチン（call_tool など）を共有イベントループで開始し、結果の Future を返す。"""
+        return self._http.submit(coro)
+
+    async def list_tools(self) -> list[dict]:
+        """MCP サーバーからツール定義一覧を取得し、Anthropic 形式に変換して返す。"""
+        result = await self._call_jsonrpc("tools/list", {})
+        return [self._to_anthropic_format(t) for t in result.get("tools", [])]
+
+    async def call_tool(self, tool_name: str, tool_input: dict,
+                        on_progress: Callable[[dict], None] | None = None) -> str:
+        """
+        指定したツールを呼び出し、テキスト結果を返す。
+
+        結果キャッシュの扱いは MCPClient.call_tool() と同じ（キャッシュも共有する）。
+
+        Raises:
+            MCPError: 呼び出し失敗時（失敗した結果はキャッシュしない）
+        """
+        if _is_write_query(tool_name, tool_input):
+            try:
+                return await self._call_tool(tool_name, tool_input, on_progress)
+            finally:
+                _invalidate_after_write(_tenant_key(self.jwt_token, self.account_id))
+        ttl = _tool_result_ttl(self._config, tool_name)
+        if ttl <= 0:
+            return await self._call_tool(tool_name, tool_input, on_progress)
+
+        key = self._tool_result_key(tool_name, tool_input)
+        entry = _tool_results.get(key)
+        if entry is not None:
+            _tool_result_stats.record(tool_name, hit=True)
+            return entry.value
+
+        async def _load() -> str:
+            entry = _tool_results.get(key)
+            if entry is not None:
+                return entry.value
+            tenant = _tenant_key(self.jwt_token, self.account_id)
+            epoch = _tool_result_epochs.current(tenant)
+            text = await self._call_tool(tool_name, tool_input, on_progress)
+            _tool_result_epochs.set_if_current(tenant, epoch, key, text, ttl)
+            return text
+
+        _tool_result_stats.record(tool_name, hit=False)
+        return await _async_tool_result_flight.do(key, _load)
+
+    async def _call_tool(self, tool_name: str, tool_input: dict,
+                         on_progress: Callable[[dict], None] | None = None) -> str:
+        """tools/call を送信してテキスト結果を返す（キャッシュを通さない）。"""
+        params, handler = self._tool_call_params(tool_name, tool_input, on_progress)
+        return self._tool_text(await self._call_jsonrpc("tools/call", params, handler))
 
 
 # ---------------------------------------------------------------------------
-# モジュールレベル: ツール定義キャッシュ
+# モジュールレベル: ツール定義キャッシュ（テナント単位）
 # ---------------------------------------------------------------------------
 
-def get_mcp_tools(jwt_token: str) -> list[dict]:
+# テナントごとのツール定義（TTL 切れ後は古い値を返しつつ裏で再取得する）
+_tools_cache = CacheLoader(MemoryCache(max_bytes=16 * 1024 * 1024), max_workers=2)
+# 同じテナントの同時の初回取得を 1 回の tools/list にまとめる
+_tools_flight = SingleFlight()
+
+
+def _tenant_key(jwt_token: str, account_id: str | None) -> str:
     """
-    MCP ツール定義を返す（初回のみ取得してキャッシュ）。
+    キャッシュのテナントキーを返す。
+
+    account_id が無ければ JWT の sub クレーム（= accountId）を使い、
+    それも読めない場合はトークンのハッシュを使う。
+    """
+    if account_id:
+        return account_id
+    try:
+        sub = jwt.decode(jwt_token, options={"verify_signature": False}).get("sub")
+    except jwt.PyJWTError:
+        sub = None
+    if sub:
+        return sub
+    return "token-" + hashlib.sha256(jwt_token.encode()).hexdigest()[:16]
+
+
+def _tools_cache_ttl() -> tuple[float, float]:
+    from flask import current_app, has_app_context
+    config = current_app.config if has_app_context() else {}
+    return (
+        float(config.get("MCP_TOOLS_CACHE_TTL", 300)),
+        float(config.get("MCP_TOOLS_CACHE_STALE_TTL", 3600)),
+    )
+
+
+def get_mcp_tools(jwt_token: str, account_id: str | None = None) -> list[dict]:
+    """
+    MCP ツール定義をテナント単位のキャッシュ越しに返す。
+
+    TTL（MCP_TOOLS_CACHE_TTL）内はキャッシュを返し、切れた後も
+    MCP_TOOLS_CACHE_STALE_TTL 秒は古い値を返しつつ裏で tools/list を取り直す。
+    同じテナントの同時の初回取得は 1 回にまとめる。
 
     Args:
         jwt_token: MCP サーバー認証用 JWT
+        account_id: テナント（省略時は JWT の sub クレーム）
     Returns:
         Anthropic 形式のツール定義リスト
     """
-    global _cached_tools
-    if _cached_tools is None:
-        client = MCPClient(jwt_token)
-        _cached_tools = client.list_tools()
-    return _cached_tools
+    from flask import current_app, has_app_context
+
+    tenant = _tenant_key(jwt_token, account_id)
+    key = f"{_TOOLS_CACHE_PREFIX}{tenant}:"
+    ttl, stale_ttl = _tools_cache_ttl()
+    # 裏での再取得もサーキットブレーカーなどは同じアプリの設定を使う
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def _load() -> list[dict]:
+        client = MCPClient(jwt_token, account_id=account_id)
+        if app is None:
+            return client.list_tools()
+        with app.app_context():
+            return client.list_tools()
+
+    return _tools_flight.do(key, lambda: _tools_cache.get_or_load(key, _load, ttl, stale_ttl))
+
+
+def invalidate_tools_cache(account_id: str | None = None) -> None:
+    """ツール定義キャッシュを破棄する（account_id 省略時は全テナント）。"""
+    prefix = _TOOLS_CACHE_PREFIX + (f"{account_id}:" if account_id else "")
+    _tools_cache.invalidate_prefix(prefix)
+
+
+def tools_cache_stats() -> dict:
+    """ツール定義キャッシュのヒット率などを返す。"""
+    return _tools_cache.stats()
+
+
+# ---------------------------------------------------------------------------
+# モジュールレベル: ツール実行結果キャッシュ（テナント単位）
+# ---------------------------------------------------------------------------
+
+_TOOL_RESULT_CACHE_PREFIX = "mcp-tool-result:"
+
+# 読み取り専用で、結果がコネクション追加・削除まで変わらないメタデータ取得ツール
+METADATA_TOOLS = frozenset({
+    "getCatalogs",
+    "getSchemas",
+    "getTables",
+    "getColumns",
+    "getProcedures",
+    "getProcedureParameters",
+})
+QUERY_TOOL = "queryData"
+
+_tool_results = MemoryCache(max_bytes=32 * 1024 * 1024)
+_tool_result_flight = SingleFlight()
+_async_tool_result_flight = AsyncSingleFlight()
+
+
+class _ToolResultEpochs:
+    """
+    テナントごとのツール結果キャッシュの世代番号。
+
+    invalidate_tool_result_cache のたびに対象テナント（省略時は全テナント）の世代を進め、
+    破棄前に始まった呼び出しの結果は保存しない。世代の確認と保存を同じロック内で行うため、
+    確認の直後に破棄されて古い結果が残ることもない。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._global = 0
+        self._tenants: dict[str, int] = {}
+
+    def current(self, tenant: str) -> tuple[int, int]:
+        with self._lock:
+            return self._global, self._tenants.get(tenant, 0)
+
+    def advance(self, tenant: str | None) -> None:
+        with self._lock:
+            if tenant:
+                self._tenants[tenant] = self._tenants.get(tenant, 0) + 1
+            else:
+                # 全テナントの世代が変わるため、テナント別の世代は持ち越さなくてよい
+                self._global += 1
+                self._tenants.clear()
+
+    def set_if_current(self, tenant: str, epoch: tuple[int, int], key: str,
+                       text: str, ttl: float) -> None:
+        """epoch が現在の世代と一致する場合だけ結果をキャッシュに保存する。"""
+        with self._lock:
+            if (self._global, self._tenants.get(tenant, 0)) == epoch:
+                _tool_results.set(key, text, ttl)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._global = 0
+            self._tenants.clear()
+
+
+_tool_result_epochs = _ToolResultEpochs()
+
+
+class _ToolResultStats:
+    """ツール名ごとのキャッシュヒット / ミス件数。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: dict[str, list[int]] = {}
+
+    def record(self, tool_name: str, hit: bool) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(tool_name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4),
+                }
+                for name, (hits, misses) in sorted(self._counts.items())
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+_tool_result_stats = _ToolResultStats()
+
+
+def _tool_result_ttl(config, tool_name: str) -> float:
+    """ツールの結果をキャッシュする秒数を返す（0 ならキャッシュしない）。"""
+    if tool_name in METADATA_TOOLS:
+        return float(config.get("MCP_TOOL_RESULT_CACHE_TTL", 0))
+    if tool_name == QUERY_TOOL:
+        return float(config.get("MCP_QUERY_RESULT_CACHE_TTL", 0))
+    return 0.0
+
+
+# キャッシュしてよい queryData の SQL の先頭（WITH などで始まる文は書き込みを含みうるため対象外）
+_SELECT_RE = re.compile(r"\s*SELECT\b", re.IGNORECASE)
+
+
+def _is_write_query(tool_name: str, tool_input: dict) -> bool:
+    """
+    queryData の SQL が SELECT 1 文だけでなければ True（結果をキャッシュせず、実行後に破棄する）。
+
+    末尾の ; は許す。文中に ; があれば複数文とみなす（文字列リテラル内の ; も安全側に倒す）。
+    """
+    if tool_name != QUERY_TOOL:
+        return False
+    sql = (tool_input or {}).get("query")
+    if not isinstance(sql, str):
+        return True
+    statement = sql.strip().rstrip(";")
+    return ";" in statement or _SELECT_RE.match(statement) is None
+
+
+def _invalidate_after_write(tenant: str) -> None:
+    """queryData で SELECT 以外を実行した後、テナントのクエリ結果キャッシュを破棄する。"""
+    from flask import has_app_context
+    if has_app_context():
+        # /api/v1/query の結果キャッシュと queryData の結果キャッシュの両方を破棄する
+        from backend.services.query_service import invalidate_query_cache
+        invalidate_query_cache(tenant)
+    else:
+        invalidate_tool_result_cache(tenant, [QUERY_TOOL])
+
+
+def _tool_result_key(tenant: str, tool_name: str, tool_input: dict) -> str:
+    """テナント・ツール名・正規化した引数（キー順・区切りを固定した JSON）からキーを作る。"""
+    args = json.dumps(tool_input or {}, sort_keys=True, ensure_ascii=False,
+                      separators=(",", ":"), default=str)
+    digest = hashlib.sha256(args.encode()).hexdigest()
+    return f"{_TOOL_RESULT_CACHE_PREFIX}{tenant}:{tool_name}:{digest}"
+
+
+def invalidate_tool_result_cache(account_id: str | None = None,
+                                 tool_names: Iterable[str] | None = None) -> int:
+    """
+    ツール実行結果のキャッシュを破棄し、破棄した件数を返す。
+
+    Args:
+        account_id: 対象テナント（省略時は全テナントの全ツール）
+        tool_names: 対象ツール（省略時はテナントのすべてのツール）
+    """
+    _tool_result_epochs.advance(account_id)
+    if not account_id:
+        return _tool_results.delete_prefix(_TOOL_RESULT_CACHE_PREFIX)
+    prefix = f"{_TOOL_RESULT_CACHE_PREFIX}{account_id}:"
+    if tool_names is None:
+        return _tool_results.delete_prefix(prefix)
+    return sum(_tool_results.delete_prefix(f"{prefix}{name}:") for name in tool_names)
+
+
+def tool_result_cache_stats() -> dict:
+    """ツール実行結果キャッシュのサイズと、ツールごとのヒット率を返す。"""
+    return {**_tool_results.stats(), "tools": _tool_result_stats.stats()}
+
+
+def reset_tool_result_cache() -> None:
+    """ツール実行結果キャッシュと統計をすべて破棄する（テスト用）。"""
+    _tool_results.clear()
+    _tool_result_stats.clear()
+    _tool_result_epochs.clear()
+
+
+# ---------------------------------------------------------------------------
+# モジュールレベル: MCP セッション（テナント単位）
+# ---------------------------------------------------------------------------
+
+# アプリコンテキスト外（MCP_SESSION_ENABLED を参照できない場合）のデフォルト
+_SESSION_ENABLED_DEFAULT = True
+
+
+class _MCPSession:
+    """initialize で確立したセッション（session_id が None ならステートレス）。"""
+
+    def __init__(self, session_id: str | None, protocol_version: str | None) -> None:
+        self.session_id = session_id
+        self.protocol_version = protocol_version
+        self.expires_at = 0.0
+
+
+class _SessionRegistry:
+    """テナント -> _MCPSession。MCP_SESSION_TTL 秒で初期化し直す。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sessions: dict[str, _MCPSession] = {}
+        self._initialized = 0
+        self._expired = 0
+
+    def get(self, tenant: str) -> _MCPSession | None:
+        with self._lock:
+            session = self._sessions.get(tenant)
+            if session is not None and session.expires_at <= time.monotonic():
+                del self._sessions[tenant]
+                return None
+            return session
+
+    def put(self, tenant: str, session: _MCPSession, ttl: float) -> _MCPSession:
+        session.expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._sessions[tenant] = session
+            self._initialized += 1
+        return session
+
+    def drop(self, tenant: str, session: _MCPSession | None) -> None:
+        """期限切れのセッションを破棄する（別スレッドが作り直したものは残す）。"""
+        with self._lock:
+            if self._sessions.get(tenant) is session:
+                del self._sessions[tenant]
+                self._expired += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "initialized": self._initialized,
+                "expired": self._expired,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+
+_sessions = _SessionRegistry()
+_session_flight = SingleFlight()
+_async_session_flight = AsyncSingleFlight()
+
+
+def mcp_session_stats() -> dict:
+    """MCP セッションの数・初期化回数・期限切れ回数を返す。"""
+    return _sessions.stats()
 
 
-def invalidate_tools_cache() -> None:
-    """ツール定義キャッシュを破棄する（テスト・再読み込み用）。"""
-    global _cached_tools
-    _cached_tools = None
+def reset_mcp_sessions() -> None:
+    """すべての MCP セッションを破棄する（テスト用）。"""
+    _sessions.clear()
 
 
 # ---------------------------------------------------------------------------
@@ -174,7 +1097,7 @@ def _make_client(account_id: str) -> MCPClient:
 
     parent_id = current_app.config["CONNECT_AI_PARENT_ACCOUNT_ID"]
     jwt_token = generate_connect_ai_jwt(parent_id, account_id)
-    return MCPClient(jwt_token)
+    return MCPClient(jwt_token, account_id=account_id)
 
 
 def get_catalogs(account_id: str) -> str:
@@ -1,6 +1,54 @@
+import json
+
+from flask import current_app
 from flask_login import current_user
+from backend.cache import get_cache
+from backend.connectai.async_client import AsyncConnectAIClient
 from backend.connectai.client import ConnectAIClient
 from backend.connectai.exceptions import ConnectAIError
+from backend.services.mcp_client import METADATA_TOOLS, invalidate_tool_result_cache
+
+
+def metadata_cache_prefix(account_id: str | None) -> str:
+    """テナント（Connect AI アカウント）単位のメタデータキャッシュキーの接頭辞を返す。"""
+    return f"metadata:{account_id or ''}:"
+
+
+def invalidate_metadata_cache(account_id: str | None) -> None:
+    """
+    テナントのメタデータキャッシュをすべて破棄する（コネクション追加・削除時）。
+
+    AI アシスタントの MCP メタデータ取得ツールの結果キャッシュも破棄する。
+    """
+    get_cache(current_app._get_current_object()).invalidate_prefix(
+        metadata_cache_prefix(account_id)
+    )
+    invalidate_tool_result_cache(account_id, METADATA_TOOLS)
+
+
+# 主キーを表すカラムメタデータのフラグ（データソースによって名前が異なる）
+_KEY_FLAGS = ("IS_KEY", "IsKey", "IS_PRIMARY_KEY", "PRIMARY_KEY")
+
+
+def is_key_column(column: dict) -> bool:
+    """カラムメタデータ（get_columns の 1 行）が主キーのカラムかを返す。"""
+    for flag in _KEY_FLAGS:
+        value = column.get(flag)
+        if value is True or str(value).lower() in ("true", "yes", "1"):
+            return True
+    return False
+
+
+def is_non_nullable_column(column: dict) -> bool:
+    """カラムメタデータが NULL を取らないと明示しているかを返す（IS_NULLABLE が無ければ False）。"""
+    value = column.get("IS_NULLABLE")
+    return value is False or str(value).lower() in ("false", "no", "0")
+
+
+def _metadata_cache_key(level: str, path: list[str]) -> str:
+    return metadata_cache_prefix(current_user.connect_ai_account_id) + json.dumps(
+        [level, *path], ensure_ascii=False
+    )
 
 
 class MetadataService:
@@ -9,18 +57,96 @@ class MetadataService:
         """ログイン中ユーザーの ChildAccountId で Connect AI クライアントを生成する。"""
         return ConnectAIClient(child_account_id=current_user.connect_ai_account_id)
 
+    def _cached(self, level: str, path: list[str], fetch) -> list[dict]:
+        """
+        メタデータをキャッシュ越しに取得する。
+
+        TTL は階層ごとに METADATA_CACHE_TTL_<LEVEL>、TTL 切れ後も
+        METADATA_CACHE_STALE_TTL 秒は古い値を返しつつ裏で再取得する。
+        """
+        config = current_app.config
+        key = _metadata_cache_key(level, path)
+        client = self._client()
+
+        def _load() -> list[dict]:
+            with client.app_context():
+                return fetch(client)
+
+        return get_cache(current_app._get_current_object()).get_or_load(
+            key,
+            _load,
+            ttl=config[f"METADATA_CACHE_TTL_{level.upper()}"],
+            stale_ttl=config["METADATA_CACHE_STALE_TTL"],
+        )
+
     def get_catalogs(self) -> list[dict]:
         """カタログ一覧を Connect AI から取得する。"""
-        return self._client().get_catalogs()
+        return self._cached("catalogs", [], lambda c: c.get_catalogs())
 
     def get_schemas(self, catalog_name: str) -> list[dict]:
         """スキーマ一覧を Connect AI から取得する。"""
-        return self._client().get_schemas(catalog_name)
+        return self._cached("schemas", [catalog_name], lambda c: c.get_schemas(catalog_name))
 
     def get_tables(self, catalog_name: str, schema_name: str) -> list[dict]:
         """テーブル一覧を Connect AI から取得する。"""
-        return self._client().get_tables(catalog_name, schema_name)
+        return self._cached(
+            "tables", [catalog_name, schema_name],
+            lambda c: c.get_tables(catalog_name, schema_name),
+        )
 
     def get_columns(self, catalog_name: str, schema_name: str, table_name: str) -> list[dict]:
         """カラム一覧を Connect AI から取得する。"""
-        return self._client().get_columns(catalog_name, schema_name, table_name)
+        return self._cached(
+            "columns", [catalog_name, schema_name, table_name],
+            lambda c: c.get_columns(catalog_name, schema_name, table_name),
+        )
+
+    def invalidate(self) -> None:
+        """ログイン中ユーザーのメタデータキャッシュを破棄する。"""
+        invalidate_metadata_cache(current_user.connect_ai_account_id)
+
+
+class AsyncMetadataService:
+    """
+    MetadataService の非同期版（CONNECT_AI_ASYNC 有効時の async ビューから使う）。
+
+    キャッシュ（キー・TTL）は MetadataService と共有する。
+    """
+
+    def _client(self) -> AsyncConnectAIClient:
+        return AsyncConnectAIClient(child_account_id=current_user.connect_ai_account_id)
+
+    async def _cached(self, level: str, path: list[str], fetch) -> list[dict]:
+        """メタデータをキャッシュ越しに取得する（TTL は MetadataService._cached と同じ）。"""
+        config = current_app.config
+        client = self._client()
+
+        async def _load() -> list[dict]:
+            # TTL 切れ後の再取得は別スレッドで実行されるため、生成元アプリのコンテキストで呼ぶ
+            with client.app_context():
+                return await fetch(client)
+
+        return await get_cache(current_app._get_current_object()).aget_or_load(
+            _metadata_cache_key(level, path),
+            _load,
+            ttl=config[f"METADATA_CACHE_TTL_{level.upper()}"],
+            stale_ttl=config["METADATA_CACHE_STALE_TTL"],
+        )
+
+    async def get_catalogs(self) -> list[dict]:
+        return await self._cached("catalogs", [], lambda c: c.get_catalogs())
+
+    async def get_schemas(self, catalog_name: str) -> list[dict]:
+        return await self._cached("schemas", [catalog_name], lambda c: c.get_schemas(catalog_name))
+
+    async def get_tables(self, catalog_name: str, schema_name: str) -> list[dict]:
+        return await self._cached(
+            "tables", [catalog_name, schema_name],
+            lambda c: c.get_tables(catalog_name, schema_name),
+        )
+
+    async def get_columns(self, catalog_name: str, schema_name: str, table_name: str) -> list[dict]:
+        return await self._cached(
+            "columns", [catalog_name, schema_name, table_name],
+            lambda c: c.get_columns(catalog_name, schema_name, table_name),
+        )
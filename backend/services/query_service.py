@@ -1,7 +1,25 @@
+import csv
+import hashlib
+import io
+import json
 import time
+from collections.abc import Iterator
+from flask import current_app
 from flask_login import current_user
+from backend import json_provider
+from backend.cache import get_cache
+from backend.connectai.async_client import AsyncConnectAIClient
 from backend.connectai.client import ConnectAIClient
-from backend.schemas.query_schema import QueryRequestSchema
+from backend.schemas.query_schema import QueryExportSchema, QueryRequestSchema
+from backend.services import result_format
+from backend.services.metadata_service import MetadataService, is_key_column
+from backend.services.mcp_client import QUERY_TOOL, invalidate_tool_result_cache
+
+# エクスポート形式 -> Content-Type
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
 
 
 def build_query_sql(
@@ -10,10 +28,16 @@ def build_query_sql(
     table: str,
     columns: list[str],
     conditions: list[dict],
+    limit: int = 1000,
+    offset: int = 0,
+    order_by: list[str] | None = None,
 ) -> tuple[str, dict, dict]:
     """
     SELECT 文・パラメータ・パラメータ型を組み立てて返す。
 
+    offset を指定した場合は LIMIT ... OFFSET ... でページ単位に取得する（エクスポート用）。
+    ページ間で行が重複・欠落しないよう、その場合は order_by で一意な並び順を指定する。
+
     Returns:
         (sql, params, param_types)
     """
@@ -60,16 +84,98 @@ def build_query_sql(
     sql = f"SELECT {select_part} FROM {from_part}"
     if where_clauses:
         sql += " WHERE " + " AND ".join(where_clauses)
-    sql += " LIMIT 1000"
+    if order_by:
+        sql += " ORDER BY " + ", ".join(f"[{c}] ASC" for c in order_by)
+    sql += f" LIMIT {limit}"
+    if offset:
+        sql += f" OFFSET {offset}"
 
     return sql, params, param_types
 
 
+def query_cache_prefix(account_id: str | None) -> str:
+    """テナント単位のクエリ結果キャッシュキーの接頭辞を返す。"""
+    return f"query:{account_id or ''}:"
+
+
+def invalidate_query_cache(account_id: str | None) -> None:
+    """
+    テナントのクエリ結果キャッシュを破棄する（データ書き込み時）。
+
+    AI アシスタントの queryData の結果キャッシュも破棄する。
+    """
+    get_cache(current_app._get_current_object()).invalidate_prefix(
+        query_cache_prefix(account_id)
+    )
+    invalidate_tool_result_cache(account_id, [QUERY_TOOL])
+
+
+def _query_cache_key(sql: str, params: dict | None, param_types: dict | None) -> str:
+    digest = hashlib.sha256(
+        json.dumps([sql, params, param_types], sort_keys=True, ensure_ascii=False).encode()
+    ).hexdigest()
+    return query_cache_prefix(current_user.connect_ai_account_id) + digest
+
+
+def _request_sql(req: QueryRequestSchema) -> tuple[str, dict | None, dict | None]:
+    """クエリリクエストから (sql, params, param_types) を作る（パラメータなしは None）。"""
+    sql, params, param_types = build_query_sql(
+        req.catalog_name,
+        req.schema_name,
+        req.table_name,
+        req.columns,
+        [c.model_dump() for c in req.conditions],
+    )
+    return sql, params if params else None, param_types if param_types else None
+
+
+def _columnar_result(fmt: str, schema: list[dict], rows: list[list], start: float) -> bytes:
+    elapsed_ms = int((time.time() - start) * 1000)
+    return result_format.encode(fmt, schema, rows, {"total": len(rows), "elapsed_ms": elapsed_ms})
+
+
+def _export_order_columns(req: QueryExportSchema) -> list[str]:
+    """
+    エクスポートのページ取得に使う ORDER BY のカラムを返す。
+
+    主キーがあれば主キー（複合キーなら全カラム）で並べる。主キーが特定できない
+    テーブルでは、選択カラム（指定がなければ全カラム）で並べて順序を固定する。
+    """
+    metadata = MetadataService().get_columns(req.catalog_name, req.schema_name, req.table_name)
+    keys = [c["COLUMN_NAME"] for c in metadata if is_key_column(c)]
+    if keys:
+        return keys
+    return list(req.columns) or [c["COLUMN_NAME"] for c in metadata]
+
+
+def _query_result(columns: list[str], rows: list[list], start: float) -> dict:
+    return {
+        "columns": columns,
+        "rows": rows,
+        "total": len(rows),
+        "elapsed_ms": int((time.time() - start) * 1000),
+    }
+
+
 class QueryService:
 
     def _client(self) -> ConnectAIClient:
         return ConnectAIClient(child_account_id=current_user.connect_ai_account_id)
 
+    def _cached_query(self, sql: str, params: dict | None,
+                      param_types: dict | None) -> tuple[list[str], list[list]]:
+        """SELECT をキャッシュ越しに実行する（QUERY_CACHE_TTL が 0 なら毎回実行）。"""
+        client = self._client()
+        ttl = current_app.config["QUERY_CACHE_TTL"]
+        if ttl <= 0:
+            return client.query_data(sql, params, param_types)
+        columns, rows = get_cache(current_app._get_current_object()).get_or_load(
+            _query_cache_key(sql, params, param_types),
+            lambda: list(client.query_data(sql, params, param_types)),
+            ttl=ttl,
+        )
+        return columns, rows
+
     def execute_query(self, req: QueryRequestSchema) -> dict:
         """
         クエリを実行し結果を返す。
@@ -77,23 +183,154 @@ class QueryService:
         Returns:
             {"columns": [...], "rows": [...], "total": N, "elapsed_ms": N}
         """
-        sql, params, param_types = build_query_sql(
-            req.catalog_name,
-            req.schema_name,
-            req.table_name,
-            req.columns,
-            [c.model_dump() for c in req.conditions],
-        )
+        sql, params, param_types = _request_sql(req)
+        start = time.time()
+        columns, rows = self._cached_query(sql, params, param_types)
+        return _query_result(columns, rows, start)
+
+    def execute_query_columnar(self, req: QueryRequestSchema, fmt: str) -> bytes:
+        """
+        クエリを実行し、結果を Arrow IPC ストリーム / Parquet で返す。
+
+        Connect AI の schema（dataTypeName）から各カラムの型を決めるため、
+        数値・日時は JSON を経由せず型付きのまま渡せる。結果キャッシュは使わない。
+
+        Raises:
+            ColumnarUnavailableError: pyarrow が未インストールの場合
+        """
+        sql, params, param_types = _request_sql(req)
         start = time.time()
-        columns, rows = self._client().query_data(
-            sql,
-            params if params else None,
-            param_types if param_types else None,
+        schema, rows = self._client().query_with_schema(sql, params, param_types)
+        return _columnar_result(fmt, schema, rows, start)
+
+    def export_query(self, req: QueryExportSchema) -> Iterator[str]:
+        """
+        クエリ結果を全件 CSV / NDJSON でエクスポートするイテレータを返す。
+
+        Connect AI から EXPORT_PAGE_SIZE 件ずつ主キー順に取得し、ページごとに文字列へ
+        変換して yield する。全件をメモリに保持しないため件数が増えてもメモリは一定で、
+        最初のページが届いた時点で送信を始められる。クライアントが切断すると
+        イテレータが閉じられ、以降のページは取得しない。
+
+        最初のページはこのメソッド内で取得するため、Connect AI のエラーは
+        レスポンス送信前に ConnectAIError として送出される。2 ページ目以降の取得に
+        失敗した場合は、欠けたファイルを正常終了に見せないよう、末尾にエラー行
+        （CSV は # で始まるコメント行、NDJSON は {"error": ...}）を書いてから例外を送出し、
+        チャンク転送を終端させずに打ち切る。
+
+        Raises:
+            ValueError: 未対応の形式が指定された場合
+            ConnectAIError: 最初のページの取得に失敗した場合
+        """
+        if req.format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {req.format}")
+        config = current_app.config
+        page_size = max(1, int(config["EXPORT_PAGE_SIZE"]))
+        max_rows = int(config["EXPORT_MAX_ROWS"])
+        client = self._client()
+        conditions = [c.model_dump() for c in req.conditions]
+        order_by = _export_order_columns(req)
+
+        def _fetch(offset: int) -> tuple[list[str], list[list]]:
+            limit = page_size if max_rows <= 0 else min(page_size, max_rows - offset)
+            sql, params, param_types = build_query_sql(
+                req.catalog_name, req.schema_name, req.table_name,
+                req.columns, conditions, limit=limit, offset=offset, order_by=order_by,
+            )
+            return client.query_data(sql, params or None, param_types or None)
+
+        columns, rows = _fetch(0)
+        encode = _encode_csv if req.format == "csv" else _encode_ndjson
+
+        def _stream() -> Iterator[str]:
+            nonlocal rows
+            if req.format == "csv" and columns:
+                yield _encode_csv(columns, [columns])
+            offset = 0
+            while rows:
+                yield encode(columns, rows)
+                offset += len(rows)
+                if len(rows) < page_size or (max_rows > 0 and offset >= max_rows):
+                    return
+                try:
+                    _, rows = _fetch(offset)
+                except Exception as e:
+                    current_app.logger.exception(
+                        "Export of [%s].[%s].[%s] failed after %d rows",
+                        req.catalog_name, req.schema_name, req.table_name, offset,
+                    )
+                    yield _encode_export_error(req.format, e, offset)
+                    raise
+
+        return _stream()
+
+
+class AsyncQueryService:
+    """
+    QueryService の非同期版（CONNECT_AI_ASYNC 有効時の async ビューから使う）。
+
+    クエリ結果キャッシュは QueryService と共有する。
+    """
+
+    def _client(self) -> AsyncConnectAIClient:
+        return AsyncConnectAIClient(child_account_id=current_user.connect_ai_account_id)
+
+    async def _cached_query(self, sql: str, params: dict | None,
+                            param_types: dict | None) -> tuple[list[str], list[list]]:
+        client = self._client()
+        ttl = current_app.config["QUERY_CACHE_TTL"]
+        if ttl <= 0:
+            return await client.query_data(sql, params, param_types)
+
+        async def _load() -> list:
+            with client.app_context():
+                return list(await client.query_data(sql, params, param_types))
+
+        columns, rows = await get_cache(current_app._get_current_object()).aget_or_load(
+            _query_cache_key(sql, params, param_types), _load, ttl=ttl,
         )
-        elapsed_ms = int((time.time() - start) * 1000)
-        return {
-            "columns": columns,
-            "rows": rows,
-            "total": len(rows),
-            "elapsed_ms": elapsed_ms,
-        }
+        return columns, rows
+
+    async def execute_query(self, req: QueryRequestSchema) -> dict:
+        """クエリを実行し結果を返す（結果は QueryService.execute_query() と同じ）。"""
+        sql, params, param_types = _request_sql(req)
+        start = time.time()
+        columns, rows = await self._cached_query(sql, params, param_types)
+        return _query_result(columns, rows, start)
+
+    async def execute_query_columnar(self, req: QueryRequestSchema, fmt: str) -> bytes:
+        """
+        クエリを実行し、結果を Arrow IPC / Parquet で返す（QueryService.execute_query_columnar() と同じ）。
+
+        Raises:
+            ColumnarUnavailableError: pyarrow が未インストールの場合
+        """
+        sql, params, param_types = _request_sql(req)
+        start = time.time()
+        schema, rows = await self._client().query_with_schema(sql, params, param_types)
+        return _columnar_result(fmt, schema, rows, start)
+
+
+def _encode_csv(columns: list[str], rows: list[list]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(
+        ["" if v is None else v for v in row] for row in rows
+    )
+    return buf.getvalue()
+
+
+def _encode_export_error(fmt: str, error: Exception, rows_exported: int) -> str:
+    """エクスポートが途中で失敗したことを示す末尾の行を返す。"""
+    message = " ".join(str(error).split())
+    if fmt == "csv":
+        return f"# ERROR: export failed after {rows_exported} rows: {message}\n"
+    return json_provider.dumps({"error": {
+        "code": "CONNECT_AI_ERROR", "message": message, "rows_exported": rows_exported,
+    }}) + "\n"
+
+
+def _encode_ndjson(columns: list[str], rows: list[list]) -> str:
+    return "".join(
+        json_provider.dumps(dict(zip(columns, row)), default=str) + "\n"
+        for row in rows
+    )
@@ -0,0 +1,164 @@
+"""
+クエリ結果の列指向フォーマット（Apache Arrow IPC ストリーム / ファイル、Parquet）への変換。
+
+pyarrow はオプション依存で、未インストールの環境では JSON のみを返す。
+"""
+import io
+
+from backend.connectai import decoding
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow 未インストール環境
+    pa = None
+    pq = None
+
+FORMAT_JSON = "json"
+FORMAT_ARROW = "arrow"
+FORMAT_ARROW_FILE = "arrow-file"
+FORMAT_PARQUET = "parquet"
+
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
+ARROW_FILE_MIMETYPE = "application/vnd.apache.arrow.file"
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+
+MIMETYPES = {
+    FORMAT_ARROW: ARROW_STREAM_MIMETYPE,
+    FORMAT_ARROW_FILE: ARROW_FILE_MIMETYPE,
+    FORMAT_PARQUET: PARQUET_MIMETYPE,
+}
+
+# Accept ヘッダーで受け付けるメディアタイプ -> 形式
+_ACCEPT_TYPES = {
+    "application/json": FORMAT_JSON,
+    ARROW_STREAM_MIMETYPE: FORMAT_ARROW,
+    ARROW_FILE_MIMETYPE: FORMAT_ARROW_FILE,
+    PARQUET_MIMETYPE: FORMAT_PARQUET,
+    "application/x-parquet": FORMAT_PARQUET,
+}
+
+
+class ColumnarUnavailableError(Exception):
+    """pyarrow が未インストールのため列指向フォーマットを返せないことを表す。"""
+
+
+def negotiate_format(accept, format_param: str | None = None) -> str:
+    """
+    ?format= または Accept ヘッダーから返却形式を決める。
+
+    Args:
+        accept: request.accept_mimetypes
+        format_param: クエリパラメータ format の値（Accept より優先する）
+    Returns:
+        "json" / "arrow" / "arrow-file" / "parquet"
+    Raises:
+        ValueError: format に未対応の値が指定された場合
+        ColumnarUnavailableError: 列指向フォーマットが求められたが pyarrow が未インストールの場合
+    """
+    if format_param:
+        if format_param not in (FORMAT_JSON, *MIMETYPES):
+            raise ValueError(f"Unsupported format: {format_param}")
+        fmt = format_param
+    else:
+        best = accept.best_match(list(_ACCEPT_TYPES), default="application/json")
+        fmt = _ACCEPT_TYPES[best]
+    if fmt != FORMAT_JSON and pa is None:
+        raise ColumnarUnavailableError("pyarrow is not installed")
+    return fmt
+
+
+# ---------------------------------------------------------------------------
+# 型変換
+# ---------------------------------------------------------------------------
+
+def _arrow_type(column: dict):
+    """
+    Connect AI の schema の型から Arrow の型と値の変換関数を返す。
+
+    値の変換は ConnectAIClient.query_data(typed=True) と同じ decoding の変換関数を使う。
+
+    Returns:
+        (arrow_type, converter)。converter は None 以外の値に適用する
+    """
+    name = decoding.type_name(column)
+    convert = decoding.converter_for(name)
+    if name == "TINYINT":
+        return pa.int8(), convert
+    if name == "SMALLINT":
+        return pa.int16(), convert
+    if name in ("INTEGER", "INT"):
+        return pa.int32(), convert
+    if name == "BIGINT":
+        return pa.int64(), convert
+    if name == "REAL":
+        return pa.float32(), convert
+    if name in ("FLOAT", "DOUBLE"):
+        return pa.float64(), convert
+    if name in decoding.DECIMAL_TYPES:
+        precision, scale = column.get("precision"), column.get("scale")
+        if isinstance(precision, int) and isinstance(scale, int) and 0 < precision <= 38:
+            return pa.decimal128(precision, max(scale, 0)), convert
+        return pa.float64(), float
+    if name in decoding.BOOLEAN_TYPES:
+        return pa.bool_(), convert
+    if name == "DATE":
+        return pa.date32(), convert
+    if name == "TIME":
+        return pa.time64("us"), convert
+    if name in ("TIMESTAMP", "DATETIME"):
+        return pa.timestamp("us"), convert
+    if name in decoding.BINARY_TYPES:
+        return pa.binary(), lambda v: v if isinstance(v, bytes) else str(v).encode()
+    return pa.string(), str
+
+
+def to_arrow_table(schema: list[dict], rows: list[list], metadata: dict | None = None):
+    """
+    Connect AI の (schema, rows) を Arrow Table に変換する。
+
+    変換できない値を含むカラムは文字列型にフォールバックする。
+
+    Args:
+        schema: [{"columnName": ..., "dataTypeName": ...}, ...]
+        rows: 行データ
+        metadata: スキーマに付与するメタデータ（total など）
+    Raises:
+        ColumnarUnavailableError: pyarrow が未インストールの場合
+    """
+    if pa is None:
+        raise ColumnarUnavailableError("pyarrow is not installed")
+    arrays = []
+    fields = []
+    for i, column in enumerate(schema):
+        arrow_type, convert = _arrow_type(column)
+        values = [row[i] for row in rows]
+        try:
+            array = pa.array(
+                [None if v is None else convert(v) for v in values], type=arrow_type
+            )
+        except (ValueError, TypeError, ArithmeticError, pa.ArrowException):
+            arrow_type = pa.string()
+            array = pa.array([None if v is None else str(v) for v in values], type=arrow_type)
+        arrays.append(array)
+        fields.append(pa.field(column["columnName"], arrow_type))
+    arrow_schema = pa.schema(
+        fields,
+        metadata={k: str(v) for k, v in (metadata or {}).items() if v is not None},
+    )
+    return pa.Table.from_arrays(arrays, schema=arrow_schema)
+
+
+def encode(fmt: str, schema: list[dict], rows: list[list], metadata: dict | None = None) -> bytes:
+    """(schema, rows) を Arrow IPC ストリーム / ファイル、または Parquet のバイト列にする。"""
+    table = to_arrow_table(schema, rows, metadata)
+    sink = io.BytesIO()
+    if fmt == FORMAT_PARQUET:
+        pq.write_table(table, sink)
+    elif fmt == FORMAT_ARROW_FILE:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue()
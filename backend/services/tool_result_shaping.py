@@ -0,0 +1,263 @@
+"""
+AI アシスタントに返す MCP ツール結果の整形。
+
+queryData などが返す大きな CSV をそのまま tool_result にすると、以降の Agentic loop の
+呼び出しがすべて重くなる。上限（バイト数・行数）を超える結果は、ヘッダーと代表的な
+サンプル行・カラムごとの統計（行数・最小 / 最大・NULL 件数）に置き換え、省略したことを
+Claude に伝える。全件はハンドル付きでテナント単位に共有キャッシュ（get_cache）へ保存し、
+readToolResult ツール（Claude 用）と /api/v1/ai-assistant/results/<handle>（利用者用）から
+取得できる。CACHE_BACKEND=sqlite なら別のワーカーが保存した全件も取得できる。
+"""
+import csv
+import io
+import uuid
+
+from flask import current_app, has_app_context
+from backend.cache import get_cache
+
+READ_RESULT_TOOL_NAME = "readToolResult"
+
+# Claude に渡すローカルツールの定義（MCP サーバーには送らない）
+READ_RESULT_TOOL = {
+    "name": READ_RESULT_TOOL_NAME,
+    "description": (
+        "省略されたツール結果の全件から、指定した範囲の行を取得します。"
+        "ツール結果に「handle」が示されている場合に使用してください。"
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "handle": {"type": "string", "description": "省略されたツール結果のハンドル"},
+            "offset": {"type": "integer", "description": "取得を始める行（0 始まり、ヘッダーを除く）"},
+            "limit": {"type": "integer", "description": "取得する行数（デフォルト 100）"},
+        },
+        "required": ["handle"],
+    },
+}
+
+_HANDLE_PREFIX = "tool-result:"
+_DEFAULT_READ_LIMIT = 100
+# 統計に表示する文字列の最小 / 最大値の最大文字数
+_STAT_VALUE_CHARS = 40
+# 表形式とみなす、ヘッダーと列数が一致する行の割合
+_TABULAR_RATIO = 0.9
+_NULL_VALUES = frozenset({"", "NULL", "null"})
+
+
+def _limits() -> dict:
+    config = current_app.config if has_app_context() else {}
+    return {
+        "max_bytes": int(config.get("MCP_TOOL_RESULT_MAX_BYTES", 32 * 1024)),
+        "max_rows": int(config.get("MCP_TOOL_RESULT_MAX_ROWS", 200)),
+        "sample_rows": int(config.get("MCP_TOOL_RESULT_SAMPLE_ROWS", 20)),
+        "handle_ttl": float(config.get("MCP_TOOL_RESULT_HANDLE_TTL", 1800)),
+        "full_max_bytes": int(config.get("MCP_TOOL_RESULT_FULL_MAX_BYTES", 8 * 1024 * 1024)),
+    }
+
+
+def is_enabled() -> bool:
+    """上限（バイト数・行数）のいずれかが設定されているかどうか。"""
+    limits = _limits()
+    return limits["max_bytes"] > 0 or limits["max_rows"] > 0
+
+
+# ---------------------------------------------------------------------------
+# 解析
+# ---------------------------------------------------------------------------
+
+def _parse_table(text: str) -> tuple[list[str], list[list[str]]] | None:
+    """CSV として解析できれば (header, rows) を、表形式でなければ None を返す。"""
+    try:
+        records = list(csv.reader(io.StringIO(text)))
+    except csv.Error:
+        return None
+    if len(records) < 2 or len(records[0]) < 1:
+        return None
+    header, rows = records[0], records[1:]
+    matching = sum(1 for row in rows if len(row) == len(header))
+    if matching < len(rows) * _TABULAR_RATIO:
+        return None
+    return header, rows
+
+
+def _to_csv(header: list[str], rows: list[list[str]]) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+def _sample_indexes(total: int, count: int) -> list[int]:
+    """先頭 count // 2 行と、残りから等間隔に選んだ行（最終行を含む）のインデックスを返す。"""
+    if total <= count:
+        return list(range(total))
+    head = count // 2
+    rest = count - head
+    span = total - head
+    spaced = {head + (span - 1) * (k + 1) // rest for k in range(rest)}
+    return list(range(head)) + sorted(spaced)
+
+
+def _column_stats(header: list[str], rows: list[list[str]]) -> list[str]:
+    """カラムごとの NULL 件数・最小 / 最大値（数値として解釈できれば数値で比較）を返す。"""
+    lines = []
+    for i, name in enumerate(header):
+        values = [row[i] for row in rows if i < len(row) and row[i] not in _NULL_VALUES]
+        nulls = len(rows) - len(values)
+        if not values:
+            lines.append(f"- {name}: NULL {nulls} 件")
+            continue
+        try:
+            numbers = [float(v) for v in values]
+        except ValueError:
+            low, high = min(values), max(values)
+        else:
+            low = values[numbers.index(min(numbers))]
+            high = values[numbers.index(max(numbers))]
+        lines.append(
+            f"- {name}: NULL {nulls} 件, 最小 {low[:_STAT_VALUE_CHARS]}, "
+            f"最大 {high[:_STAT_VALUE_CHARS]}"
+        )
+    return lines
+
+
+def _row_size(row: list[str]) -> int:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerow(row)
+    return len(buf.getvalue().encode())
+
+
+def _fit_rows(header: list[str], rows: list[list[str]], max_bytes: int) -> list[list[str]]:
+    """CSV にしたとき max_bytes に収まるところまで rows を先頭から残す（最低 1 行）。"""
+    if max_bytes <= 0:
+        return rows
+    size = _row_size(header) if header else 0
+    kept = []
+    for row in rows:
+        size += _row_size(row)
+        if size > max_bytes and kept:
+            break
+        kept.append(row)
+    return kept
+
+
+# ---------------------------------------------------------------------------
+# 整形・全件の保存
+# ---------------------------------------------------------------------------
+
+def full_result_prefix(account_id: str | None) -> str:
+    """テナント単位の全件保存キーの接頭辞を返す。"""
+    return f"{_HANDLE_PREFIX}{account_id or ''}:"
+
+
+def _save_full_result(account_id: str | None, text: str, size: int, limits: dict) -> str | None:
+    """
+    全件を共有キャッシュに保存してハンドルを返す。
+
+    MCP_TOOL_RESULT_FULL_MAX_BYTES を超える結果と、アプリコンテキスト外では保存せず None を返す。
+    """
+    full_max_bytes = limits["full_max_bytes"]
+    if not has_app_context() or (full_max_bytes > 0 and size > full_max_bytes):
+        return None
+    handle = "tr_" + uuid.uuid4().hex[:16]
+    get_cache(current_app._get_current_object()).cache.set(
+        full_result_prefix(account_id) + handle, text, limits["handle_ttl"]
+    )
+    return handle
+
+
+def shape(text: str, account_id: str | None) -> str:
+    """
+    ツール結果が上限を超える場合、サンプルと統計に置き換えた文字列を返す。
+
+    上限（MCP_TOOL_RESULT_MAX_BYTES / MCP_TOOL_RESULT_MAX_ROWS）以内ならそのまま返す。
+    超える場合は全件をハンドル付きで保存し（MCP_TOOL_RESULT_FULL_MAX_BYTES 以内の場合）、
+    表形式（CSV）ならヘッダー・サンプル行・カラムごとの統計を、それ以外は先頭部分を返す。
+
+    Args:
+        account_id: テナント（保存した全件はこのテナントからのみ取得できる）
+    """
+    limits = _limits()
+    max_bytes, max_rows = limits["max_bytes"], limits["max_rows"]
+    size = len(text.encode())
+    over_bytes = max_bytes > 0 and size > max_bytes
+    # 改行数が行数の上限以下なら行数は超えない（小さな結果は CSV として解析しない）
+    many_lines = max_rows > 0 and text.count("\n") > max_rows
+    table = _parse_table(text) if over_bytes or many_lines else None
+    over_rows = table is not None and max_rows > 0 and len(table[1]) > max_rows
+    if not over_bytes and not over_rows:
+        return text
+
+    handle = _save_full_result(account_id, text, size, limits)
+
+    if table is None:
+        head = text.encode()[:max_bytes].decode("utf-8", errors="ignore")
+        if handle is None:
+            rest = "続きは保存していないため取得できません"
+        else:
+            rest = (f"続きは {READ_RESULT_TOOL_NAME} ツールに handle \"{handle}\" を指定して"
+                    f"行単位で取得できます")
+        return (
+            f"（結果が大きいため先頭 {len(head.encode())} バイトのみ表示しています: 全 {size} バイト。"
+            f"{rest}）\n{head}"
+        )
+
+    header, rows = table
+    sample = [rows[i] for i in _sample_indexes(len(rows), max(1, limits["sample_rows"]))]
+    sample = _fit_rows(header, sample, max_bytes // 2 if max_bytes > 0 else 0)
+    if handle is None:
+        rest = "全件は保存していないため取得できません"
+    else:
+        rest = f"全件は {READ_RESULT_TOOL_NAME} ツールに handle \"{handle}\" を指定して取得できます"
+    return "\n".join([
+        f"（結果が大きいため省略しました: 全 {len(rows)} 行 / {size} バイトのうち {len(sample)} 行を"
+        f"表示しています。サンプルは先頭の行と、残りから等間隔に選んだ行です。{rest}）",
+        f"行数: {len(rows)}",
+        "カラムの統計:",
+        *_column_stats(header, rows),
+        "サンプル:",
+        _to_csv(header, sample).rstrip("\n"),
+    ])
+
+
+def get_full_result(account_id: str | None, handle: str) -> str | None:
+    """保存した全件を返す（期限切れ・他テナントのハンドルは None）。"""
+    if not has_app_context():
+        return None
+    entry = get_cache(current_app._get_current_object()).cache.get(
+        full_result_prefix(account_id) + handle
+    )
+    return entry.value if entry is not None else None
+
+
+def read_result(account_id: str | None, tool_input: dict) -> str:
+    """
+    readToolResult ツールの実行: 保存した全件から offset 行目から limit 行を返す。
+
+    返す内容も MCP_TOOL_RESULT_MAX_BYTES に収まるよう行数を減らす。
+    """
+    handle = str(tool_input.get("handle") or "")
+    text = get_full_result(account_id, handle)
+    if text is None:
+        return f"エラー: handle \"{handle}\" の結果が見つかりません（期限切れの可能性があります）"
+    try:
+        offset = max(0, int(tool_input.get("offset") or 0))
+        limit = max(1, int(tool_input.get("limit") or _DEFAULT_READ_LIMIT))
+    except (TypeError, ValueError):
+        return "エラー: offset / limit には整数を指定してください"
+
+    table = _parse_table(text)
+    if table is None:
+        header, rows = None, [[line] for line in text.splitlines()]
+    else:
+        header, rows = table
+    chunk = _fit_rows(header or [], rows[offset:offset + limit], _limits()["max_bytes"])
+    end = offset + len(chunk)
+    footer = f"（全 {len(rows)} 行中 {offset + 1}〜{end} 行目"
+    footer += f"。続きは offset={end}）" if end < len(rows) else "）"
+    if header is None:
+        body = "\n".join(row[0] for row in chunk)
+    else:
+        body = _to_csv(header, chunk).rstrip("\n")
+    return f"{body}\n{footer}"
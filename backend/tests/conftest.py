@@ -39,6 +39,42 @@ def client(app):
     return app.test_client()
 
 
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    """テスト間でサーキットブレーカーの状態を持ち越さない"""
+    from backend.connectai.circuit_breaker import reset_circuit_breakers as _reset
+    _reset()
+    yield
+    _reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_mcp_sessions():
+    """テスト間で MCP セッションを持ち越さない"""
+    from backend.services.mcp_client import reset_mcp_sessions as _reset
+    _reset()
+    yield
+    _reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_tool_result_cache():
+    """テスト間で MCP ツール実行結果のキャッシュを持ち越さない"""
+    from backend.services.mcp_client import reset_tool_result_cache as _reset
+    _reset()
+    yield
+    _reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_async_http_pool():
+    """テスト間で非同期コネクションプール（トランスポートの差し替え）を持ち越さない"""
+    from backend.connectai.async_http_pool import reset_async_http_pool as _reset
+    _reset()
+    yield
+    _reset()
+
+
 @pytest.fixture(autouse=True)
 def mock_connect_ai():
     """Connect AI Account API をモックする（外部APIへの依存を排除）"""
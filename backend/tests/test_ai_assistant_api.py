@@ -104,7 +104,8 @@ class TestAiAssistantChat:
         _register_and_login(client)
         _set_api_key(app)
 
-        def mock_stream(api_key, jwt_token, messages, catalog_name=None):
+        def mock_stream(api_key, jwt_token, messages, catalog_name=None, account_id=None,
+                        conversation_id=None):
             yield "text_delta", {"text": "テスト回答"}
             yield "done", {"message": "complete", "answer": "テスト回答"}
 
@@ -124,7 +125,8 @@ class TestAiAssistantChat:
 
         captured = {}
 
-        def mock_stream(api_key, jwt_token, messages, catalog_name=None):
+        def mock_stream(api_key, jwt_token, messages, catalog_name=None, account_id=None,
+                        conversation_id=None):
             captured["catalog_name"] = catalog_name
             yield "done", {"message": "complete", "answer": "ok"}
 
@@ -137,13 +139,34 @@ class TestAiAssistantChat:
 
         assert captured["catalog_name"] == "SalesDB"
 
+    def test_chat_passes_conversation_id(self, client, app):
+        _register_and_login(client)
+        _set_api_key(app)
+
+        captured = []
+
+        def mock_stream(api_key, jwt_token, messages, catalog_name=None, account_id=None,
+                        conversation_id=None):
+            captured.append(conversation_id)
+            yield "done", {"message": "complete", "answer": "ok"}
+
+        with patch("backend.api.v1.ai_assistant.generate_connect_ai_jwt", return_value="tok"), \
+             patch("backend.services.claude_service.stream_chat", side_effect=mock_stream):
+            client.post("/api/v1/ai-assistant/chat", json={"message": "hi", "conversation_id": "conv-1"})
+            client.post("/api/v1/ai-assistant/chat", json={"message": "hi"})
+
+        assert captured[0] == "conv-1"
+        # 未指定なら新しい識別子を割り当てる
+        assert captured[1]
+
     def test_empty_catalog_name_passed_as_none(self, client, app):
         _register_and_login(client)
         _set_api_key(app)
 
         captured = {}
 
-        def mock_stream(api_key, jwt_token, messages, catalog_name=None):
+        def mock_stream(api_key, jwt_token, messages, catalog_name=None, account_id=None,
+                        conversation_id=None):
             captured["catalog_name"] = catalog_name
             yield "done", {"message": "complete", "answer": "ok"}
 
@@ -160,7 +183,8 @@ class TestAiAssistantChat:
         _register_and_login(client)
         _set_api_key(app)
 
-        def mock_stream(api_key, jwt_token, messages, catalog_name=None):
+        def mock_stream(api_key, jwt_token, messages, catalog_name=None, account_id=None,
+                        conversation_id=None):
             yield "error", {"error": "Anthropic API error"}
 
         with patch("backend.api.v1.ai_assistant.generate_connect_ai_jwt", return_value="tok"), \
@@ -175,7 +199,8 @@ class TestAiAssistantChat:
         _register_and_login(client)
         _set_api_key(app)
 
-        def mock_stream(api_key, jwt_token, messages, catalog_name=None):
+        def mock_stream(api_key, jwt_token, messages, catalog_name=None, account_id=None,
+                        conversation_id=None):
             yield "tool_start", {"tool_name": "getCatalogs", "tool_input": {}}
             yield "tool_result", {"tool_name": "getCatalogs", "result": "cat1,cat2"}
             yield "text_delta", {"text": "カタログ一覧: cat1, cat2"}
@@ -196,7 +221,8 @@ class TestAiAssistantChat:
         _register_and_login(client)
         _set_api_key(app)
 
-        def mock_stream(api_key, jwt_token, messages, catalog_name=None):
+        def mock_stream(api_key, jwt_token, messages, catalog_name=None, account_id=None,
+                        conversation_id=None):
             yield "text_delta", {"text": "こんにちは！"}
             yield "done", {"message": "complete", "answer": "こんにちは！"}
 
@@ -222,7 +248,8 @@ class TestAiAssistantClientHistory:
 
         captured = {}
 
-        def mock_stream(api_key, jwt_token, messages, catalog_name=None):
+        def mock_stream(api_key, jwt_token, messages, catalog_name=None, account_id=None,
+                        conversation_id=None):
             captured["messages"] = list(messages)
             yield "done", {"message": "complete", "answer": "回答"}
 
@@ -249,7 +276,8 @@ class TestAiAssistantClientHistory:
 
         captured = {}
 
-        def mock_stream(api_key, jwt_token, messages, catalog_name=None):
+        def mock_stream(api_key, jwt_token, messages, catalog_name=None, account_id=None,
+                        conversation_id=None):
             captured["messages"] = list(messages)
             yield "done", {"message": "complete", "answer": "回答"}
 
@@ -278,11 +306,13 @@ class TestAiAssistantClientHistory:
         received_by_a = {}
         received_by_b = {}
 
-        def mock_stream_a(api_key, jwt_token, messages, catalog_name=None):
+        def mock_stream_a(api_key, jwt_token, messages, catalog_name=None, account_id=None,
+                          conversation_id=None):
             received_by_a["messages"] = list(messages)
             yield "done", {"message": "complete", "answer": "回答A"}
 
-        def mock_stream_b(api_key, jwt_token, messages, catalog_name=None):
+        def mock_stream_b(api_key, jwt_token, messages, catalog_name=None, account_id=None,
+                          conversation_id=None):
             received_by_b["messages"] = list(messages)
             yield "done", {"message": "complete", "answer": "回答B"}
 
@@ -305,3 +335,33 @@ class TestAiAssistantClientHistory:
         # ユーザー B の履歴には B のメッセージのみ含まれる
         assert len(received_by_b["messages"]) == 1
         assert received_by_b["messages"][0]["content"] == "BのQ1"
+
+
+# ---------------------------------------------------------------------------
+# 省略したツール結果の取得
+# ---------------------------------------------------------------------------
+
+class TestAiAssistantResults:
+    def test_returns_full_result_for_own_tenant(self, client, app):
+        from backend.services import tool_result_shaping
+
+        _register_and_login(client)
+        with app.app_context():
+            account_id = db.session.query(User).filter_by(email="user@example.com").first() \
+                .connect_ai_account_id
+            app.config["MCP_TOOL_RESULT_MAX_ROWS"] = 10
+            full = "Id\n" + "\n".join(str(i) for i in range(100))
+            shaped = tool_result_shaping.shape(full, account_id)
+            other = tool_result_shaping.shape(full, "other-child-account")
+        handle = shaped.split('handle "')[1].split('"')[0]
+        other_handle = other.split('handle "')[1].split('"')[0]
+
+        resp = client.get(f"/api/v1/ai-assistant/results/{handle}")
+        assert resp.status_code == 200
+        assert "text/csv" in resp.content_type
+        assert resp.get_data(as_text=True) == full
+        # 他テナントのハンドルは取得できない
+        assert client.get(f"/api/v1/ai-assistant/results/{other_handle}").status_code == 404
+
+    def test_without_login_returns_401(self, client):
+        assert client.get("/api/v1/ai-assistant/results/tr_x").status_code == 401
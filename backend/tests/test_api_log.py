@@ -1,6 +1,8 @@
 """
 API ログ機能のテスト（テストファースト）
 """
+import json
+
 import pytest
 from backend.models.api_log import ApiLog
 from backend.models import db
@@ -121,3 +123,99 @@ def test_other_user_logs_not_visible(app, client):
     data = resp.get_json()
     assert data["total"] == 1
     assert data["logs"][0]["endpoint"] == "/query"
+
+
+# ---------------------------------------------------------------------------
+# ApiLogWriter（バックグラウンド書き込みキュー）
+# ---------------------------------------------------------------------------
+
+def _entry(endpoint: str = "/catalogs") -> dict:
+    return {
+        "user_id": 1,
+        "method": "GET",
+        "endpoint": endpoint,
+        "request_body": None,
+        "response_body": {"results": []},
+        "status_code": 200,
+        "elapsed_ms": 5,
+    }
+
+
+def test_log_writer_batches_rows(app):
+    """キューに積んだログがまとめて書き込まれること"""
+    from backend.connectai.log_writer import ApiLogWriter
+    writer = ApiLogWriter(app, batch_size=10, flush_interval=0.05)
+    for i in range(25):
+        assert writer.submit(_entry(f"/catalogs/{i}"))
+    assert writer.flush(timeout=5)
+
+    with app.app_context():
+        logs = ApiLog.query.all()
+        assert len(logs) == 25
+        assert json.loads(logs[0].response_body) == {"results": []}
+    stats = writer.stats()
+    assert stats["written"] == 25
+    assert stats["queue_depth"] == 0
+    assert stats["batches"] <= 25
+    writer.shutdown()
+
+
+def test_log_writer_drop_oldest_when_full(app):
+    """drop_oldest ポリシーでは満杯時に古いログが捨てられ、件数が計上されること"""
+    from backend.connectai.log_writer import ApiLogWriter
+    writer = ApiLogWriter(app, max_queue=3, batch_size=100, flush_interval=60)
+    for i in range(5):
+        writer.submit(_entry(f"/e{i}"))
+
+    stats = writer.stats()
+    assert stats["dropped"] == 2
+    assert stats["queue_depth"] == 3
+    writer.shutdown()
+
+    with app.app_context():
+        endpoints = sorted(log.endpoint for log in ApiLog.query.all())
+    assert endpoints == ["/e2", "/e3", "/e4"]
+
+
+def test_log_writer_block_policy_gives_up_after_timeout(app):
+    """block ポリシーでは空きを待ち、時間切れなら破棄すること"""
+    from backend.connectai.log_writer import ApiLogWriter
+    writer = ApiLogWriter(app, max_queue=1, batch_size=100, flush_interval=60,
+                          overflow_policy="block", block_timeout=0.05)
+    assert writer.submit(_entry("/first"))
+    assert writer.submit(_entry("/second")) is False
+    assert writer.stats()["dropped"] == 1
+    writer.shutdown()
+
+
+def test_log_writer_shutdown_drains_queue(app):
+    """shutdown 時に残りのログが書き込まれ、以降の submit は拒否されること"""
+    from backend.connectai.log_writer import ApiLogWriter
+    writer = ApiLogWriter(app, batch_size=100, flush_interval=60)
+    for _ in range(3):
+        writer.submit(_entry())
+    writer.shutdown()
+
+    with app.app_context():
+        assert ApiLog.query.count() == 3
+    assert writer.submit(_entry()) is False
+
+
+def test_connect_ai_calls_are_logged_through_writer(app, client):
+    """ConnectAIClient の呼び出しログがライター経由で保存されること"""
+    from unittest.mock import patch, MagicMock
+    from backend.connectai.client import ConnectAIClient
+    from backend.connectai.log_writer import get_log_writer
+
+    _register_and_login(client)
+    resp = MagicMock(status_code=200)
+    resp.content = b'{"results": [{"schema": [], "rows": []}]}'
+    with patch("backend.connectai.client.generate_connect_ai_jwt", return_value="tok"), \
+         patch("backend.connectai.http_pool.HTTPConnectionPool.request", return_value=resp):
+        client.get("/api/v1/metadata/catalogs")
+
+    assert get_log_writer(app).flush(timeout=5)
+    resp = client.get("/api/v1/api-logs")
+    data = resp.get_json()
+    assert data["total"] == 1
+    assert data["logs"][0]["endpoint"] == "/catalogs"
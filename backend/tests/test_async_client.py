@@ -0,0 +1,454 @@
+"""
+非同期クライアントのテスト
+
+対象:
+  - backend/connectai/async_http_pool.py
+  - backend/connectai/async_client.py
+  - backend/connectai/singleflight.py（AsyncSingleFlight）
+  - backend/services/mcp_client.py（AsyncMCPClient）
+  - backend/services/metadata_service.py / query_service.py / data_service.py（Async*Service）
+  - backend/api/v1/__init__.py（async ビューへの差し替え）
+"""
+import asyncio
+import json
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from backend.connectai.async_http_pool import (  # noqa: E402
+    AsyncHTTPConnectionPool,
+    get_async_http_pool,
+    set_async_http_pool,
+)
+from backend.connectai.exceptions import ConnectAIError  # noqa: E402
+
+_CATALOGS = {"results": [{"schema": [{"columnName": "TABLE_CATALOG"}], "rows": [["SF"]]}]}
+_SAMPLE_JWT = "eyJhbGciOiJIUzI1NiJ9.eyJzdWIiOiJ0ZW5hbnQtYSJ9.sig"
+
+
+def _use_transport(handler) -> AsyncHTTPConnectionPool:
+    """handler（httpx.Request -> httpx.Response、コルーチン可）で応答する共有プールに差し替える。"""
+    pool = AsyncHTTPConnectionPool(transport=httpx.MockTransport(handler))
+    set_async_http_pool(pool)
+    return pool
+
+
+@pytest.fixture
+def async_app(app):
+    from backend.connectai.retry import reset_retry_budgets
+    reset_retry_budgets()
+    app.config.update(CONNECT_AI_RETRY_BASE_DELAY=0)
+    with patch("backend.connectai.client.generate_connect_ai_jwt", return_value="tok"):
+        yield app
+    reset_retry_budgets()
+
+
+def _run(app, coro_fn):
+    """アプリコンテキスト内で asyncio.run(coro_fn()) を実行する。"""
+    with app.app_context():
+        return asyncio.run(coro_fn())
+
+
+# ---------------------------------------------------------------------------
+# AsyncHTTPConnectionPool / AsyncSingleFlight
+# ---------------------------------------------------------------------------
+
+class TestAsyncHTTPConnectionPool:
+
+    def test_holds_many_requests_on_one_loop(self):
+        """1 本のイベントループで多数のリクエストを同時に保持できること"""
+        arrived = []
+        all_arrived = asyncio.Event()
+
+        async def handler(request):
+            # 全件が届くまで応答しない（負荷で投入が遅れても同時保持数を確かめられるようにする）
+            arrived.append(request)
+            if len(arrived) == 100:
+                all_arrived.set()
+            await asyncio.wait_for(all_arrived.wait(), timeout=5)
+            return httpx.Response(200, json={"path": request.url.path})
+
+        pool = _use_transport(handler)
+
+        async def fan_out():
+            return await asyncio.gather(
+                *(pool.request("GET", f"http://connect-ai.test/{i}") for i in range(100))
+            )
+
+        start = time.monotonic()
+        responses = asyncio.run(fan_out())
+        elapsed = time.monotonic() - start
+
+        assert [r.json()["path"] for r in responses] == [f"/{i}" for i in range(100)]
+        stats = pool.stats()
+        assert stats["requests"] == 100
+        assert stats["max_in_flight"] == 100
+        assert stats["in_flight"] == 0
+        assert elapsed < 2.5
+
+    def test_shared_across_event_loops(self):
+        """呼び出し元のイベントループが変わっても同じプールで処理されること"""
+        pool = _use_transport(lambda request: httpx.Response(200, json={"ok": True}))
+        for _ in range(3):
+            assert asyncio.run(pool.request("GET", "http://connect-ai.test/")).json() == {"ok": True}
+        assert get_async_http_pool() is pool
+        assert pool.stats()["requests"] == 3
+
+    def test_submit_from_sync_code(self):
+        pool = _use_transport(lambda request: httpx.Response(200, json={"ok": True}))
+        future = pool.submit(pool.request("GET", "http://connect-ai.test/"))
+        assert future.result(timeout=5).json() == {"ok": True}
+
+
+class TestAsyncSingleFlight:
+
+    def test_coalesces_concurrent_calls(self):
+        from backend.connectai.singleflight import AsyncSingleFlight
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "v"
+
+        async def main():
+            return await asyncio.gather(*(flight.do("k", load) for _ in range(10)))
+
+        assert asyncio.run(main()) == ["v"] * 10
+        assert len(calls) == 1
+        assert flight.stats() == {"executed": 1, "shared": 9, "in_flight": 0}
+
+    def test_error_is_shared_and_not_cached(self):
+        from backend.connectai.singleflight import AsyncSingleFlight
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(flight.do("k", fail))
+        assert asyncio.run(flight.do("k", lambda: asyncio.sleep(0, "ok"))) == "ok"
+
+
+# ---------------------------------------------------------------------------
+# AsyncConnectAIClient
+# ---------------------------------------------------------------------------
+
+class TestAsyncConnectAIClient:
+
+    def test_get_catalogs_retries_transient_errors(self, async_app):
+        from backend.connectai.async_client import AsyncConnectAIClient
+        responses = [httpx.Response(503), httpx.Response(200, json=_CATALOGS)]
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            return responses.pop(0)
+
+        _use_transport(handler)
+        result = _run(async_app, lambda: AsyncConnectAIClient("child").get_catalogs())
+
+        assert result == [{"TABLE_CATALOG": "SF"}]
+        assert len(seen) == 2
+        assert seen[0].headers["Authorization"] == "Bearer tok"
+        assert seen[0].url.path.endswith("/catalogs")
+
+    def test_query_sends_typed_parameters(self, async_app):
+        from backend.connectai.async_client import AsyncConnectAIClient
+        bodies = []
+
+        def handler(request):
+            bodies.append(json.loads(request.content))
+            return httpx.Response(200, json={"results": [{
+                "schema": [{"columnName": "Id"}, {"columnName": "Amount"}],
+                "rows": [["001", 10]],
+            }]})
+
+        _use_transport(handler)
+        columns, rows = _run(async_app, lambda: AsyncConnectAIClient("child").query_data(
+            "SELECT [Id], [Amount] FROM [T] WHERE [Amount] > @a", {"@a": 5}, {"@a": "INTEGER"}
+        ))
+
+        assert (columns, rows) == (["Id", "Amount"], [["001", 10]])
+        assert bodies[0]["parameters"] == {"@a": {"dataType": 8, "value": "5"}}
+
+    def test_http_error_raises_connect_ai_error_with_sql(self, async_app):
+        from backend.connectai.async_client import AsyncConnectAIClient
+        _use_transport(lambda request: httpx.Response(400, text="bad query"))
+
+        with pytest.raises(ConnectAIError) as exc:
+            _run(async_app, lambda: AsyncConnectAIClient("child").query_data("SELECT 1"))
+        assert "HTTP 400: bad query" in str(exc.value)
+        assert "SQL: SELECT 1" in str(exc.value)
+
+    def test_write_is_not_retried(self, async_app):
+        from backend.connectai.async_client import AsyncConnectAIClient
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            return httpx.Response(503)
+
+        _use_transport(handler)
+        with pytest.raises(ConnectAIError):
+            _run(async_app, lambda: AsyncConnectAIClient("child").query_data(
+                "DELETE FROM [T] WHERE [Id] = '1'"
+            ))
+        assert len(seen) == 1
+
+    def test_identical_selects_are_coalesced(self, async_app):
+        from backend.connectai.async_client import AsyncConnectAIClient
+        seen = []
+
+        async def handler(request):
+            seen.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=_CATALOGS)
+
+        _use_transport(handler)
+
+        async def main():
+            client = AsyncConnectAIClient("child")
+            return await asyncio.gather(*(client.query_data("SELECT 1") for _ in range(5)))
+
+        results = _run(async_app, main)
+        assert len(results) == 5
+        assert len(seen) == 1
+
+
+# ---------------------------------------------------------------------------
+# AsyncMCPClient
+# ---------------------------------------------------------------------------
+
+def _sse(*messages: dict) -> bytes:
+    return "".join(f"event: message\ndata: {json.dumps(m)}\n\n" for m in messages).encode()
+
+
+class TestAsyncMCPClient:
+
+    def test_call_tool_streams_progress_and_reuses_session(self, app):
+        from backend.services.mcp_client import AsyncMCPClient, mcp_session_stats
+        methods = []
+
+        def handler(request):
+            body = json.loads(request.content)
+            methods.append((body["method"], request.headers.get("Mcp-Session-Id")))
+            if body["method"] == "initialize":
+                return httpx.Response(
+                    200, json={"jsonrpc": "2.0", "id": body["id"], "result": {"protocolVersion": "2025-03-26"}},
+                    headers={"Mcp-Session-Id": "sess-1"},
+                )
+            if body["method"] == "notifications/initialized":
+                return httpx.Response(202)
+            token = body["params"]["_meta"]["progressToken"]
+            return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=_sse(
+                {"jsonrpc": "2.0", "method": "notifications/progress",
+                 "params": {"progressToken": token, "progress": 1, "total": 2}},
+                {"jsonrpc": "2.0", "id": body["id"],
+                 "result": {"content": [{"type": "text", "text": "a,b\n1,2"}]}},
+            ))
+
+        _use_transport(handler)
+        initialized = mcp_session_stats()["initialized"]
+        progress = []
+
+        async def main():
+            client = AsyncMCPClient(_SAMPLE_JWT, account_id="tenant-a")
+            first = await client.call_tool("queryData", {"query": "SELECT 1"}, on_progress=progress.append)
+            second = await client.call_tool("queryData", {"query": "SELECT 2"}, on_progress=progress.append)
+            return first, second
+
+        with app.app_context():
+            first, second = asyncio.run(main())
+
+        assert first == second == "a,b\n1,2"
+        assert [p["progress"] for p in progress] == [1, 1]
+        assert methods[:2] == [("initialize", None), ("notifications/initialized", "sess-1")]
+        assert methods[2:] == [("tools/call", "sess-1"), ("tools/call", "sess-1")]
+        assert mcp_session_stats()["initialized"] == initialized + 1
+
+    def test_metadata_tool_results_are_cached(self, app):
+        from backend.services.mcp_client import AsyncMCPClient, tool_result_cache_stats
+        calls = []
+
+        def handler(request):
+            body = json.loads(request.content)
+            if body["method"] != "tools/call":
+                return httpx.Response(404)
+            calls.append(body)
+            return httpx.Response(200, json={
+                "jsonrpc": "2.0", "id": body["id"],
+                "result": {"content": [{"type": "text", "text": "TABLE_CATALOG\nSF"}]},
+            })
+
+        _use_transport(handler)
+
+        async def main():
+            client = AsyncMCPClient(_SAMPLE_JWT, account_id="tenant-a")
+            return [await client.call_tool("getCatalogs", {}) for _ in range(3)]
+
+        with app.app_context():
+            assert asyncio.run(main()) == ["TABLE_CATALOG\nSF"] * 3
+        assert len(calls) == 1
+        assert tool_result_cache_stats()["tools"]["getCatalogs"]["hits"] == 2
+
+    def test_rpc_error_raises_mcp_error(self, app):
+        from backend.services.mcp_client import AsyncMCPClient, MCPError
+        app.config["MCP_SESSION_ENABLED"] = False
+        _use_transport(lambda request: httpx.Response(200, json={
+            "jsonrpc": "2.0", "id": json.loads(request.content)["id"],
+            "error": {"code": -32602, "message": "unknown tool"},
+        }))
+        with app.app_context(), pytest.raises(MCPError, match="unknown tool"):
+            asyncio.run(AsyncMCPClient(_SAMPLE_JWT).list_tools())
+
+    def test_oversized_response_rejected(self, app):
+        from backend.services.mcp_client import AsyncMCPClient, MCPError
+        app.config.update(MCP_SESSION_ENABLED=False, MCP_MAX_RESPONSE_BYTES=64)
+        _use_transport(lambda request: httpx.Response(
+            200, headers={"Content-Type": "text/event-stream"},
+            content=b"data: " + b"x" * 200 + b"\n\n",
+        ))
+        with app.app_context(), pytest.raises(MCPError, match="too large"):
+            asyncio.run(AsyncMCPClient(_SAMPLE_JWT).call_tool("queryData", {}))
+
+
+# ---------------------------------------------------------------------------
+# Async*Service / AI アシスタントのツール実行
+# ---------------------------------------------------------------------------
+
+_USER = SimpleNamespace(connect_ai_account_id="child", is_authenticated=False)
+
+
+class TestAsyncServices:
+
+    def test_metadata_shares_cache_with_sync_service(self, async_app):
+        from backend.services.metadata_service import AsyncMetadataService, MetadataService
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            return httpx.Response(200, json=_CATALOGS)
+
+        _use_transport(handler)
+        with patch("backend.services.metadata_service.current_user", _USER):
+            assert _run(async_app, lambda: AsyncMetadataService().get_catalogs()) == [{"TABLE_CATALOG": "SF"}]
+            assert _run(async_app, lambda: AsyncMetadataService().get_catalogs()) == [{"TABLE_CATALOG": "SF"}]
+            with async_app.app_context():
+                assert MetadataService().get_catalogs() == [{"TABLE_CATALOG": "SF"}]
+        assert len(seen) == 1
+
+    def test_query_service_returns_same_shape(self, async_app):
+        from backend.schemas.query_schema import QueryRequestSchema
+        from backend.services.query_service import AsyncQueryService
+        _use_transport(lambda request: httpx.Response(200, json={"results": [{
+            "schema": [{"columnName": "Id"}], "rows": [["001"], ["002"]],
+        }]}))
+        req = QueryRequestSchema(catalog_name="SF", schema_name="dbo", table_name="Account")
+        with patch("backend.services.query_service.current_user", _USER):
+            result = _run(async_app, lambda: AsyncQueryService().execute_query(req))
+        assert result["columns"] == ["Id"]
+        assert result["rows"] == [["001"], ["002"]]
+        assert result["total"] == 2
+
+    def test_columnar_results_use_async_client(self, async_app):
+        """列指向フォーマットもコルーチン版で取得し、型はレスポンスの schema から決めること"""
+        pa = pytest.importorskip("pyarrow")
+        from backend.schemas.data_schema import RecordListSchema
+        from backend.schemas.query_schema import QueryRequestSchema
+        from backend.services import data_service
+        from backend.services.data_service import AsyncDataService
+        from backend.services.query_service import AsyncQueryService
+        data_service._count_cache.clear()
+        _use_transport(lambda request: httpx.Response(200, json={"results": [{
+            "schema": [{"columnName": "Qty", "dataTypeName": "INTEGER"}], "rows": [[1], [2]],
+        }]}))
+        query_req = QueryRequestSchema(catalog_name="SF", schema_name="dbo", table_name="T")
+        list_req = RecordListSchema(connection_id="c", catalog="SF", schema_name="dbo", table="T")
+        with patch("backend.services.query_service.current_user", _USER), \
+             patch("backend.services.data_service.current_user", _USER), \
+             patch("backend.connectai.client.ConnectAIClient.query_with_schema",
+                   side_effect=AssertionError), \
+             patch("backend.connectai.client.ConnectAIClient.query_data",
+                   return_value=(["cnt"], [[2]])):
+            body = _run(async_app, lambda: AsyncQueryService().execute_query_columnar(query_req, "arrow"))
+            page, page_info = _run(
+                async_app, lambda: AsyncDataService().list_records_columnar(list_req, "arrow")
+            )
+        assert pa.ipc.open_stream(body).read_all().column("Qty").to_pylist() == [1, 2]
+        table = pa.ipc.open_stream(page).read_all()
+        assert table.schema.field("Qty").type == pa.int32()
+        assert page_info["total"] == 2
+
+    def test_assistant_tools_run_on_shared_loop(self, app):
+        """CONNECT_AI_ASYNC 有効時、AI アシスタントのツールはスレッドプールを使わずに並行実行されること"""
+        from backend.services import claude_service
+        from backend.services.mcp_client import AsyncMCPClient
+        app.config.update(CONNECT_AI_ASYNC=True, MCP_SESSION_ENABLED=False, MCP_TOOL_CONCURRENCY=4)
+
+        async def handler(request):
+            body = json.loads(request.content)
+            await asyncio.sleep(0.1)
+            name = body["params"]["name"]
+            return httpx.Response(200, json={
+                "jsonrpc": "2.0", "id": body["id"],
+                "result": {"content": [{"type": "text", "text": f"result of {name}"}]},
+            })
+
+        _use_transport(handler)
+        blocks = [SimpleNamespace(name=f"tool{i}", input={}, id=f"t{i}") for i in range(4)]
+        with app.app_context(), \
+             patch.object(claude_service, "_get_tool_executor", side_effect=AssertionError):
+            mcp = claude_service._mcp_client(_SAMPLE_JWT, "tenant-a")
+            assert isinstance(mcp, AsyncMCPClient)
+            start = time.monotonic()
+            events = list(claude_service._run_tools(mcp, blocks))
+            elapsed = time.monotonic() - start
+
+        results = {i: r for event, i, r in events if event == "tool_result"}
+        assert results == {i: f"result of tool{i}" for i in range(4)}
+        assert elapsed < 0.35  # 逐次なら 0.4 秒以上
+
+
+# ---------------------------------------------------------------------------
+# async ビューへの差し替え
+# ---------------------------------------------------------------------------
+
+class TestAsyncViews:
+
+    def test_requires_asgiref(self, app):
+        from backend.api.v1 import enable_async_views
+        with patch.dict(sys.modules, {"asgiref": None}), pytest.raises(RuntimeError, match="asgiref"):
+            enable_async_views(app)
+
+    def test_async_variants_registered_for_io_endpoints(self):
+        from backend.api.v1 import async_views
+        assert set(async_views) == {
+            "get_catalogs", "get_schemas", "get_tables", "get_columns",
+            "execute_query",
+            "get_records", "get_record_count", "create_record", "update_record", "delete_record",
+        }
+        assert all(asyncio.iscoroutinefunction(fn) for fn in async_views.values())
+
+    def test_metadata_endpoint_served_by_async_view(self, app):
+        pytest.importorskip("asgiref")
+        from backend.api.v1 import enable_async_views
+        enable_async_views(app)
+        _use_transport(lambda request: httpx.Response(200, json=_CATALOGS))
+
+        client = app.test_client()
+        assert client.get("/api/v1/metadata/catalogs").status_code == 401
+        client.post("/api/v1/auth/register", json={
+            "email": "async@example.com", "password": "password123", "name": "Async",
+        })
+        client.post("/api/v1/auth/login", json={"email": "async@example.com", "password": "password123"})
+        with patch("backend.connectai.client.generate_connect_ai_jwt", return_value="tok"):
+            resp = client.get("/api/v1/metadata/catalogs")
+        assert resp.status_code == 200
+        assert resp.get_json() == {"catalogs": [{"TABLE_CATALOG": "SF"}]}
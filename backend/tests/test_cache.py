@@ -0,0 +1,236 @@
+"""
+キャッシュ基盤のテスト
+
+対象:
+  - backend/cache/memory.py
+  - backend/cache/loader.py
+  - backend/cache/sqlite.py
+"""
+import asyncio
+import sqlite3
+import time
+from unittest.mock import patch
+
+import pytest
+from backend.cache import CacheLoader, MemoryCache, SQLiteCache, create_cache_backend
+
+
+# ---------------------------------------------------------------------------
+# MemoryCache
+# ---------------------------------------------------------------------------
+
+class TestMemoryCache:
+
+    def test_set_and_get(self):
+        cache = MemoryCache()
+        cache.set("k", [{"a": 1}], ttl=60)
+        entry = cache.get("k")
+        assert entry.value == [{"a": 1}]
+        assert entry.fresh_until > time.time()
+
+    def test_expired_entry_removed(self):
+        cache = MemoryCache()
+        cache.set("k", "v", ttl=10, stale_ttl=5)
+        with patch("backend.cache.memory.time.time", return_value=time.time() + 16):
+            assert cache.get("k") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction_by_size(self):
+        cache = MemoryCache(max_bytes=30)
+        cache.set("a", "x" * 8, ttl=60)   # 10 bytes
+        cache.set("b", "x" * 8, ttl=60)
+        cache.get("a")                    # a を最近使ったことにする
+        cache.set("c", "x" * 8, ttl=60)
+        cache.set("d", "x" * 8, ttl=60)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        stats = cache.stats()
+        assert stats["bytes"] <= 30
+        assert stats["evictions"] == 1
+
+    def test_delete_prefix(self):
+        cache = MemoryCache()
+        cache.set("metadata:t1:a", 1, ttl=60)
+        cache.set("metadata:t1:b", 2, ttl=60)
+        cache.set("metadata:t2:a", 3, ttl=60)
+        assert cache.delete_prefix("metadata:t1:") == 2
+        assert cache.get("metadata:t2:a").value == 3
+
+
+# ---------------------------------------------------------------------------
+# CacheLoader
+# ---------------------------------------------------------------------------
+
+class TestCacheLoader:
+
+    def test_loads_once_within_ttl(self):
+        loader = CacheLoader(MemoryCache())
+        calls = []
+        for _ in range(3):
+            value = loader.get_or_load("k", lambda: calls.append(1) or "v", ttl=60)
+        assert value == "v"
+        assert len(calls) == 1
+        stats = loader.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+
+    def test_loader_error_not_cached(self):
+        loader = CacheLoader(MemoryCache())
+
+        def _fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            loader.get_or_load("k", _fail, ttl=60)
+        assert loader.get_or_load("k", lambda: "ok", ttl=60) == "ok"
+
+    def test_invalidate_discards_in_flight_result(self):
+        loader = CacheLoader(MemoryCache())
+
+        def _load():
+            loader.invalidate_prefix("k")  # 取得中に無効化された
+            return "old"
+
+        assert loader.get_or_load("k", _load, ttl=60) == "old"
+        assert loader.cache.get("k") is None
+
+    def test_aget_or_load_refreshes_stale_in_background(self):
+        loader = CacheLoader(MemoryCache())
+        calls = []
+
+        async def _load():
+            calls.append(1)
+            return f"v{len(calls)}"
+
+        assert asyncio.run(loader.aget_or_load("k", _load, ttl=10, stale_ttl=60)) == "v1"
+        assert asyncio.run(loader.aget_or_load("k", _load, ttl=10, stale_ttl=60)) == "v1"
+        with patch("backend.cache.loader.time.time", return_value=time.time() + 20):
+            # stale: 古い値を返し、裏で asyncio.run(loader()) を実行する
+            assert asyncio.run(loader.aget_or_load("k", _load, ttl=10, stale_ttl=60)) == "v1"
+        loader._executor.shutdown(wait=True)
+        assert loader.cache.get("k").value == "v2"
+        assert loader.stats()["refreshes"] == 1
+
+
+# ---------------------------------------------------------------------------
+# SQLiteCache（ワーカー間共有）
+# ---------------------------------------------------------------------------
+
+class TestSQLiteCache:
+
+    def test_shared_between_instances(self, tmp_path):
+        """同じファイルを開いた別インスタンス（別ワーカー相当）から値が見えること"""
+        path = str(tmp_path / "cache.sqlite3")
+        worker1 = SQLiteCache(path)
+        worker2 = SQLiteCache(path)
+        worker1.set("metadata:t1:catalogs", [{"TABLE_CATALOG": "SF"}], ttl=60)
+
+        entry = worker2.get("metadata:t1:catalogs")
+        assert entry.value == [{"TABLE_CATALOG": "SF"}]
+
+    def test_uses_wal_mode(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+        (mode,) = cache._conn().execute("PRAGMA journal_mode").fetchone()
+        assert mode == "wal"
+
+    def test_expired_entry_removed(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+        cache.set("k", "v", ttl=10)
+        with patch("backend.cache.sqlite.time.time", return_value=time.time() + 11):
+            assert cache.get("k") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_size_bounded_eviction(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_bytes=30)
+        with patch("backend.cache.sqlite.time.time", return_value=1000.0):
+            cache.set("a", "x" * 8, ttl=60)
+        with patch("backend.cache.sqlite.time.time", return_value=1001.0):
+            cache.set("b", "x" * 8, ttl=60)
+        with patch("backend.cache.sqlite.time.time", return_value=1002.0):
+            cache.set("c", "x" * 8, ttl=60)
+            cache.set("d", "x" * 8, ttl=60)
+            assert cache.get("a") is None
+            assert cache.get("d") is not None
+        stats = cache.stats()
+        assert stats["bytes"] <= 30
+        assert stats["evictions"] == 1
+
+    def test_running_total_matches_entries(self, tmp_path):
+        """合計サイズは上書き・削除・別インスタンスからの書き込みでも SUM(size) と一致すること"""
+        path = str(tmp_path / "cache.sqlite3")
+        worker1, worker2 = SQLiteCache(path), SQLiteCache(path)
+        worker1.set("query:t1:a", "x" * 100, ttl=60)
+        worker2.set("query:t1:a", "x" * 10, ttl=60)
+        worker2.set("query:t1:b", [1, 2, 3], ttl=60)
+        worker1.set("query:t2:a", {"k": "v"}, ttl=60)
+        worker1.delete("query:t2:a")
+        worker2.delete_prefix("query:t1:b")
+
+        (expected,) = worker1._conn().execute("SELECT SUM(size) FROM cache_entries").fetchone()
+        assert worker1.stats()["bytes"] == worker2.stats()["bytes"] == expected == 12
+        worker1.clear()
+        assert worker2.stats()["bytes"] == 0
+
+    def test_running_total_initialized_for_existing_file(self, tmp_path):
+        """合計サイズの表がないファイルを開いた場合は既存の行から初期化すること"""
+        path = str(tmp_path / "cache.sqlite3")
+        SQLiteCache(path).set("k", "x" * 8, ttl=60)
+        conn = sqlite3.connect(path)
+        conn.executescript("DROP TABLE cache_stats;")
+        conn.close()
+        assert SQLiteCache(path).stats()["bytes"] == 10
+
+    def test_indexes_for_eviction(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+        indexes = {row[1] for row in cache._conn().execute("PRAGMA index_list(cache_entries)")}
+        assert {"ix_cache_entries_last_access", "ix_cache_entries_stale_until"} <= indexes
+
+    def test_expired_rows_purged_periodically_or_over_budget(self, tmp_path):
+        """期限切れの行は書き込みのたびではなく、一定間隔または上限超過時に削除すること"""
+        cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), max_bytes=30)
+
+        def _rows() -> int:
+            return cache._conn().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+        with patch("backend.cache.sqlite.time.time", return_value=1000.0):
+            cache.set("old", "x" * 8, ttl=1)
+        with patch("backend.cache.sqlite.time.time", return_value=1010.0):
+            cache.set("b", "x" * 8, ttl=60)
+            assert _rows() == 2  # 上限以内・間隔内なので期限切れの行は残す
+            cache.set("c", "x" * 8, ttl=60)
+            cache.set("d", "x" * 8, ttl=60)
+            assert cache.get("old") is None
+            assert cache.get("b") is not None  # 期限切れの行を先に削除し、有効な行は追い出さない
+        assert cache.stats()["evictions"] == 0
+        cache.delete_prefix("c")
+        cache.delete_prefix("d")
+        with patch("backend.cache.sqlite.time.time", return_value=1100.0):
+            cache.set("e", "x", ttl=60)  # 上限以内でも前回から一定時間経てば削除する
+        assert _rows() == 1
+
+    def test_delete_prefix(self, tmp_path):
+        cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+        cache.set("query:t1:a", 1, ttl=60)
+        cache.set("query:t1:b", 2, ttl=60)
+        cache.set("query:t2:a", 3, ttl=60)
+        assert cache.delete_prefix("query:t1:") == 2
+        assert cache.get("query:t2:a").value == 3
+
+    def test_loader_with_sqlite_backend(self, tmp_path):
+        """CacheLoader のバックエンドとして差し替えられること"""
+        path = str(tmp_path / "cache.sqlite3")
+        worker1 = CacheLoader(SQLiteCache(path))
+        worker2 = CacheLoader(SQLiteCache(path))
+        calls = []
+        worker1.get_or_load("k", lambda: calls.append(1) or ["v"], ttl=60)
+        assert worker2.get_or_load("k", lambda: calls.append(1) or ["v"], ttl=60) == ["v"]
+        assert len(calls) == 1
+
+    def test_backend_selected_by_config(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite3")
+        assert isinstance(create_cache_backend({"CACHE_BACKEND": "memory"}), MemoryCache)
+        backend = create_cache_backend({"CACHE_BACKEND": "sqlite", "CACHE_SQLITE_PATH": path})
+        assert isinstance(backend, SQLiteCache)
+        with pytest.raises(ValueError):
+            create_cache_backend({"CACHE_BACKEND": "redis"})
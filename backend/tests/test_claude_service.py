@@ -121,7 +121,12 @@ class TestChatEndTurn:
             chat(SAMPLE_API_KEY, SAMPLE_JWT, [{"role": "user", "content": "test"}])
 
         call_kwargs = mock_client.messages.create.call_args[1]
-        assert call_kwargs["tools"] == SAMPLE_TOOLS
+        # MCP のツール定義 + 省略した結果を取得するローカルツール
+        assert [t["name"] for t in call_kwargs["tools"]] == [t["name"] for t in SAMPLE_TOOLS] + [
+            "readToolResult"
+        ]
+        # ツール定義はプロンプトキャッシュの対象
+        assert call_kwargs["tools"][-1]["cache_control"] == {"type": "ephemeral"}
 
     def test_catalog_name_added_to_system(self):
         mock_response = _Response("end_turn", [_TextBlock("ok")])
@@ -138,7 +143,8 @@ class TestChatEndTurn:
                  catalog_name="SalesDB")
 
         system = mock_client.messages.create.call_args[1]["system"]
-        assert "SalesDB" in system
+        assert "SalesDB" in system[0]["text"]
+        assert system[0]["cache_control"] == {"type": "ephemeral"}
 
     def test_no_catalog_name_no_catalog_in_system(self):
         mock_response = _Response("end_turn", [_TextBlock("ok")])
@@ -154,7 +160,7 @@ class TestChatEndTurn:
             chat(SAMPLE_API_KEY, SAMPLE_JWT, [{"role": "user", "content": "test"}])
 
         system = mock_client.messages.create.call_args[1]["system"]
-        assert "カタログ" not in system
+        assert "カタログ" not in system[0]["text"]
 
     def test_multiple_text_blocks_joined(self):
         mock_response = _Response("end_turn", [
@@ -311,7 +317,10 @@ class TestChatHistory:
         assert len(messages) == 3
         assert messages[0]["content"] == "最初の質問"
         assert messages[1]["content"] == "最初の回答"
-        assert messages[2]["content"] == "2回目の質問"
+        # 最後のメッセージはキャッシュのブレークポイント付きのテキストブロックになる
+        assert messages[2]["content"] == [
+            {"type": "text", "text": "2回目の質問", "cache_control": {"type": "ephemeral"}}
+        ]
 
 
 # ---------------------------------------------------------------------------
@@ -453,3 +462,428 @@ class TestStreamChat:
         tool_result = next(d for et, d in events if et == "tool_result")
         assert "エラー" in tool_result["result"]
         assert "Connection refused" in tool_result["result"]
+
+
+# ---------------------------------------------------------------------------
+# 複数ツールの並行実行
+# ---------------------------------------------------------------------------
+
+class _SlowTools:
+    """ツール名ごとの待ち時間で応答し、同時実行数の最大値を記録する call_tool"""
+
+    def __init__(self, delays: dict):
+        import threading
+        self.delays = delays
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, name, tool_input, on_progress=None):
+        import time
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delays[tool_input["table"]])
+        with self.lock:
+            self.active -= 1
+        return f"columns of {tool_input['table']}"
+
+
+_PARALLEL_BLOCKS = [
+    _ToolUseBlock(f"tu_{i}", "getColumns", {"table": t})
+    for i, t in enumerate(["Account", "Contact", "Lead", "Opportunity"])
+]
+_PARALLEL_DELAYS = {"Account": 0.15, "Contact": 0.1, "Lead": 0.05, "Opportunity": 0.01}
+
+
+class TestParallelTools:
+    def _run_chat(self, slow_tools):
+        with patch("backend.services.claude_service.Anthropic") as MockAnthropic, \
+             patch("backend.services.claude_service.get_mcp_tools", return_value=SAMPLE_TOOLS), \
+             patch("backend.services.claude_service.MCPClient") as MockMCPClient:
+            mock_client = MagicMock()
+            MockAnthropic.return_value = mock_client
+            mock_client.messages.create.side_effect = [
+                _Response("tool_use", _PARALLEL_BLOCKS),
+                _Response("end_turn", [_TextBlock("完了")]),
+            ]
+            MockMCPClient.return_value.call_tool.side_effect = slow_tools
+            _, tool_calls = chat(SAMPLE_API_KEY, SAMPLE_JWT, [{"role": "user", "content": "q"}])
+        tool_results = mock_client.messages.create.call_args_list[1].kwargs["messages"][-1]["content"]
+        return tool_calls, tool_results
+
+    def test_chat_runs_tools_concurrently_in_order(self):
+        slow_tools = _SlowTools(_PARALLEL_DELAYS)
+        tool_calls, tool_results = self._run_chat(slow_tools)
+
+        assert slow_tools.max_active == 4
+        assert [r["tool_use_id"] for r in tool_results] == ["tu_0", "tu_1", "tu_2", "tu_3"]
+        assert [c["result"] for c in tool_calls] == [
+            "columns of Account", "columns of Contact", "columns of Lead", "columns of Opportunity",
+        ]
+
+    def test_concurrency_cap(self, app):
+        app.config["MCP_TOOL_CONCURRENCY"] = 2
+        slow_tools = _SlowTools(_PARALLEL_DELAYS)
+        with app.app_context():
+            _, tool_results = self._run_chat(slow_tools)
+
+        assert slow_tools.max_active == 2
+        assert [r["tool_use_id"] for r in tool_results] == ["tu_0", "tu_1", "tu_2", "tu_3"]
+
+    def test_stream_emits_results_as_each_call_finishes(self):
+        slow_tools = _SlowTools(_PARALLEL_DELAYS)
+        with patch("backend.services.claude_service.Anthropic") as MockAnthropic, \
+             patch("backend.services.claude_service.get_mcp_tools", return_value=SAMPLE_TOOLS), \
+             patch("backend.services.claude_service.MCPClient") as MockMCPClient:
+            mock_client = MagicMock()
+            MockAnthropic.return_value = mock_client
+            mock_client.messages.stream.side_effect = [
+                _MockStream([], "tool_use", _PARALLEL_BLOCKS),
+                _MockStream(["完了"], "end_turn"),
+            ]
+            MockMCPClient.return_value.call_tool.side_effect = slow_tools
+            events = list(stream_chat(SAMPLE_API_KEY, SAMPLE_JWT, [{"role": "user", "content": "q"}]))
+        tool_results = mock_client.messages.stream.call_args_list[1].kwargs["messages"][-1]["content"]
+
+        starts = [d["tool_use_id"] for et, d in events if et == "tool_start"]
+        finished = [d["tool_use_id"] for et, d in events if et == "tool_result"]
+        assert starts == ["tu_0", "tu_1", "tu_2", "tu_3"]
+        # 待ち時間の短い順に完了する
+        assert finished == ["tu_3", "tu_2", "tu_1", "tu_0"]
+        # Claude に返す tool_result は元の順序
+        assert [r["tool_use_id"] for r in tool_results] == ["tu_0", "tu_1", "tu_2", "tu_3"]
+
+
+# ---------------------------------------------------------------------------
+# プロンプトキャッシュ
+# ---------------------------------------------------------------------------
+
+class _Usage:
+    def __init__(self, input_tokens, output_tokens, cache_creation=0, cache_read=0):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cache_creation_input_tokens = cache_creation
+        self.cache_read_input_tokens = cache_read
+
+
+def _with_usage(response, usage):
+    response.usage = usage
+    return response
+
+
+class TestPromptCache:
+    def _tool_then_end(self):
+        return [
+            _with_usage(_Response("tool_use", [_ToolUseBlock("tu_001", "getCatalogs", {})]),
+                        _Usage(20, 10, cache_creation=3000)),
+            _with_usage(_Response("end_turn", [_TextBlock("ok")]),
+                        _Usage(50, 30, cache_read=3000)),
+        ]
+
+    def test_breakpoint_moves_to_latest_message(self):
+        with patch("backend.services.claude_service.Anthropic") as MockAnthropic, \
+             patch("backend.services.claude_service.get_mcp_tools", return_value=SAMPLE_TOOLS), \
+             patch("backend.services.claude_service.MCPClient") as MockMCPClient:
+            mock_client = MagicMock()
+            MockAnthropic.return_value = mock_client
+            mock_client.messages.create.side_effect = self._tool_then_end()
+            MockMCPClient.return_value.call_tool.return_value = "cat1"
+            history = [{"role": "user", "content": "q"}]
+            chat(SAMPLE_API_KEY, SAMPLE_JWT, history)
+
+        second = mock_client.messages.create.call_args_list[1].kwargs["messages"]
+        marked = [
+            (i, b) for i, m in enumerate(second) if isinstance(m["content"], list)
+            for b in m["content"] if "cache_control" in b
+        ]
+        # ブレークポイントは最新のメッセージ（tool_result）の 1 か所だけ
+        assert len(marked) == 1
+        assert marked[0][0] == len(second) - 1
+        assert marked[0][1]["type"] == "tool_result"
+        # 呼び出し元の履歴は変更しない
+        assert history == [{"role": "user", "content": "q"}]
+
+    def test_chat_records_cache_usage(self):
+        usage: dict = {}
+        with patch("backend.services.claude_service.Anthropic") as MockAnthropic, \
+             patch("backend.services.claude_service.get_mcp_tools", return_value=SAMPLE_TOOLS), \
+             patch("backend.services.claude_service.MCPClient") as MockMCPClient:
+            mock_client = MagicMock()
+            MockAnthropic.return_value = mock_client
+            mock_client.messages.create.side_effect = self._tool_then_end()
+            MockMCPClient.return_value.call_tool.return_value = "cat1"
+            chat(SAMPLE_API_KEY, SAMPLE_JWT, [{"role": "user", "content": "q"}], usage=usage)
+
+        iterations = usage.pop("iterations")
+        assert usage == {
+            "requests": 2,
+            "input_tokens": 70,
+            "output_tokens": 40,
+            "cache_creation_input_tokens": 3000,
+            "cache_read_input_tokens": 3000,
+        }
+        # 呼び出しごとの入力トークン数（キャッシュ分を含む）
+        assert [it["input_tokens"] for it in iterations] == [3020, 3050]
+
+    def test_stream_done_event_includes_usage(self):
+        tool_stream = _MockStream([], "tool_use", [_ToolUseBlock("tu_001", "getCatalogs", {})])
+        tool_stream._final_message.usage = _Usage(20, 10, cache_creation=3000)
+        final_stream = _MockStream(["ok"], "end_turn")
+        final_stream._final_message.usage = _Usage(50, 30, cache_read=3000)
+
+        with patch("backend.services.claude_service.Anthropic") as MockAnthropic, \
+             patch("backend.services.claude_service.get_mcp_tools", return_value=SAMPLE_TOOLS), \
+             patch("backend.services.claude_service.MCPClient") as MockMCPClient:
+            mock_client = MagicMock()
+            MockAnthropic.return_value = mock_client
+            mock_client.messages.stream.side_effect = [tool_stream, final_stream]
+            MockMCPClient.return_value.call_tool.return_value = "cat1"
+            events = list(stream_chat(SAMPLE_API_KEY, SAMPLE_JWT, [{"role": "user", "content": "q"}]))
+
+        done = events[-1][1]
+        assert done["usage"]["cache_read_input_tokens"] == 3000
+        assert done["usage"]["requests"] == 2
+
+    def test_stream_logs_cache_usage_per_conversation(self, app, caplog):
+        tool_stream = _MockStream([], "tool_use", [_ToolUseBlock("tu_001", "getCatalogs", {})])
+        tool_stream._final_message.usage = _Usage(20, 10, cache_creation=3000)
+        final_stream = _MockStream(["ok"], "end_turn")
+        final_stream._final_message.usage = _Usage(50, 30, cache_read=3000)
+
+        with app.app_context(), caplog.at_level("INFO", logger=app.logger.name), \
+             patch("backend.services.claude_service.Anthropic") as MockAnthropic, \
+             patch("backend.services.claude_service.get_mcp_tools", return_value=SAMPLE_TOOLS), \
+             patch("backend.services.claude_service.MCPClient") as MockMCPClient:
+            mock_client = MagicMock()
+            MockAnthropic.return_value = mock_client
+            mock_client.messages.stream.side_effect = [tool_stream, final_stream]
+            MockMCPClient.return_value.call_tool.return_value = "cat1"
+            list(stream_chat(SAMPLE_API_KEY, SAMPLE_JWT, [{"role": "user", "content": "q"}],
+                             account_id="acct-1", conversation_id="conv-1"))
+
+        records = [r.claude_usage for r in caplog.records if hasattr(r, "claude_usage")]
+        assert records == [{
+            "account_id": "acct-1",
+            "conversation_id": "conv-1",
+            "status": "complete",
+            "requests": 2,
+            "input_tokens": 70,
+            "output_tokens": 40,
+            "cache_creation_input_tokens": 3000,
+            "cache_read_input_tokens": 3000,
+        }]
+
+    def test_cache_disabled(self, app):
+        app.config["CLAUDE_PROMPT_CACHE"] = False
+        with app.app_context(), \
+             patch("backend.services.claude_service.Anthropic") as MockAnthropic, \
+             patch("backend.services.claude_service.get_mcp_tools", return_value=SAMPLE_TOOLS), \
+             patch("backend.services.claude_service.MCPClient"):
+            mock_client = MagicMock()
+            MockAnthropic.return_value = mock_client
+            mock_client.messages.create.return_value = _Response("end_turn", [_TextBlock("ok")])
+            chat(SAMPLE_API_KEY, SAMPLE_JWT, [{"role": "user", "content": "q"}])
+
+        kwargs = mock_client.messages.create.call_args.kwargs
+        assert isinstance(kwargs["system"], str)
+        assert kwargs["tools"][:-1] == SAMPLE_TOOLS
+        assert "cache_control" not in kwargs["tools"][-1]
+        assert kwargs["messages"] == [{"role": "user", "content": "q"}]
+
+
+class TestToolProgress:
+    def test_stream_emits_tool_progress(self):
+        def call_tool(name, tool_input, on_progress=None):
+            on_progress({"progressToken": "t", "progress": 500, "total": 1000, "message": "500 行"})
+            return "done"
+
+        with patch("backend.services.claude_service.Anthropic") as MockAnthropic, \
+             patch("backend.services.claude_service.get_mcp_tools", return_value=SAMPLE_TOOLS), \
+             patch("backend.services.claude_service.MCPClient") as MockMCPClient:
+            mock_client = MagicMock()
+            MockAnthropic.return_value = mock_client
+            mock_client.messages.stream.side_effect = [
+                _MockStream([], "tool_use", [_ToolUseBlock("tu_001", "queryData", {"query": "SELECT 1"})]),
+                _MockStream(["完了"], "end_turn"),
+            ]
+            MockMCPClient.return_value.call_tool.side_effect = call_tool
+            events = list(stream_chat(SAMPLE_API_KEY, SAMPLE_JWT, [{"role": "user", "content": "q"}]))
+
+        types = [et for et, _ in events if et.startswith("tool_")]
+        assert types == ["tool_start", "tool_progress", "tool_result"]
+        progress = next(d for et, d in events if et == "tool_progress")
+        assert progress == {
+            "tool_use_id": "tu_001", "tool_name": "queryData",
+            "progress": 500, "total": 1000, "message": "500 行",
+        }
+
+
+# ---------------------------------------------------------------------------
+# 会話コンテキストの圧縮（トークン予算）
+# ---------------------------------------------------------------------------
+
+def _tool_turn(question: str, tool_id: str, result: str) -> list[dict]:
+    return [
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": [
+            {"type": "tool_use", "id": tool_id, "name": "queryData", "input": {}},
+        ]},
+        {"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": tool_id, "content": result},
+        ]},
+        {"role": "assistant", "content": "回答"},
+    ]
+
+
+class TestContextBudget:
+    def _budget(self, budget: int):
+        from backend.services.claude_service import _ContextBudget
+        return _ContextBudget(budget, "system", SAMPLE_TOOLS)
+
+    def test_within_budget_unchanged(self):
+        messages = _tool_turn("q1", "tu_1", "a,b\n1,2") + [{"role": "user", "content": "q2"}]
+        original = list(messages)
+        assert self._budget(100000).fit(messages) == 0
+        assert messages == original
+
+    def test_old_tool_results_compacted_first(self):
+        messages = (_tool_turn("q1", "tu_1", "x" * 20000)
+                    + [{"role": "user", "content": "q2"}])
+        budget = self._budget(2000)
+        assert budget.fit(messages) == 1
+        assert budget.estimate(messages) <= 2000
+        # ターンは残し、古いツール結果だけ省略する
+        assert [m["role"] for m in messages] == ["user", "assistant", "user", "assistant", "user"]
+        result = messages[2]["content"][0]["content"]
+        assert result.startswith("x" * 300)
+        assert "全 20000 文字" in result
+
+    def test_old_turns_dropped_with_summary(self):
+        messages = []
+        for i in range(20):
+            messages += _tool_turn(f"質問{i}", f"tu_{i}", "y" * 200)
+        messages.append({"role": "user", "content": "最新の質問"})
+        budget = self._budget(1500)
+        budget.fit(messages)
+
+        assert budget.estimate(messages) <= 1500
+        assert messages[0]["role"] == "user"
+        assert "以前のユーザーの質問" in messages[0]["content"]
+        # 要約には直近の発言から _SUMMARY_MAX_QUESTIONS 件まで残す
+        assert "「質問10」" in messages[0]["content"]
+        assert "「質問0」" not in messages[0]["content"]
+        assert messages[-1] == {"role": "user", "content": "最新の質問"}
+        # tool_use と tool_result の対応が崩れていないこと
+        for i, m in enumerate(messages):
+            if m["role"] == "user" and isinstance(m["content"], list):
+                assert messages[i - 1]["content"][0]["type"] == "tool_use"
+
+    def test_latest_tool_result_truncated_as_last_resort(self):
+        messages = [
+            {"role": "user", "content": "q"},
+            {"role": "assistant", "content": [
+                {"type": "tool_use", "id": "tu_1", "name": "queryData", "input": {}},
+            ]},
+            {"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": "tu_1", "content": "z" * 50000},
+            ]},
+        ]
+        budget = self._budget(3000)
+        assert budget.fit(messages) == 1
+        assert budget.estimate(messages) <= 3000
+        assert "コンテキストの上限のため省略" in messages[2]["content"][0]["content"]
+
+    def test_estimate_matches_full_serialization(self):
+        from backend.services.claude_service import _BYTES_PER_TOKEN, _json_size
+        messages = _tool_turn("q1", "tu_1", "a,b\n1,2") + [{"role": "user", "content": "q2"}]
+        size = _json_size("system") + _json_size(SAMPLE_TOOLS) + _json_size(messages)
+        assert self._budget(100000).estimate(messages) == int(size * (1 / _BYTES_PER_TOKEN))
+
+    def test_long_conversation_serializes_each_message_once(self):
+        """圧縮中に会話全体を JSON 化し直さないこと（メッセージ数に比例した回数で済む）"""
+        from backend.services import claude_service
+        messages = []
+        for i in range(300):
+            messages += _tool_turn(f"質問{i}", f"tu_{i}", "y" * 200)
+        messages.append({"role": "user", "content": "最新の質問"})
+        budget = self._budget(1500)
+        conversation_bytes = claude_service._json_size(messages)
+        serialized = []
+        original = claude_service._json_size
+
+        def counting(value):
+            size = original(value)
+            serialized.append(size)
+            return size
+
+        with patch.object(claude_service, "_json_size", counting):
+            budget.fit(messages)
+            budget.estimate(messages)
+        assert budget.estimate(messages) <= 1500
+        # 元のメッセージ 1 回ずつ + 差し替えたメッセージの分（全体の再 JSON 化なら数百倍になる）
+        assert sum(serialized) < 2 * conversation_bytes
+
+    def test_observe_calibrates_estimate(self):
+        messages = [{"role": "user", "content": "q" * 1000}]
+        budget = self._budget(100000)
+        budget.observe(messages, 5000)
+        assert budget.estimate(messages) == 5000
+
+    def test_chat_compacts_between_iterations(self, app):
+        app.config["CLAUDE_CONTEXT_TOKEN_BUDGET"] = 2000
+        with app.app_context(), \
+             patch("backend.services.claude_service.Anthropic") as MockAnthropic, \
+             patch("backend.services.claude_service.get_mcp_tools", return_value=SAMPLE_TOOLS), \
+             patch("backend.services.claude_service.MCPClient") as MockMCPClient:
+            mock_client = MagicMock()
+            MockAnthropic.return_value = mock_client
+            mock_client.messages.create.side_effect = [
+                _Response("tool_use", [_ToolUseBlock("tu_001", "queryData", {})]),
+                _Response("tool_use", [_ToolUseBlock("tu_002", "queryData", {})]),
+                _Response("end_turn", [_TextBlock("ok")]),
+            ]
+            MockMCPClient.return_value.call_tool.return_value = "r" * 5000
+            usage: dict = {}
+            chat(SAMPLE_API_KEY, SAMPLE_JWT, [{"role": "user", "content": "q"}], usage=usage)
+
+        third = mock_client.messages.create.call_args_list[2].kwargs["messages"]
+        first_result = third[2]["content"][0]["content"]
+        assert "以前のツール結果のため省略" in first_result
+        assert [it["compacted"] > 0 for it in usage["iterations"]] == [False, False, True]
+
+
+# ---------------------------------------------------------------------------
+# ツール結果の整形
+# ---------------------------------------------------------------------------
+
+class TestToolResultShaping:
+    def test_large_result_shaped_and_readable_by_handle(self, app):
+        app.config.update(MCP_TOOL_RESULT_MAX_ROWS=50, MCP_TOOL_RESULT_SAMPLE_ROWS=4)
+        csv_text = "Id,Name\n" + "\n".join(f"{i},name{i}" for i in range(1000))
+        with app.app_context(), \
+             patch("backend.services.claude_service.Anthropic") as MockAnthropic, \
+             patch("backend.services.claude_service.get_mcp_tools", return_value=SAMPLE_TOOLS), \
+             patch("backend.services.claude_service.MCPClient") as MockMCPClient:
+            mock_client = MagicMock()
+            MockAnthropic.return_value = mock_client
+            mock_client.messages.create.side_effect = [
+                _Response("tool_use", [_ToolUseBlock("tu_001", "queryData", {"query": "SELECT"})]),
+                _Response("end_turn", [_TextBlock("ok")]),
+            ]
+            MockMCPClient.return_value.account_id = "acct-1"
+            MockMCPClient.return_value.call_tool.return_value = csv_text
+            _, tool_calls = chat(SAMPLE_API_KEY, SAMPLE_JWT, [{"role": "user", "content": "q"}])
+
+            shaped = tool_calls[0]["result"]
+            assert "全 1000 行" in shaped
+            assert "- Id: NULL 0 件, 最小 0, 最大 999" in shaped
+            handle = shaped.split('handle "')[1].split('"')[0]
+
+            # Claude が readToolResult を呼ぶと MCP を介さず保存した全件から返す
+            from backend.services.claude_service import _call_tool
+            page = _call_tool(MockMCPClient.return_value,
+                              _ToolUseBlock("tu_002", "readToolResult",
+                                            {"handle": handle, "offset": 10, "limit": 2}))
+        assert page.splitlines()[:3] == ["Id,Name", "10,name10", "11,name11"]
+        assert MockMCPClient.return_value.call_tool.call_count == 1
@@ -0,0 +1,760 @@
+"""
+Connect AI クライアントのテスト
+
+対象:
+  - backend/connectai/http_pool.py
+  - backend/connectai/client.py
+  - backend/connectai/jwt.py
+  - backend/connectai/singleflight.py
+  - backend/connectai/retry.py
+  - backend/connectai/circuit_breaker.py
+  - backend/connectai/decoding.py
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+from backend.connectai.http_pool import HTTPConnectionPool, get_http_pool, reset_http_pool
+
+
+# ---------------------------------------------------------------------------
+# テスト用フィクスチャ
+# ---------------------------------------------------------------------------
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """keep-alive 有効な最小 JSON サーバー"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"ok": True, "path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _JSONHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def _reset_pool():
+    reset_http_pool()
+    yield
+    reset_http_pool()
+
+
+# ---------------------------------------------------------------------------
+# HTTPConnectionPool
+# ---------------------------------------------------------------------------
+
+class TestHTTPConnectionPool:
+
+    def test_reuses_connection_across_requests(self, http_server):
+        pool = HTTPConnectionPool(pool_size=2)
+        for _ in range(5):
+            resp = pool.request("GET", f"{http_server}/catalogs", timeout=5)
+            assert resp.json()["ok"] is True
+
+        stats = pool.stats()
+        assert stats["requests"] == 5
+        assert stats["misses"] == 1
+        assert stats["hits"] == 4
+        assert stats["hit_rate"] == pytest.approx(0.8)
+        pool.close()
+
+    def test_idle_session_is_evicted(self, http_server):
+        pool = HTTPConnectionPool(idle_timeout=0)
+        first = pool.session()
+        pool.request("GET", f"{http_server}/catalogs", timeout=5)
+        with patch("backend.connectai.http_pool.time.monotonic", return_value=10**9):
+            second = pool.session()
+
+        assert first is not second
+        stats = pool.stats()
+        assert stats["evictions"] >= 1
+        # 破棄済みセッションの件数も通算される
+        assert stats["requests"] == 1
+        pool.close()
+
+    def test_session_recycled_after_max_keepalive(self):
+        pool = HTTPConnectionPool(max_keepalive=5, idle_timeout=3600)
+        with patch("backend.connectai.http_pool.time.monotonic", return_value=100.0):
+            first = pool.session()
+        with patch("backend.connectai.http_pool.time.monotonic", return_value=104.0):
+            assert pool.session() is first
+        with patch("backend.connectai.http_pool.time.monotonic", return_value=106.0):
+            assert pool.session() is not first
+        pool.close()
+
+    def test_rotated_session_is_closed_after_in_flight_use(self):
+        pool = HTTPConnectionPool(idle_timeout=0)
+        with patch("backend.connectai.http_pool.time.monotonic", return_value=100.0):
+            lease = pool.lease()
+            leased = lease.__enter__()
+        with patch.object(leased, "close") as close:
+            with patch("backend.connectai.http_pool.time.monotonic", return_value=200.0):
+                assert pool.session() is not leased
+            pool.close()
+            # 入れ替え・close() の時点では使用中のため閉じない
+            close.assert_not_called()
+            lease.__exit__(None, None, None)
+            close.assert_called_once()
+        assert pool._draining == {}
+        assert pool._in_use == {}
+
+    def test_rotation_leaves_directly_held_session_open(self):
+        pool = HTTPConnectionPool(idle_timeout=0)
+        with patch("backend.connectai.http_pool.time.monotonic", return_value=100.0):
+            first = pool.session()
+        with patch.object(first, "close") as close, \
+             patch("backend.connectai.http_pool.time.monotonic", return_value=200.0):
+            assert pool.session() is not first
+        close.assert_not_called()
+        pool.close()
+
+    def test_shared_pool_is_process_wide(self):
+        pool = get_http_pool({"CONNECT_AI_POOL_SIZE": 3})
+        assert get_http_pool() is pool
+        assert pool.pool_size == 3
+
+
+# ---------------------------------------------------------------------------
+# ConnectAIClient
+# ---------------------------------------------------------------------------
+
+class TestConnectAIClientPooling:
+
+    def test_clients_share_pool_and_reuse_connections(self, app, http_server):
+        from backend.connectai.client import ConnectAIClient
+
+        app.config["CONNECT_AI_BASE_URL"] = http_server
+        with app.test_request_context(), \
+             patch("backend.connectai.client.generate_connect_ai_jwt", return_value="tok"):
+            first = ConnectAIClient(child_account_id="child-1")
+            second = ConnectAIClient(child_account_id="child-2")
+            first._get("/catalogs")
+            second._get("/columns", params={"tableName": "Account"})
+
+        assert first._http is second._http
+        stats = get_http_pool().stats()
+        assert stats["requests"] == 2
+        assert stats["hits"] == 1
+
+
+def test_query_payload_sends_none_as_null(app):
+    """パラメーターの None は文字列 "None" ではなく null として送ること"""
+    from backend.connectai.client import ConnectAIClient
+
+    with app.app_context():
+        payload = ConnectAIClient("child-1")._query_payload(
+            "SELECT 1", {"@a": None, "@b": 5}, {"@b": "INTEGER"}
+        )
+    assert payload["parameters"]["@a"]["value"] is None
+    assert payload["parameters"]["@b"]["value"] == "5"
+
+
+# ---------------------------------------------------------------------------
+# generate_connect_ai_jwt（トークンキャッシュ）
+# ---------------------------------------------------------------------------
+
+@pytest.fixture(scope="module")
+def rsa_private_pem() -> str:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+@pytest.fixture
+def jwt_app(app, rsa_private_pem):
+    from backend.connectai.jwt import clear_jwt_cache
+    app.config["CONNECT_AI_PRIVATE_KEY"] = rsa_private_pem
+    clear_jwt_cache()
+    yield app
+    clear_jwt_cache()
+
+
+class TestJwtCache:
+
+    def test_returns_cached_token_for_same_tenant(self, jwt_app):
+        from backend.connectai import jwt as jwt_module
+        with jwt_app.app_context(), \
+             patch.object(jwt_module, "sign_connect_ai_jwt",
+                          wraps=jwt_module.sign_connect_ai_jwt) as mint:
+            first = jwt_module.generate_connect_ai_jwt("parent", "child-1")
+            second = jwt_module.generate_connect_ai_jwt("parent", "child-1")
+
+        assert first == second
+        assert mint.call_count == 1
+
+    def test_tenants_get_separate_tokens(self, jwt_app):
+        import jwt as pyjwt
+        from backend.connectai.jwt import generate_connect_ai_jwt
+        with jwt_app.app_context():
+            token_a = generate_connect_ai_jwt("parent", "child-a")
+            token_b = generate_connect_ai_jwt("parent", "child-b")
+
+        claims = pyjwt.decode(token_b, options={"verify_signature": False})
+        assert token_a != token_b
+        assert claims["sub"] == "child-b"
+        assert claims["iss"] == "parent"
+
+    def test_remints_within_refresh_margin(self, jwt_app):
+        from backend.connectai import jwt as jwt_module
+        jwt_app.config["CONNECT_AI_JWT_REFRESH_MARGIN"] = 300
+        with jwt_app.app_context():
+            jwt_module.generate_connect_ai_jwt("parent", "child-1")
+            _, exp, _ = jwt_module._token_cache[("parent", "child-1")]
+            with patch("backend.connectai.jwt.time.time", return_value=exp - 299), \
+                 patch.object(jwt_module, "sign_connect_ai_jwt",
+                              return_value=("new-token", exp + 3600)) as mint:
+                token = jwt_module.generate_connect_ai_jwt("parent", "child-1")
+
+        assert token == "new-token"
+        mint.assert_called_once()
+
+    def test_concurrent_requests_sign_once(self, jwt_app):
+        from backend.connectai import jwt as jwt_module
+        barrier = threading.Barrier(8)
+        results: list[str] = []
+
+        def _worker():
+            with jwt_app.app_context():
+                barrier.wait()
+                results.append(jwt_module.generate_connect_ai_jwt("parent", "child-1"))
+
+        with patch.object(jwt_module, "sign_connect_ai_jwt",
+                          wraps=jwt_module.sign_connect_ai_jwt) as mint:
+            threads = [threading.Thread(target=_worker) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        assert mint.call_count == 1
+        assert len(set(results)) == 1
+
+    def test_prunes_expired_tokens_and_locks_when_minting(self, jwt_app):
+        from backend.connectai import jwt as jwt_module
+        with jwt_app.app_context(), patch.object(jwt_module, "_prune_at", 4):
+            for i in range(4):
+                jwt_module.generate_connect_ai_jwt("parent", f"child-{i}")
+            assert len(jwt_module._token_cache) == 4
+            _, exp, _ = jwt_module._token_cache[("parent", "child-0")]
+            with patch("backend.connectai.jwt.time.time", return_value=exp + 1):
+                jwt_module.generate_connect_ai_jwt("parent", "child-new")
+
+            assert list(jwt_module._token_cache) == [("parent", "child-new")]
+            assert list(jwt_module._mint_locks) == [("parent", "child-new")]
+
+
+class TestPrivateKeyProvider:
+
+    def test_key_file_parsed_once(self, app, rsa_private_pem, tmp_path):
+        from backend.connectai import jwt as jwt_module
+        key_file = tmp_path / "private.key"
+        key_file.write_text(rsa_private_pem)
+        app.config["CONNECT_AI_PRIVATE_KEY"] = ""
+        app.config["CONNECT_AI_PRIVATE_KEY_PATH"] = str(key_file)
+        jwt_module.clear_jwt_cache()
+
+        with app.app_context(), \
+             patch.object(jwt_module.serialization, "load_pem_private_key",
+                          wraps=jwt_module.serialization.load_pem_private_key) as load:
+            for subject in ("a", "b", "c"):
+                jwt_module.generate_connect_ai_jwt("parent", subject)
+
+        assert load.call_count == 1
+        jwt_module.clear_jwt_cache()
+
+    def test_reloads_and_remints_when_key_file_changes(self, app, rsa_private_pem, tmp_path):
+        import os
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from backend.connectai import jwt as jwt_module
+
+        key_file = tmp_path / "private.key"
+        key_file.write_text(rsa_private_pem)
+        app.config["CONNECT_AI_PRIVATE_KEY"] = ""
+        app.config["CONNECT_AI_PRIVATE_KEY_PATH"] = str(key_file)
+        jwt_module.clear_jwt_cache()
+
+        with app.app_context():
+            before = jwt_module.generate_connect_ai_jwt("parent", "child-1")
+
+            new_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+            key_file.write_bytes(new_key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption(),
+            ))
+            stat = key_file.stat()
+            os.utime(key_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            after = jwt_module.generate_connect_ai_jwt("parent", "child-1")
+
+        assert before != after
+        import jwt as pyjwt
+        pyjwt.decode(after, new_key.public_key(), algorithms=["RS256"])
+        jwt_module.clear_jwt_cache()
+
+    def test_sign_without_key_loading(self, rsa_private_pem):
+        import jwt as pyjwt
+        from cryptography.hazmat.primitives import serialization
+        from backend.connectai.jwt import sign_connect_ai_jwt
+
+        key = serialization.load_pem_private_key(rsa_private_pem.encode(), password=None)
+        token, exp = sign_connect_ai_jwt(key, "parent", "child-1", now=1_000)
+
+        assert exp == 1_000 + 3600
+        claims = pyjwt.decode(token, key.public_key(), algorithms=["RS256"],
+                              options={"verify_exp": False})
+        assert claims["sub"] == "child-1"
+
+
+# ---------------------------------------------------------------------------
+# 同一リクエストの相乗り（single-flight）
+# ---------------------------------------------------------------------------
+
+def _slow_response(release: threading.Event, body: dict):
+    from unittest.mock import MagicMock
+
+    def _request(*args, **kwargs):
+        release.wait(5)
+        resp = MagicMock(status_code=200)
+        resp.content = json.dumps(body).encode()
+        return resp
+    return _request
+
+
+def _run_concurrently(app, fn, n: int) -> list:
+    results: list = []
+    started = threading.Barrier(n + 1)
+
+    def _worker():
+        with app.test_request_context():
+            started.wait()
+            results.append(fn())
+
+    threads = [threading.Thread(target=_worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    started.wait()
+    return threads, results
+
+
+class TestSingleFlight:
+
+    def test_shares_result_and_error(self):
+        from backend.connectai.singleflight import SingleFlight
+        sf = SingleFlight()
+        assert sf.do("k", lambda: 1) == 1
+
+        def _fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            sf.do("k", _fail)
+        assert sf.stats()["in_flight"] == 0
+
+    def test_concurrent_gets_are_coalesced(self, app):
+        from backend.connectai.client import ConnectAIClient, _inflight
+
+        release = threading.Event()
+        body = {"results": [{"schema": [{"columnName": "TABLE_CATALOG"}], "rows": [["SF"]]}]}
+        with patch("backend.connectai.client.generate_connect_ai_jwt", return_value="tok"), \
+             patch("backend.connectai.http_pool.HTTPConnectionPool.request",
+                   side_effect=_slow_response(release, body)) as request:
+            threads, results = _run_concurrently(
+                app, lambda: ConnectAIClient("child-1").get_catalogs(), 5
+            )
+            for _ in range(100):
+                if _inflight.stats()["in_flight"] and request.call_count:
+                    break
+                threading.Event().wait(0.01)
+            threading.Event().wait(0.05)
+            release.set()
+            for t in threads:
+                t.join()
+
+        assert request.call_count == 1
+        assert results == [[{"TABLE_CATALOG": "SF"}]] * 5
+
+    def test_writes_are_not_coalesced(self, app):
+        from backend.connectai.client import ConnectAIClient
+
+        release = threading.Event()
+        release.set()
+        body = {"results": [{"affectedRows": 1}]}
+        with patch("backend.connectai.client.generate_connect_ai_jwt", return_value="tok"), \
+             patch("backend.connectai.http_pool.HTTPConnectionPool.request",
+                   side_effect=_slow_response(release, body)) as request:
+            threads, _ = _run_concurrently(
+                app,
+                lambda: ConnectAIClient("child-1").query_data("DELETE FROM [A].[B].[C]"),
+                3,
+            )
+            for t in threads:
+                t.join()
+
+        assert request.call_count == 3
+
+    def test_different_tenants_are_not_coalesced(self, app):
+        from backend.connectai.client import ConnectAIClient
+
+        release = threading.Event()
+        body = {"results": [{"schema": [{"columnName": "TABLE_CATALOG"}], "rows": [["SF"]]}]}
+        with patch("backend.connectai.client.generate_connect_ai_jwt", return_value="tok"), \
+             patch("backend.connectai.http_pool.HTTPConnectionPool.request",
+                   side_effect=_slow_response(release, body)) as request:
+            tenants = iter(["child-1", "child-2"])
+            lock = threading.Lock()
+
+            def _call():
+                with lock:
+                    tenant = next(tenants)
+                return ConnectAIClient(tenant).get_catalogs()
+
+            threads, _ = _run_concurrently(app, _call, 2)
+            threading.Event().wait(0.1)
+            release.set()
+            for t in threads:
+                t.join()
+
+        assert request.call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# 再試行（指数バックオフ・Retry-After・再試行バジェット）
+# ---------------------------------------------------------------------------
+
+def _response(status: int, body: dict | None = None, headers: dict | None = None):
+    import requests
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = json.dumps(body or {}).encode()
+    resp.headers.update(headers or {})
+    resp.url = "http://connect-ai.test"
+    return resp
+
+
+_CATALOGS = {"results": [{"schema": [{"columnName": "TABLE_CATALOG"}], "rows": [["SF"]]}]}
+
+
+@pytest.fixture
+def retry_app(app):
+    from backend.connectai.retry import reset_retry_budgets
+    reset_retry_budgets()
+    app.config.update(CONNECT_AI_RETRY_BASE_DELAY=0, CONNECT_AI_COALESCE=False)
+    yield app
+    reset_retry_budgets()
+
+
+def _call(app, fn, responses):
+    """HTTP レスポンスを差し替えて fn(client) を呼び、(結果または例外, 送信回数, 記録した試行番号) を返す。"""
+    from backend.connectai.client import ConnectAIClient
+
+    with app.test_request_context(), \
+         patch("backend.connectai.client.generate_connect_ai_jwt", return_value="tok"), \
+         patch("backend.connectai.http_pool.HTTPConnectionPool.request",
+               side_effect=responses) as request, \
+         patch.object(ConnectAIClient, "_log") as log:
+        try:
+            result = fn(ConnectAIClient("child-retry"))
+        except Exception as e:
+            result = e
+    attempts = [c.args[6] for c in log.call_args_list]
+    return result, request.call_count, attempts
+
+
+class TestRetry:
+
+    def test_get_retries_transient_errors(self, retry_app):
+        result, calls, attempts = _call(
+            retry_app, lambda c: c.get_catalogs(),
+            [_response(503), _response(502), _response(200, _CATALOGS)],
+        )
+        assert result == [{"TABLE_CATALOG": "SF"}]
+        assert calls == 3
+        assert attempts == [1, 2, 3]
+
+    def test_connection_error_is_retried(self, retry_app):
+        import requests
+        result, calls, _ = _call(
+            retry_app, lambda c: c.get_catalogs(),
+            [requests.ConnectionError("reset"), _response(200, _CATALOGS)],
+        )
+        assert result == [{"TABLE_CATALOG": "SF"}]
+        assert calls == 2
+
+    def test_gives_up_after_max_attempts(self, retry_app):
+        from backend.connectai.exceptions import ConnectAIError
+        result, calls, _ = _call(
+            retry_app, lambda c: c.get_catalogs(), [_response(503)] * 5,
+        )
+        assert isinstance(result, ConnectAIError)
+        assert calls == 3
+
+    def test_client_errors_are_not_retried(self, retry_app):
+        result, calls, _ = _call(
+            retry_app, lambda c: c.get_catalogs(), [_response(400), _response(200, _CATALOGS)],
+        )
+        assert calls == 1
+
+    def test_retry_after_is_honoured_and_capped(self, retry_app):
+        result, calls, _ = _call(
+            retry_app, lambda c: c.get_catalogs(),
+            [_response(429, headers={"Retry-After": "0"}), _response(200, _CATALOGS)],
+        )
+        assert calls == 2
+        # Retry-After が CONNECT_AI_RETRY_MAX_DELAY を超える場合は待たずに諦める
+        result, calls, _ = _call(
+            retry_app, lambda c: c.get_catalogs(),
+            [_response(429, headers={"Retry-After": "120"}), _response(200, _CATALOGS)],
+        )
+        assert calls == 1
+
+    def test_non_idempotent_calls_are_not_retried(self, retry_app):
+        _, calls, _ = _call(
+            retry_app, lambda c: c.create_connection("n", "Salesforce", "http://r"),
+            [_response(503), _response(200)],
+        )
+        assert calls == 1
+        _, calls, _ = _call(
+            retry_app, lambda c: c.query_data("DELETE FROM [A].[B].[C]"),
+            [_response(503), _response(200)],
+        )
+        assert calls == 1
+
+    def test_select_query_is_retried(self, retry_app):
+        body = {"results": [{"schema": [{"columnName": "Id"}], "rows": [["1"]]}]}
+        result, calls, _ = _call(
+            retry_app, lambda c: c.query_data("SELECT Id FROM [A].[B].[C]"),
+            [_response(504), _response(200, body)],
+        )
+        assert result == (["Id"], [["1"]])
+        assert calls == 2
+
+    def test_budget_limits_retries_per_tenant(self, retry_app):
+        retry_app.config.update(CONNECT_AI_RETRY_BUDGET_BURST=1, CONNECT_AI_RETRY_BUDGET_RATIO=0)
+        _, calls, _ = _call(retry_app, lambda c: c.get_catalogs(), [_response(503)] * 5)
+        assert calls == 2
+        _, calls, _ = _call(retry_app, lambda c: c.get_catalogs(), [_response(503)] * 5)
+        assert calls == 1
+
+    def test_parse_retry_after(self):
+        from backend.connectai.retry import parse_retry_after
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("Thu, 01 Jan 1970 00:01:40 GMT", now=40) == 60.0
+        assert parse_retry_after("soon") is None
+        assert parse_retry_after(None) is None
+
+
+# ---------------------------------------------------------------------------
+# サーキットブレーカー
+# ---------------------------------------------------------------------------
+
+class TestCircuitBreaker:
+
+    def _breaker(self, **kwargs):
+        from backend.connectai.circuit_breaker import CircuitBreaker
+        params = {"failure_rate": 0.5, "min_requests": 4, "window": 30, "open_seconds": 0.05}
+        params.update(kwargs)
+        return CircuitBreaker("test", **params)
+
+    def test_opens_when_failure_rate_exceeded(self):
+        from backend.connectai.circuit_breaker import CircuitOpenError
+        breaker = self._breaker()
+        for ok in (True, False, True):
+            (breaker.record_success if ok else breaker.record_failure)()
+        assert breaker.state == "closed"
+        breaker.record_failure()
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        assert breaker.stats()["rejected"] == 1
+
+    def test_half_open_probe_closes_or_reopens(self):
+        import time
+        from backend.connectai.circuit_breaker import CircuitOpenError
+        breaker = self._breaker(min_requests=1)
+        breaker.record_failure()
+        time.sleep(0.06)
+        assert breaker.state == "half_open"
+        breaker.before_call()
+        # 試行枠（1 件）が埋まっている間は即座に失敗する
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+        time.sleep(0.06)
+        breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_rate_limited_is_neutral(self):
+        import time
+        breaker = self._breaker(min_requests=2)
+        breaker.record_failure()
+        for _ in range(3):
+            breaker.record_status(429)
+        assert breaker.stats()["window_requests"] == 1
+        breaker.record_status(503)
+        assert breaker.state == "open"
+
+        # half-open の試行が 429 なら試行枠を返し、次の試行を通す
+        time.sleep(0.06)
+        breaker.before_call()
+        breaker.record_status(429)
+        assert breaker.state == "half_open"
+        breaker.before_call()
+        breaker.record_status(200)
+        assert breaker.state == "closed"
+
+    def test_client_throttling_does_not_hold_breaker_closed(self, retry_app):
+        retry_app.config.update(
+            CIRCUIT_BREAKER_MIN_REQUESTS=2, CIRCUIT_BREAKER_OPEN_SECONDS=60,
+            CONNECT_AI_RETRY_MAX_ATTEMPTS=1,
+        )
+        for status in (503, 429, 429, 429, 503):
+            _call(retry_app, lambda c: c.get_catalogs(), [_response(status)])
+        _, calls, _ = _call(retry_app, lambda c: c.get_catalogs(), [_response(200, _CATALOGS)])
+        assert calls == 0
+
+    def test_idle_tenant_breakers_are_pruned(self):
+        import time
+        from backend.connectai import circuit_breaker as cb
+        config = {"CIRCUIT_BREAKER_PER_TENANT": True}
+        with patch.object(cb, "_prune_at", 2):
+            busy = cb.get_circuit_breaker("connect-ai", "busy", config)
+            cb.get_circuit_breaker("connect-ai", "idle", config)
+            later = time.monotonic() + 3600
+            with patch.object(busy, "is_idle", return_value=False), \
+                 patch("backend.connectai.circuit_breaker.time.monotonic", return_value=later):
+                cb.get_circuit_breaker("connect-ai", "new", config)
+            tenants = sorted(key[1] for key in cb._breakers)
+        assert tenants == ["busy", "new"]
+
+    def test_client_fails_fast_when_open(self, retry_app):
+        from backend.connectai.exceptions import ConnectAIError
+        retry_app.config.update(
+            CIRCUIT_BREAKER_MIN_REQUESTS=2, CIRCUIT_BREAKER_OPEN_SECONDS=60,
+            CONNECT_AI_RETRY_MAX_ATTEMPTS=1,
+        )
+        for _ in range(2):
+            _call(retry_app, lambda c: c.get_catalogs(), [_response(503)])
+        result, calls, attempts = _call(
+            retry_app, lambda c: c.get_catalogs(), [_response(200, _CATALOGS)],
+        )
+        assert isinstance(result, ConnectAIError)
+        assert "Circuit open" in str(result)
+        assert calls == 0
+        assert attempts == []
+
+    def test_client_errors_do_not_open(self, retry_app):
+        retry_app.config.update(CIRCUIT_BREAKER_MIN_REQUESTS=2)
+        for _ in range(3):
+            _call(retry_app, lambda c: c.get_catalogs(), [_response(404)])
+        _, calls, _ = _call(retry_app, lambda c: c.get_catalogs(), [_response(200, _CATALOGS)])
+        assert calls == 1
+
+    def test_mcp_client_fails_fast_when_open(self, app):
+        import requests
+        from backend.services.mcp_client import MCPClient, MCPError
+        app.config.update(CIRCUIT_BREAKER_MIN_REQUESTS=2, CIRCUIT_BREAKER_OPEN_SECONDS=60)
+        with app.app_context(), \
+             patch("requests.Session.post", side_effect=requests.ConnectionError("down")) as post:
+            for _ in range(3):
+                with pytest.raises(MCPError):
+                    MCPClient("tok").list_tools()
+        assert post.call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# 型付きデコード
+# ---------------------------------------------------------------------------
+
+_TYPED_SCHEMA = [
+    {"columnName": "Id", "dataTypeName": "VARCHAR"},
+    {"columnName": "Qty", "dataTypeName": "INTEGER"},
+    {"columnName": "Amount", "dataType": 7},
+    {"columnName": "Price", "dataTypeName": "DECIMAL"},
+    {"columnName": "Active", "dataTypeName": "BIT"},
+    {"columnName": "Created", "dataTypeName": "TIMESTAMP"},
+    {"columnName": "Day", "dataTypeName": "DATE"},
+]
+_TYPED_ROWS = [
+    ["001", "3", 12.5, "19.99", "true", "2024-01-02T03:04:05Z", "2024-01-02"],
+    ["002", None, "7", None, False, None, "n/a"],
+]
+
+
+class TestDecoding:
+    def test_decode_rows_converts_by_schema(self):
+        from datetime import date, datetime, timezone
+        from decimal import Decimal
+        from backend.connectai.decoding import decode_rows
+
+        rows = decode_rows(_TYPED_SCHEMA, _TYPED_ROWS)
+        assert rows[0] == [
+            "001", 3, 12.5, Decimal("19.99"), True,
+            datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc), date(2024, 1, 2),
+        ]
+        # None はそのまま、変換できない値は元の値のまま残す
+        assert rows[1] == ["002", None, 7.0, None, False, None, "n/a"]
+
+    def test_decode_columns(self):
+        from backend.connectai.decoding import decode_columns
+
+        columns = decode_columns(_TYPED_SCHEMA, _TYPED_ROWS)
+        assert list(columns) == [c["columnName"] for c in _TYPED_SCHEMA]
+        assert columns["Qty"] == [3, None]
+
+    def test_decode_empty_rows(self):
+        from backend.connectai.decoding import decode_columns, decode_rows
+
+        assert decode_rows(_TYPED_SCHEMA, []) == []
+        assert decode_columns(_TYPED_SCHEMA, []) == {c["columnName"]: [] for c in _TYPED_SCHEMA}
+
+    def test_decode_columns_numpy(self):
+        np = pytest.importorskip("numpy")
+        from backend.connectai.decoding import decode_columns
+
+        schema = [{"columnName": "Big", "dataTypeName": "BIGINT"}] + _TYPED_SCHEMA[1:3]
+        rows = [["1", "3", 12.5], ["2", None, "7"]]
+        columns = decode_columns(schema, rows, use_numpy=True)
+        assert columns["Big"].dtype == np.int64
+        # NULL を含む整数カラムは float64 + NaN
+        assert columns["Qty"].dtype == np.float64
+        assert np.isnan(columns["Qty"][1])
+        assert columns["Amount"].tolist() == [12.5, 7.0]
+
+    def test_query_data_typed(self, retry_app):
+        body = {"results": [{"schema": _TYPED_SCHEMA[:2], "rows": [["001", "3"]]}]}
+        (columns, rows), _, _ = _call(
+            retry_app, lambda c: c.query_data("SELECT 1", typed=True), [_response(200, body)]
+        )
+        assert columns == ["Id", "Qty"]
+        assert rows == [["001", 3]]
+
+    def test_query_data_untyped_by_default(self, retry_app):
+        body = {"results": [{"schema": _TYPED_SCHEMA[:2], "rows": [["001", "3"]]}]}
+        (_, rows), _, _ = _call(retry_app, lambda c: c.query_data("SELECT 1"), [_response(200, body)])
+        assert rows == [["001", "3"]]
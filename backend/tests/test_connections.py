@@ -66,6 +66,16 @@ def test_get_datasources_success(client, mock_connect_ai_connections):
     assert data["datasources"][1]["name"] == "QuickBooks"
 
 
+def test_get_datasources_is_cached(client, mock_connect_ai_connections):
+    """データソース一覧はキャッシュされ、2 回目以降は Connect AI を呼ばないこと"""
+    _register_and_login(client)
+    client.get("/api/v1/datasources")
+    resp = client.get("/api/v1/datasources")
+    assert resp.status_code == 200
+    assert len(resp.get_json()["datasources"]) == 2
+    assert mock_connect_ai_connections["datasources"].call_count == 1
+
+
 def test_get_datasources_requires_login(client, mock_connect_ai_connections):
     """未認証でのデータソース取得は 401 が返ること"""
     resp = client.get("/api/v1/datasources")
@@ -1,9 +1,12 @@
 """
 データ CRUD API のテスト（テストファースト）
 """
+import threading
+
 import pytest
 from backend.services.data_service import (
     build_select_sql,
+    build_keyset_select_sql,
     build_count_sql,
     build_insert_sql,
     build_update_sql,
@@ -126,6 +129,296 @@ def test_delete_record_requires_login(client, mock_connect_ai_crud):
     assert resp.status_code == 401
 
 
+# ---------------------------------------------------------------------------
+# COUNT(*) の並行実行
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def clear_pending_counts():
+    from backend.services import data_service
+    data_service._pending_counts.clear()
+    data_service._count_cache.clear()
+    yield
+    data_service._pending_counts.clear()
+    data_service._count_cache.clear()
+
+
+def _slow_count_side_effect(release: threading.Event):
+    """COUNT(*) だけ release されるまでブロックする query_data の代替"""
+    def _query(sql, *args, **kwargs):
+        if "COUNT(*)" in sql:
+            release.wait(5)
+            return ["cnt"], [[42]]
+        return ["Id", "Name"], [["001", "Acme"]]
+    return _query
+
+
+def _count_side_effect(sql, *args, **kwargs):
+    if "COUNT(*)" in sql:
+        return ["cnt"], [[42]]
+    return ["Id"], [["001"]]
+
+
+def _count_calls(mock) -> int:
+    return len([c for c in mock.call_args_list if "COUNT(*)" in c[0][0]])
+
+
+def test_get_records_runs_count_in_parallel(app, client, mock_connect_ai_crud, clear_pending_counts):
+    """COUNT(*) と SELECT の両方が実行され、total が返ること"""
+    _register_and_login(client)
+    mock_connect_ai_crud.side_effect = _count_side_effect
+    resp = client.get("/api/v1/data/records", query_string=_BASE)
+    data = resp.get_json()
+    assert data["total"] == 42
+    assert "total_pending" not in data
+    assert mock_connect_ai_crud.call_count == 2
+
+
+def test_get_records_slow_count_returns_pending(app, client, mock_connect_ai_crud, clear_pending_counts):
+    """COUNT(*) がタイムアウトしたら total=-1 で返し、後から /count で取得できること"""
+    _register_and_login(client)
+    app.config["DATA_COUNT_TIMEOUT"] = 0.05
+    release = threading.Event()
+    mock_connect_ai_crud.side_effect = _slow_count_side_effect(release)
+
+    resp = client.get("/api/v1/data/records", query_string=_BASE)
+    data = resp.get_json()
+    assert resp.status_code == 200
+    assert data["rows"] == [["001", "Acme"]]
+    assert data["total"] == -1
+    assert data["total_pending"] is True
+
+    release.set()
+    resp = client.get("/api/v1/data/records/count", query_string=_BASE)
+    assert resp.status_code == 200
+    assert resp.get_json() == {"total": 42}
+    # 実行中の COUNT を再利用するため COUNT は 1 回だけ
+    assert _count_calls(mock_connect_ai_crud) == 1
+
+
+def test_get_records_count_is_cached(app, client, mock_connect_ai_crud, clear_pending_counts):
+    """同じテーブルのページ送りでは COUNT(*) が再実行されないこと"""
+    _register_and_login(client)
+    mock_connect_ai_crud.side_effect = _count_side_effect
+    client.get("/api/v1/data/records", query_string={**_BASE, "offset": 0})
+    resp = client.get("/api/v1/data/records", query_string={**_BASE, "offset": 20})
+
+    assert resp.get_json()["total"] == 42
+    assert _count_calls(mock_connect_ai_crud) == 1
+
+
+def test_create_record_adjusts_cached_count(app, client, mock_connect_ai_crud, clear_pending_counts):
+    """レコード作成後はキャッシュ済みの件数が +1 されること"""
+    _register_and_login(client)
+    mock_connect_ai_crud.side_effect = _count_side_effect
+    client.get("/api/v1/data/records", query_string=_BASE)
+    client.post("/api/v1/data/records", json={**_BASE, "data": {"Name": "New"}})
+    resp = client.get("/api/v1/data/records", query_string=_BASE)
+
+    assert resp.get_json()["total"] == 43
+    assert _count_calls(mock_connect_ai_crud) == 1
+
+
+def test_delete_record_invalidates_cached_count(app, client, mock_connect_ai_crud, clear_pending_counts):
+    """レコード削除後は COUNT(*) が再実行されること"""
+    _register_and_login(client)
+    mock_connect_ai_crud.side_effect = _count_side_effect
+    client.get("/api/v1/data/records", query_string=_BASE)
+    client.delete("/api/v1/data/records", json={**_BASE, "where": {"Id": "001"}})
+    client.get("/api/v1/data/records", query_string=_BASE)
+
+    assert _count_calls(mock_connect_ai_crud) == 2
+
+
+def test_count_cache_is_per_tenant(app, client, second_user_client, mock_connect_ai_crud,
+                                   clear_pending_counts):
+    """件数キャッシュがテナント（Connect AI アカウント）ごとに分かれていること"""
+    from backend.models import db
+    from backend.models.user import User
+    with app.app_context():
+        user = User.query.filter_by(email="other@example.com").first()
+        user.connect_ai_account_id = "other-child-account"
+        db.session.commit()
+
+    _register_and_login(client)
+    mock_connect_ai_crud.side_effect = _count_side_effect
+    client.get("/api/v1/data/records", query_string=_BASE)
+    second_user_client.get("/api/v1/data/records", query_string=_BASE)
+
+    assert _count_calls(mock_connect_ai_crud) == 2
+
+
+def test_get_record_count_requires_login(client):
+    """未認証での件数取得は 401 が返ること"""
+    resp = client.get("/api/v1/data/records/count", query_string=_BASE)
+    assert resp.status_code == 401
+
+
+# ---------------------------------------------------------------------------
+# keyset ページング
+# ---------------------------------------------------------------------------
+
+_KEYSET_ROWS = [[f"{i:03d}", f"Name{i}"] for i in range(1, 6)]
+
+
+def _keyset_side_effect(sql, params=None, param_types=None):
+    """ORDER BY の並び順と @after0, @after1, ... の続きから LIMIT 件を _KEYSET_ROWS に対して再現する"""
+    if "COUNT(*)" in sql:
+        return ["cnt"], [[len(_KEYSET_ROWS)]]
+    columns = ["Id", "Name"]
+    order = [c.strip()[1:].split("]")[0] for c in sql.split("ORDER BY ")[1].split(" LIMIT")[0].split(",")]
+    key = lambda r: [r[columns.index(c)] for c in order]  # noqa: E731
+    rows = sorted(_KEYSET_ROWS, key=key)
+    if params:
+        after = [params[f"@after{i}"] for i in range(len(order))]
+        rows = [r for r in rows if key(r) > after]
+    limit = int(sql.rsplit("LIMIT", 1)[1])
+    return columns, rows[:limit]
+
+
+@pytest.fixture
+def keyset_mocks(mock_connect_ai_crud, mock_connect_ai_metadata, clear_pending_counts):
+    mock_connect_ai_crud.side_effect = _keyset_side_effect
+    mock_connect_ai_metadata["columns"].return_value = [
+        {"COLUMN_NAME": "Id", "TYPE_NAME": "VARCHAR", "IS_KEY": True},
+        {"COLUMN_NAME": "Name", "TYPE_NAME": "VARCHAR", "IS_KEY": False, "IS_NULLABLE": False},
+    ]
+    return mock_connect_ai_crud
+
+
+def test_get_records_keyset_pages_through_table(client, keyset_mocks):
+    """keyset モードで next_cursor をたどると全件を重複なく取得できること"""
+    _register_and_login(client)
+    seen, cursor = [], None
+    for _ in range(5):
+        query = {**_BASE, "limit": 2, "paging": "keyset"}
+        if cursor:
+            query["cursor"] = cursor
+        data = client.get("/api/v1/data/records", query_string=query).get_json()
+        assert data["paging"] == "keyset"
+        seen.extend(r[0] for r in data["rows"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["001", "002", "003", "004", "005"]
+    # 2 ページ目以降は OFFSET ではなく主キーの続きから取得する
+    page_sqls = [c[0][0] for c in keyset_mocks.call_args_list if "COUNT(*)" not in c[0][0]]
+    assert all("OFFSET" not in sql for sql in page_sqls)
+    assert "WHERE [Id] > @after0" in page_sqls[-1]
+
+
+def test_get_records_keyset_rejects_tampered_cursor(client, keyset_mocks):
+    """改ざんされた継続トークンは 400 になること"""
+    _register_and_login(client)
+    resp = client.get("/api/v1/data/records", query_string={**_BASE, "cursor": "bogus"})
+    assert resp.status_code == 400
+
+
+def test_get_records_keyset_cursor_is_bound_to_table(client, keyset_mocks):
+    """別テーブルの継続トークンは受け付けないこと"""
+    _register_and_login(client)
+    data = client.get(
+        "/api/v1/data/records", query_string={**_BASE, "limit": 2, "paging": "keyset"}
+    ).get_json()
+    resp = client.get(
+        "/api/v1/data/records",
+        query_string={**_BASE, "table": "Contact", "cursor": data["next_cursor"]},
+    )
+    assert resp.status_code == 400
+
+
+def test_get_records_keyset_requires_key_column(client, keyset_mocks, mock_connect_ai_metadata):
+    """主キーが特定できなければ sort_key を指定しても 400 になること（一意性を保証できない）"""
+    _register_and_login(client)
+    mock_connect_ai_metadata["columns"].return_value = [
+        {"COLUMN_NAME": "Id", "TYPE_NAME": "VARCHAR"},
+        {"COLUMN_NAME": "Name", "TYPE_NAME": "VARCHAR"},
+    ]
+    query = {**_BASE, "paging": "keyset"}
+    assert client.get("/api/v1/data/records", query_string=query).status_code == 400
+    resp = client.get("/api/v1/data/records", query_string={**query, "sort_key": "Id"})
+    assert resp.status_code == 400
+
+
+def test_get_records_keyset_rejects_unknown_sort_key(client, keyset_mocks):
+    """テーブルに存在しない sort_key は 400 になること"""
+    _register_and_login(client)
+    resp = client.get(
+        "/api/v1/data/records", query_string={**_BASE, "paging": "keyset", "sort_key": "Nope"}
+    )
+    assert resp.status_code == 400
+
+
+def test_get_records_keyset_non_unique_sort_key_uses_primary_key(client, keyset_mocks):
+    """主キー以外の sort_key は (sort_key, 主キー) の複合キーで重複なくページングすること"""
+    rows, _KEYSET_ROWS[:] = list(_KEYSET_ROWS), [
+        ["001", "B"], ["002", "A"], ["003", "B"], ["004", "A"], ["005", "B"],
+    ]
+    try:
+        _register_and_login(client)
+        seen, cursor = [], None
+        for _ in range(5):
+            query = {**_BASE, "limit": 2, "paging": "keyset", "sort_key": "Name"}
+            if cursor:
+                query["cursor"] = cursor
+            data = client.get("/api/v1/data/records", query_string=query).get_json()
+            seen.extend(r[0] for r in data["rows"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+    finally:
+        _KEYSET_ROWS[:] = rows
+    assert seen == ["002", "004", "001", "003", "005"]
+    page_sqls = [c[0][0] for c in keyset_mocks.call_args_list if "COUNT(*)" not in c[0][0]]
+    assert "ORDER BY [Name] ASC, [Id] ASC" in page_sqls[-1]
+
+
+def test_get_records_keyset_rejects_nullable_sort_key(client, keyset_mocks, mock_connect_ai_metadata):
+    """NULL を取りうる（または IS_NULLABLE が不明な）sort_key は 400 になること"""
+    _register_and_login(client)
+    query = {**_BASE, "paging": "keyset", "sort_key": "Name"}
+    for nullable in ({"IS_NULLABLE": True}, {"IS_NULLABLE": "YES"}, {}):
+        mock_connect_ai_metadata["columns"].return_value = [
+            {"COLUMN_NAME": "Id", "TYPE_NAME": "VARCHAR", "IS_KEY": True},
+            {"COLUMN_NAME": "Name", "TYPE_NAME": "VARCHAR", **nullable},
+        ]
+        assert client.get("/api/v1/data/records", query_string=query).status_code == 400
+
+
+def test_get_records_keyset_fails_on_null_at_page_boundary(client, keyset_mocks):
+    """メタデータに反してページ末尾の sort_key が NULL なら、続きを取り違えず 502 にすること"""
+    keyset_mocks.side_effect = lambda sql, *a: (["cnt"], [[3]]) if "COUNT(*)" in sql else (
+        ["Id", "Name"], [["002", "A"], ["001", None], ["003", "B"]]
+    )
+    _register_and_login(client)
+    resp = client.get(
+        "/api/v1/data/records",
+        query_string={**_BASE, "limit": 2, "paging": "keyset", "sort_key": "Name"},
+    )
+    assert resp.status_code == 502
+    page_sqls = [c[0][0] for c in keyset_mocks.call_args_list if "COUNT(*)" not in c[0][0]]
+    assert all("@after" not in sql for sql in page_sqls)
+
+
+def test_get_records_keyset_fails_without_key_in_result(client, keyset_mocks):
+    """結果に並び順のカラムが含まれなければ継続トークンを黙って省略せず 502 にすること"""
+    keyset_mocks.side_effect = lambda sql, *a: (["cnt"], [[5]]) if "COUNT(*)" in sql else (
+        ["Name"], [["a"], ["b"], ["c"]]
+    )
+    _register_and_login(client)
+    resp = client.get(
+        "/api/v1/data/records", query_string={**_BASE, "limit": 2, "paging": "keyset"}
+    )
+    assert resp.status_code == 502
+
+
+def test_get_records_rejects_unknown_paging(client, keyset_mocks):
+    """paging は offset / keyset 以外を受け付けないこと"""
+    _register_and_login(client)
+    resp = client.get("/api/v1/data/records", query_string={**_BASE, "paging": "cursor"})
+    assert resp.status_code == 400
+
+
 # ---------------------------------------------------------------------------
 # SQL 組み立て単体テスト
 # ---------------------------------------------------------------------------
@@ -139,6 +432,20 @@ def test_build_select_sql():
     assert "OFFSET 40" in sql
 
 
+def test_build_keyset_select_sql():
+    """主キー順 + 1 件多い LIMIT の SQL が生成され、2 ページ目以降は @after で絞り込むこと"""
+    sql = build_keyset_select_sql("Cat", "Sch", "Tbl", ["Id"], limit=20, after=False)
+    assert "FROM [Cat].[Sch].[Tbl] ORDER BY [Id] ASC LIMIT 21" in sql
+    assert "OFFSET" not in sql
+    sql = build_keyset_select_sql("Cat", "Sch", "Tbl", ["Id"], limit=20, after=True)
+    assert "WHERE [Id] > @after0 ORDER BY [Id] ASC" in sql
+    sql = build_keyset_select_sql("Cat", "Sch", "Tbl", ["Name", "Id"], limit=20, after=True)
+    assert (
+        "WHERE ([Name] > @after0) OR ([Name] = @after0 AND [Id] > @after1)"
+        " ORDER BY [Name] ASC, [Id] ASC LIMIT 21"
+    ) in sql
+
+
 def test_build_count_sql():
     """`SELECT COUNT(*) AS [cnt]` の SQL が生成されること"""
     sql = build_count_sql("Cat", "Sch", "Tbl")
@@ -0,0 +1,39 @@
+"""
+ヘルスチェック API のテスト
+
+対象:
+  - backend/api/v1/health.py
+  - backend/services/health_service.py
+"""
+from backend.connectai.circuit_breaker import get_circuit_breaker
+
+
+def test_health_ok_without_login(client):
+    resp = client.get("/api/v1/health")
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["status"] == "ok"
+    assert "http_pool" in data
+    assert data["circuit_breakers"] == {}
+
+
+def test_health_reports_open_breaker_as_degraded(app, client):
+    breaker = get_circuit_breaker("connect-ai", config={"CIRCUIT_BREAKER_MIN_REQUESTS": 2})
+    breaker.record_failure()
+    breaker.record_failure()
+
+    data = client.get("/api/v1/health").get_json()
+    assert data["status"] == "degraded"
+    assert data["circuit_breakers"]["connect-ai"]["state"] == "open"
+
+
+def test_health_hides_tenant_ids(app, client):
+    config = {"CIRCUIT_BREAKER_PER_TENANT": True, "CIRCUIT_BREAKER_MIN_REQUESTS": 1}
+    get_circuit_breaker("mcp", "tenant-a", config).record_failure()
+    get_circuit_breaker("mcp", "tenant-b", config).record_success()
+
+    resp = client.get("/api/v1/health")
+    data = resp.get_json()
+    assert data["status"] == "degraded"
+    assert data["circuit_breakers"]["mcp"]["tenants"] == {"open": 1, "closed": 1}
+    assert "tenant-a" not in resp.get_data(as_text=True)
@@ -0,0 +1,79 @@
+"""
+JSON プロバイダーのテスト
+
+対象:
+  - backend/json_provider.py
+"""
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from backend import json_provider
+
+_BACKENDS = [json_provider.BACKEND_STDLIB]
+if json_provider.orjson is not None:
+    _BACKENDS.append(json_provider.BACKEND_ORJSON)
+
+
+@pytest.fixture(params=_BACKENDS)
+def backend(request):
+    previous = json_provider.get_backend()
+    json_provider.configure(request.param)
+    yield request.param
+    json_provider.configure(previous)
+
+
+class TestDumpsLoads:
+    def test_round_trip(self, backend):
+        value = {"name": "日本語", "rows": [[1, 2.5, None, True]]}
+        text = json_provider.dumps(value)
+        assert "日本語" in text
+        assert json_provider.loads(text) == value
+        assert json_provider.loads(text.encode()) == value
+
+    def test_sort_keys_and_default(self, backend):
+        text = json_provider.dumps({"b": Decimal("1.5"), "a": 1}, default=str, sort_keys=True)
+        assert json.loads(text) == {"a": 1, "b": "1.5"}
+        assert text.index('"a"') < text.index('"b"')
+
+    def test_big_int_falls_back_to_stdlib(self, backend):
+        assert json_provider.loads(json_provider.dumps({"n": 2 ** 70})) == {"n": 2 ** 70}
+
+    def test_invalid_json_raises_json_decode_error(self, backend):
+        with pytest.raises(json.JSONDecodeError):
+            json_provider.loads(b"<html>")
+
+
+class TestConfigure:
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            json_provider.configure("simplejson")
+
+    def test_orjson_required_but_missing(self):
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(json_provider, "orjson", None)
+            with pytest.raises(RuntimeError):
+                json_provider.configure("orjson")
+            assert json_provider.configure("auto") == json_provider.BACKEND_STDLIB
+
+
+class TestFlaskProvider:
+    def test_app_uses_provider(self, app):
+        assert isinstance(app.json, json_provider.FastJSONProvider)
+
+    def test_jsonify_matches_default_provider(self, app, backend):
+        """バックエンドによらず Flask 標準と同じ値（日時は HTTP 日付形式）になること"""
+        from flask.json.provider import DefaultJSONProvider
+
+        value = {
+            "at": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            "amount": Decimal("12.30"),
+            "name": "顧客",
+        }
+        with app.app_context():
+            body = app.json.response(value).get_data(as_text=True)
+            expected = DefaultJSONProvider(app).dumps(value)
+        assert json.loads(body) == json.loads(expected)
+        assert "Tue, 02 Jan 2024 03:04:05 GMT" in body
@@ -5,8 +5,10 @@ MCP クライアントのテスト
   - backend/services/mcp_client.py
   - MCPClient クラスの各メソッド
   - get_mcp_tools() / invalidate_tools_cache() モジュール関数
+  - call_tool() の結果キャッシュ
 """
 import json
+import time
 import pytest
 from unittest.mock import patch, MagicMock
 from backend.services.mcp_client import (
@@ -71,11 +73,17 @@ SAMPLE_ANTHROPIC_TOOLS = [
 ]
 
 
+@pytest.fixture(autouse=True)
+def stateless_mcp(monkeypatch):
+    """セッションのテスト以外は initialize を送らない（ステートレスなサーバーとして扱う）"""
+    monkeypatch.setattr("backend.services.mcp_client._SESSION_ENABLED_DEFAULT", False)
+
+
 def _make_jsonrpc_response(result: dict) -> MagicMock:
     """正常な JSON-RPC 2.0 レスポンスを模倣した Mock を返す。"""
     mock_resp = MagicMock()
     mock_resp.status_code = 200
-    mock_resp.json.return_value = {"jsonrpc": "2.0", "result": result, "id": "1"}
+    mock_resp.content = json.dumps({"jsonrpc": "2.0", "result": result, "id": "1"}).encode()
     mock_resp.raise_for_status.return_value = None
     return mock_resp
 
@@ -84,11 +92,11 @@ def _make_jsonrpc_error_response(code: int, message: str) -> MagicMock:
     """JSON-RPC エラーレスポンスを模倣した Mock を返す。"""
     mock_resp = MagicMock()
     mock_resp.status_code = 200
-    mock_resp.json.return_value = {
+    mock_resp.content = json.dumps({
         "jsonrpc": "2.0",
         "error": {"code": code, "message": message},
         "id": "1",
-    }
+    }).encode()
     mock_resp.raise_for_status.return_value = None
     return mock_resp
 
@@ -144,7 +152,7 @@ class TestListTools:
 
     def test_returns_anthropic_formatted_tools(self):
         mock_resp = _make_jsonrpc_response({"tools": SAMPLE_MCP_TOOLS})
-        with patch("requests.post", return_value=mock_resp) as mock_post:
+        with patch("requests.Session.post", return_value=mock_resp) as mock_post:
             client = MCPClient(SAMPLE_JWT)
             tools = client.list_tools()
 
@@ -157,7 +165,7 @@ class TestListTools:
 
     def test_sends_bearer_auth_header(self):
         mock_resp = _make_jsonrpc_response({"tools": []})
-        with patch("requests.post", return_value=mock_resp) as mock_post:
+        with patch("requests.Session.post", return_value=mock_resp) as mock_post:
             MCPClient(SAMPLE_JWT).list_tools()
 
         headers = mock_post.call_args[1]["headers"]
@@ -165,13 +173,13 @@ class TestListTools:
 
     def test_empty_tools_returns_empty_list(self):
         mock_resp = _make_jsonrpc_response({"tools": []})
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             tools = MCPClient(SAMPLE_JWT).list_tools()
         assert tools == []
 
     def test_raises_mcp_error_on_jsonrpc_error(self):
         mock_resp = _make_jsonrpc_error_response(-32600, "Invalid Request")
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             with pytest.raises(MCPError, match="JSON-RPC error"):
                 MCPClient(SAMPLE_JWT).list_tools()
 
@@ -183,14 +191,14 @@ class TestListTools:
         http_error = _requests.HTTPError(response=mock_resp)
         mock_resp.raise_for_status.side_effect = http_error
 
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             with pytest.raises(MCPError, match="HTTP 401"):
                 MCPClient(SAMPLE_JWT).list_tools()
 
     def test_raises_mcp_error_on_connection_error(self):
         import requests as _requests
         with patch(
-            "requests.post",
+            "requests.Session.post",
             side_effect=_requests.ConnectionError("Connection refused"),
         ):
             with pytest.raises(MCPError, match="Request failed"):
@@ -212,7 +220,7 @@ class TestCallTool:
                 ]
             }
         )
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             result = MCPClient(SAMPLE_JWT).call_tool("getCatalogs", {})
         assert result == "catalog1,catalog2"
 
@@ -225,7 +233,7 @@ class TestCallTool:
                 ]
             }
         )
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             result = MCPClient(SAMPLE_JWT).call_tool("getCatalogs", {})
         assert result == "first\nsecond"
 
@@ -238,13 +246,13 @@ class TestCallTool:
                 ]
             }
         )
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             result = MCPClient(SAMPLE_JWT).call_tool("queryData", {"query": "SELECT 1"})
         assert result == "csv data"
 
     def test_sends_correct_jsonrpc_payload(self):
         mock_resp = _make_jsonrpc_response({"content": []})
-        with patch("requests.post", return_value=mock_resp) as mock_post:
+        with patch("requests.Session.post", return_value=mock_resp) as mock_post:
             MCPClient(SAMPLE_JWT).call_tool("queryData", {"query": "SELECT 1"})
 
         payload = mock_post.call_args[1]["json"]
@@ -254,13 +262,13 @@ class TestCallTool:
 
     def test_empty_content_returns_empty_string(self):
         mock_resp = _make_jsonrpc_response({"content": []})
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             result = MCPClient(SAMPLE_JWT).call_tool("getCatalogs", {})
         assert result == ""
 
     def test_raises_mcp_error_on_jsonrpc_error(self):
         mock_resp = _make_jsonrpc_error_response(-32000, "Tool execution failed")
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             with pytest.raises(MCPError, match="JSON-RPC error"):
                 MCPClient(SAMPLE_JWT).call_tool("getCatalogs", {})
 
@@ -271,7 +279,7 @@ class TestCallTool:
         mock_resp.text = "Forbidden"
         mock_resp.raise_for_status.side_effect = _requests.HTTPError(response=mock_resp)
 
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             with pytest.raises(MCPError, match="HTTP 403"):
                 MCPClient(SAMPLE_JWT).call_tool("getCatalogs", {})
 
@@ -289,13 +297,13 @@ class TestGetMcpTools:
 
     def test_returns_tools_on_first_call(self):
         mock_resp = _make_jsonrpc_response({"tools": SAMPLE_MCP_TOOLS})
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             tools = get_mcp_tools(SAMPLE_JWT)
         assert tools == SAMPLE_ANTHROPIC_TOOLS
 
     def test_caches_result_and_calls_api_only_once(self):
         mock_resp = _make_jsonrpc_response({"tools": SAMPLE_MCP_TOOLS})
-        with patch("requests.post", return_value=mock_resp) as mock_post:
+        with patch("requests.Session.post", return_value=mock_resp) as mock_post:
             get_mcp_tools(SAMPLE_JWT)
             get_mcp_tools(SAMPLE_JWT)
             get_mcp_tools(SAMPLE_JWT)
@@ -304,7 +312,7 @@ class TestGetMcpTools:
 
     def test_invalidate_clears_cache(self):
         mock_resp = _make_jsonrpc_response({"tools": SAMPLE_MCP_TOOLS})
-        with patch("requests.post", return_value=mock_resp) as mock_post:
+        with patch("requests.Session.post", return_value=mock_resp) as mock_post:
             get_mcp_tools(SAMPLE_JWT)
             invalidate_tools_cache()
             get_mcp_tools(SAMPLE_JWT)
@@ -313,7 +321,520 @@ class TestGetMcpTools:
 
     def test_returns_same_object_from_cache(self):
         mock_resp = _make_jsonrpc_response({"tools": SAMPLE_MCP_TOOLS})
-        with patch("requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             first = get_mcp_tools(SAMPLE_JWT)
             second = get_mcp_tools(SAMPLE_JWT)
         assert first is second
+
+
+class TestToolsCachePerTenant:
+    """テナント単位・TTL 付きのツール定義キャッシュ"""
+
+    def setup_method(self):
+        invalidate_tools_cache()
+
+    def test_cached_per_tenant(self):
+        mock_resp = _make_jsonrpc_response({"tools": SAMPLE_MCP_TOOLS})
+        with patch("requests.Session.post", return_value=mock_resp) as mock_post:
+            get_mcp_tools(SAMPLE_JWT, "tenant-a")
+            get_mcp_tools(SAMPLE_JWT, "tenant-b")
+            get_mcp_tools(SAMPLE_JWT, "tenant-a")
+        assert mock_post.call_count == 2
+
+    def test_tenant_from_jwt_subject(self):
+        import jwt
+        token_a = jwt.encode({"sub": "tenant-a"}, "secret", algorithm="HS256")
+        token_a2 = jwt.encode({"sub": "tenant-a", "iat": 1}, "secret", algorithm="HS256")
+        token_b = jwt.encode({"sub": "tenant-b"}, "secret", algorithm="HS256")
+        mock_resp = _make_jsonrpc_response({"tools": SAMPLE_MCP_TOOLS})
+        with patch("requests.Session.post", return_value=mock_resp) as mock_post:
+            get_mcp_tools(token_a)
+            get_mcp_tools(token_a2)
+            get_mcp_tools(token_b)
+        # 同じ sub のトークンは再発行されても同じキャッシュを使う
+        assert mock_post.call_count == 2
+
+    def test_invalidate_single_tenant(self):
+        mock_resp = _make_jsonrpc_response({"tools": SAMPLE_MCP_TOOLS})
+        with patch("requests.Session.post", return_value=mock_resp) as mock_post:
+            get_mcp_tools(SAMPLE_JWT, "tenant-a")
+            get_mcp_tools(SAMPLE_JWT, "tenant-b")
+            invalidate_tools_cache("tenant-a")
+            get_mcp_tools(SAMPLE_JWT, "tenant-a")
+            get_mcp_tools(SAMPLE_JWT, "tenant-b")
+        assert mock_post.call_count == 3
+
+    def test_stale_value_refreshed_in_background(self, app):
+        import time
+        app.config.update(MCP_TOOLS_CACHE_TTL=0.05, MCP_TOOLS_CACHE_STALE_TTL=60,
+                          MCP_SESSION_ENABLED=False)
+        updated = SAMPLE_MCP_TOOLS + [{
+            "name": "queryData", "description": "Run SQL",
+            "inputSchema": {"type": "object", "properties": {}},
+        }]
+        with app.app_context(), patch("requests.Session.post", side_effect=[
+            _make_jsonrpc_response({"tools": SAMPLE_MCP_TOOLS}),
+            _make_jsonrpc_response({"tools": updated}),
+        ]):
+            first = get_mcp_tools(SAMPLE_JWT, "tenant-a")
+            time.sleep(0.1)
+            # TTL 切れ: 古い値をすぐ返し、裏で取り直す
+            assert get_mcp_tools(SAMPLE_JWT, "tenant-a") == first
+            for _ in range(50):
+                latest = get_mcp_tools(SAMPLE_JWT, "tenant-a")
+                if len(latest) == len(updated):
+                    break
+                time.sleep(0.02)
+        assert [t["name"] for t in latest][-1] == "queryData"
+
+    def test_concurrent_first_calls_fetch_once(self):
+        import threading
+        import time
+
+        def slow_post(*args, **kwargs):
+            time.sleep(0.1)
+            return _make_jsonrpc_response({"tools": SAMPLE_MCP_TOOLS})
+
+        results = []
+        with patch("requests.Session.post", side_effect=slow_post) as mock_post:
+            threads = [
+                threading.Thread(target=lambda: results.append(get_mcp_tools(SAMPLE_JWT, "tenant-a")))
+                for _ in range(8)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert mock_post.call_count == 1
+        assert len(results) == 8
+
+
+# ---------------------------------------------------------------------------
+# MCP セッション（initialize + Mcp-Session-Id）
+# ---------------------------------------------------------------------------
+
+class _MCPServer:
+    """initialize でセッション ID を払い出し、以降のリクエストで検証する模擬サーバー"""
+
+    def __init__(self, session_id: str | None = "sess-1"):
+        self.session_id = session_id
+        self.requests: list[tuple[str, dict]] = []
+
+    def __call__(self, url, json=None, headers=None, **kwargs):
+        self.requests.append((json["method"], dict(headers)))
+        resp = MagicMock()
+        resp.raise_for_status.return_value = None
+        resp.headers = {}
+        if json["method"] == "initialize":
+            resp.status_code = 200
+            if self.session_id:
+                resp.headers = {"Mcp-Session-Id": self.session_id}
+            resp.content = _json_rpc({"protocolVersion": "2025-03-26", "capabilities": {}})
+        elif json["method"] == "notifications/initialized":
+            resp.status_code = 202
+            resp.content = b""
+        elif self.session_id and headers.get("Mcp-Session-Id") != self.session_id:
+            resp.status_code = 404
+            resp.content = b""
+        else:
+            resp.status_code = 200
+            resp.content = _json_rpc({"content": [{"type": "text", "text": "ok"}]})
+        return resp
+
+    def methods(self) -> list[str]:
+        return [m for m, _ in self.requests]
+
+
+def _json_rpc(result: dict) -> bytes:
+    return json.dumps({"jsonrpc": "2.0", "result": result, "id": "1"}).encode()
+
+
+class TestMCPSession:
+    @pytest.fixture(autouse=True)
+    def sessions_enabled(self, monkeypatch):
+        monkeypatch.setattr("backend.services.mcp_client._SESSION_ENABLED_DEFAULT", True)
+
+    def test_initializes_once_and_reuses_session(self):
+        server = _MCPServer()
+        with patch("requests.Session.post", side_effect=server):
+            for _ in range(10):
+                assert MCPClient(SAMPLE_JWT, account_id="tenant-a").call_tool("getCatalogs", {}) == "ok"
+
+        assert server.methods() == ["initialize", "notifications/initialized"] + ["tools/call"] * 10
+        tool_headers = [h for m, h in server.requests if m == "tools/call"]
+        assert all(h["Mcp-Session-Id"] == "sess-1" for h in tool_headers)
+        assert all(h["MCP-Protocol-Version"] == "2025-03-26" for h in tool_headers)
+
+    def test_sessions_are_per_tenant(self):
+        server = _MCPServer()
+        with patch("requests.Session.post", side_effect=server):
+            MCPClient(SAMPLE_JWT, account_id="tenant-a").call_tool("getCatalogs", {})
+            MCPClient(SAMPLE_JWT, account_id="tenant-b").call_tool("getCatalogs", {})
+        assert server.methods().count("initialize") == 2
+
+    def test_stateless_server_skips_session_header(self):
+        server = _MCPServer(session_id=None)
+        with patch("requests.Session.post", side_effect=server):
+            client = MCPClient(SAMPLE_JWT, account_id="tenant-a")
+            client.call_tool("getCatalogs", {})
+            client.call_tool("getCatalogs", {})
+        assert server.methods().count("initialize") == 1
+        assert all("Mcp-Session-Id" not in h for m, h in server.requests if m == "tools/call")
+
+    def test_expired_session_is_reinitialized(self):
+        server = _MCPServer()
+        with patch("requests.Session.post", side_effect=server):
+            client = MCPClient(SAMPLE_JWT, account_id="tenant-a")
+            client.call_tool("getCatalogs", {})
+            server.session_id = "sess-2"  # サーバー側でセッションが破棄された
+            assert client.call_tool("getCatalogs", {}) == "ok"
+        assert server.methods().count("initialize") == 2
+        assert server.requests[-1][1]["Mcp-Session-Id"] == "sess-2"
+
+    def test_initialize_rejected_falls_back_to_stateless(self):
+        calls = []
+
+        def post(url, json=None, headers=None, **kwargs):
+            calls.append(json["method"])
+            if json["method"] == "initialize":
+                return _make_jsonrpc_error_response(-32601, "Method not found")
+            return _make_jsonrpc_response({"tools": SAMPLE_MCP_TOOLS})
+
+        with patch("requests.Session.post", side_effect=post):
+            MCPClient(SAMPLE_JWT, account_id="tenant-a").list_tools()
+            MCPClient(SAMPLE_JWT, account_id="tenant-a").list_tools()
+        assert calls == ["initialize", "tools/list", "tools/list"]
+
+    def test_connections_are_pooled(self, monkeypatch):
+        """10 回のツール呼び出しが 1 本の keep-alive 接続を再利用すること"""
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from backend.connectai.http_pool import get_http_pool, reset_http_pool
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if request.get("id") is None:
+                    self.send_response(202)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = _json_rpc({"content": [{"type": "text", "text": "ok"}]})
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Mcp-Session-Id", "sess-1")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        monkeypatch.setattr("backend.services.mcp_client.MCP_BASE_URL",
+                            f"http://127.0.0.1:{server.server_port}/mcp")
+        reset_http_pool()
+        try:
+            for _ in range(10):
+                MCPClient(SAMPLE_JWT, account_id="tenant-a").call_tool("getCatalogs", {})
+            stats = get_http_pool().stats()
+        finally:
+            reset_http_pool()
+            server.shutdown()
+            server.server_close()
+        # initialize + notifications/initialized + tools/call × 10
+        assert stats["requests"] == 12
+        assert stats["misses"] == 1
+
+
+# ---------------------------------------------------------------------------
+# SSE の逐次解析
+# ---------------------------------------------------------------------------
+
+def _sse_response(chunks: list[bytes], after_end=None) -> MagicMock:
+    """chunks を順に返す SSE レスポンス。after_end が指定されていれば読み過ぎで例外にする。"""
+    def iter_content(chunk_size=None):
+        yield from chunks
+        if after_end is not None:
+            raise after_end
+
+    resp = MagicMock()
+    resp.status_code = 200
+    resp.headers = {"Content-Type": "text/event-stream"}
+    resp.raise_for_status.return_value = None
+    resp.iter_content.side_effect = iter_content
+    return resp
+
+
+def _sse_event(message: dict) -> bytes:
+    return f"event: message\r\ndata: {json.dumps(message)}\r\n\r\n".encode()
+
+
+class TestSSEParsing:
+    def test_progress_then_matching_response(self):
+        from backend.services.mcp_client import _parse_response
+
+        progress = {"jsonrpc": "2.0", "method": "notifications/progress",
+                    "params": {"progressToken": "t", "progress": 50, "total": 100}}
+        other = {"jsonrpc": "2.0", "id": "other", "result": {}}
+        final = {"jsonrpc": "2.0", "id": "req-1", "result": {"content": [{"type": "text", "text": "行" * 10}]}}
+        stream = b": keep-alive\n\n" + _sse_event(progress) + _sse_event(other) + _sse_event(final)
+        # チャンク境界が行やマルチバイト文字の途中にあっても解析できること
+        chunks = [stream[i:i + 7] for i in range(0, len(stream), 7)]
+        resp = _sse_response(chunks, after_end=AssertionError("read past the response"))
+
+        received = []
+        body = _parse_response(resp, "req-1", received.append)
+
+        assert body == final
+        assert received == [progress["params"]]
+        resp.close.assert_called_once()
+
+    def test_multiline_data(self):
+        from backend.services.mcp_client import _parse_response
+
+        resp = _sse_response([b'data: {"jsonrpc": "2.0",\ndata: "id": "1", "result": {"ok": true}}\n\n'])
+        assert _parse_response(resp, "1")["result"] == {"ok": True}
+
+    def test_last_event_without_blank_line(self):
+        from backend.services.mcp_client import _parse_response
+
+        resp = _sse_response([b'data: {"jsonrpc": "2.0", "id": "1", "result": {}}'])
+        assert _parse_response(resp, "1") == {"jsonrpc": "2.0", "id": "1", "result": {}}
+
+    def test_stream_without_response(self):
+        from backend.services.mcp_client import _parse_response
+
+        resp = _sse_response([b": ping\n\n"])
+        with pytest.raises(MCPError, match="no JSON-RPC response"):
+            _parse_response(resp, "1")
+
+    def test_max_bytes(self):
+        from backend.services.mcp_client import _parse_response
+
+        resp = _sse_response([b"data: " + b"x" * 100, b"y" * 100])
+        with pytest.raises(MCPError, match="too large"):
+            _parse_response(resp, "1", max_bytes=150)
+        resp.close.assert_called_once()
+
+    def test_long_single_line_event_is_linear(self):
+        """1 行が数 MB のイベントを小さなチャンクで受信しても、受信量に比例した時間で解析できること"""
+        from backend.services.mcp_client import _SSEDecoder
+
+        text = "x" * (8 * 1024 * 1024)
+        stream = f'data: {{"jsonrpc": "2.0", "id": "1", "result": {{"text": "{text}"}}}}\n\n'.encode()
+        decoder = _SSEDecoder()
+        events = []
+        start = time.perf_counter()
+        for i in range(0, len(stream), 8192):
+            events.extend(decoder.feed(stream[i:i + 8192]))
+        elapsed = time.perf_counter() - start
+
+        assert len(events) == 1
+        assert len(json.loads(events[0][1])["result"]["text"]) == len(text)
+        # 受信済みの部分を毎回探し直すと 8 MB で数秒かかる
+        assert elapsed < 2.0
+
+    def test_json_content_length_over_limit(self):
+        from backend.services.mcp_client import _parse_response
+
+        resp = _make_jsonrpc_response({})
+        resp.headers = {"Content-Type": "application/json", "Content-Length": "1000"}
+        with pytest.raises(MCPError, match="too large"):
+            _parse_response(resp, "1", max_bytes=100)
+
+    def test_call_tool_reports_progress(self):
+        received = []
+
+        def post(url, json=None, headers=None, **kwargs):
+            token = json["params"]["_meta"]["progressToken"]
+            assert kwargs["stream"] is True
+            return _sse_response([
+                _sse_event({"jsonrpc": "2.0", "method": "notifications/progress",
+                            "params": {"progressToken": token, "progress": 1, "total": 2}}),
+                _sse_event({"jsonrpc": "2.0", "method": "notifications/progress",
+                            "params": {"progressToken": "someone-else", "progress": 9}}),
+                _sse_event({"jsonrpc": "2.0", "id": json["id"],
+                            "result": {"content": [{"type": "text", "text": "done"}]}}),
+            ])
+
+        with patch("requests.Session.post", side_effect=post):
+            result = MCPClient(SAMPLE_JWT).call_tool("queryData", {"query": "SELECT 1"},
+                                                     on_progress=received.append)
+
+        assert result == "done"
+        assert [p["progress"] for p in received] == [1]
+
+
+# ---------------------------------------------------------------------------
+# ツール実行結果キャッシュ
+# ---------------------------------------------------------------------------
+
+class TestToolResultCache:
+    """読み取り専用ツールの結果キャッシュ（テナント単位・TTL 付き）"""
+
+    @pytest.fixture(autouse=True)
+    def cache_enabled(self, app):
+        app.config.update(MCP_TOOL_RESULT_CACHE_TTL=60, MCP_QUERY_RESULT_CACHE_TTL=0,
+                          MCP_SESSION_ENABLED=False)
+        with app.app_context():
+            yield app
+
+    @staticmethod
+    def _post(text="catalog1"):
+        return patch("requests.Session.post", side_effect=lambda *a, **k: _make_jsonrpc_response(
+            {"content": [{"type": "text", "text": text}]}
+        ))
+
+    def test_metadata_tool_cached_by_canonical_args(self):
+        with self._post("schema1") as mock_post:
+            client = MCPClient(SAMPLE_JWT, account_id="tenant-a")
+            first = client.call_tool("getTables", {"catalogName": "c", "schemaName": "s"})
+            # 引数の順序が違っても同じ呼び出しとみなす
+            second = client.call_tool("getTables", {"schemaName": "s", "catalogName": "c"})
+            client.call_tool("getTables", {"catalogName": "c", "schemaName": "other"})
+        assert first == second == "schema1"
+        assert mock_post.call_count == 2
+
+    def test_cached_per_tenant(self):
+        with self._post() as mock_post:
+            MCPClient(SAMPLE_JWT, account_id="tenant-a").call_tool("getCatalogs", {})
+            MCPClient(SAMPLE_JWT, account_id="tenant-b").call_tool("getCatalogs", {})
+            MCPClient(SAMPLE_JWT, account_id="tenant-a").call_tool("getCatalogs", {})
+        assert mock_post.call_count == 2
+
+    def test_query_data_not_cached_by_default(self):
+        with self._post() as mock_post:
+            client = MCPClient(SAMPLE_JWT, account_id="tenant-a")
+            client.call_tool("queryData", {"query": "SELECT 1"})
+            client.call_tool("queryData", {"query": "SELECT 1"})
+        assert mock_post.call_count == 2
+
+    def test_query_data_cached_with_short_ttl(self, app):
+        import time
+        app.config["MCP_QUERY_RESULT_CACHE_TTL"] = 0.05
+        with self._post() as mock_post:
+            client = MCPClient(SAMPLE_JWT, account_id="tenant-a")
+            client.call_tool("queryData", {"query": "SELECT 1"})
+            client.call_tool("queryData", {"query": "SELECT 1"})
+            time.sleep(0.1)
+            client.call_tool("queryData", {"query": "SELECT 1"})
+        assert mock_post.call_count == 2
+
+    def test_query_data_caches_only_single_select(self, app):
+        """SELECT 1 文以外（書き込み・複数文）の queryData はキャッシュしないこと"""
+        app.config["MCP_QUERY_RESULT_CACHE_TTL"] = 60
+        with self._post() as mock_post:
+            client = MCPClient(SAMPLE_JWT, account_id="tenant-a")
+            for sql in ("UPDATE [T] SET [A] = 1", "SELECT 1; DELETE FROM [T]",
+                        "WITH x AS (SELECT 1) SELECT * FROM x"):
+                client.call_tool("queryData", {"query": sql})
+                client.call_tool("queryData", {"query": sql})
+            client.call_tool("queryData", {"query": "select 1;"})
+            client.call_tool("queryData", {"query": "select 1;"})
+        assert mock_post.call_count == 7
+
+    def test_write_query_invalidates_tenant_query_cache(self, app):
+        """queryData で書き込みを実行したら、そのテナントのクエリ結果キャッシュを破棄すること"""
+        from backend.cache import get_cache
+        from backend.services.query_service import query_cache_prefix
+        app.config["MCP_QUERY_RESULT_CACHE_TTL"] = 60
+        rest_cache = get_cache(app)
+        rest_cache.cache.set(query_cache_prefix("tenant-a") + "k", [1], 60)
+        rest_cache.cache.set(query_cache_prefix("tenant-b") + "k", [1], 60)
+        with self._post() as mock_post:
+            a = MCPClient(SAMPLE_JWT, account_id="tenant-a")
+            b = MCPClient(SAMPLE_JWT, account_id="tenant-b")
+            a.call_tool("queryData", {"query": "SELECT 1"})
+            b.call_tool("queryData", {"query": "SELECT 1"})
+            a.call_tool("queryData", {"query": "DELETE FROM [T] WHERE [Id] = '1'"})
+            a.call_tool("queryData", {"query": "SELECT 1"})
+            b.call_tool("queryData", {"query": "SELECT 1"})
+        assert mock_post.call_count == 4
+        assert rest_cache.cache.get(query_cache_prefix("tenant-a") + "k") is None
+        assert rest_cache.cache.get(query_cache_prefix("tenant-b") + "k") is not None
+
+    def test_errors_are_not_cached(self):
+        with patch("requests.Session.post", side_effect=[
+            _make_jsonrpc_error_response(-32000, "Tool execution failed"),
+            _make_jsonrpc_response({"content": [{"type": "text", "text": "ok"}]}),
+        ]):
+            client = MCPClient(SAMPLE_JWT, account_id="tenant-a")
+            with pytest.raises(MCPError):
+                client.call_tool("getCatalogs", {})
+            assert client.call_tool("getCatalogs", {}) == "ok"
+
+    def test_invalidate_by_tenant_and_tool(self):
+        from backend.services.mcp_client import METADATA_TOOLS, invalidate_tool_result_cache
+
+        with self._post() as mock_post:
+            a = MCPClient(SAMPLE_JWT, account_id="tenant-a")
+            b = MCPClient(SAMPLE_JWT, account_id="tenant-b")
+            a.call_tool("getCatalogs", {})
+            b.call_tool("getCatalogs", {})
+            assert invalidate_tool_result_cache("tenant-a", METADATA_TOOLS) == 1
+            a.call_tool("getCatalogs", {})
+            b.call_tool("getCatalogs", {})
+        assert mock_post.call_count == 3
+
+    def test_invalidation_during_call_is_scoped_to_tenant(self):
+        """呼び出し中の破棄は同じテナントの結果だけ保存を見送ること（他テナントの書き込みは無関係）"""
+        from backend.services.mcp_client import invalidate_tool_result_cache
+
+        def post_invalidating(tenant):
+            def _post(*args, **kwargs):
+                invalidate_tool_result_cache(tenant)
+                return _make_jsonrpc_response({"content": [{"type": "text", "text": "cat"}]})
+            return _post
+
+        client = MCPClient(SAMPLE_JWT, account_id="tenant-a")
+        with patch("requests.Session.post", side_effect=post_invalidating("tenant-b")) as post:
+            client.call_tool("getCatalogs", {})
+            client.call_tool("getCatalogs", {})
+        assert post.call_count == 1
+
+        client = MCPClient(SAMPLE_JWT, account_id="tenant-c")
+        with patch("requests.Session.post", side_effect=post_invalidating("tenant-c")) as post:
+            client.call_tool("getCatalogs", {})
+            client.call_tool("getCatalogs", {})
+        assert post.call_count == 2
+
+    def test_stats_per_tool(self):
+        from backend.services.mcp_client import tool_result_cache_stats
+
+        with self._post():
+            client = MCPClient(SAMPLE_JWT, account_id="tenant-a")
+            for _ in range(3):
+                client.call_tool("getCatalogs", {})
+            client.call_tool("getSchemas", {"catalogName": "c"})
+        tools = tool_result_cache_stats()["tools"]
+        assert tools["getCatalogs"] == {"hits": 2, "misses": 1, "hit_rate": 0.6667}
+        assert tools["getSchemas"] == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+
+    def test_concurrent_identical_calls_fetch_once(self, app):
+        import threading
+        import time
+
+        def slow_post(*args, **kwargs):
+            time.sleep(0.1)
+            return _make_jsonrpc_response({"content": [{"type": "text", "text": "c"}]})
+
+        results = []
+
+        def worker():
+            with app.app_context():
+                results.append(
+                    MCPClient(SAMPLE_JWT, account_id="tenant-a").call_tool("getCatalogs", {})
+                )
+
+        with patch("requests.Session.post", side_effect=slow_post) as mock_post:
+            threads = [threading.Thread(target=worker) for _ in range(6)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert mock_post.call_count == 1
+        assert results == ["c"] * 6
@@ -143,3 +143,97 @@ def test_get_columns_missing_param(client, mock_connect_ai_metadata):
     _register_and_login(client)
     resp = client.get("/api/v1/metadata/columns?catalog_name=Salesforce1&schema_name=dbo")
     assert resp.status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# メタデータキャッシュ
+# ---------------------------------------------------------------------------
+
+def test_metadata_is_cached(client, mock_connect_ai_metadata):
+    """同じメタデータの 2 回目以降は Connect AI を呼ばないこと"""
+    _register_and_login(client)
+    for _ in range(3):
+        client.get("/api/v1/metadata/catalogs")
+        client.get("/api/v1/metadata/columns?catalog_name=Salesforce1&schema_name=dbo&table_name=Account")
+
+    assert mock_connect_ai_metadata["catalogs"].call_count == 1
+    assert mock_connect_ai_metadata["columns"].call_count == 1
+
+
+def test_metadata_cache_keyed_by_path(client, mock_connect_ai_metadata):
+    """パスが異なるメタデータは別々にキャッシュされること"""
+    _register_and_login(client)
+    client.get("/api/v1/metadata/tables?catalog_name=Salesforce1&schema_name=dbo")
+    client.get("/api/v1/metadata/tables?catalog_name=Salesforce2&schema_name=dbo")
+
+    assert mock_connect_ai_metadata["tables"].call_count == 2
+
+
+def test_metadata_cache_is_per_tenant(app, client, second_user_client, mock_connect_ai_metadata):
+    """別テナントのキャッシュは共有されないこと"""
+    from backend.models import db
+    from backend.models.user import User
+    with app.app_context():
+        user = User.query.filter_by(email="other@example.com").first()
+        user.connect_ai_account_id = "other-child-account"
+        db.session.commit()
+
+    _register_and_login(client)
+    client.get("/api/v1/metadata/catalogs")
+    second_user_client.get("/api/v1/metadata/catalogs")
+
+    assert mock_connect_ai_metadata["catalogs"].call_count == 2
+
+
+def test_metadata_cache_invalidated_on_connection_change(client, mock_connect_ai_metadata,
+                                                         mock_connect_ai_connections):
+    """コネクションの作成・削除でメタデータキャッシュが破棄されること"""
+    _register_and_login(client)
+    client.get("/api/v1/metadata/catalogs")
+    client.post("/api/v1/connections", json={"name": "SF", "data_source": "Salesforce"})
+    client.get("/api/v1/metadata/catalogs")
+    client.delete("/api/v1/connections/conn-001")
+    client.get("/api/v1/metadata/catalogs")
+
+    assert mock_connect_ai_metadata["catalogs"].call_count == 3
+
+
+def test_metadata_cache_invalidated_on_oauth_callback(client, mock_connect_ai_metadata,
+                                                     mock_connect_ai_connections):
+    """作成後・OAuth 完了前に読み込んだカタログは /callback で破棄され、新しいカタログが見えること"""
+    _register_and_login(client)
+    client.post("/api/v1/connections", json={"name": "SF", "data_source": "Salesforce"})
+    client.get("/api/v1/metadata/catalogs")
+    mock_connect_ai_metadata["catalogs"].return_value = [
+        {"TABLE_CATALOG": "Salesforce1"}, {"TABLE_CATALOG": "SF"},
+    ]
+    assert client.get("/callback").status_code == 200
+
+    catalogs = client.get("/api/v1/metadata/catalogs").get_json()["catalogs"]
+    assert [c["TABLE_CATALOG"] for c in catalogs] == ["Salesforce1", "SF"]
+    assert mock_connect_ai_metadata["catalogs"].call_count == 2
+
+
+def test_stale_metadata_served_while_revalidating(app, client, mock_connect_ai_metadata):
+    """TTL 切れ後は古い値を即座に返し、バックグラウンドで再取得すること"""
+    import time
+    from unittest.mock import patch
+    from backend.cache import get_cache
+
+    _register_and_login(client)
+    client.get("/api/v1/metadata/catalogs")
+    mock_connect_ai_metadata["catalogs"].return_value = [{"TABLE_CATALOG": "Refreshed"}]
+
+    later = time.time() + app.config["METADATA_CACHE_TTL_CATALOGS"] + 1
+    with patch("backend.cache.loader.time.time", return_value=later):
+        resp = client.get("/api/v1/metadata/catalogs")
+    assert resp.get_json()["catalogs"][0]["TABLE_CATALOG"] == "Salesforce1"
+
+    cache = get_cache(app)
+    for _ in range(100):
+        if cache.stats()["refreshes"]:
+            break
+        time.sleep(0.01)
+    resp = client.get("/api/v1/metadata/catalogs")
+    assert resp.get_json()["catalogs"][0]["TABLE_CATALOG"] == "Refreshed"
+    assert cache.stats()["stale_hits"] == 1
@@ -116,6 +116,164 @@ def test_execute_query_connect_ai_error(client, mock_connect_ai_query):
     assert resp.status_code == 502
 
 
+# ---------------------------------------------------------------------------
+# クエリ結果キャッシュ
+# ---------------------------------------------------------------------------
+
+_QUERY = {
+    "catalog_name": "Salesforce1",
+    "schema_name": "dbo",
+    "table_name": "Account",
+}
+
+
+def test_execute_query_not_cached_by_default(client, mock_connect_ai_query):
+    """QUERY_CACHE_TTL=0（デフォルト）では毎回 Connect AI を呼ぶこと"""
+    _register_and_login(client)
+    client.post("/api/v1/query", json=_QUERY)
+    client.post("/api/v1/query", json=_QUERY)
+    assert mock_connect_ai_query.call_count == 2
+
+
+def test_execute_query_cached_and_invalidated_on_write(app, client, mock_connect_ai_query):
+    """QUERY_CACHE_TTL > 0 では同じクエリ結果を再利用し、データ書き込みで破棄すること"""
+    app.config["QUERY_CACHE_TTL"] = 60
+    _register_and_login(client)
+    first = client.post("/api/v1/query", json=_QUERY).get_json()
+    second = client.post("/api/v1/query", json=_QUERY).get_json()
+    assert first["rows"] == second["rows"]
+    assert mock_connect_ai_query.call_count == 1
+
+    client.post("/api/v1/data/records", json={
+        "connection_id": "conn-001", "catalog": "Salesforce1", "schema_name": "dbo",
+        "table": "Account", "data": {"Name": "New"},
+    })
+    calls_before = mock_connect_ai_query.call_count
+    client.post("/api/v1/query", json=_QUERY)
+    assert mock_connect_ai_query.call_count == calls_before + 1
+
+
+# ---------------------------------------------------------------------------
+# ストリーミングエクスポート
+# ---------------------------------------------------------------------------
+
+def _paged_side_effect(total: int):
+    """LIMIT / OFFSET に応じて total 件のうち 1 ページ分を返す query_data の代替"""
+    def _query(sql, params=None, param_types=None):
+        limit = int(sql.split("LIMIT ")[1].split()[0])
+        offset = int(sql.split("OFFSET ")[1]) if "OFFSET" in sql else 0
+        rows = [[f"{i:03d}", f"Name,{i}"] for i in range(offset, min(offset + limit, total))]
+        return ["Id", "Name"], rows
+    return _query
+
+
+def test_export_query_streams_all_pages_as_csv(app, client, mock_connect_ai_query, mock_connect_ai_metadata):
+    """ページ単位で全件を取得し、ヘッダー付き CSV で返すこと"""
+    app.config["EXPORT_PAGE_SIZE"] = 2
+    mock_connect_ai_query.side_effect = _paged_side_effect(5)
+    _register_and_login(client)
+    resp = client.post("/api/v1/query/export", json=_QUERY)
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/csv"
+    assert "attachment" in resp.headers["Content-Disposition"]
+    lines = resp.get_data(as_text=True).splitlines()
+    assert lines[0] == "Id,Name"
+    assert lines[1] == '000,"Name,0"'
+    assert len(lines) == 6
+    assert mock_connect_ai_query.call_count == 3
+
+
+def test_export_query_ndjson(app, client, mock_connect_ai_query, mock_connect_ai_metadata):
+    """format=ndjson では 1 行 1 レコードの JSON を返すこと"""
+    import json
+    mock_connect_ai_query.side_effect = _paged_side_effect(3)
+    _register_and_login(client)
+    resp = client.post("/api/v1/query/export", json={**_QUERY, "format": "ndjson"})
+    assert resp.mimetype == "application/x-ndjson"
+    records = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert records[0] == {"Id": "000", "Name": "Name,0"}
+    assert len(records) == 3
+
+
+def test_export_query_respects_max_rows(app, client, mock_connect_ai_query, mock_connect_ai_metadata):
+    """EXPORT_MAX_ROWS を超えて取得しないこと"""
+    app.config.update(EXPORT_PAGE_SIZE=2, EXPORT_MAX_ROWS=3)
+    mock_connect_ai_query.side_effect = _paged_side_effect(10)
+    _register_and_login(client)
+    lines = client.post("/api/v1/query/export", json=_QUERY).get_data(as_text=True).splitlines()
+    assert len(lines) == 4
+    assert "LIMIT 1 OFFSET 2" in mock_connect_ai_query.call_args[0][0]
+
+
+def test_export_query_stops_fetching_when_closed(app, client, mock_connect_ai_query, mock_connect_ai_metadata):
+    """クライアントが途中で切断したら以降のページを取得しないこと"""
+    app.config["EXPORT_PAGE_SIZE"] = 2
+    mock_connect_ai_query.side_effect = _paged_side_effect(100)
+    _register_and_login(client)
+    resp = client.post("/api/v1/query/export", json=_QUERY, buffered=False)
+    chunks = resp.response
+    next(chunks)
+    next(chunks)
+    resp.close()
+    assert mock_connect_ai_query.call_count == 1
+
+
+def test_export_query_pages_are_ordered_by_primary_key(app, client, mock_connect_ai_query,
+                                                      mock_connect_ai_metadata):
+    """OFFSET でページを取得する SQL は主キー順に並べること（ページ間の重複・欠落を防ぐ）"""
+    app.config["EXPORT_PAGE_SIZE"] = 2
+    mock_connect_ai_metadata["columns"].return_value[0]["IS_KEY"] = True
+    mock_connect_ai_query.side_effect = _paged_side_effect(3)
+    _register_and_login(client)
+    client.post("/api/v1/query/export", json=_QUERY).get_data()
+    sqls = [c[0][0] for c in mock_connect_ai_query.call_args_list]
+    assert len(sqls) == 2
+    assert all(" ORDER BY [Id] ASC LIMIT 2" in sql for sql in sqls)
+
+
+def test_export_query_orders_by_selected_columns_without_key(app, client, mock_connect_ai_query,
+                                                            mock_connect_ai_metadata):
+    """主キーが特定できないテーブルでは選択カラムすべてで並べること"""
+    mock_connect_ai_query.side_effect = _paged_side_effect(1)
+    _register_and_login(client)
+    client.post("/api/v1/query/export", json={**_QUERY, "columns": ["Name", "Id"]}).get_data()
+    assert "ORDER BY [Name] ASC, [Id] ASC LIMIT" in mock_connect_ai_query.call_args[0][0]
+
+
+def test_export_query_errors(client, mock_connect_ai_query, mock_connect_ai_metadata):
+    """未対応の形式は 400、最初のページの取得失敗は 502 を返すこと"""
+    from backend.connectai.exceptions import ConnectAIError
+    _register_and_login(client)
+    assert client.post(
+        "/api/v1/query/export", json={**_QUERY, "format": "xml"}
+    ).status_code == 400
+    mock_connect_ai_query.side_effect = ConnectAIError("boom")
+    assert client.post("/api/v1/query/export", json=_QUERY).status_code == 502
+
+
+@pytest.mark.parametrize("fmt, trailer", [
+    ("csv", "# ERROR: export failed after 2 rows: page 2 failed\n"),
+    ("ndjson", {"error": {"code": "CONNECT_AI_ERROR", "message": "page 2 failed", "rows_exported": 2}}),
+])
+def test_export_query_fails_visibly_when_later_page_errors(app, client, mock_connect_ai_query,
+                                                          mock_connect_ai_metadata, fmt, trailer):
+    """2 ページ目の取得に失敗したら末尾にエラー行を書き、レスポンスを正常終了させないこと"""
+    import json
+    from backend.connectai.exceptions import ConnectAIError
+    app.config["EXPORT_PAGE_SIZE"] = 2
+    pages = _paged_side_effect(5)
+    mock_connect_ai_query.side_effect = [pages("SELECT * LIMIT 2"), ConnectAIError("page 2 failed")]
+    _register_and_login(client)
+    resp = client.post("/api/v1/query/export", json={**_QUERY, "format": fmt}, buffered=False)
+    assert resp.status_code == 200
+    chunks = []
+    with pytest.raises(ConnectAIError):
+        for chunk in resp.response:
+            chunks.append(chunk.decode())
+    last = chunks[-1] if fmt == "csv" else json.loads(chunks[-1])
+    assert last == trailer
+
+
 # ---------------------------------------------------------------------------
 # connection_id 不整合バグの修正確認（Issue #14）
 # ---------------------------------------------------------------------------
@@ -0,0 +1,142 @@
+"""
+列指向フォーマット（Arrow IPC / Parquet）のテスト
+
+対象:
+  - backend/services/result_format.py
+  - /api/v1/query・/api/v1/data/records のコンテンツネゴシエーション
+"""
+import io
+from unittest.mock import patch
+
+import pytest
+from werkzeug.datastructures import MIMEAccept
+
+from backend.services import result_format
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq  # noqa: E402
+
+
+_SCHEMA = [
+    {"columnName": "Id", "dataTypeName": "VARCHAR"},
+    {"columnName": "Amount", "dataTypeName": "DOUBLE"},
+    {"columnName": "Qty", "dataTypeName": "INTEGER"},
+    {"columnName": "Active", "dataTypeName": "BOOLEAN"},
+    {"columnName": "Created", "dataTypeName": "TIMESTAMP"},
+    {"columnName": "Day", "dataTypeName": "DATE"},
+]
+_ROWS = [
+    ["001", 12.5, 3, True, "2024-01-02T03:04:05Z", "2024-01-02"],
+    ["002", None, "7", "false", None, None],
+]
+
+
+def _register_and_login(client, email="user@example.com", password="password123", name="Test User"):
+    client.post("/api/v1/auth/register", json={"email": email, "password": password, "name": name})
+    client.post("/api/v1/auth/login", json={"email": email, "password": password})
+
+
+# ---------------------------------------------------------------------------
+# 変換
+# ---------------------------------------------------------------------------
+
+def test_to_arrow_table_uses_schema_types():
+    table = result_format.to_arrow_table(_SCHEMA, _ROWS, {"total": 2})
+    assert table.schema.field("Amount").type == pa.float64()
+    assert table.schema.field("Qty").type == pa.int32()
+    assert table.schema.field("Active").type == pa.bool_()
+    assert table.schema.field("Created").type == pa.timestamp("us")
+    assert table.schema.field("Day").type == pa.date32()
+    assert table.column("Qty").to_pylist() == [3, 7]
+    assert table.column("Active").to_pylist() == [True, False]
+    assert table.schema.metadata[b"total"] == b"2"
+
+
+def test_to_arrow_table_falls_back_to_string():
+    """型どおりに変換できないカラムは文字列として返すこと"""
+    table = result_format.to_arrow_table(
+        [{"columnName": "Qty", "dataTypeName": "INTEGER"}], [["3"], ["n/a"]]
+    )
+    assert table.schema.field("Qty").type == pa.string()
+    assert table.column("Qty").to_pylist() == ["3", "n/a"]
+
+
+def test_encode_round_trips():
+    body = result_format.encode("arrow", _SCHEMA, _ROWS)
+    assert pa.ipc.open_stream(body).read_all().num_rows == 2
+    body = result_format.encode("parquet", _SCHEMA, _ROWS)
+    assert pq.read_table(io.BytesIO(body)).column("Id").to_pylist() == ["001", "002"]
+
+
+def test_encode_arrow_file_format():
+    """arrow-file は Arrow IPC ファイル形式（ランダムアクセス可能）で書くこと"""
+    body = result_format.encode("arrow-file", _SCHEMA, _ROWS)
+    assert body[:6] == b"ARROW1"
+    assert pa.ipc.open_file(body).read_all().num_rows == 2
+
+
+def test_negotiate_format():
+    accept = MIMEAccept([("application/vnd.apache.arrow.stream", 1)])
+    assert result_format.negotiate_format(accept) == "arrow"
+    assert result_format.negotiate_format(MIMEAccept([("*/*", 1)])) == "json"
+    file_accept = MIMEAccept([("application/vnd.apache.arrow.file", 1)])
+    assert result_format.negotiate_format(file_accept) == "arrow-file"
+    assert result_format.negotiate_format(MIMEAccept([]), "parquet") == "parquet"
+    with pytest.raises(ValueError):
+        result_format.negotiate_format(MIMEAccept([]), "xml")
+    with patch.object(result_format, "pa", None), \
+         pytest.raises(result_format.ColumnarUnavailableError):
+        result_format.negotiate_format(accept)
+
+
+# ---------------------------------------------------------------------------
+# API
+# ---------------------------------------------------------------------------
+
+def test_query_returns_arrow_stream(client):
+    _register_and_login(client)
+    with patch("backend.connectai.client.ConnectAIClient.query_with_schema",
+               return_value=(_SCHEMA, _ROWS)):
+        resp = client.post(
+            "/api/v1/query",
+            json={"catalog_name": "C", "schema_name": "S", "table_name": "T"},
+            headers={"Accept": "application/vnd.apache.arrow.stream"},
+        )
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(resp.data).read_all()
+    assert table.column("Amount").to_pylist() == [12.5, None]
+
+
+def test_query_returns_406_without_pyarrow(client):
+    _register_and_login(client)
+    with patch.object(result_format, "pa", None):
+        resp = client.post(
+            "/api/v1/query?format=parquet",
+            json={"catalog_name": "C", "schema_name": "S", "table_name": "T"},
+        )
+    assert resp.status_code == 406
+
+
+def test_data_records_return_parquet(client, mock_connect_ai_crud, mock_connect_ai_metadata):
+    """カラムの型はページ取得のレスポンスの schema から決め、メタデータは取得しないこと"""
+    from backend.services import data_service
+    data_service._count_cache.clear()
+    mock_connect_ai_crud.side_effect = lambda sql, *a, **kw: (["cnt"], [[2]])
+    page_schema = [
+        {"columnName": "Id", "dataTypeName": "VARCHAR"},
+        {"columnName": "Qty", "dataTypeName": "INTEGER"},
+    ]
+    _register_and_login(client)
+    with patch("backend.connectai.client.ConnectAIClient.query_with_schema",
+               return_value=(page_schema, [["001", 1], ["002", 2]])):
+        resp = client.get("/api/v1/data/records", query_string={
+            "connection_id": "c", "catalog": "C", "schema_name": "S", "table": "T",
+            "format": "parquet",
+        })
+    assert resp.status_code == 200
+    mock_connect_ai_metadata["columns"].assert_not_called()
+    assert resp.headers["X-Total-Count"] == "2"
+    table = pq.read_table(io.BytesIO(resp.data))
+    assert table.schema.field("Qty").type == pa.int32()
+    assert table.column("Qty").to_pylist() == [1, 2]
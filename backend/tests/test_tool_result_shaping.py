@@ -0,0 +1,117 @@
+"""
+ツール結果の整形のテスト
+
+対象:
+  - backend/services/tool_result_shaping.py
+"""
+import pytest
+
+from backend.services import tool_result_shaping
+from backend.services.tool_result_shaping import get_full_result, read_result, shape
+
+
+def _csv(rows: int) -> str:
+    lines = ["Id,Amount,Region"]
+    for i in range(rows):
+        region = "" if i % 10 == 0 else f"R{i % 3}"
+        lines.append(f"{i},{i * 1.5},{region}")
+    return "\n".join(lines)
+
+
+def _handle(shaped: str) -> str:
+    return shaped.split('handle "')[1].split('"')[0]
+
+
+@pytest.fixture
+def limits(app):
+    app.config.update(MCP_TOOL_RESULT_MAX_BYTES=4096, MCP_TOOL_RESULT_MAX_ROWS=100,
+                      MCP_TOOL_RESULT_SAMPLE_ROWS=10)
+    with app.app_context():
+        yield app
+
+
+class TestShape:
+    def test_small_result_unchanged(self, limits):
+        text = _csv(5)
+        assert shape(text, "acct-1") == text
+
+    def test_rows_over_limit_replaced_by_sample_and_stats(self, limits):
+        shaped = shape(_csv(500), "acct-1")
+        assert "全 500 行" in shaped
+        assert "行数: 500" in shaped
+        assert "- Id: NULL 0 件, 最小 0, 最大 499" in shaped
+        # 数値として比較する（文字列比較なら "99.0" が最大になる）
+        assert "- Amount: NULL 0 件, 最小 0.0, 最大 748.5" in shaped
+        assert "- Region: NULL 50 件, 最小 R0, 最大 R2" in shaped
+        sample = shaped.split("サンプル:\n")[1].splitlines()
+        assert sample[0] == "Id,Amount,Region"
+        ids = [int(line.split(",")[0]) for line in sample[1:]]
+        # 先頭の行と、残りから等間隔に選んだ行（最終行を含む）
+        assert ids[:5] == [0, 1, 2, 3, 4]
+        assert ids[-1] == 499
+        assert len(ids) == 10
+
+    def test_bytes_over_limit(self, limits):
+        limits.config["MCP_TOOL_RESULT_MAX_ROWS"] = 0
+        shaped = shape(_csv(2000), "acct-1")
+        assert len(shaped.encode()) < 4096
+        assert "全 2000 行" in shaped
+
+    def test_non_tabular_text_truncated(self, limits):
+        text = "あ" * 5000
+        shaped = shape(text, "acct-1")
+        assert "先頭" in shaped
+        assert len(shaped.encode()) < 4096 + 500
+        assert get_full_result("acct-1", _handle(shaped)) == text
+
+    def test_disabled(self, limits):
+        limits.config.update(MCP_TOOL_RESULT_MAX_BYTES=0, MCP_TOOL_RESULT_MAX_ROWS=0)
+        text = _csv(500)
+        assert shape(text, "acct-1") == text
+        assert not tool_result_shaping.is_enabled()
+
+
+class TestFullResult:
+    def test_handle_scoped_to_tenant(self, limits):
+        text = _csv(500)
+        handle = _handle(shape(text, "acct-1"))
+        assert get_full_result("acct-1", handle) == text
+        assert get_full_result("acct-2", handle) is None
+
+    def test_read_result_pages(self, limits):
+        handle = _handle(shape(_csv(500), "acct-1"))
+        page = read_result("acct-1", {"handle": handle, "offset": 498, "limit": 10})
+        lines = page.splitlines()
+        assert lines[0] == "Id,Amount,Region"
+        assert lines[1].startswith("498,")
+        assert lines[-1] == "（全 500 行中 499〜500 行目）"
+
+        first = read_result("acct-1", {"handle": handle, "limit": 3})
+        assert first.splitlines()[-1] == "（全 500 行中 1〜3 行目。続きは offset=3）"
+
+    def test_read_result_capped_by_bytes(self, limits):
+        handle = _handle(shape(_csv(2000), "acct-1"))
+        page = read_result("acct-1", {"handle": handle, "limit": 2000})
+        assert len(page.encode()) < 4096 + 200
+        assert "続きは offset=" in page
+
+    def test_unknown_handle(self, limits):
+        assert read_result("acct-1", {"handle": "tr_missing"}).startswith("エラー")
+
+    def test_stored_in_shared_cache(self, limits):
+        """全件はアプリの共有キャッシュにテナント単位のキーで保存されること"""
+        from backend.cache import get_cache
+        text = _csv(500)
+        handle = _handle(shape(text, "acct-1"))
+        entry = get_cache(limits).cache.get(tool_result_shaping.full_result_prefix("acct-1") + handle)
+        assert entry.value == text
+
+    def test_not_stored_over_full_max_bytes(self, limits):
+        """MCP_TOOL_RESULT_FULL_MAX_BYTES を超える全件は保存せず、ハンドルも示さないこと"""
+        limits.config["MCP_TOOL_RESULT_FULL_MAX_BYTES"] = 1024
+        shaped = shape(_csv(500), "acct-1")
+        assert "全 500 行" in shaped
+        assert "handle" not in shaped
+        assert "取得できません" in shaped
+        from backend.cache import get_cache
+        assert get_cache(limits).cache.stats()["entries"] == 0
@@ -72,11 +72,22 @@ class APIClient {
     return this.request('GET', `/metadata/columns?catalog_name=${encodeURIComponent(catalogName)}&schema_name=${encodeURIComponent(schemaName)}&table_name=${encodeURIComponent(tableName)}`);
   }
 
-  async getRecords(connectionId, catalog, schemaName, table, limit = 20, offset = 0) {
+  // keyset ページング: keyset = { sortKey?, cursor? }（前ページの next_cursor を cursor に渡す）
+  async getRecords(connectionId, catalog, schemaName, table, limit = 20, offset = 0, keyset = null) {
     const params = new URLSearchParams({ connection_id: connectionId, catalog, schema_name: schemaName, table, limit, offset });
+    if (keyset) {
+      params.set('paging', 'keyset');
+      if (keyset.sortKey) params.set('sort_key', keyset.sortKey);
+      if (keyset.cursor) params.set('cursor', keyset.cursor);
+    }
     return this.request('GET', `/data/records?${params}`);
   }
 
+  async getRecordCount(connectionId, catalog, schemaName, table) {
+    const params = new URLSearchParams({ connection_id: connectionId, catalog, schema_name: schemaName, table });
+    return this.request('GET', `/data/records/count?${params}`);
+  }
+
   async createRecord(connectionId, catalog, schemaName, table, data) {
     return this.request('POST', '/data/records', { connection_id: connectionId, catalog, schema_name: schemaName, table, data });
   }
@@ -89,6 +100,33 @@ class APIClient {
     return this.request('DELETE', '/data/records', { connection_id: connectionId, catalog, schema_name: schemaName, table, where });
   }
 
+  // 全件エクスポート: ストリーミングの Response をそのまま返す（signal で中断できる）
+  async exportQuery(catalogName, schemaName, tableName, columns, conditions, format = 'csv', signal = null) {
+    const resp = await fetch(`${this.baseURL}/query/export`, {
+      method: 'POST',
+      credentials: 'include',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        catalog_name: catalogName,
+        schema_name: schemaName,
+        table_name: tableName,
+        columns,
+        conditions,
+        format,
+      }),
+      signal,
+    });
+    if (resp.status === 401) {
+      window.location.href = '/login';
+      return;
+    }
+    if (!resp.ok) {
+      const err = await resp.json();
+      throw new Error(err.error?.message || 'エラーが発生しました');
+    }
+    return resp;
+  }
+
   async executeQuery(catalogName, schemaName, tableName, columns, conditions) {
     return this.request('POST', '/query', {
       catalog_name: catalogName,